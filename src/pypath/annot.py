@@ -22,11 +22,16 @@ from future.utils import iteritems
 from past.builtins import xrange, range, reduce
 
 
+import os
 import sys
 import imp
+import time
+import hashlib
+import importlib
 import collections
 import itertools
 import traceback
+import multiprocessing
 
 try:
     import cPickle as pickle
@@ -35,6 +40,7 @@ except:
 
 import numpy as np
 import pandas as pd
+import scipy.sparse
 
 import pypath.dataio as dataio
 import pypath.common as common
@@ -46,6 +52,15 @@ import pypath.session_mod as session_mod
 import pypath.annot_formats as annot_formats
 import pypath.complex as complex
 import pypath.intera as intera
+import pypath.settings as settings
+import pypath.cache as cache_mod
+
+try:
+    # the `resource` module of the standard library, not `pypath.resource`
+    rusage = importlib.import_module('resource')
+except ImportError:
+    # not available on Windows
+    rusage = None
 
 
 protein_sources_default = {
@@ -205,6 +220,8 @@ class CustomAnnotation(session_mod.Logger):
     
     def load_from_pickle(self, pickle_file):
         
+        cache_mod.register_read(pickle_file)
+        
         with open(pickle_file, 'rb') as fp:
             
             self.classes = pickle.load(fp)
@@ -212,7 +229,7 @@ class CustomAnnotation(session_mod.Logger):
     
     def save_to_pickle(self, pickle_file):
         
-        with open(pickle_file, 'wb') as fp:
+        with cache_mod.atomic_write(pickle_file) as fp:
             
             pickle.dump(
                 obj = self.classes,
@@ -240,17 +257,19 @@ class CustomAnnotation(session_mod.Logger):
 
         elif isinstance(classdef.source, common.basestring):
 
-            if classdef.source in self.annotdb.annots:
+            # resources are loaded on first access, those failed
+            # to load are missing
+            annot = self.annotdb.annots.get(classdef.source)
+
+            if annot is not None:
 
                 if not classdef.args:
 
-                    return self.annotdb.annots[classdef.source].to_set()
+                    return annot.to_set()
 
                 else:
 
-                    return self.annotdb.annots[classdef.source].get_subset(
-                        **classdef.args
-                    )
+                    return annot.get_subset(**classdef.args)
 
         elif callable(classdef.source):
 
@@ -410,6 +429,7 @@ class AnnotationBase(resource.AbstractResource):
             reference_set = (),
             infer_complexes = True,
             dump = None,
+            load = True,
             **kwargs
         ):
         """
@@ -427,6 +447,9 @@ class AnnotationBase(resource.AbstractResource):
             object suitable for ``process_method``.
         :arg dict input_args:
             Arguments for the ``input_method``.
+        :arg bool load:
+            Load the data upon initialization. If `False`, the ``load``
+            method should be called later.
         """
         
         session_mod.Logger.__init__(self, name = 'annot')
@@ -453,7 +476,10 @@ class AnnotationBase(resource.AbstractResource):
         self.complexes = complexes
         self.reference_set = reference_set
         self.swissprot_only = swissprot_only
-        self.load()
+        
+        if load:
+            
+            self.load()
 
 
     def reload(self):
@@ -468,10 +494,47 @@ class AnnotationBase(resource.AbstractResource):
         setattr(self, '__class__', new)
 
 
+    @property
+    def loaded(self):
+        
+        return hasattr(self, 'annot')
+    
+    
+    def __getstate__(self):
+        
+        # the logger has an open file, and the record classes are often
+        # defined locally in `_process_method`, hence we pickle the
+        # records as tuples, together with the definition of their class
+        state = self.__dict__.copy()
+        del state['_logger']
+        state.pop('index', None)
+        state.pop('_index_annot', None)
+        state.pop('_index_entities', None)
+        state.pop('_index_records', None)
+        state.pop('_index_record_entity', None)
+        
+        if 'annot' in state:
+            
+            state['annot'] = _records_to_tuples(state['annot'])
+        
+        return state
+    
+    
+    def __setstate__(self, state):
+        
+        if 'annot' in state:
+            
+            state['annot'] = _tuples_to_records(*state['annot'])
+        
+        self.__dict__.update(state)
+        self._logger = session_mod.get_log()
+    
+    
     def load(self):
         
         self._log('Loading annotations from `%s`.' % self.name)
         
+        self.drop_index()
         self.set_reference_set()
         resource.AbstractResource.load(self)
         
@@ -489,6 +552,7 @@ class AnnotationBase(resource.AbstractResource):
         complex_annotation = self.complex_inference(complexes = complexes)
         
         self.annot.update(complex_annotation)
+        self.drop_index()
     
     
     def complex_inference(self, complexes = None):
@@ -691,6 +755,198 @@ class AnnotationBase(resource.AbstractResource):
         self.annot = dict((u, set()) for u in self.data)
 
 
+    def make_index(self):
+        """
+        Creates the list of all annotation records and the inverted
+        indices of their fields. The indices are built on demand, one
+        field at a time, by ``field_index``.
+        """
+        
+        self._index_annot = self.annot
+        self._index_entities = []
+        self._index_records = []
+        record_entity = []
+        
+        for entity, annots in iteritems(self.annot):
+            
+            ientity = len(self._index_entities)
+            self._index_entities.append(entity)
+            
+            for a in annots:
+                
+                self._index_records.append(a)
+                record_entity.append(ientity)
+        
+        self._index_record_entity = np.array(record_entity, dtype = np.int32)
+        self.index = {}
+    
+    
+    def ensure_index(self):
+        
+        if getattr(self, '_index_annot', None) is not self.annot:
+            
+            self.make_index()
+    
+    
+    def drop_index(self):
+        """
+        Removes the indices, e.g. after the annotations have been changed.
+        They will be built again when they are needed.
+        """
+        
+        self._index_annot = None
+        self._index_entities = []
+        self._index_records = []
+        self._index_record_entity = np.array([], dtype = np.int32)
+        self.index = {}
+    
+    
+    @staticmethod
+    def _index_keys(value):
+        """
+        The keys of a record's value in the inverted index: the value
+        itself and, if it has multiple elements, each of its elements.
+        """
+        
+        keys = []
+        
+        if isinstance(value, (tuple, list, set)):
+            
+            keys.extend(value)
+        
+        if not isinstance(value, (list, set)):
+            
+            keys.append(value)
+        
+        return keys
+    
+    
+    def field_index(self, name):
+        """
+        Returns the inverted index of one field: a dict with values as
+        keys and arrays of record indices as values. Each record is
+        indexed under its value and under each element of its value if
+        it is a tuple, list or set.
+        """
+        
+        self.ensure_index()
+        
+        if name not in self.index:
+            
+            index = collections.defaultdict(list)
+            
+            for irec, a in enumerate(self._index_records):
+                
+                for key in set(self._index_keys(getattr(a, name))):
+                    
+                    index[key].append(irec)
+            
+            self.index[name] = dict(
+                (key, np.array(irecs, dtype = np.int32))
+                for key, irecs in iteritems(index)
+            )
+        
+        return self.index[name]
+    
+    
+    @staticmethod
+    def _is_indexable(value):
+        """
+        Tells if a search value can be looked up in the inverted index:
+        a non-empty set or a hashable value, but not a callable.
+        """
+        
+        if callable(value):
+            
+            return False
+        
+        if isinstance(value, set):
+            
+            return bool(value)
+        
+        try:
+            
+            hash(value)
+            
+        except TypeError:
+            
+            return False
+        
+        return True
+    
+    
+    def _lookup(self, name, value):
+        """
+        Returns the sorted array of indices of the records matching
+        ``value`` in the field ``name``.
+        """
+        
+        index = self.field_index(name)
+        
+        if isinstance(value, set):
+            
+            irecs = [index[v] for v in value if v in index]
+            
+            return (
+                np.unique(np.concatenate(irecs))
+                    if irecs else
+                np.array([], dtype = np.int32)
+            )
+        
+        return index.get(value, np.array([], dtype = np.int32))
+    
+    
+    @staticmethod
+    def _match(value, query):
+        """
+        Checks one value of an annotation record against a search value.
+        """
+        
+        return (
+            # simple agreement
+            value == query
+            # custom method returns bool
+            or
+            (
+                callable(query)
+                and
+                query(value)
+            )
+            # multiple value in annotation slot
+            # and query is a set: checking if they have
+            # any in common
+            or
+            (
+                isinstance(value, (tuple, list, set))
+                and
+                isinstance(query, set)
+                and
+                bool(set(value) & query)
+            )
+            # search value is a set, checking if contains
+            # the record's value
+            or
+            (
+                isinstance(query, set)
+                and
+                not isinstance(value, (list, set))
+                and
+                value in query
+            )
+            # record's value contains multiple elements
+            # (set, list or tuple), checking if it contains
+            # the search value
+            or
+            (
+                isinstance(value, (tuple, list, set))
+                and
+                not isinstance(query, set)
+                and
+                query in value
+            )
+        )
+
+
     def get_subset(self, method = None, **kwargs):
         """
         Retrieves a subset by filtering based on ``kwargs``.
@@ -698,68 +954,57 @@ class AnnotationBase(resource.AbstractResource):
         Elements having the provided values in the annotation will be
         returned.
         Returns a set of UniProt IDs.
+        
+        Values and sets of values are looked up in the inverted index of
+        the fields, callables in ``method`` and in ``kwargs`` are called
+        only on the records matching all the other conditions.
         """
-
-        result = set()
-
-        for uniprot, annot in iteritems(self.annot):
-
-            for a in annot:
-
+        
+        self.ensure_index()
+        
+        irecs = None
+        other = {}
+        
+        for name, value in iteritems(kwargs):
+            
+            if self._is_indexable(value):
+                
+                this_irecs = self._lookup(name, value)
+                irecs = (
+                    this_irecs
+                        if irecs is None else
+                    np.intersect1d(irecs, this_irecs, assume_unique = True)
+                )
+                
+            else:
+                
+                other[name] = value
+        
+        if irecs is None:
+            
+            irecs = np.arange(len(self._index_records))
+        
+        if callable(method) or other:
+            
+            irecs = [
+                irec
+                for irec in irecs
+                for a in (self._index_records[irec],)
                 # we either call a method on all records
                 # or check against conditions provided in **kwargs
                 if (
                     not callable(method) or
                     method(a)
                 ) and all(
-                    (
-                        # simple agreement
-                        (
-                            getattr(a, name) == value
-                        )
-                        # custom method returns bool
-                        or
-                        (
-                            callable(value)
-                            and
-                            value(getattr(a, name))
-                        )
-                        # multiple value in annotation slot
-                        # and value is a set: checking if they have
-                        # any in common
-                        or
-                        (
-                            isinstance(getattr(a, name), (tuple, list, set))
-                            and
-                            isinstance(value, set)
-                            and
-                            set(getattr(a, name)) | value
-                        )
-                        # search value is a set, checking if contains
-                        # the record's value
-                        or
-                        (
-                            isinstance(value, set)
-                            and
-                            getattr(a, name) in value
-                        )
-                        # record's value contains multiple elements
-                        # (set, list or tuple), checking if it contains
-                        # the search value
-                        or
-                        (
-                            isinstance(getattr(a, name), (tuple, list, set))
-                            and
-                            value in getattr(a, name)
-                        )
-                    )
-                    for name, value in iteritems(kwargs)
-                ):
-
-                    result.add(uniprot)
-                    break
+                    self._match(getattr(a, name), value)
+                    for name, value in iteritems(other)
+                )
+            ]
         
-        return result
+        return set(
+            self._index_entities[ientity]
+            for ientity in np.unique(self._index_record_entity[irecs])
+        )
     
     
     def get_subset_bool_array(self, reference_set = None, **kwargs):
@@ -809,7 +1054,16 @@ class AnnotationBase(resource.AbstractResource):
         ))
     
     
-    def to_array(self, reference_set = None, use_fields = None):
+    def to_array(self, reference_set = None, use_fields = None, sparse = False):
+        """
+        Creates a boolean matrix with the entities in ``reference_set`` in
+        its rows and the labels in its columns: the resource itself and
+        each combination of the values in ``use_fields``.
+        
+        Returns a tuple of labels and the matrix, which is a
+        ``scipy.sparse.csc_matrix`` if ``sparse`` is `True`, otherwise a
+        dense ``numpy.ndarray``.
+        """
         
         use_fields = (
             use_fields or (
@@ -833,10 +1087,28 @@ class AnnotationBase(resource.AbstractResource):
         result = [
             (
                 (self.name,),
-                self.to_bool_array(reference_set = reference_set)
+                np.flatnonzero(
+                    self.to_bool_array(reference_set = reference_set)
+                ),
             )
         ]
         
+        self.ensure_index()
+        
+        rows = dict(
+            reversed(i)
+            for i in enumerate(reference_set)
+        )
+        entity_rows = np.array(
+            [rows.get(entity, -1) for entity in self._index_entities],
+            dtype = np.int64,
+        )
+        record_rows = entity_rows[self._index_record_entity]
+        
+        # records matching each combination of values, we refine these
+        # groups field by field instead of searching for each combination
+        groups = {(): np.arange(len(self._index_records))}
+        
         for i in xrange(len(fields)):
             
             this_ifields = ifields[:i+1]
@@ -844,8 +1116,7 @@ class AnnotationBase(resource.AbstractResource):
             
             value_combinations = set(
                 tuple(annot[j] for j in this_ifields)
-                for annots in self.annot.values()
-                for annot in annots
+                for annot in self._index_records
             )
             value_combinations = sorted(
                 values
@@ -856,6 +1127,15 @@ class AnnotationBase(resource.AbstractResource):
                 )
             )
             
+            groups = self._refine_groups(
+                groups = groups,
+                # the search values are assigned to the field names
+                # by `zip`, hence the field is the one at the position
+                # of the last value
+                name = this_fields[len(this_ifields) - 1],
+                value_combinations = value_combinations,
+            )
+            
             for values in value_combinations:
                 
                 labels = tuple(
@@ -867,17 +1147,12 @@ class AnnotationBase(resource.AbstractResource):
                     for ival, val in enumerate(values)
                 )
                 
-                this_values = dict(zip(this_fields, values))
-
-                this_array = self.get_subset_bool_array(
-                    reference_set = reference_set,
-                    **this_values
-                )
+                this_rows = record_rows[groups[values]]
 
                 result.append(
                     (
                         (self.name,) + labels,
-                        this_array,
+                        np.unique(this_rows[this_rows >= 0]),
                     )
                 )
         
@@ -888,10 +1163,88 @@ class AnnotationBase(resource.AbstractResource):
         
         return (
             tuple(r[0] for r in result),
-            np.vstack([r[1] for r in result]).T
+            self._rows_to_array(
+                rows = [r[1] for r in result],
+                n_rows = len(reference_set),
+                sparse = sparse,
+            )
         )
     
     
+    @staticmethod
+    def _rows_to_array(rows, n_rows, sparse = False):
+        """
+        Creates a boolean matrix from the indices of the `True` rows
+        in each column.
+        """
+        
+        indices = (
+            np.concatenate(rows).astype(np.int32)
+                if rows else
+            np.array([], dtype = np.int32)
+        )
+        indptr = np.cumsum([0] + [len(r) for r in rows]).astype(np.int32)
+        
+        array = scipy.sparse.csc_matrix(
+            (
+                np.ones(len(indices), dtype = bool),
+                indices,
+                indptr,
+            ),
+            shape = (n_rows, len(rows)),
+        )
+        
+        return array if sparse else array.toarray()
+    
+    
+    def _refine_groups(self, groups, name, value_combinations):
+        """
+        From the records matching combinations of values selects the
+        ones matching also a value of the field ``name``, using the
+        inverted index of the field.
+        
+        :arg dict groups:
+            Tuples of values as keys, arrays of record indices matching
+            them as values.
+        :arg str name:
+            The field to select by.
+        :arg list value_combinations:
+            Tuples of values, each extending a key in ``groups`` by one
+            value of the field ``name``. If the tuples have the same
+            length as the keys in ``groups``, these are simply selected.
+        """
+        
+        if value_combinations and len(value_combinations[0]) in {
+            len(values) for values in groups
+        }:
+            
+            return dict(
+                (values, groups[values])
+                for values in value_combinations
+            )
+        
+        index = self.field_index(name)
+        by_value = collections.defaultdict(list)
+        
+        for values in value_combinations:
+            
+            by_value[values[-1]].append(values)
+        
+        refined = {}
+        
+        for value, combinations in iteritems(by_value):
+            
+            matching = np.zeros(len(self._index_records), dtype = bool)
+            matching[index.get(value, [])] = True
+            
+            for values in combinations:
+                
+                parent = groups[values[:-1]]
+                refined[values] = parent[matching[parent]]
+        
+        return refined
+    
+    
     @property
     def has_fields(self):
         
@@ -2251,6 +2604,88 @@ class GuideToPharmacology(LigandReceptor):
         LigandReceptor._default_record_processor(self, record, typ, annot)
 
 
+LoadStats = collections.namedtuple(
+    'LoadStats',
+    ['time', 'memory'],
+)
+
+
+class LazyAnnotations(dict):
+    """
+    A dict of annotation objects, with resource names as keys. Loads the
+    data of each resource when it is first accessed, and removes the ones
+    failed to load.
+    
+    :arg callable load_resource:
+        Loads the data into an annotation object, returns `False` if it
+        failed.
+    """
+    
+    
+    def __init__(self, load_resource, *args, **kwargs):
+        
+        dict.__init__(self, *args, **kwargs)
+        self._load_resource = load_resource
+    
+    
+    def __getitem__(self, key):
+        
+        annot = dict.__getitem__(self, key)
+        
+        if not annot.loaded and not self._load_resource(annot):
+            
+            dict.__delitem__(self, key)
+            raise KeyError(key)
+        
+        return annot
+    
+    
+    def get(self, key, default = None):
+        
+        try:
+            
+            return self[key]
+            
+        except KeyError:
+            
+            return default
+    
+    
+    def items(self):
+        
+        return [
+            (key, annot)
+            for key, annot in (
+                (key, self.get(key))
+                for key in list(self.keys())
+            )
+            if annot is not None
+        ]
+    
+    
+    def values(self):
+        
+        return [annot for key, annot in self.items()]
+    
+    
+    def load_all(self):
+        
+        _ = self.items()
+    
+    
+    @property
+    def loaded(self):
+        """
+        Names of the resources already loaded.
+        """
+        
+        return set(
+            key
+            for key, annot in dict.items(self)
+            if annot.loaded
+        )
+
+
 class AnnotationTable(session_mod.Logger):
     
     
@@ -2268,6 +2703,9 @@ class AnnotationTable(session_mod.Logger):
             create_dataframe = False,
             load = True,
             pickle_file = None,
+            sparse = None,
+            lazy = None,
+            workers = None,
         ):
         """
         Manages a custom set of annotation resources. Loads data and
@@ -2297,6 +2735,17 @@ class AnnotationTable(session_mod.Logger):
         :arg bool load:
             Load the data upon initialization. If `False`, you will have a
             chance to call the ``load`` method later.
+        :arg bool sparse:
+            Store the boolean array of annotations as a sparse matrix
+            (``scipy.sparse.csc_matrix``). If `None`, the value of the
+            ``annot_sparse_array`` setting will be used.
+        :arg bool lazy:
+            Load each resource only when it is first accessed. If `None`,
+            the value of the ``annot_lazy`` setting will be used.
+        :arg int workers:
+            Number of processes loading the resources if ``lazy`` is
+            `False`. If `None`, the value of the ``annot_workers`` setting
+            will be used.
         """
 
         session_mod.Logger.__init__(self, name = 'annot')
@@ -2321,8 +2770,16 @@ class AnnotationTable(session_mod.Logger):
         self.proteins = proteins
         self.swissprot_only = swissprot_only
         self.use_complexes = use_complexes
+        self.sparse = (
+            settings.get('annot_sparse_array')
+                if sparse is None else
+            sparse
+        )
+        self.lazy = settings.get('annot_lazy') if lazy is None else lazy
+        self.workers = workers or settings.get('annot_workers') or 1
         self.set_reference_set()
-        self.annots = {}
+        self.annots = LazyAnnotations(self._load_resource)
+        self.load_stats = {}
         
         if load:
 
@@ -2359,92 +2816,35 @@ class AnnotationTable(session_mod.Logger):
     
     def load_from_pickle(self, pickle_file):
         
+        cache_mod.register_read(pickle_file)
+        
         with open(pickle_file, 'rb') as fp:
             
             self.proteins, self.complexes, self.reference_set, annots = (
                 pickle.load(fp)
             )
             
-            self.annots = {}
+            self.annots = LazyAnnotations(self._load_resource)
             
             for name, (cls_name, data, record_cls) in iteritems(annots):
                 
-                if record_cls is not None:
-                    
-                    setattr(
-                        sys.modules[record_cls['module']],
-                        record_cls['name'],
-                        collections.namedtuple(
-                            record_cls['name'],
-                            record_cls['fields'],
-                        ),
-                    )
-                    
-                    record_cls_new = getattr(
-                        sys.modules[record_cls['module']],
-                        record_cls['name'],
-                    )
-                    
-                    data = dict(
-                        (
-                            key,
-                            set(
-                                record_cls_new(*this_annot)
-                                for this_annot in these_annots
-                            )
-                        )
-                        for key, these_annots in iteritems(data)
-                    )
-                
+                data = _tuples_to_records(data, record_cls)
                 cls = globals()[cls_name]
                 
                 self.annots[name] = cls(dump = data)
+        
+        self.load_array(self._array_file(pickle_file))
     
     
     def save_to_pickle(self, pickle_file):
         
-        
-        def get_record_class(annot):
-            
-            for val in annot.values():
-                
-                for elem in val:
-                    
-                    return elem.__class__
-        
-        
-        with open(pickle_file, 'wb') as fp:
-            
-            classes = dict(
-                (
-                    name,
-                    get_record_class(annot.annot)
-                )
-                for name, annot in iteritems(self.annots)
-            )
+        with cache_mod.atomic_write(pickle_file) as fp:
             
             annots = dict(
                 (
                     name,
-                    (
-                        annot.__class__.__name__,
-                        dict(
-                            (
-                                key,
-                                set(
-                                    tuple(this_annot)
-                                    for this_annot in these_annots
-                                )
-                            )
-                            for key, these_annots in iteritems(annot.annot)
-                        ),
-                        {
-                            'name': classes[name].__name__,
-                            'module': classes[name].__module__,
-                            'fields': classes[name]._fields,
-                        }
-                        if classes[name] else None
-                    )
+                    (annot.__class__.__name__,) +
+                    _records_to_tuples(annot.annot)
                 )
                 for name, annot in iteritems(self.annots)
             )
@@ -2458,6 +2858,102 @@ class AnnotationTable(session_mod.Logger):
                 ),
                 file = fp,
             )
+        
+        array_file = self._array_file(pickle_file)
+        
+        if hasattr(self, 'data'):
+            
+            self.save_array(array_file)
+            
+        elif os.path.exists(array_file):
+            
+            # an array from an earlier state would not match
+            os.remove(array_file)
+    
+    
+    @staticmethod
+    def _array_file(pickle_file):
+        
+        return '%s.npz' % pickle_file
+    
+    
+    def save_array(self, fname):
+        """
+        Saves the boolean array of annotations and its column labels
+        into a NumPy ``.npz`` file, in sparse (CSC) format. The hash of
+        the reference set (the rows) is saved too.
+        """
+        
+        self._log('Saving annotation array to `%s`.' % fname)
+        
+        data = scipy.sparse.csc_matrix(self.data)
+        
+        with cache_mod.atomic_write(fname) as fp:
+            
+            np.savez(
+                fp,
+                indices = data.indices,
+                indptr = data.indptr,
+                shape = np.array(data.shape),
+                names = self.names,
+                reference_set_md5 = np.array(self._reference_set_md5()),
+            )
+    
+    
+    def _reference_set_md5(self):
+        """
+        Returns the MD5 hash of the reference set, in the order of
+        the rows.
+        """
+        
+        return hashlib.md5(
+            '\n'.join(str(i) for i in self.reference_set).encode('utf-8')
+        ).hexdigest()
+    
+    
+    def load_array(self, fname):
+        """
+        Loads the boolean array of annotations from a file saved by
+        ``save_array``. Nothing happens if the file does not exist or its
+        rows do not match the reference set (including the order).
+        """
+        
+        if not os.path.exists(fname):
+            
+            return
+        
+        cache_mod.register_read(fname)
+        
+        with np.load(fname, allow_pickle = True) as npz:
+            
+            shape = tuple(npz['shape'])
+            
+            if (
+                'reference_set_md5' not in npz.files or
+                str(npz['reference_set_md5']) != self._reference_set_md5()
+            ):
+                
+                self._log(
+                    'Annotation array in `%s` does not match the '
+                    'reference set, not loading it.' % fname
+                )
+                return
+            
+            data = scipy.sparse.csc_matrix(
+                (
+                    np.ones(len(npz['indices']), dtype = bool),
+                    npz['indices'],
+                    npz['indptr'],
+                ),
+                shape = shape,
+            )
+            
+            self.names = npz['names']
+        
+        self.data = data if self.sparse else data.toarray()
+        self.set_cols()
+        
+        self._log('Annotation array loaded from `%s`.' % fname)
     
     
     def set_reference_set(self):
@@ -2489,31 +2985,172 @@ class AnnotationTable(session_mod.Logger):
     
     
     def _load_resources(self, definitions, reference_set):
+        """
+        Creates the annotation objects and loads their data: either right
+        away, one by one or in parallel, or, in lazy mode, when they are
+        first accessed.
+        """
+        
+        jobs = []
         
         for cls in definitions:
             
             cls = cls if callable(cls) else getattr(self._module, cls)
+            param = {
+                'ncbi_tax_id': self.ncbi_tax_id,
+                'reference_set': reference_set,
+            }
             
             try:
                 
-                annot = cls(
-                    ncbi_tax_id = self.ncbi_tax_id,
-                    reference_set = reference_set,
-                )
-                
-                self.annots[annot.name] = annot
+                # only creating the object, not loading the data yet
+                annot = cls(load = False, **param)
                 
             except Exception:
                 
-                self._log(
-                    'Failed to load annotations from resource `%s`.\n'
-                    '%s\n' % (
-                        cls.__name__
-                            if hasattr(cls, '__name__') else
-                        str(cls),
-                        traceback.format_exc(),
-                    )
+                self._log_failure(cls)
+                continue
+            
+            self.annots[annot.name] = annot
+            jobs.append((annot.name, (cls, param)))
+        
+        if self.lazy:
+            
+            return
+        
+        parallel = [job for job in jobs if self._picklable(job[1])]
+        
+        if self.workers > 1 and len(parallel) > 1:
+            
+            self._log(
+                'Loading %u annotation resources in %u processes.' % (
+                    len(parallel),
+                    self.workers,
+                )
+            )
+            
+            # new process for each resource, so we can tell the memory
+            # used by each of them
+            mapping.sync_memo()
+            pool = multiprocessing.Pool(
+                processes = self.workers,
+                maxtasksperchild = 1,
+                initializer = mapping.detach_memo,
+            )
+            
+            try:
+                
+                results = pool.imap(
+                    _load_annotation,
+                    [job for name, job in parallel],
                 )
+                
+                for name, (cls, param) in parallel:
+                    
+                    result, error, elapsed, memory = next(results)
+                    
+                    if error is not None:
+                        
+                        self._log(
+                            'Failed to load annotations from resource '
+                            '`%s` in a worker process.\n%s\n' % (
+                                cls.__name__,
+                                error,
+                            )
+                        )
+                        del self.annots[name]
+                        
+                    elif result is not None:
+                        
+                        self.annots[name] = pickle.loads(result)
+                        self._record_stats(name, elapsed, memory)
+                
+                pool.close()
+                
+            except:
+                
+                pool.terminate()
+                raise
+                
+            finally:
+                
+                pool.join()
+        
+        # the ones not loaded in worker processes
+        self.annots.load_all()
+    
+    
+    def _load_resource(self, annot):
+        """
+        Loads the data of one annotation object. Returns `False` if it
+        failed.
+        """
+        
+        t0 = time.time()
+        memory = _peak_memory()
+        
+        try:
+            
+            annot.load()
+            
+        except Exception:
+            
+            self._log_failure(annot.__class__)
+            return False
+        
+        self._record_stats(
+            annot.name,
+            time.time() - t0,
+            _memory_increase(memory),
+        )
+        
+        return True
+    
+    
+    def _record_stats(self, name, elapsed, memory):
+        
+        self.load_stats[name] = LoadStats(time = elapsed, memory = memory)
+        self._log(
+            'Annotation resource `%s` loaded in %.02f s%s.' % (
+                name,
+                elapsed,
+                (
+                    ', peak memory increased by %.01f MB' % (memory / 1e6)
+                        if memory is not None else
+                    ''
+                ),
+            )
+        )
+    
+    
+    def _log_failure(self, cls):
+        
+        self._log(
+            'Failed to load annotations from resource `%s`.\n'
+            '%s\n' % (
+                cls.__name__
+                    if hasattr(cls, '__name__') else
+                str(cls),
+                traceback.format_exc(),
+            )
+        )
+    
+    
+    @staticmethod
+    def _picklable(job):
+        """
+        Tells if a resource can be loaded in a worker process.
+        """
+        
+        try:
+            
+            pickle.dumps(job)
+            
+            return True
+            
+        except Exception:
+            
+            return False
     
     
     def make_dataframe(self, reference_set = None):
@@ -2530,27 +3167,16 @@ class AnnotationTable(session_mod.Logger):
             self.make_array(reference_set = reference_set)
     
     
-    def to_array(self, reference_set = None):
+    def to_array(self, reference_set = None, sparse = None):
         
         reference_set = reference_set or self.reference_set
+        sparse = self.sparse if sparse is None else sparse
         
         names  = []
         arrays = []
         
         for resource in self.annots.values():
             
-            # skipping HPA for now because too large number of
-            # annotations, it would take very long:
-            if resource.name == 'HPA':
-                
-                continue
-            
-            use_fields = (
-                self.use_fields[resource.name]
-                    if resource.name in self.use_fields else
-                None
-            )
-            
             this_names, this_array = resource.to_array(
                     reference_set = reference_set,
                     use_fields = (
@@ -2558,13 +3184,22 @@ class AnnotationTable(session_mod.Logger):
                             if resource.name in self.use_fields else
                         None
                     ),
+                    sparse = sparse,
                 )
             
             names.extend(this_names)
             arrays.append(this_array)
         
-        names = np.array(list(itertools.chain(names)))
-        data = np.hstack(arrays)
+        # the labels are tuples of different length,
+        # hence we create an array of objects
+        _names = names
+        names = np.empty(len(_names), dtype = object)
+        names[:] = _names
+        data = (
+            scipy.sparse.hstack(arrays, format = 'csc')
+                if sparse else
+            np.hstack(arrays)
+        )
         
         return names, data
     
@@ -2582,15 +3217,30 @@ class AnnotationTable(session_mod.Logger):
     
     def keep(self, keep):
         
-        ikeep = np.array([
-            i for i, name in enumerate(self.names) if name in keep
-        ])
+        ikeep = np.array(
+            [i for i, name in enumerate(self.names) if name in keep],
+            dtype = np.int64,
+        )
         
         self.names = self.names[ikeep]
         self.data  = self.data[:,ikeep]
         self.set_cols()
     
     
+    def column_rows(self, i):
+        """
+        Returns the indices of the rows having `True` in column ``i``.
+        """
+        
+        if scipy.sparse.issparse(self.data):
+            
+            return self.data.indices[
+                self.data.indptr[i]:self.data.indptr[i + 1]
+            ]
+        
+        return np.flatnonzero(self.data[:,i])
+    
+    
     def make_sets(self):
         
         self.ensure_array()
@@ -2598,7 +3248,7 @@ class AnnotationTable(session_mod.Logger):
         self.sets = dict(
             (
                 name,
-                set(self.reference_set[self.data[:,i]])
+                set(self.reference_set[j] for j in self.column_rows(i))
             )
             for i, name in enumerate(self.names)
         )
@@ -2606,6 +3256,8 @@ class AnnotationTable(session_mod.Logger):
 
     def annotate_network(self, pa):
 
+        self.ensure_array()
+
         nodes = pa.graph.vs['name']
         edges = [
             (
@@ -2615,26 +3267,39 @@ class AnnotationTable(session_mod.Logger):
             for e in pa.graph.es
         ]
 
+        # the labels of each row from the compressed rows
+        data = scipy.sparse.csr_matrix(self.data)
+        data.sort_indices()
+        no_labels = np.array([], dtype = np.int32)
+
+        def labels(uniprot):
+
+            if uniprot not in self.rows:
+
+                return no_labels
+
+            row = self.rows[uniprot]
+
+            return data.indices[data.indptr[row]:data.indptr[row + 1]]
+
         nodeannot = []
         edgeannot = []
 
         for i, uniprot in enumerate(nodes):
 
-            for name, uniprots in iteritems(self.sets):
-
-                if uniprot in uniprots:
+            for j in labels(uniprot):
 
-                    nodeannot.append((name, i))
+                nodeannot.append((self.names[j], i))
 
         for i, (uniprot1, uniprot2) in enumerate(edges):
 
-            for name1, uniprots1 in iteritems(self.sets):
+            labels2 = labels(uniprot2)
 
-                for name2, uniprots2 in iteritems(self.sets):
+            for j1 in labels(uniprot1):
 
-                    if uniprot1 in uniprots1 and uniprot2 in uniprots2:
+                for j2 in labels2:
 
-                        edgeannot.append((name1, name2, i))
+                    edgeannot.append((self.names[j1], self.names[j2], i))
 
         return nodeannot, edgeannot
 
@@ -2687,6 +3352,14 @@ class AnnotationTable(session_mod.Logger):
         
         colnames = ['__'.join(name) for name in self.names]
         
+        if scipy.sparse.issparse(self.data):
+            
+            return pd.DataFrame.sparse.from_spmatrix(
+                self.data,
+                index = self.reference_set,
+                columns = colnames,
+            )
+        
         df = pd.DataFrame(
             data = self.data,
             index = self.reference_set,
@@ -2787,3 +3460,126 @@ def get_db(
         )
 
     return globals()['db']
+
+
+def _peak_memory():
+    """
+    Returns the peak resident memory of the current process in bytes, or
+    `None` if it is not available.
+    """
+    
+    if rusage is None:
+        
+        return None
+    
+    peak = rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss
+    
+    # bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _memory_increase(before):
+    
+    after = _peak_memory()
+    
+    return None if before is None or after is None else after - before
+
+
+def _records_to_tuples(annot):
+    """
+    Converts the records of an annotation dict to tuples, so they can be
+    pickled even if their class is not available at the module level.
+    Returns the new dict and the definition of the record class.
+    """
+    
+    record_cls = None
+    
+    for records in annot.values():
+        
+        for record in records:
+            
+            record_cls = record.__class__
+            break
+        
+        if record_cls is not None:
+            
+            break
+    
+    return (
+        dict(
+            (key, set(tuple(record) for record in records))
+            for key, records in iteritems(annot)
+        ),
+        {
+            'name': record_cls.__name__,
+            'module': record_cls.__module__,
+            'fields': record_cls._fields,
+        }
+            if record_cls is not None and hasattr(record_cls, '_fields') else
+        None,
+    )
+
+
+def _tuples_to_records(annot, record_cls):
+    """
+    Creates the record class and converts the tuples back to records.
+    The reverse of `_records_to_tuples`.
+    """
+    
+    if record_cls is None:
+        
+        return annot
+    
+    setattr(
+        sys.modules[record_cls['module']],
+        record_cls['name'],
+        collections.namedtuple(
+            record_cls['name'],
+            record_cls['fields'],
+        ),
+    )
+    
+    record_cls_new = getattr(
+        sys.modules[record_cls['module']],
+        record_cls['name'],
+    )
+    
+    return dict(
+        (key, set(record_cls_new(*record) for record in records))
+        for key, records in iteritems(annot)
+    )
+
+
+def _load_annotation(job):
+    """
+    Loads one annotation resource, typically in a worker process of
+    `AnnotationTable`. Returns the pickled annotation object, the
+    traceback if loading failed, the time it took and the increase of the
+    peak memory. If the object can not be pickled, both the result and the
+    traceback are `None`.
+    """
+    
+    cls, param = job
+    t0 = time.time()
+    memory = _peak_memory()
+    
+    try:
+        
+        annot = cls(**param)
+        
+    except Exception:
+        
+        return None, traceback.format_exc(), time.time() - t0, None
+    
+    elapsed = time.time() - t0
+    memory = _memory_increase(memory)
+    
+    try:
+        
+        result = pickle.dumps(annot, protocol = pickle.HIGHEST_PROTOCOL)
+        
+    except Exception:
+        
+        result = None
+    
+    return result, None, elapsed, memory
@@ -18,9 +18,19 @@
 #  Website: http://pypath.omnipathdb.org/
 #
 
+from future.utils import iteritems
+
 import os
+import re
+import imp
+import time
+import hashlib
+import sqlite3
+import contextlib
+import collections
 
 import pypath.settings as settings
+import pypath.session_mod as session_mod
 
 
 def get_cachedir(cachedir = None):
@@ -33,3 +43,501 @@ def get_cachedir(cachedir = None):
     os.makedirs(cachedir, exist_ok = True)
     
     return cachedir
+
+
+_re_cache_file = re.compile(r'^[0-9a-f]{32}-')
+
+# if it is a set, the paths of the cache and input files read are
+# added to it, this way we can tell which files a process depends on
+READ_FILES = None
+
+
+def register_read(path):
+    """
+    Records that a cache file (or a local input file) is being read,
+    if the files read are tracked (see `track_reads`). Cache files
+    written are registered too, as the data loaded next time will
+    come from them.
+    """
+    
+    if isinstance(READ_FILES, set) and path:
+        
+        READ_FILES.add(os.path.abspath(path))
+
+
+@contextlib.contextmanager
+def track_reads():
+    """
+    Context which collects the paths of the files registered by
+    `register_read`, it yields the set of the paths.
+    """
+    
+    global READ_FILES
+    
+    previous = READ_FILES
+    READ_FILES = set()
+    
+    try:
+        
+        yield READ_FILES
+        
+    finally:
+        
+        READ_FILES = previous
+
+
+def tmp_path(path):
+    """
+    Returns a temporary path in the same directory as ``path``, unique
+    for the current process.
+    """
+    
+    return '%s.%u.tmp' % (path, os.getpid())
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode = 'wb'):
+    """
+    Context which yields a file object to a temporary file, and replaces
+    ``path`` by it once the context exits without error. Hence processes
+    reading ``path`` see either the old or the complete new contents,
+    never a partially written file.
+    """
+    
+    tmp = tmp_path(path)
+    
+    try:
+        
+        with open(tmp, mode) as fp:
+            
+            yield fp
+        
+        os.replace(tmp, path)
+        
+    finally:
+        
+        if os.path.exists(tmp):
+            
+            os.remove(tmp)
+
+
+CacheEntry = collections.namedtuple(
+    'CacheEntry',
+    [
+        'path',
+        'url',
+        'post_md5',
+        'size',
+        'created',
+        'accessed',
+        'hits',
+        'md5',
+    ],
+)
+
+
+class CacheIndex(session_mod.Logger):
+    """
+    Keeps track of the files in the download cache directory in an SQLite
+    database: the URL and the hash of the POST parameters the file has
+    been downloaded from, its size, the time of creation and last access,
+    the number of cache hits and the MD5 hash of its contents.
+    `curl.Curl` updates the index at each cache hit and miss. The index
+    makes possible to limit the total size of the cache by evicting the
+    least recently used files, and to expire files after a maximum age.
+
+    :arg str cachedir:
+        Path to the cache directory, by default the `cachedir` setting.
+    :arg int max_size:
+        Maximum total size of the cache files in bytes. If ``None`` the
+        ``cache_max_size`` setting is used. If that is ``None`` too, the
+        size is not limited.
+    :arg float max_age:
+        Maximum age of cache files in days. If ``None`` the
+        ``cache_max_age`` setting is used.
+    :arg dict max_age_urls:
+        Maximum age in days for URLs matching regular expressions.
+        If ``None`` the ``cache_max_age_urls`` setting is used.
+    """
+    
+    
+    def __init__(
+            self,
+            cachedir = None,
+            max_size = None,
+            max_age = None,
+            max_age_urls = None,
+        ):
+        
+        session_mod.Logger.__init__(self, name = 'cache')
+        
+        self.cachedir = get_cachedir(cachedir)
+        self.path = os.path.join(
+            self.cachedir,
+            settings.get('cache_index_file'),
+        )
+        self.max_size = max_size or settings.get('cache_max_size')
+        self.max_age = max_age or settings.get('cache_max_age')
+        self.max_age_urls = dict(
+            (re.compile(pattern), age)
+            for pattern, age in iteritems(
+                max_age_urls or settings.get('cache_max_age_urls') or {}
+            )
+        )
+        
+        self.con = sqlite3.connect(
+            self.path,
+            timeout = 60,
+            isolation_level = None,
+        )
+        self.con.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, '
+            'url TEXT, '
+            'post_md5 TEXT, '
+            'size INTEGER, '
+            'created REAL, '
+            'accessed REAL, '
+            'hits INTEGER, '
+            'md5 TEXT)'
+        )
+        self.con.execute(
+            'CREATE INDEX IF NOT EXISTS files_accessed ON files (accessed)'
+        )
+    
+    
+    def reload(self):
+        
+        modname = self.__class__.__module__
+        mod = __import__(modname, fromlist = [modname.split('.')[0]])
+        imp.reload(mod)
+        new = getattr(mod, self.__class__.__name__)
+        setattr(self, '__class__', new)
+    
+    
+    def get(self, path):
+        """
+        Returns the `CacheEntry` of a file or ``None`` if the file is not
+        in the index.
+        """
+        
+        row = self.con.execute(
+            'SELECT * FROM files WHERE path = ?',
+            (path,),
+        ).fetchone()
+        
+        return CacheEntry(*row) if row else None
+    
+    
+    def hit(self, path, url = None, post_md5 = None):
+        """
+        Registers the use of an existing cache file.
+        Files not in the index yet are added.
+        """
+        
+        now = time.time()
+        
+        updated = self.con.execute(
+            'UPDATE files SET accessed = ?, hits = hits + 1 '
+            'WHERE path = ?',
+            (now, path),
+        ).rowcount
+        
+        if not updated:
+            
+            self.add(path, url = url, post_md5 = post_md5, hits = 1)
+    
+    
+    def miss(self, path, url = None, post_md5 = None):
+        """
+        Registers a cache file about to be downloaded. The size and the
+        hash are recorded by `update` once the download finished.
+        """
+        
+        self.add(path, url = url, post_md5 = post_md5, md5 = False)
+    
+    
+    def add(self, path, url = None, post_md5 = None, hits = 0, md5 = True):
+        
+        now = time.time()
+        
+        self.con.execute(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                path,
+                url,
+                post_md5,
+                self._size(path),
+                now,
+                now,
+                hits,
+                file_md5(path) if md5 and os.path.exists(path) else None,
+            ),
+        )
+    
+    
+    def update(self, path):
+        """
+        Records the actual size and content hash of a file, e.g. after
+        it has been downloaded. Then evicts old files if the cache is
+        larger than the maximum size.
+        """
+        
+        if not self.get(path):
+            
+            self.add(path)
+            
+        else:
+            
+            self.con.execute(
+                'UPDATE files SET size = ?, md5 = ? WHERE path = ?',
+                (
+                    self._size(path),
+                    file_md5(path) if os.path.exists(path) else None,
+                    path,
+                ),
+            )
+        
+        if self.max_size:
+            
+            self.evict(self.max_size, keep = {path})
+    
+    
+    def is_expired(self, path, url = None):
+        """
+        Tells if a file is older than the maximum age set for its URL.
+        """
+        
+        entry = self.get(path)
+        
+        if not entry:
+            
+            return False
+        
+        max_age = self._max_age(url or entry.url)
+        
+        return (
+            max_age is not None and
+            time.time() - entry.created > max_age * 86400
+        )
+    
+    
+    def _max_age(self, url):
+        
+        if url:
+            
+            for pattern, age in iteritems(self.max_age_urls):
+                
+                if pattern.search(url):
+                    
+                    return age
+        
+        return self.max_age
+    
+    
+    def entries(self, url = None):
+        """
+        Returns a list of `CacheEntry` tuples, the most recently used
+        first. Optionally only the ones with URLs containing `url`.
+        """
+        
+        query = 'SELECT * FROM files'
+        param = ()
+        
+        if url:
+            
+            query += ' WHERE url LIKE ?'
+            param = ('%%%s%%' % url,)
+        
+        query += ' ORDER BY accessed DESC'
+        
+        return [CacheEntry(*row) for row in self.con.execute(query, param)]
+    
+    
+    def total_size(self):
+        
+        return self.con.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM files'
+        ).fetchone()[0]
+    
+    
+    def remove(self, path):
+        """
+        Deletes a file from the cache and from the index.
+        """
+        
+        if os.path.exists(path):
+            
+            os.remove(path)
+        
+        self.con.execute('DELETE FROM files WHERE path = ?', (path,))
+        self._log('Removed from cache: `%s`.' % path)
+    
+    
+    def evict(self, max_size = None, keep = None):
+        """
+        Removes the least recently used files until the total size is
+        below `max_size`. Returns the list of removed paths.
+        """
+        
+        max_size = max_size or self.max_size
+        keep = keep or set()
+        removed = []
+        
+        if not max_size:
+            
+            return removed
+        
+        total = self.total_size()
+        
+        if total <= max_size:
+            
+            return removed
+        
+        for path, size in self.con.execute(
+            'SELECT path, size FROM files ORDER BY accessed'
+        ).fetchall():
+            
+            if total <= max_size:
+                
+                break
+            
+            if path in keep:
+                
+                continue
+            
+            self.remove(path)
+            removed.append(path)
+            total -= size or 0
+        
+        return removed
+    
+    
+    def prune(self, max_size = None):
+        """
+        Removes the expired files, the index entries of files which do not
+        exist any more, and the least recently used files if the cache is
+        larger than `max_size`. Returns the list of removed paths.
+        """
+        
+        removed = []
+        
+        for entry in self.entries():
+            
+            if (
+                not os.path.exists(entry.path) or
+                self.is_expired(entry.path, entry.url)
+            ):
+                
+                self.remove(entry.path)
+                removed.append(entry.path)
+        
+        removed.extend(self.evict(max_size))
+        
+        self._log('Pruning cache: %u files removed.' % len(removed))
+        
+        return removed
+    
+    
+    def verify(self, remove = False):
+        """
+        Checks the contents of the files against the hashes in the index.
+        Returns the list of paths which are missing or changed, optionally
+        removes them.
+        """
+        
+        invalid = []
+        
+        for entry in self.entries():
+            
+            if (
+                not os.path.exists(entry.path) or
+                (entry.md5 and file_md5(entry.path) != entry.md5)
+            ):
+                
+                invalid.append(entry.path)
+                
+                if remove:
+                    
+                    self.remove(entry.path)
+        
+        self._log(
+            'Verifying cache: %u invalid files found.' % len(invalid)
+        )
+        
+        return invalid
+    
+    
+    def scan(self):
+        """
+        Adds the download cache files which are not in the index yet,
+        e.g. the ones downloaded before the index has been created.
+        Their last access is set to their modification time.
+        Returns the number of files added.
+        """
+        
+        known = set(
+            row[0] for row in self.con.execute('SELECT path FROM files')
+        )
+        added = 0
+        
+        for fname in os.listdir(self.cachedir):
+            
+            path = os.path.join(self.cachedir, fname)
+            
+            if (
+                path not in known and
+                _re_cache_file.match(fname) and
+                os.path.isfile(path)
+            ):
+                
+                mtime = os.path.getmtime(path)
+                
+                self.con.execute(
+                    'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        path, None, None, self._size(path),
+                        mtime, mtime, 0, file_md5(path),
+                    ),
+                )
+                added += 1
+        
+        return added
+    
+    
+    @staticmethod
+    def _size(path):
+        
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+_indices = {}
+
+
+def get_index(cachedir = None):
+    """
+    Returns the `CacheIndex` of a cache directory, one instance in each
+    process.
+    """
+    
+    cachedir = get_cachedir(cachedir)
+    key = (os.path.abspath(cachedir), os.getpid())
+    
+    if key not in _indices:
+        
+        _indices[key] = CacheIndex(cachedir = cachedir)
+    
+    return _indices[key]
+
+
+def file_md5(path):
+    
+    md5 = hashlib.md5()
+    
+    with open(path, 'rb') as fp:
+        
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            
+            md5.update(chunk)
+    
+    return md5.hexdigest()
@@ -667,7 +667,7 @@ def get_args(loc_dict, remove=set([])):
     args = dict((k, v) for k, v in iteritems(loc_dict) if k not in remove)
 
     if 'kwargs' in loc_dict:
-        args = dict(args.items() + loc_dict['kwargs'].items())
+        args.update(loc_dict['kwargs'])
 
     return args
 
@@ -35,6 +35,7 @@ import pypath.dataio as dataio
 import pypath.intera as intera
 import pypath.resource as resource
 import pypath.settings as settings
+import pypath.cache as cache_mod
 import pypath.session_mod as session_mod
 
 
@@ -431,6 +432,8 @@ class ComplexAggregator(AbstractComplexResource):
     
     def load_from_pickle(self, pickle_file):
         
+        cache_mod.register_read(pickle_file)
+        
         with open(pickle_file, 'rb') as fp:
             
             self.complexes = pickle.load(fp)
@@ -438,7 +441,7 @@ class ComplexAggregator(AbstractComplexResource):
     
     def save_to_pickle(self, pickle_file):
         
-        with open(pickle_file, 'wb') as fp:
+        with cache_mod.atomic_write(pickle_file) as fp:
             
             pickle.dump(
                 obj = self.complexes,
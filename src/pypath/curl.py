@@ -34,7 +34,6 @@ import sys
 import os
 import io
 import shutil
-import struct
 
 import pypath.session_mod as session_mod
 _logger = session_mod.get_log()
@@ -94,6 +93,10 @@ import zipfile
 import tarfile
 import hashlib
 import re
+import copy
+import time
+import sqlite3
+import collections
 
 
 try:
@@ -107,6 +110,7 @@ from contextlib import closing
 import pypath.progress as progress
 import pypath.common as common
 import pypath.settings as settings
+import pypath.cache as cache_mod
 
 try:
     basestring
@@ -546,6 +550,11 @@ class FileOpener(session_mod.Logger):
     files if you only need certain files from a multifile archive,
     reads the data from the file, or returns the file pointer,
     as you request. It examines the file type and size.
+    Nothing is extracted to the disk: the `large` mode iterates over
+    the lines, decompressing and decoding them on the fly. The `size`
+    of a compressed file is its size on the disk, and `tell()` returns
+    the number of compressed bytes read, these are suitable to show
+    the progress of processing.
     """
 
     def __init__(
@@ -558,6 +567,7 @@ class FileOpener(session_mod.Logger):
             files_needed = None,
             large = True,
             default_mode = 'r',
+            encoding = None,
         ):
         
         if not hasattr(self, '_logger'):
@@ -566,6 +576,10 @@ class FileOpener(session_mod.Logger):
         
         if not hasattr(self, 'compr'):
             self.compr = compr
+        if not hasattr(self, 'default_mode'):
+            self.default_mode = default_mode
+        if not hasattr(self, 'encoding'):
+            self.encoding = encoding
         if not hasattr(self, 'files_needed'):
             self.files_needed = files_needed
         if not hasattr(self, 'large'):
@@ -652,9 +666,7 @@ class FileOpener(session_mod.Logger):
         
         self._log('Opening gzip file `%s`.' % self.fileobj.name)
         
-        self.fileobj.seek(-4, 2)
-        self.size = struct.unpack('I', self.fileobj.read(4))[0]
-        self.fileobj.seek(0)
+        self.size = os.path.getsize(self.fileobj.name)
         self.gzfile = gzip.GzipFile(fileobj = self.fileobj)
         
         # try:
@@ -707,6 +719,7 @@ class FileOpener(session_mod.Logger):
                         # TODO: check if this is compatible with Py2
                         self.files_multipart[m] = io.TextIOWrapper(
                             this_file,
+                            encoding = self.encoding,
                         )
                 else:
                     self.files_multipart[m] = this_file.read()
@@ -758,6 +771,15 @@ class FileOpener(session_mod.Logger):
             self.type = 'plain'
     
     
+    def tell(self):
+        """
+        Returns the position in the file on the disk, i.e. for compressed
+        files the number of compressed bytes read so far.
+        """
+        
+        return self.fileobj.tell()
+    
+    
     @staticmethod
     def iterfile(fileobj):
         
@@ -885,6 +907,8 @@ class Curl(FileOpener):
             self.cache_file_name = self.url
             self.use_cache = True
         
+        cache_mod.register_read(self.cache_file_name)
+        
         self.write_cache = write_cache
         self.outfile = outf
 
@@ -1127,9 +1151,9 @@ class Curl(FileOpener):
             self._log('Binary data added to query (not showing).')
     
     
-    def curl_init(self, url = False):
+    def curl_init(self, url = False, handle = None):
         
-        self.curl = pycurl.Curl()
+        self.curl = handle or pycurl.Curl()
         self.set_url(url = url)
         self.curl.setopt(self.curl.SSL_VERIFYPEER, False)
         self.curl.setopt(self.curl.FOLLOWLOCATION, self.follow_http_redirect)
@@ -1153,7 +1177,9 @@ class Curl(FileOpener):
         self.curl.setopt(self.curl.URL, url)
 
     def set_target(self):
-        self.target = open(self.cache_file_name, 'wb')
+        # the download goes to a temporary file which replaces the cache
+        # file only when complete, see `transfer_finish`
+        self.target = open(cache_mod.tmp_path(self.cache_file_name), 'wb')
         self.curl.setopt(self.curl.WRITEFUNCTION, self.target.write)
 
     def set_req_headers(self):
@@ -1181,8 +1207,8 @@ class Curl(FileOpener):
             self.curl.setopt(pycurl.ENCODING, 'gzip, deflate')
     
     
-    def curl_setup(self, url = False):
-        self.curl_init(url = url)
+    def curl_setup(self, url = False, handle = None):
+        self.curl_init(url = url, handle = handle)
         self.curl_progress_setup()
         self.set_target()
         self.set_debug()
@@ -1204,46 +1230,104 @@ class Curl(FileOpener):
                         % attempt)
                 self.curl.perform()
                 
-                self.target.flush()
-                
-                if os.stat(self.cache_file_name).st_size == 0:
-                    
-                    self._log(
-                        'Empty file retrieved, attempting downlad again'
-                    )
+                if self.transfer_ok():
                     
-                    continue
+                    break
+            
+            except pycurl.error as e:
                 
-                if self.url.startswith('http'):
-                    self.status = self.curl.getinfo(pycurl.HTTP_CODE)
-                    if self.status == 200:
-                        self.terminate_progress()
-                        break
+                self.transfer_error(e.args)
+        
+        self.curl.close()
+        self.transfer_finish()
+    
+    
+    def transfer_ok(self):
+        """
+        Checks the result of a finished transfer and sets the `status`.
+        Returns `True` if the download was successful.
+        """
+        
+        self.target.flush()
+        
+        if os.stat(self.target.name).st_size == 0:
+            
+            self._log(
+                'Empty file retrieved, attempting downlad again'
+            )
+            
+            return False
+        
+        if self.url.startswith('http'):
+            
+            self.status = self.curl.getinfo(pycurl.HTTP_CODE)
+        
+        if self.url.startswith('ftp'):
+            
+            self.status = 500
+            
+            for h in self.resp_headers:
                 
-                if self.url.startswith('ftp'):
-                    self.status == 500
-                    for h in self.resp_headers:
-                        if h[:3] == b'226':
-                            self.status = 200
-                            self.terminate_progress()
-                            break
-                    if self.status == 200:
-                        break
+                if h[:3] == b'226':
+                    
+                    self.status = 200
+                    break
+        
+        if self.status == 200:
             
-            except pycurl.error as e:
-                self.status = 500
-                if self.progress is not None:
-                    self.progress.terminate(status = 'failed')
-                    self.progress = None
-                self.print_debug_info('ERROR',
-                                      'PycURL error: %s' % str(e.args))
+            self.terminate_progress()
+            
+            return True
+        
+        return False
+    
+    
+    def transfer_error(self, error):
+        
+        self.status = 500
+        if self.progress is not None:
+            self.progress.terminate(status = 'failed')
+            self.progress = None
+        self.print_debug_info('ERROR',
+                              'PycURL error: %s' % str(error))
+    
+    
+    def transfer_finish(self):
+        """
+        Sets the final status of the download and closes the cache file.
+        The downloaded file replaces the cache file only if the download
+        was successful.
+        """
+        
         if self.status != 200:
             self.download_failed = True
-        if os.stat(self.cache_file_name).st_size == 0:
+        if os.stat(self.target.name).st_size == 0:
             self.status = 500
             self.download_failed = True
-        self.curl.close()
         self.target.close()
+        
+        if self.download_failed:
+            
+            os.remove(self.target.name)
+            
+        else:
+            
+            os.replace(self.target.name, self.cache_file_name)
+            self.cache_index_update()
+    
+    
+    def transfer_restart(self):
+        """
+        Prepares the handle of a failed transfer to be performed again.
+        """
+        
+        self.target.close()
+        self.set_target()
+        self.set_resp_headers()
+        
+        if getattr(self, 'binary_data_file', None) is not None:
+            
+            self.binary_data_file.seek(0)
     
     
     def progress_setup(self):
@@ -1394,6 +1478,7 @@ class Curl(FileOpener):
         self._log('Cache file path: `%s`' % self.cache_file_name)
         
         self.select_cache_file()
+        self.cache_index_init()
     
     
     def get_hash(self):
@@ -1414,9 +1499,42 @@ class Curl(FileOpener):
         else:
             bindata = ''
         
+        # earlier versions transcoded the cache files to utf-8, files
+        # kept in other encodings get different names to not mix them up
+        encoding = self._cache_encoding()
+        encoding_str = '#encoding=%s' % encoding if encoding else ''
+        
         self.urlmd5 = hashlib.md5(
-            self.unicode2bytes('%s%s%s' % \
-                (self.url, self.post_str, bindata))).hexdigest()
+            self.unicode2bytes('%s%s%s%s' % \
+                (self.url, self.post_str, bindata, encoding_str))).hexdigest()
+        self.post_md5 = (
+            hashlib.md5(
+                self.unicode2bytes('%s%s' % (self.post_str, bindata))
+            ).hexdigest()
+                if self.post_str or bindata else
+            None
+        )
+    
+    
+    def _cache_encoding(self):
+        """
+        Returns the normalized name of the encoding if it is not utf-8
+        compatible, otherwise ``None``.
+        """
+        
+        if self.encoding:
+            
+            try:
+                
+                encoding = codecs.lookup(self.encoding).name
+                
+            except LookupError:
+                
+                encoding = self.encoding.lower()
+            
+            if encoding not in ('utf-8', 'ascii'):
+                
+                return encoding
     
     
     def cache_dir_exists(self):
@@ -1469,6 +1587,67 @@ class Curl(FileOpener):
             
             self.use_cache = True
 
+    def cache_index_init(self):
+        """
+        Registers the cache hit or miss in the cache index. Cache files
+        older than the maximum age set for the URL are downloaded again.
+        """
+        
+        index = self._cache_index()
+        
+        if index is None:
+            
+            return
+        
+        try:
+            
+            if (
+                self.use_cache and
+                index.is_expired(self.cache_file_name, self.url)
+            ):
+                
+                self._log('Cache file expired, downloading again.')
+                self.use_cache = False
+            
+            (index.hit if self.use_cache else index.miss)(
+                self.cache_file_name,
+                url = self.url,
+                post_md5 = self.post_md5,
+            )
+            
+        except sqlite3.Error as e:
+            
+            self._log('Failed to update cache index: %s' % str(e))
+    
+    
+    def cache_index_update(self):
+        """
+        Records the size and hash of the cache file after it has been
+        written, and evicts old files if the cache is too large.
+        """
+        
+        index = self._cache_index()
+        
+        if index is None:
+            
+            return
+        
+        try:
+            
+            index.update(self.cache_file_name)
+            
+        except sqlite3.Error as e:
+            
+            self._log('Failed to update cache index: %s' % str(e))
+    
+    
+    def _cache_index(self):
+        
+        if settings.get('cache_index') and not self.local_file:
+            
+            return cache_mod.get_index(self.cache_dir)
+    
+    
     def show_cache(self):
         
         self.print_debug_info('INFO', 'URL = %s' % self.url)
@@ -1480,39 +1659,8 @@ class Curl(FileOpener):
     
     # open files:
     
-    def transcode(self):
-        
-        if not self.use_cache and self.type == 'plain':
-            
-            self.guess_encoding()
-            
-            if self.encoding is not None and self.encoding != 'utf-8':
-                
-                self._log(
-                    'Converting encoding from `%s` '
-                    'to `utf-8`.' % self.encoding
-                )
-                
-                tmp_file_name = os.path.join(os.getcwd(), self.cache_dir,
-                                             'transcoding.tmp.txt')
-                os.rename(self.cache_file_name, tmp_file_name)
-                if self.progress is not None:
-                    self.print_status('Converting %s encoded data to utf-8' %
-                                      self.encoding)
-                with open(tmp_file_name, 'rb') as tmp_file:
-                    with open(self.cache_file_name, 'wb') as cache_file:
-                        for line in tmp_file:
-                            cache_file.write(
-                                line.decode(self.encoding or 'utf-8').encode(
-                                    'utf-8'))
-                os.remove(tmp_file_name)
-                self.encoding = 'utf-8'
-    
-    
     def copy_file(self):
         
-        self.transcode()
-        
         if self.outfile is not None and self.outfile != self.cache_file_name:
             if self.write_cache:
                 self._log(
@@ -1679,6 +1827,7 @@ class Curl(FileOpener):
         self.sftp_success = self.sftp_download()
         if self.sftp_success:
             self.status = 200
+            self.cache_index_update()
         else:
             self.status = 501
     
@@ -1762,3 +1911,281 @@ class Curl(FileOpener):
                     if '3' in whattodo:
                         return False
         return True
+
+
+class MultiCurl(session_mod.Logger):
+    """
+    Downloads many URLs concurrently using ``pycurl.CurlMulti``. At most
+    `concurrency` transfers are active at the same time. The curl handles
+    are reused, hence connections to the same host are kept alive across
+    the requests. The downloaded data are written into the same cache
+    files as by `Curl`, and `Curl` objects are created for each request,
+    so the results are available the usual way, in the `result` attribute
+    of the elements of `curls`. Requests already in the cache are not
+    downloaded again.
+
+    :arg list requests:
+        URLs or dicts of `Curl` arguments, e.g. ``url``, ``post``, ``get``.
+    :arg int concurrency:
+        Maximum number of simultaneous transfers. If ``None`` the
+        ``curl_multi_concurrency`` setting is used.
+    :arg float min_interval:
+        Minimum time in seconds between the starts of two transfers
+        (including the retries) to the same host, for servers with
+        a limit on the request rate.
+    :arg bool silent:
+        Show a progress bar about the number of completed requests.
+    :arg bool process:
+        Open and decode the downloaded files, as `Curl` does by default.
+    :arg int retries:
+        Number of attempts for each request.
+    :arg **kwargs:
+        Default arguments for the `Curl` objects.
+    """
+    
+    
+    def __init__(
+            self,
+            requests,
+            concurrency = None,
+            min_interval = None,
+            silent = True,
+            process = True,
+            retries = 3,
+            **kwargs
+        ):
+        
+        session_mod.Logger.__init__(self, name = 'curl')
+        
+        self.concurrency = (
+            concurrency or settings.get('curl_multi_concurrency') or 1
+        )
+        self.min_interval = min_interval or 0
+        self.silent = silent
+        self.retries = retries
+        self.kwargs = kwargs
+        
+        self.curls = [self._curl(request) for request in requests]
+        
+        self.perform()
+        
+        if process and not DRYRUN:
+            
+            for c in self.curls:
+                
+                if not c.download_failed:
+                    
+                    c.process_file()
+    
+    
+    def _curl(self, request):
+        
+        param = copy.copy(self.kwargs)
+        param.update(
+            request if isinstance(request, dict) else {'url': request}
+        )
+        param.update(
+            silent = True,
+            setup = False,
+            call = False,
+            process = False,
+            retries = self.retries,
+        )
+        
+        return Curl(**param)
+    
+    
+    @property
+    def results(self):
+        
+        return [c.result for c in self.curls]
+    
+    
+    def perform(self):
+        """
+        Downloads all requests which are not available in the cache.
+        """
+        
+        # one transfer for each cache file, the rest
+        # of the requests for the same file wait for it
+        pending = collections.OrderedDict()
+        
+        for c in self.curls:
+            
+            if (
+                c.use_cache or
+                DRYRUN or
+                c.sftp_host is not None
+            ):
+                
+                continue
+            
+            pending.setdefault(c.cache_file_name, []).append(c)
+        
+        if not pending:
+            
+            return
+        
+        self._log(
+            'Downloading %u URLs in %u concurrent transfers.' % (
+                len(pending),
+                min(self.concurrency, len(pending)),
+            )
+        )
+        
+        self.progress = None if self.silent else progress.Progress(
+            total = len(pending),
+            name = 'Downloading',
+            interval = 1,
+        )
+        
+        self.multi = pycurl.CurlMulti()
+        handles = [
+            pycurl.Curl()
+            for _ in xrange(min(self.concurrency, len(pending)))
+        ]
+        self._free = list(handles)
+        self._active = {}
+        # transfers set up, waiting for their turn at the host
+        self._waiting = collections.deque()
+        self._last_start = {}
+        self._attempts = collections.Counter()
+        queue = collections.deque(c[0] for c in pending.values())
+        
+        while queue or self._active or self._waiting:
+            
+            while queue and self._free:
+                
+                c = queue.popleft()
+                handle = self._free.pop()
+                handle.reset()
+                c.curl_setup(handle = handle)
+                self._waiting.append(c)
+            
+            wait = self._start_waiting()
+            
+            if not self._active:
+                
+                time.sleep(wait)
+                continue
+            
+            while True:
+                
+                ret, _ = self.multi.perform()
+                
+                if ret != pycurl.E_CALL_MULTI_PERFORM:
+                    
+                    break
+            
+            while True:
+                
+                n_queued, done, failed = self.multi.info_read()
+                
+                for handle in done:
+                    
+                    self._done(handle)
+                
+                for handle, errno, errmsg in failed:
+                    
+                    self._done(handle, error = (errno, errmsg))
+                
+                if not n_queued:
+                    
+                    break
+            
+            if self._active:
+                
+                self.multi.select(
+                    min(wait, 1.0) if self._waiting else 1.0
+                )
+        
+        for handle in handles:
+            
+            handle.close()
+        
+        self.multi.close()
+        
+        if self.progress is not None:
+            
+            self.progress.terminate()
+        
+        for same_file in pending.values():
+            
+            for c in same_file[1:]:
+                
+                c.status = same_file[0].status
+                c.download_failed = same_file[0].download_failed
+                c.use_cache = True
+    
+    
+    def _start_waiting(self):
+        """
+        Starts the waiting transfers to the hosts which have not been
+        contacted within ``min_interval``. Returns the time until the
+        next waiting transfer can be started.
+        """
+        
+        now = time.time()
+        wait = self.min_interval
+        
+        for c in list(self._waiting):
+            
+            host = urlparse.urlsplit(c.url).netloc
+            ready_at = self._last_start.get(host, 0) + self.min_interval
+            
+            if ready_at <= now:
+                
+                self._waiting.remove(c)
+                self._last_start[host] = now
+                self._add(c)
+                
+            else:
+                
+                wait = min(wait, ready_at - now)
+        
+        return wait
+    
+    
+    def _add(self, c):
+        
+        self._attempts[id(c)] += 1
+        self._active[id(c.curl)] = c
+        self.multi.add_handle(c.curl)
+    
+    
+    def _done(self, handle, error = None):
+        
+        self.multi.remove_handle(handle)
+        c = self._active.pop(id(handle))
+        
+        if error is not None:
+            
+            c.transfer_error(error)
+            
+        elif c.transfer_ok():
+            
+            c.transfer_finish()
+            self._release(c)
+            
+            return
+        
+        if self._attempts[id(c)] < self.retries:
+            
+            self._log('Retrying download of `%s`.' % c.url[:200])
+            c.transfer_restart()
+            self._waiting.append(c)
+            
+        else:
+            
+            c.transfer_finish()
+            self._release(c)
+    
+    
+    def _release(self, c):
+        
+        self._free.append(c.curl)
+        
+        if self.progress is not None:
+            
+            self.progress.step()
+
@@ -114,6 +114,7 @@ import pypath.intera as intera
 # from pypath import reaction
 import pypath.residues as residues
 import pypath.settings as settings
+import pypath.cache as cache_mod
 
 if 'long' not in __builtins__:
     long = int
@@ -1341,6 +1342,7 @@ def get_pisa(pdblist):
     u_pdb, pdb_u = get_pdb_chains()
     if os.path.exists(cachefile):
         try:
+            cache_mod.register_read(cachefile)
             interfaces = pickle.load(open(cachefile, 'rb'))
         except:
             pass
@@ -1544,6 +1546,7 @@ def get_3did_ddi(residues = False, ddi_flat = None, organism = 9606):
 def get_3did(ddi_flat = None, res = True, organism = 9606, pickl = True):
     resultfile = os.path.join(settings.get('cachedir'), '3did_ddi.pickle')
     if pickl and os.path.exists(resultfile):
+        cache_mod.register_read(resultfile)
         result = pickle.load(open(resultfile, 'rb'))
         if len(result) == 1:
             return result
@@ -1660,6 +1663,7 @@ def get_3did(ddi_flat = None, res = True, organism = 9606, pickl = True):
 def get_3did_dmi(dmi_flat = None):
     resultfile = os.path.join(settings.get('cachedir'), '3did_dmi.pickle')
     if os.path.exists(resultfile):
+        cache_mod.register_read(resultfile)
         return pickle.load(open(resultfile, 'rb'))
     if dmi_flat is None:
         c = curl.Curl(urls.urls['3did_dmi']['url'], silent = False)
@@ -3004,6 +3008,7 @@ def get_ielm(ppi,
     result = []
     pcache = os.path.join(settings.get('cachedir'), 'ielm.pickle')
     if not part and os.path.exists(pcache):
+        cache_mod.register_read(pcache)
         from_pickle = pickle.load(open(pcache, 'rb'))
         ppi_pickle = from_pickle['ppi']
         ppi_query = list(set(ppi) - set(ppi_pickle))
@@ -4264,24 +4269,26 @@ def go_descendants_quickgo(
         target = target or collections.defaultdict(set)
         
         paginator = common.paginate(terms, chunk_size)
+        
+        # the chunks are downloaded concurrently
+        # and processed in their original order
+        mc = curl.MultiCurl(
+            [
+                urls.urls['quickgo_rest']['desc'] % (
+                    ','.join(terms_part),
+                    '?relations = %s' % relations_part,
+                )
+                for terms_part in paginator
+            ],
+            req_headers = req_headers,
+            large = True,
+        )
 
-        for p, terms_part in enumerate(paginator):
-
-            url = urls.urls['quickgo_rest']['desc'] % (
-                ','.join(terms_part),
-                '?relations = %s' % relations_part,
-            )
-
-            c = curl.Curl(
-                url,
-                req_headers = req_headers,
-                silent = True,
-                large = True,
-            )
+        for p, c in enumerate(mc.curls):
             
             try:
                 result = json.load(c.fileobj)
-            except json.decoder.JSONDecodeError:
+            except (json.decoder.JSONDecodeError, AttributeError):
                 done = chunk_size * p
                 remaining = terms[done:]
                 new_chunk_size = chunk_size // 2
@@ -4302,7 +4309,7 @@ def go_descendants_quickgo(
                 return download_in_chunks(
                     terms = remaining,
                     chunk_size = new_chunk_size,
-                    target = taret,
+                    target = target,
                 )
             
             for res in result['results']:
@@ -5080,36 +5087,42 @@ def get_pubmeds(pmids):
     url = urls.urls['pubmed-eutils']['url']
     cache = len(pmids) < 10
     data = {}
-    prg = progress.Progress(
-        len(pmids) / 100 + 1,
-        'Retrieving data from NCBI e-utils',
-        1,
-        percent = False)
-    for offset in xrange(0, len(pmids), 100):
-        prg.step()
-        post = {
+    posts = [
+        {
             'id': ','.join(pmids[offset:offset + 100]),
             'retmode': 'json',
             'db': 'pubmed'
         }
+        for offset in xrange(0, len(pmids), 100)
+    ]
+    # NCBI allows only 3 requests per second without API key:
+    # the requests start at least 0.35 s after each other
+    mc = curl.MultiCurl(
+        [{'url': url, 'post': post} for post in posts],
+        concurrency = 3,
+        min_interval = .35,
+        silent = False,
+        cache = cache,
+        override_post = True,
+    )
+    for c, post in zip(mc.curls, posts):
         for i in xrange(3):
             try:
-                c = curl.Curl(
-                    url,
-                    silent = False,
-                    cache = cache,
-                    post = post,
-                    override_post = True,
-                )
                 res = c.result
                 data = dict([(k, v)
                              for k, v in iteritems(json.loads(res)['result'])]
                             + [(k, v) for k, v in iteritems(data)])
                 break
-            except ValueError:
+            except (ValueError, TypeError):
                 sys.stdout.write('\t:: Error in JSON, retry %u\n' % i)
                 sys.stdout.flush()
-    prg.terminate()
+                c = curl.Curl(
+                    url,
+                    silent = False,
+                    cache = False,
+                    post = post,
+                    override_post = True,
+                )
     return data
 
 
@@ -5412,6 +5425,7 @@ def get_hpmr(use_cache = None):
 
         _log('Reading HPMR data from cache file `%s`.' % cachefile)
 
+        cache_mod.register_read(cachefile)
         return pickle.load(open(cachefile, 'rb'))
 
     rerecname = re.compile(r'Receptor ([A-z0-9]+) interacts with:')
@@ -6828,6 +6842,7 @@ def take_a_trip(cachefile = None):
             'Loading preprocessed TRIP database '
             'content from `%s`' % cachefile
         )
+        cache_mod.register_read(cachefile)
         result = pickle.load(open(cachefile, 'rb'))
         return result
 
@@ -7931,6 +7946,7 @@ def reactions_biopax(biopax_file,
     if os.path.exists(cachefile):
         sys.stdout.write('\t:: Loading already processed data\n')
         sys.stdout.flush()
+        cache_mod.register_read(cachefile)
         return pickle.load(open(cachefile, 'r'))
     # string constants
     bppref = '{http://www.biopax.org/release/biopax-level3.owl#}'
@@ -8387,6 +8403,7 @@ def reactome_interactions(cacheFile = None, **kwargs):
     ) if cacheFile is None else cacheFile
 
     if os.path.exists(cacheFile):
+        cache_mod.register_read(cacheFile)
         interactions = pickle.load(open(cacheFile, 'rb'))
     else:
         while True:
@@ -9030,6 +9047,8 @@ def get_phosphosite(cache = True):
     curated_cache = urls.files['phosphosite']['curated']
     noref_cache = urls.files['phosphosite']['noref']
     if cache and os.path.exists(curated_cache) and os.path.exists(noref_cache):
+        cache_mod.register_read(curated_cache)
+        cache_mod.register_read(noref_cache)
         return (pickle.load(open(curated_cache, 'rb')),
                 pickle.load(open(noref_cache, 'rb')))
     result_curated = []
@@ -9170,6 +9189,7 @@ def get_phosphosite_curated():
         curated, noref = get_phosphosite()
         return curated
     else:
+        cache_mod.register_read(curated_cache)
         return pickle.load(open(curated_cache, 'rb'))
 
 
@@ -9184,6 +9204,7 @@ def get_phosphosite_noref():
         curated, noref = get_phosphosite()
         return noref
     else:
+        cache_mod.register_read(noref_cache)
         return pickle.load(open(noref_cache, 'rb'))
 
 
@@ -10291,6 +10312,7 @@ def get_reactions(types = None, sources = None):
         'reaction_interactions_by_source.pickle'
     )
     if os.path.exists(cachefile):
+        cache_mod.register_read(cachefile)
         interactions = pickle.load(open(cachefile, 'rb'))
     else:
         import pypath.pyreact as pyreact
@@ -32,6 +32,7 @@ import sys
 
 try:
     import scipy.stats
+    import scipy.sparse
 
 except:
     sys.stdout.write('\t:: Module `scipy` not available.\n')
@@ -44,24 +45,252 @@ except ModuleNotFoundError:
 
 from collections import OrderedDict
 
+import numpy as np
+import pandas as pd
+
 from pypath.common import get_args
 
 
-class Enrichment(object):
+def hypergeom_pvalues(set_count, pop_count, set_size, pop_size):
+    """
+    One-sided (over-representation) p-values of the hypergeometric test,
+    i.e. the probability of having at least ``set_count`` elements
+    annotated with a term in a random set of ``set_size`` elements, if
+    ``pop_count`` of the ``pop_size`` elements in the population are
+    annotated. The same as the one-sided Fisher's exact test.
+    All arguments can be arrays, they are broadcasted against each other.
+    
+    :arg int,numpy.ndarray set_count:
+        Number of elements in the set annotated with the term.
+    :arg int,numpy.ndarray pop_count:
+        Number of elements in the population annotated with the term.
+    :arg int,numpy.ndarray set_size:
+        Number of elements in the set.
+    :arg int,numpy.ndarray pop_size:
+        Number of elements in the population.
+    """
+    
+    arrays = np.broadcast_arrays(set_count, pop_count, set_size, pop_size)
+    shape = arrays[0].shape
     
-    def __init__(self, set_count, pop_count, set_size, pop_size, data):
+    # the same counts occur many times, especially for small terms,
+    # hence we calculate the p-value only once for each combination
+    counts, inverse = np.unique(
+        np.column_stack([a.ravel() for a in arrays]).astype(np.int64),
+        axis = 0,
+        return_inverse = True,
+    )
+    
+    pvalues = scipy.stats.hypergeom.sf(
+        counts[:,0] - 1,
+        counts[:,3],
+        counts[:,1],
+        counts[:,2],
+    )
+    
+    return pvalues[inverse.ravel()].reshape(shape)
+
+
+def correct_pvalues(pvalues, method = 'hommel', alpha = 0.05):
+    """
+    Corrects for multiple testing by ``statsmodels.stats.multitest``.
+    For a matrix, the columns are corrected independently.
+    
+    :arg numpy.ndarray pvalues:
+        A vector or a matrix of p-values.
+    :arg str method:
+        A method available in ``statsmodels.stats.multitest.multipletests``.
+    """
+    
+    pvalues = np.asarray(pvalues, dtype = np.float64)
+    
+    if pvalues.ndim > 1:
         
-        for k, v in iteritems(locals()):
-            setattr(self, k, v)
+        return np.column_stack([
+            correct_pvalues(pvalues[:,i], method = method, alpha = alpha)
+            for i in xrange(pvalues.shape[1])
+        ]) if pvalues.shape[1] else pvalues.copy()
+    
+    if not len(pvalues):
         
-        oddsratio, pvalue = scipy.stats.fisher_exact(
-            (
-                (set_count, set_size),
-                (pop_count, pop_size),
-            )
+        return pvalues.copy()
+    
+    return smm.multipletests(pvalues, alpha = alpha, method = method)[1]
+
+
+def enrichment_table(
+        set_count,
+        pop_count,
+        set_size,
+        pop_size,
+        names = None,
+        method = 'hommel',
+        alpha = 0.05,
+    ):
+    """
+    Tests the enrichment of many terms at once and corrects the p-values.
+    Returns a data frame with one row for each term.
+    
+    :arg numpy.ndarray set_count:
+        Number of elements in the set annotated with each term.
+    :arg numpy.ndarray pop_count:
+        Number of elements in the population annotated with each term.
+    :arg int,numpy.ndarray set_size:
+        Number of elements in the set.
+    :arg int pop_size:
+        Number of elements in the population.
+    :arg list names:
+        Labels of the terms, used as the index of the data frame.
+    :arg str method:
+        Method for the multiple testing correction.
+    """
+    
+    set_count = np.asarray(set_count)
+    pvalues = hypergeom_pvalues(set_count, pop_count, set_size, pop_size)
+    
+    return pd.DataFrame(
+        {
+            'set_count': set_count,
+            'pop_count': np.broadcast_to(pop_count, set_count.shape),
+            'set_size': np.broadcast_to(set_size, set_count.shape),
+            'pop_size': np.broadcast_to(pop_size, set_count.shape),
+            'pvalue': pvalues,
+            'pval_adj': correct_pvalues(
+                pvalues,
+                method = method,
+                alpha = alpha,
+            ),
+        },
+        index = names,
+    )
+
+
+def enrichment_matrix(
+        annotation,
+        sets,
+        names = None,
+        set_names = None,
+        method = 'hommel',
+        alpha = 0.05,
+        min_count = 1,
+    ):
+    """
+    Tests the enrichment of many terms in many sets at once. The
+    population consists of the rows of the matrices.
+    
+    Returns a data frame with one row for each set and term, sorted by
+    the sets and the p-values. The p-values are corrected within each
+    set.
+    
+    :arg numpy.ndarray,scipy.sparse.spmatrix annotation:
+        Boolean matrix with the elements of the population in its rows,
+        the terms in its columns.
+    :arg numpy.ndarray,scipy.sparse.spmatrix sets:
+        Boolean matrix with the elements of the population in its rows,
+        the sets in its columns.
+    :arg list names:
+        Labels of the terms.
+    :arg list set_names:
+        Labels of the sets.
+    :arg int min_count:
+        Test only the terms annotating at least this many elements of
+        the set.
+    """
+    
+    def as_int(matrix):
+        
+        return (
+            scipy.sparse.csc_matrix(matrix, dtype = np.int64)
+                if scipy.sparse.issparse(matrix) else
+            np.asarray(matrix, dtype = np.int64)
         )
+    
+    annotation = as_int(annotation)
+    sets = as_int(sets)
+    
+    pop_size = annotation.shape[0]
+    pop_count = np.asarray(annotation.sum(axis = 0)).ravel()
+    set_size = np.asarray(sets.sum(axis = 0)).ravel()
+    # terms in rows, sets in columns
+    set_count = annotation.T.dot(sets)
+    set_count = (
+        set_count.toarray()
+            if scipy.sparse.issparse(set_count) else
+        np.asarray(set_count)
+    )
+    
+    names = list(
+        names if names is not None else range(annotation.shape[1])
+    )
+    set_names = list(
+        set_names if set_names is not None else range(sets.shape[1])
+    )
+    
+    iterm, iset = np.nonzero(set_count >= min_count)
+    set_count = set_count[iterm, iset]
+    pvalues = hypergeom_pvalues(
+        set_count,
+        pop_count[iterm],
+        set_size[iset],
+        pop_size,
+    )
+    
+    # sorting by the sets, and within the sets by the p-values
+    order = np.lexsort((pvalues, iset))
+    iterm = iterm[order]
+    iset = iset[order]
+    set_count = set_count[order]
+    pvalues = pvalues[order]
+    pval_adj = np.empty_like(pvalues)
+    bounds = np.searchsorted(iset, np.arange(sets.shape[1] + 1))
+    
+    for i in xrange(sets.shape[1]):
+        
+        a, b = bounds[i], bounds[i + 1]
+        pval_adj[a:b] = correct_pvalues(
+            pvalues[a:b],
+            method = method,
+            alpha = alpha,
+        )
+    
+    result = pd.DataFrame({
+        'set': [set_names[i] for i in iset],
+        'term': [names[i] for i in iterm],
+        'set_count': set_count,
+        'pop_count': pop_count[iterm],
+        'set_size': set_size[iset],
+        'pop_size': pop_size,
+        'pvalue': pvalues,
+        'pval_adj': pval_adj,
+    })
+    
+    return result
+
+
+class Enrichment(object):
+    
+    def __init__(
+            self,
+            set_count,
+            pop_count,
+            set_size,
+            pop_size,
+            data,
+            pvalue = None,
+        ):
         
-        self.pvalue = pvalue
+        self.set_count = set_count
+        self.pop_count = pop_count
+        self.set_size = set_size
+        self.pop_size = pop_size
+        self.data = data
+        self.pvalue = (
+            float(
+                hypergeom_pvalues(set_count, pop_count, set_size, pop_size)
+            )
+                if pvalue is None else
+            pvalue
+        )
 
     def significant(self, level=0.05):
         
@@ -77,32 +306,71 @@ class EnrichmentSet(object):
         values, having set_count, pop_count, set_size as their first
         3 elements, and nothing or anything behind that.
         E.g. {'Microtubule assembly': (45, 89, 367, ...), ...}
+        
+        The p-values of all terms are calculated at once, and are
+        available also as a data frame in the ``table`` attribute.
         '''
         
-        for k, v in iteritems(locals()):
-            setattr(self, k, v)
+        self.data = data
+        self.pop_size = pop_size
+        self.correction_method = correction_method
+        self.alpha = alpha
+        
+        names = sorted(data.keys())
+        counts = np.array(
+            [data[name][:3] for name in names],
+            dtype = np.int64,
+        ).reshape((len(names), 3))
+        
+        self.table = enrichment_table(
+            set_count = counts[:,0],
+            pop_count = counts[:,1],
+            set_size = counts[:,2],
+            pop_size = pop_size,
+            names = names,
+            method = correction_method,
+            alpha = alpha,
+        )
+        
         self.enrichments = OrderedDict(
-            sorted(
-                [(name, Enrichment(
-                    vals[0], vals[1], vals[2], self.pop_size, data=vals[3:]))
-                 for name, vals in iteritems(data)],
-                key=lambda x: x[0])
+            (
+                name,
+                Enrichment(
+                    vals[0],
+                    vals[1],
+                    vals[2],
+                    self.pop_size,
+                    data = vals[3:],
+                    pvalue = pvalue,
+                )
+            )
+            for name, vals, pvalue in zip(
+                names,
+                (data[name] for name in names),
+                self.table.pvalue,
             )
-        print(self.enrichments.values())
-        self.correction(method=correction_method, alpha=alpha)
+        )
+        
+        self._set_pval_adj()
 
     def correction(self, method='hommel', alpha=None):
-        print('foo bar')
+        
         if alpha is None:
-            print('alpha is none')
             alpha = self.alpha
-        print([enr.pvalue for enr in self.enrichments.values()])
-        pvals_corr = smm.multipletests(
-            [enr.pvalue for enr in self.enrichments.values()],
-            alpha=alpha,
-            method=method)[1]
-        for i, k in zip(xrange(len(pvals_corr)), self.enrichments.keys()):
-            setattr(self.enrichments[k], 'pval_adj', pvals_corr[i])
+        
+        self.table['pval_adj'] = correct_pvalues(
+            self.table.pvalue.values,
+            method=method,
+            alpha=alpha)
+        
+        self._set_pval_adj()
+
+    def _set_pval_adj(self):
+        
+        for enr, pval_adj in zip(
+                self.enrichments.values(),
+                self.table.pval_adj.values):
+            enr.pval_adj = pval_adj
 
     def toplist(self,
                 length=None,
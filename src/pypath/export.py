@@ -27,6 +27,7 @@ import imp
 import re
 import json
 import copy
+import gzip
 import pandas as pd
 import itertools
 
@@ -34,6 +35,21 @@ import pypath.progress as progress
 import pypath.urls as urls
 import pypath.data_formats as data_formats
 import pypath.settings as settings
+import pypath.session_mod as session_mod
+
+_logger = session_mod.Logger(name = 'export')
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+
+except ImportError:
+
+    _logger._log(
+        'Module `pyarrow` not available. '
+        'You won\'t be able to write Parquet files.'
+    )
+    pyarrow = None
 
 strip_json = re.compile(r'[\[\]{}\"]')
 simple_types = {bool, int, float, type(None)}
@@ -165,7 +181,69 @@ class Export(object):
             "netrowk-<session id>.tab" is used.
         """
 
-        result = []
+        header, dtypes = self._setup_table(
+            unique_pairs = unique_pairs,
+            extra_node_attrs = extra_node_attrs,
+            extra_edge_attrs = extra_edge_attrs,
+        )
+
+        self.df = pd.DataFrame(
+            list(self._iter_rows(unique_pairs = unique_pairs)),
+            columns = header,
+        )
+        self.df = self.df.astype(dtypes)
+
+    def iter_batches(
+            self,
+            unique_pairs = True,
+            extra_node_attrs = None,
+            extra_edge_attrs = None,
+            chunk_size = None,
+        ):
+        """
+        Iterates over the table created by `make_df` in data frames of
+        at most `chunk_size` rows. Only one chunk is kept in memory at
+        a time, hence these can be written into a file by `TableWriter`
+        without ever creating the full table.
+        Arguments are the same as for `make_df`.
+
+        Args:
+        -----
+        :param int chunk_size:
+            Number of rows in one data frame. By default the value of
+            the `export_chunk_size` setting.
+        """
+
+        chunk_size = chunk_size or settings.get('export_chunk_size')
+
+        header, dtypes = self._setup_table(
+            unique_pairs = unique_pairs,
+            extra_node_attrs = extra_node_attrs,
+            extra_edge_attrs = extra_edge_attrs,
+        )
+
+        rows = self._iter_rows(unique_pairs = unique_pairs)
+
+        while True:
+
+            chunk = list(itertools.islice(rows, chunk_size))
+
+            if not chunk:
+
+                break
+
+            yield pd.DataFrame(chunk, columns = header).astype(dtypes)
+
+    def _setup_table(
+            self,
+            unique_pairs = True,
+            extra_node_attrs = None,
+            extra_edge_attrs = None,
+        ):
+        """
+        Prepares the network for the export and returns the header and
+        the data types of the table.
+        """
 
         self.pa.genesymbol_labels()
 
@@ -195,6 +273,13 @@ class Export(object):
             for x in self.extra_node_attrs.keys()
         ]
 
+        return header, dtypes
+
+    def _iter_rows(self, unique_pairs = True):
+        """
+        Yields the rows of the table one by one.
+        """
+
         prg = progress.Progress(
             total = self.graph.ecount(),
             name = 'Creating table',
@@ -210,15 +295,14 @@ class Export(object):
                 self.process_edge_bydirection(e)
             )
 
-            result.extend(lines)
+            for line in lines:
+
+                yield line
 
             prg.step()
 
         prg.terminate()
 
-        self.df = pd.DataFrame(result, columns = header)
-        self.df = self.df.astype(dtypes)
-
     def process_edge_uniquepairs(self, e):
         """
         Returns a table row representing a network edge with covering all
@@ -485,13 +569,41 @@ class Export(object):
         self.write(outfile = outfile)
 
     def write(self, outfile = None):
+        """
+        Writes the data frame into a file. The format depends on the
+        file name (see `TableWriter`).
+        """
+
+        with TableWriter(self._outfile(outfile)) as writer:
+
+            writer.write(self.df)
 
-        outfile = outfile or self.outfile or os.path.join(
+    def write_batches(self, outfile = None, chunk_size = None, **kwargs):
+        """
+        Writes the table into a file chunk by chunk, without creating
+        the full data frame. The format depends on the file name
+        (see `TableWriter`).
+
+        Args:
+        -----
+        :param int chunk_size:
+            Number of rows processed at once.
+        :param **kwargs:
+            Forwarded to `iter_batches()`.
+        """
+
+        with TableWriter(self._outfile(outfile)) as writer:
+
+            for df in self.iter_batches(chunk_size = chunk_size, **kwargs):
+
+                writer.write(df)
+
+    def _outfile(self, outfile = None):
+
+        return outfile or self.outfile or os.path.join(
             self.pa.outdir, 'network-%s.tab' % self.pa.session
         )
 
-        self.df.to_csv(outfile, sep = '\t', index = False)
-
     def _dip_urls(self, e):
 
         result = []
@@ -508,6 +620,22 @@ class Export(object):
 
     def webservice_interactions_df(self):
 
+        self.make_df(**self._webservice_interactions_param())
+
+    def webservice_interactions_batches(self, chunk_size = None):
+        """
+        Iterates over the interactions table of the webservice in data
+        frames of at most `chunk_size` rows.
+        """
+
+        return self.iter_batches(
+            chunk_size = chunk_size,
+            **self._webservice_interactions_param()
+        )
+
+    @staticmethod
+    def _webservice_interactions_param():
+
         sources_omnipath = set(
             f.name for f in data_formats.omnipath.values()
         )
@@ -525,7 +653,7 @@ class Export(object):
             f.name for f in data_formats.mirna_target.values()
         )
 
-        self.make_df(
+        return dict(
             unique_pairs = False,
             extra_node_attrs = {
                 'ncbi_tax_id': 'ncbi_tax_id'
@@ -637,3 +765,151 @@ class Export(object):
             )
 
         return new
+
+
+class TableWriter(object):
+    """
+    Writes data frames arriving one by one into a single file. Suitable
+    to write large tables in chunks: only the actual chunk needs to be
+    in the memory.
+
+    The first data frame defines the columns: the columns of the later
+    ones are reordered accordingly, missing columns are filled with
+    empty values and extra columns are dropped.
+
+    Args:
+    -----
+    :param str outfile:
+        Path to the output file.
+    :param str fmt:
+        Either `tsv` or `parquet`. By default `parquet` if the file
+        name ends with `.parquet`, otherwise `tsv`.
+    :param str compression:
+        For `tsv` only `gzip` is available, this is the default if the
+        file name ends with `.gz`. For `parquet` any codec supported
+        by `pyarrow`, by default `snappy`.
+    """
+
+    def __init__(self, outfile, fmt = None, compression = None):
+
+        self.outfile = outfile
+        self.fmt = fmt or (
+            'parquet' if outfile.endswith('.parquet') else 'tsv'
+        )
+        self.compression = compression or (
+            'gzip' if outfile.endswith('.gz') else None
+        )
+        self.columns = None
+        self.schema = None
+        self._fp = None
+        self._writer = None
+
+        if self.fmt == 'parquet' and pyarrow is None:
+
+            raise ImportError(
+                'Module `pyarrow` is required to write Parquet files.'
+            )
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def write(self, df):
+        """
+        Appends the rows of a data frame to the file.
+        """
+
+        if self.columns is None:
+
+            self.columns = list(df.columns)
+
+        elif list(df.columns) != self.columns:
+
+            df = df.reindex(columns = self.columns)
+
+        if self.fmt == 'parquet':
+
+            self._write_parquet(df)
+
+        else:
+
+            self._write_tsv(df)
+
+    def _write_tsv(self, df):
+
+        header = self._fp is None
+
+        if header:
+
+            self._fp = (
+                gzip.open(self.outfile, 'wt')
+                    if self.compression == 'gzip' else
+                open(self.outfile, 'w')
+            )
+
+        df.to_csv(self._fp, sep = '\t', index = False, header = header)
+
+    def _write_parquet(self, df):
+
+        table = pyarrow.Table.from_pandas(df, preserve_index = False)
+
+        if self._writer is None:
+
+            self.schema = self._parquet_schema(table.schema)
+            self._writer = pyarrow.parquet.ParquetWriter(
+                self.outfile,
+                self.schema,
+                compression = self.compression or 'snappy',
+            )
+
+        self._writer.write_table(table.cast(self.schema))
+
+    @staticmethod
+    def _parquet_schema(schema):
+        """
+        Makes the schema inferred from the first chunk suitable for all
+        the others: categorical columns are stored as dictionaries with
+        32 bit indices, columns without any value in the first chunk
+        are stored as strings.
+        """
+
+        fields = []
+
+        for field in schema.remove_metadata():
+
+            if pyarrow.types.is_dictionary(field.type):
+
+                value_type = field.type.value_type
+
+                field = field.with_type(
+                    pyarrow.dictionary(
+                        pyarrow.int32(),
+                        pyarrow.string()
+                            if pyarrow.types.is_null(value_type) else
+                        value_type,
+                    )
+                )
+
+            elif pyarrow.types.is_null(field.type):
+
+                field = field.with_type(pyarrow.string())
+
+            fields.append(field)
+
+        return pyarrow.schema(fields)
+
+    def close(self):
+
+        if self._fp is not None:
+
+            self._fp.close()
+            self._fp = None
+
+        if self._writer is not None:
+
+            self._writer.close()
+            self._writer = None
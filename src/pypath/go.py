@@ -257,31 +257,199 @@ class GeneOntology(session_mod.Logger):
             Include ``terms`` in the subgraph or only the related nodes.
         """
         
-        relations = relations or self.all_relations
+        relations = frozenset(relations or self.all_relations)
         
         if isinstance(terms, common.basestring):
             
             terms = {terms}
         
-        graph = getattr(self, direction)
-        subgraph = set(terms) if include_seed else set()
+        subgraph = set()
         
         for term in terms:
             
-            for related, relation in graph[term]:
+            if include_seed:
                 
-                if relation not in relations:
+                subgraph.update(self._closure(direction, term, relations))
+                
+            else:
+                
+                for related, relation in self._related(direction, term):
                     
-                    continue
+                    if relation in relations:
+                        
+                        subgraph.update(
+                            self._closure(direction, related, relations)
+                        )
+        
+        return subgraph
+    
+    
+    def _related(self, direction, term):
+        
+        return getattr(self, direction).get(term, ())
+    
+    
+    def _closure(self, direction, term, relations):
+        """
+        Returns the closure of a single term, i.e. the term itself and all
+        its ancestors or descendants. The closures are memoized for each
+        direction and set of relations, the graph is traversed iteratively.
+        """
+        
+        if not hasattr(self, '_closures'):
+            
+            self._closures = {}
+        
+        memo = self._closures.setdefault((direction, relations), {})
+        
+        if term in memo:
+            
+            return memo[term]
+        
+        index = getattr(self, '_index', None)
+        
+        if (
+            index and
+            index['relations'] == relations and
+            term in index['term_idx']
+        ):
+            
+            offsets, indices = index[direction]
+            i = index['term_idx'][term]
+            memo[term] = frozenset(
+                index['terms'][indices[offsets[i]:offsets[i + 1]]]
+            )
+            
+            return memo[term]
+        
+        # depth first traversal in post-order: the closure of a term is
+        # computed after the closures of all the related terms
+        new = {}
+        in_progress = set()
+        stack = [(term, False)]
+        cycle = False
+        
+        while stack:
+            
+            this_term, expanded = stack.pop()
+            
+            if this_term in memo or this_term in new:
                 
-                if related not in subgraph:
+                continue
+            
+            related = [
+                rel
+                for rel, relation in self._related(direction, this_term)
+                if relation in relations
+            ]
+            
+            if expanded:
+                
+                in_progress.discard(this_term)
+                closure = {this_term}
+                
+                for rel in related:
                     
-                    subgraph.update(
-                        self.subgraph_nodes(direction, related, relations)
+                    closure.update(
+                        memo[rel] if rel in memo else new.get(rel, {rel})
                     )
-                    subgraph.add(related)
+                
+                new[this_term] = frozenset(closure)
+                
+            else:
+                
+                in_progress.add(this_term)
+                stack.append((this_term, True))
+                
+                for rel in related:
+                    
+                    if rel in in_progress:
+                        
+                        cycle = True
+                        
+                    elif rel not in memo and rel not in new:
+                        
+                        stack.append((rel, False))
+        
+        if cycle:
+            
+            # in a cycle the closures of the intermediate terms might be
+            # incomplete, we keep only the result of a simple traversal
+            # of the seed term
+            closure = {term}
+            stack = [term]
+            
+            while stack:
+                
+                for rel, relation in self._related(direction, stack.pop()):
+                    
+                    if relation in relations and rel not in closure:
+                        
+                        closure.add(rel)
+                        stack.append(rel)
+            
+            new = {term: frozenset(closure)}
         
-        return subgraph
+        memo.update(new)
+        
+        return memo[term]
+    
+    
+    def build_index(self, relations = None):
+        """
+        Precomputes the transitive closure of all terms in both directions.
+        For each direction the closures are stored in two arrays: the
+        indices of the terms in the closures, one after the other, and the
+        offsets where the closure of each term begins. The index is an
+        attribute of the object, hence it is saved together with the
+        ontology if the object is pickled. Once it exists, the closures
+        for the same set of relations are read from the index.
+        
+        :param set relations:
+            The relations considered, by default all relations.
+        """
+        
+        relations = frozenset(relations or self.all_relations)
+        
+        terms = sorted(
+            set(self.ancestors.keys()) |
+            set(self.descendants.keys()) |
+            set(self.aspect.keys())
+        )
+        term_idx = dict((term, i) for i, term in enumerate(terms))
+        
+        # we remove the index temporarily to compute the closures
+        # by traversing the graph
+        self._index = None
+        index = {
+            'relations': relations,
+            'terms': np.array(terms, dtype = object),
+            'term_idx': term_idx,
+        }
+        
+        for direction in ('ancestors', 'descendants'):
+            
+            closures = [
+                sorted(
+                    term_idx[t]
+                    for t in self._closure(direction, term, relations)
+                    if t in term_idx
+                )
+                for term in terms
+            ]
+            offsets = np.zeros(len(terms) + 1, dtype = np.int64)
+            offsets[1:] = np.cumsum([len(c) for c in closures])
+            
+            index[direction] = (
+                offsets,
+                np.fromiter(
+                    itertools.chain(*closures),
+                    dtype = np.int32,
+                    count = offsets[-1],
+                ),
+            )
+        
+        self._index = index
     
     
     def get_all_ancestors(self, terms, relations = None, include_seed = True):
@@ -616,7 +784,7 @@ class GOAnnotation(session_mod.Logger):
         Tells if an UniProt ID is annotated with any of a set of GO terms.
         """
         
-        return uniprot in self.all_full and term & self.all_full[uniprot]
+        return uniprot in self.all_full and bool(terms & self.all_full[uniprot])
     
     
     def all_uniprots(self):
@@ -643,15 +811,35 @@ class GOAnnotation(session_mod.Logger):
         
         uniprots = uniprots or sorted(self.all_uniprots())
         
-        method = self.has_any_term if isinstance(term, set) else self.has_term
+        terms = term if isinstance(term, set) else {term}
+        selected = set.union(set(), *(self.annotated_by(t) for t in terms))
         
         return set(
             i
             for i, uniprot in enumerate(uniprots)
-            if method(uniprot, term)
+            if uniprot in selected
         )
     
     
+    def annotated_by(self, term):
+        """
+        Returns the set of UniProt IDs annotated with a GO term or any of
+        its descendants. Uses an index built at the first call.
+        """
+        
+        if not hasattr(self, '_by_term'):
+            
+            self._by_term = {}
+            
+            for uniprot, terms in iteritems(self.all_full):
+                
+                for _term in terms:
+                    
+                    self._by_term.setdefault(_term, set()).add(uniprot)
+        
+        return self._by_term.get(term, set())
+    
+    
     def select_by_name(self, name, uniprots = None, return_uniprots = False):
         """
         Accepts a list of UniProt IDs and one or more gene ontology names
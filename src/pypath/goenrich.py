@@ -22,8 +22,15 @@
 from future.utils import iteritems
 from past.builtins import xrange, range
 
+import collections
+
+import numpy as np
+import scipy.sparse
+
 import pypath.enrich as enrich
 import pypath.dataio as dataio
+import pypath.common as common
+import pypath.go as go
 
 
 class GOEnrichmentSet(enrich.EnrichmentSet):
@@ -36,15 +43,15 @@ class GOEnrichmentSet(enrich.EnrichmentSet):
                  alpha=0.05,
                  correction_method='hommel'):
         """
-        Does not work at the moment as cfisher module should be replaced
-        by scipy in the ``pypath.enrich`` module.
+        Gene Ontology enrichment analysis. Define the set of proteins by
+        ``new_set``, or test many sets at once by ``new_sets``.
         """
         
         self.aspect = aspect
         self.organism = organism
         self.alpha = alpha
         self.correction_method = correction_method
-        self.annotation = GOAnnotation(organism=self.organism) \
+        self.annotation = go.GOAnnotation(organism=self.organism) \
             if annotation is None else annotation
         self.basic_set = basic_set if basic_set is not None \
             else self.get_basic_set()
@@ -66,7 +73,7 @@ class GOEnrichmentSet(enrich.EnrichmentSet):
     def calculate(self):
         
         data = dict([(term, (cnt, self.counts_pop[term], self.set_size,
-                             self.annotation.name[term]))
+                             self.annotation.get_name(term)))
                      for term, cnt in iteritems(self.counts_set)])
         enrich.EnrichmentSet.__init__(
             self,
@@ -89,9 +96,68 @@ class GOEnrichmentSet(enrich.EnrichmentSet):
         return dict(
             filter(lambda x: x[0] in set_names, iteritems(self.basic_set)))
 
+    def new_sets(self, sets, set_names=None):
+        """
+        Tests the enrichment in many sets of proteins at once.
+        Returns a data frame with one row for each set and term, see
+        ``pypath.enrich.enrichment_matrix``.
+        
+        :arg list,dict sets:
+            Sets of UniProt IDs, or a dict with labels as keys and sets
+            as values.
+        :arg list set_names:
+            Labels of the sets, by default their indices or the keys of
+            the dict.
+        """
+        
+        if isinstance(sets, dict):
+            set_names = set_names or list(sets.keys())
+            sets = list(sets.values())
+        
+        proteins = sorted(self.basic_set.keys())
+        rows = dict((uniprot, i) for i, uniprot in enumerate(proteins))
+        terms = sorted(self.counts_pop.keys())
+        cols = dict((term, j) for j, term in enumerate(terms))
+        
+        def bool_matrix(pairs, shape):
+            
+            pairs = np.array(list(pairs), dtype=np.int64).reshape((-1, 2))
+            
+            return scipy.sparse.csc_matrix(
+                (np.ones(len(pairs), dtype=bool), (pairs[:,0], pairs[:,1])),
+                shape=shape)
+        
+        annotation = bool_matrix(
+            (
+                (rows[uniprot], cols[term])
+                for uniprot, annot in iteritems(self.basic_set)
+                for term in set(annot)
+            ),
+            (len(proteins), len(terms)))
+        set_matrix = bool_matrix(
+            (
+                (rows[uniprot], j)
+                for j, this_set in enumerate(sets)
+                for uniprot in set(this_set)
+                if uniprot in rows
+            ),
+            (len(proteins), len(sets)))
+        
+        result = enrich.enrichment_matrix(
+            annotation,
+            set_matrix,
+            names=terms,
+            set_names=set_names,
+            method=self.correction_method,
+            alpha=self.alpha)
+        result['name'] = [self.annotation.get_name(t) for t in result.term]
+        
+        return result
+
     def count(self, data):
         
-        return Counter(flatList(list(vals) for vals in data.values()))
+        return collections.Counter(
+            common.flatList(list(vals) for vals in data.values()))
         # return dict((name, count/float(len(data))) for name, count in
         # cnt.iteritems())
 
@@ -41,6 +41,9 @@ from collections import defaultdict
 from itertools import combinations, chain  # requires python 2.6+
 from optparse import OptionParser
 
+import numpy as np
+import scipy.sparse
+
 
 def swap(a, b):
     if a > b:
@@ -160,6 +163,239 @@ class HLC:
             return self.best_P, self.best_S, self.best_D, self.list_D
 
 
+class SparseHLC(object):
+    """
+    The same clustering as `HLC`, with the same results, for large
+    networks. The similarities are calculated by sparse matrix products
+    and processed in groups of equal similarity, the communities are kept
+    in a union-find structure, and the best partition is recorded as the
+    number of merges done until it, instead of copies of `edge2cid`.
+    """
+
+    def __init__(self, adj, edges):
+        self.adj = adj  # node -> set of neighbors
+        self.edges = [swap(*edge) for edge in edges]  # just in case
+        self.Mfactor = 2.0 / len(self.edges)
+        self.orig_cid2edge = dict(enumerate(self.edges))
+        # node ids in the order of the nodes, so the edge pairs can be
+        # ordered the same way as in `HLC`
+        self.nodes = sorted(set(adj) | set(chain(*self.edges)))
+        node_ids = dict((n, i) for i, n in enumerate(self.nodes))
+        self.edge_nodes = np.array(
+            [(node_ids[ni], node_ids[nj]) for ni, nj in self.edges],
+            dtype=np.int64).reshape((-1, 2))
+        self.D = 0.0  # partition density
+
+    def _weights(self, w):
+        return None if w is None else np.array(
+            [w[edge] for edge in self.edges], dtype=np.float64)
+
+    def single_linkage(self, threshold=None, w=None, dendro_flag=False):
+        """
+        Returns the same as `HLC.single_linkage`.
+        """
+        self.list_D = [(1.0, 0.0)]  # list of (S_i,D_i) tuples...
+        self.best_D = 0.0
+        self.best_S = 1.0  # similarity threshold at best_D
+        self.linkage = []  # dendrogram
+        self.D = 0.0
+
+        n_edges = len(self.edges)
+        parent = list(range(n_edges))  # union-find of edges
+        size = [1] * n_edges  # number of edges in the comm of the root
+        cid = list(range(n_edges))  # comm id of the root
+        nodes = {}  # root -> set of nodes, only for the merged comms
+        merges = []  # edge pairs merged, in order
+        best_merges = 0  # number of merges until the best partition
+        curr_maxcid = n_edges - 1
+        edge_nodes = self.edge_nodes.tolist()
+
+        def find(e):
+            while parent[e] != e:
+                parent[e] = parent[parent[e]]
+                e = parent[e]
+            return e
+
+        def comm_nodes(root):
+            return nodes[root] if root in nodes else set(edge_nodes[root])
+
+        S_prev = -1
+        groups = similarities_sparse(
+            self.edge_nodes, len(self.nodes), self._weights(w))
+
+        # (1.0, (), ()) takes care of the special case where the last
+        # merging gives the maximum partition density (e.g. a single clique).
+        for oms, edges1, edges2 in chain(groups, [(1.0, (), ())]):
+            S = 1 - oms
+            if threshold and S < threshold:
+                break
+
+            if S != S_prev:  # update list
+                if self.D >= self.best_D:  # check PREVIOUS merger, because
+                    self.best_D = self.D  # that's the end of the tie
+                    self.best_S = S
+                    best_merges = len(merges)
+                self.list_D.append((S, self.D))
+                S_prev = S
+
+            for e1, e2 in zip(edges1, edges2):
+                r1, r2 = find(e1), find(e2)
+                if r1 == r2:  # already merged!
+                    continue
+                m1, m2 = size[r1], size[r2]
+                nodes1, nodes2 = comm_nodes(r1), comm_nodes(r2)
+                Dc1, Dc2 = Dc(m1, len(nodes1)), Dc(m2, len(nodes2))
+                if m2 > m1:  # merge smaller into larger
+                    r1, r2 = r2, r1
+                    nodes1, nodes2 = nodes2, nodes1
+                parent[r2] = r1
+                size[r1] = m = m1 + m2
+                nodes1 |= nodes2
+                nodes[r1] = nodes1
+                nodes.pop(r2, None)
+                n = len(nodes1)
+                if dendro_flag:
+                    curr_maxcid += 1
+                    self.linkage.append((cid[r1], cid[r2], S))
+                    cid[r1] = curr_maxcid
+                merges.append((e1, e2))
+                self.D = self.D + (Dc(m, n) - Dc1 - Dc2) * \
+                    self.Mfactor  # update partition density
+
+        if threshold != None:
+            self.edge2cid = dict(
+                (edge, cid[find(e)]) for e, edge in enumerate(self.edges))
+            return self.edge2cid, self.D
+
+        self.best_P = self.partition(merges[:best_merges], dendro_flag)
+        if dendro_flag:
+            return self.best_P, self.best_S, self.best_D, self.list_D, self.orig_cid2edge, self.linkage
+        else:
+            return self.best_P, self.best_S, self.best_D, self.list_D
+
+    def partition(self, merges, dendro_flag=False):
+        """
+        Returns the partition (dict: edge -> cid) after the merges of
+        edge pairs in `merges`, with the same comm ids as `HLC`.
+        """
+        n_edges = len(self.edges)
+        parent = list(range(n_edges))
+        size = [1] * n_edges
+        cid = list(range(n_edges))
+        curr_maxcid = n_edges - 1
+
+        def find(e):
+            while parent[e] != e:
+                parent[e] = parent[parent[e]]
+                e = parent[e]
+            return e
+
+        for e1, e2 in merges:
+            r1, r2 = find(e1), find(e2)
+            if size[r2] > size[r1]:
+                r1, r2 = r2, r1
+            parent[r2] = r1
+            size[r1] += size[r2]
+            if dendro_flag:
+                curr_maxcid += 1
+                cid[r1] = curr_maxcid
+
+        return dict(
+            (edge, cid[find(e)]) for e, edge in enumerate(self.edges))
+
+
+def similarities_sparse(edge_nodes, n_nodes, weights=None, chunk_size=1000000):
+    """Get all the edge similarities, the same as `similarities_unweighted`,
+    or `similarities_weighted` if `weights` are given, but from sparse
+    matrices and in groups. Input is an array of edges as pairs of node ids
+    and optionally an array of edge weights.
+    Yields (1-sim, edges1, edges2) tuples ordered by similarity, where
+    edges1 and edges2 are arrays of edge indices, the edge pairs in the same
+    order as in `similarities_unweighted`.
+    """
+    ni, nj = edge_nodes[:, 0], edge_nodes[:, 1]
+    n_edges = len(ni)
+    rows, cols = np.concatenate((ni, nj)), np.concatenate((nj, ni))
+    shape = (n_nodes, n_nodes)
+    # edge index + 1 for each pair of nodes
+    E = scipy.sparse.csr_matrix(
+        (np.tile(np.arange(1, n_edges + 1), 2), (rows, cols)), shape=shape)
+    A = scipy.sparse.csr_matrix(
+        (np.ones(2 * n_edges, dtype=np.int64), (rows, cols)), shape=shape)
+
+    # node pairs having common neighbors
+    C = scipy.sparse.triu(A.dot(A), k=1).tocoo()
+    I, J = C.row.astype(np.int64), C.col.astype(np.int64)
+
+    if not len(I):  # no edges sharing a node
+        return
+
+    if weights is None:
+        # Jacc similarity of the inclusive neighbors
+        deg = np.asarray(A.sum(axis=1)).ravel()
+        inter = C.data + 2 * np.asarray(A[I, J]).ravel()
+        S = 1.0 * inter / (deg[I] + deg[J] + 2 - inter)
+    else:
+        W = scipy.sparse.csr_matrix(
+            (np.tile(weights, 2), (rows, cols)), shape=shape)
+        # including (n,n)!
+        Wn = W + scipy.sparse.diags(
+            np.asarray(W.sum(axis=1)).ravel() /
+            np.asarray(A.sum(axis=1)).ravel())
+        ai_dot_aj = np.asarray(Wn.dot(Wn)[I, J]).ravel()
+        n2a_sqrd = np.asarray(Wn.multiply(Wn).sum(axis=1)).ravel()
+        # tanimoto similarity
+        S = ai_dot_aj / (n2a_sqrd[I] + n2a_sqrd[J] - ai_dot_aj)
+
+    oms = 1 - S
+    order = np.argsort(oms, kind='mergesort')
+    oms, I, J = oms[order], I[order], J[order]
+    # boundaries of the groups of equal similarity
+    bounds = np.concatenate(
+        ([0], np.flatnonzero(np.diff(oms)) + 1, [len(oms)]))
+
+    # processing many groups at once, but each group in one chunk
+    istart = 0
+    while istart < len(bounds) - 1:
+        iend = max(
+            istart + 1,
+            np.searchsorted(bounds, bounds[istart] + chunk_size, 'right') - 1)
+        iend = min(iend, len(bounds) - 1)
+        a, b = bounds[istart], bounds[iend]
+        group = np.repeat(
+            np.arange(istart, iend), np.diff(bounds[istart:iend + 1]))
+
+        # the shared nodes of each pair of nodes
+        shared = A[I[a:b]].multiply(A[J[a:b]]).tocoo()
+        ipair, n = shared.row, shared.col.astype(np.int64)
+        i, j = I[a:b][ipair], J[a:b][ipair]
+        e_i = np.asarray(E[i, n]).ravel() - 1
+        e_j = np.asarray(E[j, n]).ravel() - 1
+        # edges as ordered node pairs, and edge pairs ordered by them
+        i0, i1 = np.minimum(i, n), np.maximum(i, n)
+        j0, j1 = np.minimum(j, n), np.maximum(j, n)
+        i_first = (i0 < j0) | ((i0 == j0) & (i1 < j1))
+        edges1 = np.where(i_first, e_i, e_j)
+        edges2 = np.where(i_first, e_j, e_i)
+        key1 = np.where(i_first, i0, j0), np.where(i_first, i1, j1)
+        key2 = np.where(i_first, j0, i0), np.where(i_first, j1, i1)
+        this_group = group[ipair]
+        order = np.lexsort(
+            (key2[1], key2[0], key1[1], key1[0], this_group))
+        edges1, edges2 = edges1[order].tolist(), edges2[order].tolist()
+        this_bounds = np.searchsorted(
+            this_group[order], np.arange(istart, iend + 1))
+
+        for k in range(iend - istart):
+            yield (
+                float(oms[bounds[istart + k]]),
+                edges1[this_bounds[k]:this_bounds[k + 1]],
+                edges2[this_bounds[k]:this_bounds[k + 1]],
+            )
+
+        istart = iend
+
+
 def similarities_unweighted(adj):
     """Get all the edge similarities. Input dict maps nodes to sets of neighbors.
     Output is a list of decorated edge-pairs, (1-sim,eij,eik), ordered by similarity.
@@ -178,7 +414,7 @@ def similarities_unweighted(adj):
                 S = 1.0 * len(inc_ns_i & inc_ns_j) / len(inc_ns_i | inc_ns_j)
                 heappush(min_heap, (1 - S, edge_pair))
     # return ordered edge pairs
-    return [heappop(min_heap) for i in xrange(len(min_heap))]
+    return [heappop(min_heap) for i in range(len(min_heap))]
 
 
 def similarities_weighted(adj, ij2wij):
@@ -213,7 +449,7 @@ def similarities_weighted(adj, ij2wij):
                 S = ai_dot_aj / (n2a_sqrd[i] + n2a_sqrd[j] - ai_dot_aj)
                 heappush(min_heap, (1 - S, edge_pair))
     # return ordered edge pairs
-    return [heappop(min_heap) for i in xrange(len(min_heap))]
+    return [heappop(min_heap) for i in range(len(min_heap))]
 
 
 def read_edgelist_unweighted(filename, delimiter=None, nodetype=str):
@@ -222,7 +458,7 @@ def read_edgelist_unweighted(filename, delimiter=None, nodetype=str):
     """
     adj = defaultdict(set)  # node to set of neighbors
     edges = set()
-    for line in open(filename, 'U'):
+    for line in open(filename, 'r'):
         L = line.strip().split(delimiter)
         ni, nj = nodetype(L[0]), nodetype(L[1])  # other columns ignored
         if ni != nj:  # skip any self-loops...
@@ -243,7 +479,7 @@ def read_edgelist_weighted(filename,
     adj = defaultdict(set)
     edges = set()
     ij2wij = {}
-    for line in open(filename, 'U'):
+    for line in open(filename, 'r'):
         L = line.strip().split(delimiter)
         ni, nj, wij = nodetype(L[0]), nodetype(L[1]), weighttype(
             L[2])  # other columns ignored
@@ -267,14 +503,14 @@ def write_edge2cid(e2c, filename, delimiter="\t"):
 
     # write edge2cid three-column file:
     f = open(filename + ".edge2comm.txt", 'w')
-    for e, c in sorted(e2c.iteritems(), key=itemgetter(1)):
+    for e, c in sorted(e2c.items(), key=itemgetter(1)):
         f.write("%s%s%s%s%s\n" %
                 (str(e[0]), delimiter, str(e[1]), delimiter, str(c2c[c])))
     f.close()
 
     cid2edges, cid2nodes = defaultdict(set), defaultdict(
         set)  # faster to recreate here than
-    for edge, cid in e2c.iteritems():  # to keep copying all dicts
+    for edge, cid in e2c.items():  # to keep copying all dicts
         # during the linkage...
         cid2edges[cid].add(edge)
         cid2nodes[cid] |= set(edge)
@@ -286,7 +522,7 @@ def write_edge2cid(e2c, filename, delimiter="\t"):
                 'w'), open(filename + ".comm2nodes.txt", 'w')
     for cid in sorted(cid2edges.keys()):
         strcid = str(c2c[cid])
-        nodes = map(str, cid2nodes[cid])
+        nodes = list(map(str, cid2nodes[cid]))
         edges = ["%s,%s" % (ni, nj) for ni, nj in cid2edges[cid]]
         f.write(delimiter.join([strcid] + edges))
         f.write("\n")
@@ -298,7 +534,7 @@ def write_edge2cid(e2c, filename, delimiter="\t"):
 
 def write_dendro(filename, orig_cid2edge, linkage):
     with open(filename + '.cid2edge.txt', 'w') as fout:
-        for cid, e in orig_cid2edge.iteritems():
+        for cid, e in orig_cid2edge.items():
             fout.write("%d\t%s,%s\n" % (cid, str(e[0]), str(e[1])))
 
     with open(filename + '.linkage.txt', 'w') as fout:
@@ -383,6 +619,13 @@ Output:
         action="store_true",
         default=False,
         help="recording the whole dendrogram (optional)")
+    parser.add_option(
+        "-s",
+        "--sparse",
+        dest="sparse",
+        action="store_true",
+        default=False,
+        help="sparse matrix implementation, for large networks")
 
     # parse options:
     (options, args) = parser.parse_args()
@@ -394,6 +637,8 @@ Output:
     threshold = options.threshold
     is_weighted = options.is_weighted
     dendro_flag = options.dendro_flag
+    if options.sparse:
+        HLC = SparseHLC
 
     #print "# loading network from edgelist..."
     basename = os.path.splitext(args[0])[0]
@@ -52,12 +52,14 @@ import operator
 import locale
 import heapq
 import threading
+import multiprocessing
 import traceback
 import itertools
 from itertools import chain
 import collections
 from collections import Counter
 from scipy import stats
+import scipy.sparse
 import numpy as np
 
 # XXX: Put together all import tries
@@ -105,6 +107,7 @@ import pypath.curl as curl
 import pypath.intera as intera
 import pypath.seq as se
 import pypath.go as go
+import pypath.goenrich as goenrich
 import pypath.gsea as gsea
 import pypath.drawing as bdrawing
 import pypath.proteomicsdb as proteomicsdb
@@ -114,6 +117,7 @@ import pypath.refs as _refs
 import pypath.plot as plot
 import pypath.ptm
 import pypath.export as export
+import pypath.snapshot as snapshot_mod
 import pypath.ig_drawing as ig_drawing
 import pypath.common as common
 import pypath._version as _version
@@ -136,12 +140,81 @@ __all__ = ['PyPath', 'Direction', '__version__', 'a',
            'AttrHelper', 'ReferenceList', 'omnipath']
 
 
+class _SourceRegistry(object):
+    """
+    Interns resource names and encodes sets of them as integer
+    bitmasks. Each name gets one bit, in the order of registration.
+    Bitmasks are valid only within one process, hence objects using
+    them should be pickled with the names.
+    """
+
+    def __init__(self):
+
+        self.names = []
+        self.bits = {}
+        self._decoded = {0: frozenset()}
+
+    def encode(self, names):
+        """
+        Returns the bitmask of a set of resource names.
+
+        :arg set names:
+            Or [list], or a single resource name.
+        """
+
+        mask = 0
+
+        for name in common.addToSet(set(), names):
+
+            if name not in self.bits:
+
+                self.bits[name] = 1 << len(self.names)
+                self.names.append(name)
+
+            mask |= self.bits[name]
+
+        return mask
+
+    def decode(self, mask):
+        """
+        Returns the set of resource names encoded in a bitmask.
+
+        :arg int mask:
+            Bitmask created by :py:meth:`encode`.
+        """
+
+        if mask not in self._decoded:
+
+            names = []
+            i = 0
+            _mask = mask
+
+            while _mask:
+
+                if _mask & 1:
+
+                    names.append(self.names[i])
+
+                _mask >>= 1
+                i += 1
+
+            self._decoded[mask] = frozenset(names)
+
+        return set(self._decoded[mask])
+
+
 class Direction(object):
     """
     Object storing directionality information of an edge. Also includes
     information about the reverse direction, mode of regulation and
     sources of that information.
 
+    The information is stored in a compact form: the presence of the
+    directions and signs in bits of one integer, the sets of resources
+    as bitmasks over the resources registered in
+    :py:attr:`Direction.registry`. The attributes below are built on
+    access, modifying them has no effect on the object.
+
     :arg str id_a:
         Name of the source node.
     :arg str id_b:
@@ -183,30 +256,252 @@ class Direction(object):
         (*id_a*, *id_b*).
     """
 
-    __slots__ = ['nodes', 'straight', 'reverse', 'dirs', 'sources', 'positive',
-                 'negative', 'positive_sources', 'negative_sources']
+    __slots__ = [
+        'straight',
+        '_flags',
+        '_sources_straight',
+        '_sources_reverse',
+        '_sources_undirected',
+        '_positive_straight',
+        '_positive_reverse',
+        '_negative_straight',
+        '_negative_reverse',
+    ]
+
+    registry = _SourceRegistry()
+
+    # slot names by direction index: 0 is straight, 1 is reverse,
+    # 2 is undirected
+    _sources_slots = (
+        '_sources_straight',
+        '_sources_reverse',
+        '_sources_undirected',
+    )
+    _sign_slots = {
+        'positive': ('_positive_straight', '_positive_reverse'),
+        'negative': ('_negative_straight', '_negative_reverse'),
+    }
+    # offsets of the bits in `_flags`
+    _sign_flags = {'positive': 3, 'negative': 5}
 
     def __init__(self, id_a, id_b):
         """Initializes the edge object between the given nodes."""
 
-        self.nodes = [id_a, id_b]
-        self.nodes.sort()
+        nodes = sorted([id_a, id_b])
+
+        self.straight = (nodes[0], nodes[1])
+        self._flags = 0
+        self._sources_straight = 0
+        self._sources_reverse = 0
+        self._sources_undirected = 0
+        self._positive_straight = 0
+        self._positive_reverse = 0
+        self._negative_straight = 0
+        self._negative_reverse = 0
+
+    def __getstate__(self):
+
+        return (
+            self.straight,
+            self._flags,
+            tuple(
+                self.registry.decode(getattr(self, slot))
+                for slot in self.__slots__[2:]
+            ),
+        )
+
+    def __setstate__(self, state):
+
+        if isinstance(state, tuple) and len(state) == 2:
+
+            # pickled by the earlier implementation storing dicts
+            self._setstate_dicts(state[1])
+
+        else:
+
+            self.straight, self._flags, sources = state
+
+            for slot, names in zip(self.__slots__[2:], sources):
+
+                setattr(self, slot, self.registry.encode(names))
+
+    def _setstate_dicts(self, state):
+
+        Direction.__init__(self, *state['straight'])
+
+        for di in (self.straight, self.reverse, 'undirected'):
+
+            i = self._index(di)
+            self._set_flag(i, state['dirs'][di])
+            self._set_sources(i, state['sources'][di])
+
+            if di != 'undirected':
+
+                for sign in ('positive', 'negative'):
+
+                    self._set_flag(
+                        i + self._sign_flags[sign],
+                        state[sign][di],
+                    )
+                    self._set_sign_sources(
+                        i,
+                        sign,
+                        state['%s_sources' % sign][di],
+                    )
+
+    def _index(self, direction):
+        """
+        Returns the position of *direction*: 0 for :py:attr:`straight`,
+        1 for :py:attr:`reverse` and 2 for ``'undirected'``.
+        """
+
+        if direction == 'undirected':
+            return 2
+
+        elif direction == self.straight:
+            return 0
+
+        elif direction == self.reverse:
+            return 1
+
+        raise KeyError(direction)
+
+    def _flag(self, bit):
+
+        return bool(self._flags & (1 << bit))
+
+    def _set_flag(self, bit, value = True):
+
+        if value:
+            self._flags |= 1 << bit
+
+        else:
+            self._flags &= ~(1 << bit)
+
+    def _get_sources(self, i):
+
+        return self.registry.decode(getattr(self, self._sources_slots[i]))
 
-        self.straight = (self.nodes[0], self.nodes[1])
-        self.reverse = (self.nodes[1], self.nodes[0])
+    def _set_sources(self, i, names):
 
-        self.dirs = {self.straight: False,
-                     self.reverse: False,
-                     'undirected': False}
-        self.sources = {self.straight: set([]),
-                        self.reverse: set([]),
-                        'undirected': set([])}
+        setattr(self, self._sources_slots[i], self.registry.encode(names))
 
-        self.positive = {self.straight: False, self.reverse: False}
-        self.negative = {self.straight: False, self.reverse: False}
+    def _add_sources(self, i, names):
 
-        self.positive_sources = {self.straight: set([]), self.reverse: set([])}
-        self.negative_sources = {self.straight: set([]), self.reverse: set([])}
+        slot = self._sources_slots[i]
+        setattr(self, slot, getattr(self, slot) | self.registry.encode(names))
+
+    def _get_sign_sources(self, i, sign):
+
+        return self.registry.decode(getattr(self, self._sign_slots[sign][i]))
+
+    def _set_sign_sources(self, i, sign, names):
+
+        setattr(self, self._sign_slots[sign][i], self.registry.encode(names))
+
+    def _add_sign_sources(self, i, sign, names):
+
+        slot = self._sign_slots[sign][i]
+        setattr(self, slot, getattr(self, slot) | self.registry.encode(names))
+
+    def _masks(self):
+        """
+        Returns the resource bitmasks in the order of the slots.
+        """
+
+        return tuple(getattr(self, slot) for slot in self.__slots__[2:])
+
+    @classmethod
+    def _from_masks(cls, straight, flags, masks):
+        """
+        Creates an object from the values returned by :py:meth:`_masks`
+        and the flags, without checking or sorting the nodes.
+        """
+
+        new = cls.__new__(cls)
+        new.straight = straight
+        new._flags = flags
+        (
+            new._sources_straight,
+            new._sources_reverse,
+            new._sources_undirected,
+            new._positive_straight,
+            new._positive_reverse,
+            new._negative_straight,
+            new._negative_reverse,
+        ) = masks
+
+        return new
+
+    def _merge_mask(self, other, slot, other_slot):
+
+        setattr(self, slot, getattr(self, slot) | getattr(other, other_slot))
+
+    def _directions(self, undirected = True):
+
+        return (
+            (self.straight, self.reverse, 'undirected')
+                if undirected else
+            (self.straight, self.reverse)
+        )
+
+    @property
+    def nodes(self):
+
+        return list(self.straight)
+
+    @property
+    def reverse(self):
+
+        return (self.straight[1], self.straight[0])
+
+    @property
+    def dirs(self):
+
+        return dict(
+            (di, self._flag(self._index(di)))
+            for di in self._directions()
+        )
+
+    @property
+    def sources(self):
+
+        return dict(
+            (di, self._get_sources(self._index(di)))
+            for di in self._directions()
+        )
+
+    @property
+    def positive(self):
+
+        return dict(
+            (di, self._flag(self._index(di) + 3))
+            for di in self._directions(undirected = False)
+        )
+
+    @property
+    def negative(self):
+
+        return dict(
+            (di, self._flag(self._index(di) + 5))
+            for di in self._directions(undirected = False)
+        )
+
+    @property
+    def positive_sources(self):
+
+        return dict(
+            (di, self._get_sign_sources(self._index(di), 'positive'))
+            for di in self._directions(undirected = False)
+        )
+
+    @property
+    def negative_sources(self):
+
+        return dict(
+            (di, self._get_sign_sources(self._index(di), 'negative'))
+            for di in self._directions(undirected = False)
+        )
 
     def __str__(self):
         """Custom string/printing function for the object."""
@@ -299,9 +594,23 @@ class Direction(object):
         """
 
         if self.check_param(direction) and len(source):
-            self.dirs[direction] = True
-            source = common.addToSet(set([]), source)
-            self.sources[direction] = self.sources[direction] | source
+            i = self._index(direction)
+            self._set_flag(i)
+            self._add_sources(i, source)
+
+    def add_sources(self, direction, source):
+        """
+        Adds resources to the sources of *direction* without changing
+        the presence/absence of the direction in :py:attr:`dirs`.
+
+        :arg tuple direction:
+            Or [str], the directionality key.
+        :arg set source:
+            Contains the name(s) of the source(s) to be added.
+        """
+
+        if self.check_param(direction):
+            self._add_sources(self._index(direction), source)
 
     def get_dir(self, direction, sources=False):
         """
@@ -324,11 +633,13 @@ class Direction(object):
 
         if self.check_param(direction):
 
+            i = self._index(direction)
+
             if sources:
-                return self.sources[direction]
+                return self._get_sources(i)
 
             else:
-                return self.dirs[direction]
+                return self._flag(i)
 
         else:
             return None
@@ -358,15 +669,13 @@ class Direction(object):
 
         if self.check_nodes(query):
 
+            idx = [self._index(query), self._index((query[1], query[0])), 2]
+
             if sources:
-                return [self.sources[query],
-                        self.sources[(query[1], query[0])],
-                        self.sources['undirected']]
+                return [self._get_sources(i) for i in idx]
 
             else:
-                return [self.dirs[query],
-                        self.dirs[(query[1], query[0])],
-                        self.dirs['undirected']]
+                return [self._flag(i) for i in idx]
 
         else:
             return None
@@ -399,21 +708,18 @@ class Direction(object):
             :py:attr:`sources` attribute in the specified *direction*.
         """
 
-        if check_param(direction):
-
-            if source is not None:
+        if self.check_param(direction):
 
-                try:
-                    self.sources[direction].remove(source)
+            i = self._index(direction)
 
-                except ValueError:
-                    pass
+            if source is not None:
+                self._set_sources(i, self._get_sources(i) - {source})
 
             else:
-                self.sources[direction] = []
+                self._set_sources(i, ())
 
-            if len(self.sources[direction]) == 0:
-                self.dirs[direction] = False
+            if not getattr(self, self._sources_slots[i]):
+                self._set_flag(i, False)
 
     def is_directed(self):
         """
@@ -425,8 +731,7 @@ class Direction(object):
             ``False`` otherwise.
         """
 
-        return bool(
-            sum([v for k, v in iteritems(self.dirs) if k != 'undirected']))
+        return bool(self._flags & 3)
 
     def is_stimulation(self, direction=None):
         """
@@ -514,17 +819,10 @@ class Direction(object):
 
         if self.check_nodes(direction) and len(source):
             self.set_dir(direction, source)
-            source = common.addToSet(set([]), source)
-
-            if sign == 'positive':
-                self.positive[direction] = True
-                self.positive_sources[direction] = \
-                    self.positive_sources[direction] | source
-
-            else:
-                self.negative[direction] = True
-                self.negative_sources[direction] = \
-                    self.negative_sources[direction] | source
+            sign = 'positive' if sign == 'positive' else 'negative'
+            i = self._index(direction)
+            self._set_flag(i + self._sign_flags[sign])
+            self._add_sign_sources(i, sign, source)
 
     def get_sign(self, direction, sign=None, sources=False):
         """
@@ -554,28 +852,20 @@ class Direction(object):
 
         if self.check_nodes(direction):
 
-            if sources:
-
-                if sign == 'positive':
-                    return self.positive_sources[direction]
-
-                elif sign == 'negative':
-                    return self.negative_sources[direction]
+            i = self._index(direction)
+            signs = (
+                (sign,)
+                    if sign in self._sign_flags else
+                ('positive', 'negative')
+            )
 
-                else:
-                    return [self.positive_sources[direction],
-                            self.negative_sources[direction]]
+            if sources:
+                result = [self._get_sign_sources(i, s) for s in signs]
 
             else:
+                result = [self._flag(i + self._sign_flags[s]) for s in signs]
 
-                if sign == 'positive':
-                    return self.positive[direction]
-
-                elif sign == 'negative':
-                    return self.negative[direction]
-
-                else:
-                    return [self.positive[direction], self.negative[direction]]
+            return result if len(result) == 2 else result[0]
 
     def unset_sign(self, direction, sign, source=None):
         """
@@ -600,32 +890,24 @@ class Direction(object):
 
         if self.check_nodes(direction):
 
-            if source is not None:
-
-                try:
-
-                    if sign == 'positive':
-                        self.positive_sources[direction].remove(source)
+            i = self._index(direction)
 
-                    if sign == 'negative':
-                        self.negative_sources[direction].remove(source)
+            if sign in self._sign_slots:
 
-                except:
-                    pass
-
-            else:
-
-                if sign == 'positive':
-                    self.positive_sources[direction] = []
-
-                if sign == 'negative':
-                    self.negative_sources[direction] = []
+                self._set_sign_sources(
+                    i,
+                    sign,
+                    (
+                        self._get_sign_sources(i, sign) - {source}
+                            if source is not None else
+                        ()
+                    ),
+                )
 
-            if len(self.positive_sources[direction]) == 0:
-                self.positive[direction] = False
+            for _sign, slots in iteritems(self._sign_slots):
 
-            if len(self.negative_sources[direction]) == 0:
-                self.negative[direction] = False
+                if not getattr(self, slots[i]):
+                    self._set_flag(i + self._sign_flags[_sign], False)
 
     # XXX: Not sure if intended or you noticed, but if undirected=True and
     #      self.dirs['undirected']=True, the returning list includes 'u'.
@@ -973,21 +1255,37 @@ class Direction(object):
     #                 other.nodes):
         if other.__class__ == self.__class__ and self.check_nodes(other.nodes):
             for k in [self.straight, self.reverse, 'undirected']:
-                self.dirs[k] = self.dirs[k] or other.dirs[k]
-
-                self.sources[k] = self.sources[k] | other.sources[k]
+                i = self._index(k)
+                j = other._index(k)
+
+                self._set_flag(i, self._flag(i) or other._flag(j))
+                self._merge_mask(
+                    other,
+                    self._sources_slots[i],
+                    other._sources_slots[j],
+                )
 
     # XXX: Is there a reason to only update positive with straight and negative
     #      only with reverse?
                 if k == self.straight:
-                    self.positive[k] = self.positive[k] or other.positive[k]
-                    self.positive_sources[k] = (self.positive_sources[k]
-                                                | other.positive_sources[k])
+                    sign = 'positive'
 
                 elif k == self.reverse:
-                    self.negative[k] = self.negative[k] or other.negative[k]
-                    self.negative_sources[k] = (self.negative_sources[k]
-                                                | other.negative_sources[k])
+                    sign = 'negative'
+
+                else:
+                    continue
+
+                bit = self._sign_flags[sign]
+                self._set_flag(
+                    i + bit,
+                    self._flag(i + bit) or other._flag(j + bit),
+                )
+                self._merge_mask(
+                    other,
+                    self._sign_slots[sign][i],
+                    other._sign_slots[sign][j],
+                )
 
     def translate(self, ids):
         """
@@ -1484,6 +1782,13 @@ class PyPath(session_mod.Logger):
             self._undirected = self.graph
             self._directed = None
             self.failed_edges = []
+            # tracking the changes of the graph to keep the lookup
+            # structures (`nodDct`, `adjlist`, etc) up to date
+            self._graph_version = 0
+            self._graph_reset_version = 0
+            self._graph_appended = [0, 0]
+            self._index_keys = {}
+            self._labels_pending = set()
 
             # self.set_chembl_mysql(chembl_mysql[1], chembl_mysql[0])
             # self.mysql = mysql.MysqlRunner(self.mysql_conf)
@@ -1584,10 +1889,15 @@ class PyPath(session_mod.Logger):
             data for that resource and uses the cache file instead.
         :arg str pfile:
             Optional, ``False`` by default. If any, provides the file
-            name or path to a previously saved network pickle file.
+            name or path to a previously saved network pickle file
+            or snapshot directory.
             If ``True`` is passed, takes the default path from
             :py:meth:`PyPath.save_network`
-            (``'cache/default_network.pickle'``).
+            (``'cache/default_network.pickle'`` or
+            ``'cache/default_network.snapshot'``).
+            All attributes of a snapshot are loaded, as most methods
+            need them; to load only a subset, use
+            :py:meth:`load_network_snapshot` instead.
         :arg bool save:
             Optional, ``False`` by default. If set to ``True``, saves
             the loaded network to its default location
@@ -1608,12 +1918,18 @@ class PyPath(session_mod.Logger):
 
         if pfile:
             pfile = pfile if not isinstance(pfile, bool) \
-                else os.path.join(self.cache_dir, 'default_network.pickle')
+                else self._default_network_file()
+
+            if os.path.isdir(pfile):
+                self.load_network_snapshot(pfile)
+
+                return None
 
             if os.path.exists(pfile):
                 self._log(
                     'Loading igraph object from file `%s`...' % pfile
                 )
+                cache_mod.register_read(pfile)
                 graph = pickle.load(open(pfile, 'rb'))
 
                 if isinstance(graph, igraph.Graph) and graph.vcount() > 0:
@@ -1650,22 +1966,117 @@ class PyPath(session_mod.Logger):
                 (' ' * 90, pfile))
             sys.stdout.flush()
 
-    def save_network(self, pfile=None):
+    def save_network(self, pfile=None, snapshot=None):
         """Saves the network object.
 
-        Stores the instance into a pickle (binary) file which can be
-        reloaded in the future.
+        Stores the instance into a pickle (binary) file or a columnar
+        snapshot (:py:mod:`pypath.snapshot`) which can be reloaded in
+        the future.
 
         :arg str pfile:
             Optional, ``None`` by default. The path/file name where to
             store the pcikle file. If not specified, saves the network
             to its default location
-            (``'cache/default_network.pickle'``).
+            (``'cache/default_network.pickle'`` or
+            ``'cache/default_network.snapshot'``).
+        :arg bool snapshot:
+            Optional, ``None`` by default. Whether to save a snapshot
+            directory instead of a pickle. By default the setting
+            ``network_save_format`` decides.
         """
 
+        snapshot = self._save_snapshot(snapshot)
         pfile = pfile if pfile is not None \
-            else os.path.join(self.cache_dir, 'default_network.pickle')
-        pickle.dump(self.graph, open(pfile, 'wb'), -1)
+            else self._default_network_file(snapshot)
+
+        if snapshot:
+            snapshot_mod.NetworkSnapshot(pfile).save(self.graph)
+
+        else:
+            pickle.dump(self.graph, open(pfile, 'wb'), -1)
+
+    @staticmethod
+    def _save_snapshot(snapshot=None):
+
+        return (
+            snapshot
+                if isinstance(snapshot, bool) else
+            settings.get('network_save_format') == 'snapshot'
+        )
+
+    def _default_network_file(self, snapshot=None):
+
+        return os.path.join(
+            self.cache_dir,
+            'default_network.%s' % (
+                'snapshot' if self._save_snapshot(snapshot) else 'pickle'
+            ),
+        )
+
+    def load_network_snapshot(self, path, vertex_attrs=None,
+                              edge_attrs=None):
+        """
+        Loads the network from a snapshot saved by
+        :py:meth:`save_network`.
+
+        :arg str path:
+            Path to the snapshot directory.
+        The attributes loaded are decoded into Python objects entirely,
+        by default all of them. Loading only the ones needed saves time
+        and memory.
+
+        :arg list vertex_attrs:
+            Optional, ``None`` by default. The vertex attributes to load,
+            by default all. The ``name`` and ``label`` attributes are
+            always loaded. The rest can be loaded later by
+            :py:meth:`load_snapshot_attrs`.
+        :arg list edge_attrs:
+            Optional, ``None`` by default. The edge attributes to load,
+            by default all. The ``sources`` attribute is always loaded.
+        """
+
+        self._log('Loading network from snapshot `%s`...' % path)
+
+        self._snapshot = snapshot_mod.NetworkSnapshot(path)
+        self.graph = self._snapshot.load(
+            vertex_attrs = (
+                None
+                    if vertex_attrs is None else
+                set(vertex_attrs) | {'name', 'label'}
+            ),
+            edge_attrs = (
+                None
+                    if edge_attrs is None else
+                set(edge_attrs) | {'sources'}
+            ),
+        )
+        self._log(
+            'Network loaded from `%s`. %u nodes, %u edges.' % (
+                path,
+                self.graph.vcount(),
+                self.graph.ecount(),
+            )
+        )
+        self.update_vname()
+        self.update_vindex()
+        self.update_sources()
+
+    def load_snapshot_attrs(self, vertex_attrs=(), edge_attrs=()):
+        """
+        Loads further attributes from the snapshot the network has been
+        loaded from by :py:meth:`load_network_snapshot`.
+
+        :arg list vertex_attrs:
+            Optional, the vertex attributes to load.
+        :arg list edge_attrs:
+            Optional, the edge attributes to load.
+        """
+
+        self._snapshot.load(
+            graph = self.graph,
+            vertex_attrs = vertex_attrs,
+            edge_attrs = edge_attrs,
+        )
 
     ###
     # functions to read networks from text files or mysql
@@ -1852,6 +2263,9 @@ class PyPath(session_mod.Logger):
         toDel = [i for i in xrange(0, gg.vcount()) if not in_giant[i]]
         gg.delete_vertices(toDel)
 
+        if replace:
+            self._graph_changed(graph = gg)
+
         common.console(':: Giant component size: %u edges, %u nodes' %
                        (gg.ecount(), gg.vcount()))
 
@@ -1859,39 +2273,97 @@ class PyPath(session_mod.Logger):
             return gg
 
 
-    def update_vname(self):
+    def update_vname(self, force = False):
         """
         Fast lookup of node names and indexes, these are hold in a
         [list] and a [dict] as well. However, every time new nodes are
         added, these should be updated. This function is automatically
         called after all operations affecting node indices.
-        """
 
-        self._log('Updating network component lookup dictionaries.')
+        The lookups are rebuilt only if the graph has been changed
+        since they have been created. If nodes have been only added by
+        :py:meth:`new_nodes` they are extended by the new nodes.
+
+        :arg bool force:
+            Optional, ``False`` by default. Rebuild the lookups even if
+            the graph seems to be unchanged, e.g. after the vertex names
+            have been changed directly in the ``igraph.Graph`` object.
+        """
 
-        self.genesymbol_labels()
         graph = self._get_undirected()
         self._already_has_directed()
         dgraph = self._directed
 
         if graph is not None:
-            self.nodInd = set(graph.vs['name'])
-            self.nodDct = dict(zip(graph.vs['name'], xrange(graph.vcount())))
-            self.labDct = dict(zip(graph.vs['label'], xrange(graph.vcount())))
-            self.nodNam = dict(zip(xrange(graph.vcount()), graph.vs['name']))
-            self.nodLab = dict(zip(xrange(graph.vcount()), graph.vs['label']))
+            self._update_vname(graph, 'vname', '', force = force)
 
         if dgraph is not None:
-            self.dnodInd = set(dgraph.vs['name'])
-            self.dnodDct = dict(
-                zip(dgraph.vs['name'], xrange(dgraph.vcount())))
-            self.dlabDct = dict(
-                zip(dgraph.vs['label'], xrange(dgraph.vcount())))
-            self.dnodNam = dict(
-                zip(xrange(dgraph.vcount()), dgraph.vs['name']))
-            self.dnodLab = dict(
-                zip(xrange(dgraph.vcount()), dgraph.vs['label']))
+            self._update_vname(dgraph, 'dvname', 'd', force = force)
+
+    def _update_vname(self, graph, index, prefix, force = False):
+        """
+        Updates the lookup dictionaries of one graph. The dictionaries
+        are stored in attributes with names starting with *prefix*.
+        """
+
+        attrs = ('nodInd', 'nodDct', 'labDct', 'nodNam', 'nodLab')
+        force = force or not hasattr(self, '%snodLab' % prefix)
+        update = self._index_update(index, graph, force = force)
+        pending = self._labels_pending if graph is self.graph else set()
+
+        if update is None and not pending:
+            return
+
+        self._log('Updating network component lookup dictionaries.')
+
+        vcount = graph.vcount()
+        first = vcount if update is None else update[0]
+
+        if first == 0:
 
+            self.genesymbol_labels(graph = graph)
+            nodInd, nodDct, labDct, nodNam, nodLab = (
+                set(), {}, {}, {}, {}
+            )
+            vids = list(xrange(vcount))
+
+        else:
+
+            nodInd, nodDct, labDct, nodNam, nodLab = (
+                getattr(self, '%s%s' % (prefix, attr)) for attr in attrs
+            )
+            vids = sorted(
+                set(xrange(first, vcount)) |
+                set(vid for vid in pending if vid < first)
+            )
+            self.genesymbol_labels(graph = graph, vids = vids)
+
+        vs = graph.vs if first == 0 else graph.vs.select(vids)
+
+        for vid, name, label in zip(vids, vs['name'], vs['label']):
+
+            if vid in nodLab and labDct.get(nodLab[vid]) == vid:
+
+                del labDct[nodLab[vid]]
+
+            nodInd.add(name)
+            nodDct[name] = vid
+            labDct[label] = vid
+            nodNam[vid] = name
+            nodLab[vid] = label
+
+        for attr, value in zip(
+            attrs,
+            (nodInd, nodDct, labDct, nodNam, nodLab),
+        ):
+
+            setattr(self, '%s%s' % (prefix, attr), value)
+
+        if graph is self.graph:
+
+            self._labels_pending = set()
+
+        self._index_built(index, graph)
 
     def vsgs(self):
         """
@@ -2051,6 +2523,7 @@ class PyPath(session_mod.Logger):
             'Reading edge list pickle dump from cache: %s\n' % cache_file
         )
 
+        cache_mod.register_read(cache_file)
         data = pickle.load(open(cache_file, 'rb'))
 
         self._log('Data have been read from cache: `%s`' % cache_file)
@@ -2131,24 +2604,730 @@ class PyPath(session_mod.Logger):
             return len(this_directed & dir_val) > 0
 
 
-    def read_data_file(
-            self,
-            param,
-            keep_raw = False,
-            cache_files = {},
-            reread = None,
-            redownload = False,
-        ):
+    def _read_settings_columns(self, param):
         """
-        Reads interaction data file containing node and edge attributes
-        that can be read from simple text based files and adds it to the
-        networkdata. This function works not only with files, but with
-        lists as well. Any other function can be written to download and
-        preprocess data, and then give it to this function to finally
-        attach to the network.
+        Processes the column definitions of a
+        :py:class:`pypath.input_formats.ReadSettings` instance, used when
+        reading an input file.
 
         :arg pypath.input_formats.ReadSettings param:
-            :py:class:`pypath.input_formats.ReadSettings` instance
+            The input definition.
+
+        :return:
+            (*tuple*) -- The column and separator of the references,
+            the column of the sign, the column, values and separator
+            of the direction and the largest referred column number.
+        """
+
+        # finding the largest referred column number,
+        # to avoid references out of range
+        is_directed = param.is_directed
+        sign = param.sign
+        refCol = param.refs[0] if isinstance(param.refs, tuple) \
+            else param.refs if isinstance(param.refs, int) else None
+        refSep = param.refs[1] if isinstance(param.refs,
+                                                tuple) else ';'
+        sigCol = None if not isinstance(sign, tuple) else sign[0]
+        dir_col = None
+        dir_val = None
+        dir_sep = None
+
+        if isinstance(is_directed, tuple):
+
+            dir_col = is_directed[0]
+            dir_val = is_directed[1]
+            dir_sep = is_directed[2] if len(is_directed) > 2 else None
+
+        elif isinstance(sign, tuple):
+
+            dir_col = sign[0]
+            dir_val = sign[1:3]
+            dir_val = dir_val if type(dir_val[
+                0]) in common.simpleTypes else common.flatList(dir_val)
+            dir_sep = sign[3] if len(sign) > 3 else None
+
+        dir_val = set(dir_val if isinstance(dir_val, list) else [dir_val])
+        max_col = max(
+            filter(
+                lambda i: i is not None, [
+                    param.id_col_a,
+                    param.id_col_b,
+                    self.get_max(param.extra_edge_attrs),
+                    self.get_max(param.extra_node_attrs_a),
+                    self.get_max(param.extra_node_attrs_b),
+                    refCol,
+                    dir_col,
+                    sigCol,
+                    max(itertools.chain(
+                        map(lambda x: x[0],
+                            param.positive_filters),
+                        [0])),
+                    max(itertools.chain(
+                        map(lambda x: x[0],
+                            param.negative_filters),
+                        [0]))
+                ]))
+
+        return refCol, refSep, sigCol, dir_col, dir_val, dir_sep, max_col
+
+    def _read_data_lines(self, param, infile):
+        """
+        Reads the edge records from the input of
+        :py:meth:`pypath.main.PyPath.read_data_file` line by line.
+
+        :arg pypath.input_formats.ReadSettings param:
+            The input definition.
+        :arg list infile:
+            Any iterable of lines (strings) or records (lists).
+
+        :return:
+            (*tuple*) -- The list of edge records (dicts), the number of
+            the last line read, and the number of lines filtered by
+            filters, because of lack of references and by taxon filters.
+        """
+
+        (
+            refCol,
+            refSep,
+            sigCol,
+            dir_col,
+            dir_val,
+            dir_sep,
+            max_col,
+        ) = self._read_settings_columns(param)
+        is_directed = param.is_directed
+        sign = param.sign
+        edge_list = []
+
+        # iterating lines from input file
+        lFiltered = 0
+        rFiltered = 0
+        tFiltered = 0
+        readError = 0
+        lnum = 0 # we need to define it here to avoid errors if the
+                 # loop below runs zero cycles
+
+        for lnum, line in enumerate(infile):
+
+            if len(line) <= 1 or (lnum == 1 and param.header):
+                # empty lines
+                # or header row
+                continue
+
+            if not isinstance(line, (list, tuple)):
+
+                if hasattr(line, 'decode'):
+                    line = line.decode('utf-8')
+
+                line = line.strip('\n\r').split(param.separator)
+
+            else:
+                line = [
+                    x.replace('\n', '').replace('\r', '')
+                    if hasattr(x, 'replace') else x for x in line
+                ]
+
+            # in case line has less fields than needed
+            if len(line) < max_col:
+
+                self._log(
+                    'Line #%u has less than %u fields,'
+                    ' skipping! :(\n' % (lnum, max_col),
+                    5,
+                )
+
+                readError = 1
+                continue
+
+            else:
+
+                # applying filters:
+                if self.filters(line, param.positive_filters,
+                                param.negative_filters):
+                    lFiltered += 1
+                    continue
+
+                # reading names and attributes:
+                if is_directed and not isinstance(is_directed, tuple):
+                    this_edge_dir = True
+
+                else:
+                    this_edge_dir = self.process_direction(
+                        line,
+                        dir_col,
+                        dir_val,
+                        dir_sep,
+                    )
+
+                refs = []
+                if refCol is not None:
+
+                    if not isinstance(line[refCol], (list, set, tuple)):
+
+                        refs = line[refCol].split(refSep)
+
+                    else:
+
+                        refs = line[refCol]
+
+                    refs = common.delEmpty(list(set(refs)))
+
+                refs = dataio.only_pmids([r.strip() for r in refs])
+
+                if len(refs) == 0 and param.must_have_references:
+                    rFiltered += 1
+                    continue
+
+                # to give an easy way:
+                if isinstance(param.ncbi_tax_id, int):
+                    taxon_a = param.ncbi_tax_id
+                    taxon_b = param.ncbi_tax_id
+
+                # to enable more sophisticated inputs:
+                elif isinstance(param.ncbi_tax_id, dict):
+
+                    taxx = self.get_taxon(param.ncbi_tax_id, line)
+
+                    if isinstance(taxx, tuple):
+                        taxon_a = taxx[0]
+                        taxon_b = taxx[1]
+
+                    else:
+                        taxon_a = taxon_b = taxx
+
+                    taxdA = (
+                        param.ncbi_tax_id['A']
+                        if 'A' in param.ncbi_tax_id else
+                        param.ncbi_tax_id)
+                    taxdB = (
+                        param.ncbi_tax_id['B']
+                        if 'B' in param.ncbi_tax_id else
+                        param.ncbi_tax_id)
+
+                    if (('include' in taxdA and
+                        taxon_a not in taxdA['include']) or
+                        ('include' in taxdB and
+                        taxon_b not in taxdB['include']) or
+                        ('exclude' in taxdA and
+                        taxon_a in taxdA['exclude']) or
+                        ('exclude' in taxdB and
+                        taxon_b in taxdB['exclude'])):
+
+                        tFiltered += 1
+                        continue
+
+                else:
+                    taxon_a = taxon_b = self.ncbi_tax_id
+
+                if taxon_a is None or taxon_b is None:
+                    tFiltered += 1
+                    continue
+
+                stim = False
+                inh = False
+
+                if isinstance(sign, tuple):
+                    stim, inh = self.process_sign(line[sign[0]], sign)
+
+                resource = (
+                    [line[param.resource]]
+                    if type(param.resource) is int else
+                    line[param.resource[0]].split(param.resource[1])
+                    if type(param.resource) is tuple else
+                    [param.resource]
+                )
+
+                id_a = line[param.id_col_a]
+                id_b = line[param.id_col_b]
+                id_a = id_a.strip() if hasattr(id_a, 'strip') else id_a
+                id_b = id_b.strip() if hasattr(id_b, 'strip') else id_b
+
+                new_edge = {
+                    'id_a': id_a,
+                    'id_b': id_b,
+                    'id_type_a': param.id_type_a,
+                    'id_type_b': param.id_type_b,
+                    'entity_type_a': param.entity_type_a,
+                    'entity_type_b': param.entity_type_b,
+                    'source': resource,
+                    'is_directed': this_edge_dir,
+                    'references': refs,
+                    'stim': stim,
+                    'inh': inh,
+                    'taxon_a': taxon_a,
+                    'taxon_b': taxon_b,
+                    'type': param.interaction_type,
+                }
+
+                # getting additional edge and node attributes
+                attrs_edge = self.get_attrs(
+                    line,
+                    param.extra_edge_attrs,
+                    lnum,
+                )
+                attrs_node_a = self.get_attrs(
+                    line,
+                    param.extra_node_attrs_a,
+                    lnum,
+                )
+                attrs_node_b = self.get_attrs(
+                    line,
+                    param.extra_node_attrs_b,
+                    lnum,
+                )
+
+                if param.mark_source:
+
+                    attrs_node_a[param.mark_source] = this_edge_dir
+
+                if param.mark_target:
+
+                    attrs_node_b[param.mark_target] = this_edge_dir
+
+                # merging dictionaries
+                node_attrs = {
+                    'attrs_node_a': attrs_node_a,
+                    'attrs_node_b': attrs_node_b,
+                    'attrs_edge': attrs_edge,
+                }
+                new_edge.update(node_attrs)
+
+            if readError != 0:
+
+                self._log(
+                    'Errors occured, certain lines skipped.'
+                    'Trying to read the remaining.\n',
+                    5,
+                )
+                readError = 1
+
+            edge_list.append(new_edge)
+
+        return edge_list, lnum, lFiltered, rFiltered, tFiltered
+
+    def _read_data_columns(self, param, infile):
+        """
+        Column oriented alternative of
+        :py:meth:`pypath.main.PyPath._read_data_lines`. Loads the input
+        into a :py:class:`pandas.DataFrame` and applies the filters, the
+        direction, sign, reference and taxon rules as operations on
+        whole columns. Returns the same edge records in the same order.
+        Selected by the ``network_column_reader`` setting.
+
+        :arg pypath.input_formats.ReadSettings param:
+            The input definition.
+        :arg list infile:
+            Any iterable of lines (strings) or records (lists).
+
+        :return:
+            (*tuple*) -- The list of edge records (dicts), the number of
+            the last line read, and the number of lines filtered by
+            filters, because of lack of references and by taxon filters.
+        """
+
+        def str_op(column, op):
+            # applies a string method on the string values of a column,
+            # other values are left untouched
+
+            try:
+
+                result = op(column.str)
+
+            except AttributeError:
+
+                return column
+
+            return result.where(result.notnull(), column)
+
+        def any_in(column, values, split = False, sep = None, to_str = False):
+            # whether the field, or any element of the split field
+            # is in `values`
+
+            values = set(values if isinstance(values, list) else [values])
+
+            if to_str:
+
+                column = column.astype(str)
+
+            if not split:
+
+                return column.isin(values)
+
+            return (
+                column.str.split(sep).explode().isin(values).
+                groupby(level = 0).any().
+                reindex(column.index, fill_value = False)
+            )
+
+        def taxon_column(tax_dict):
+
+            if 'dict' not in tax_dict:
+
+                return data[tax_dict['col']].map(int)
+
+            return pandas.Series(
+                [tax_dict['dict'].get(v) for v in data[tax_dict['col']]],
+                index = data.index,
+                dtype = object,
+            )
+
+        def attrs_column(spec):
+
+            names = list(spec.keys())
+            columns = []
+
+            for name in names:
+
+                if isinstance(spec[name], tuple):
+
+                    column = data[spec[name][0]]
+                    column = (
+                        column.map(spec[name][1])
+                            if hasattr(spec[name][1], '__call__') else
+                        column.str.split(spec[name][1])
+                    )
+
+                else:
+
+                    column = data[spec[name]]
+
+                columns.append(column.tolist())
+
+            return [dict(zip(names, values)) for values in zip(*columns)]
+
+        (
+            refCol,
+            refSep,
+            sigCol,
+            dir_col,
+            dir_val,
+            dir_sep,
+            max_col,
+        ) = self._read_settings_columns(param)
+        is_directed = param.is_directed
+        sign = param.sign
+        lFiltered = 0
+        rFiltered = 0
+        tFiltered = 0
+
+        rows = list(infile)
+        lnum = max(len(rows) - 1, 0)
+
+        if not rows:
+
+            return [], lnum, lFiltered, rFiltered, tFiltered
+
+        if isinstance(rows[0], (list, tuple)):
+
+            n_fields = pandas.Series([len(row) for row in rows])
+            empty = n_fields <= 1
+            data = pandas.DataFrame(rows, dtype = object)
+
+            for col in data.columns:
+
+                data[col] = str_op(
+                    data[col],
+                    lambda c: c.replace('\n', '', regex = False).
+                        replace('\r', '', regex = False),
+                )
+
+        else:
+
+            lines = pandas.Series(rows, dtype = object)
+            lines = str_op(lines, lambda c: c.decode('utf-8'))
+            empty = lines.str.len() <= 1
+            data = lines.str.strip('\n\r').str.split(
+                param.separator,
+                expand = True,
+                regex = False,
+            )
+            n_fields = data.notnull().sum(axis = 1)
+
+        # empty lines or header row, just like in `_read_data_lines`
+        keep = ~empty
+
+        if param.header and len(rows) > 1:
+
+            keep.iloc[1] = False
+
+        short = keep & (n_fields < max_col)
+
+        if short.any():
+
+            self._log(
+                '%u lines have less than %u fields, skipping them.' % (
+                    short.sum(),
+                    max_col,
+                ),
+                5,
+            )
+
+        data = data[keep & ~short]
+
+        if not len(data):
+
+            return [], lnum, lFiltered, rFiltered, tFiltered
+
+        # applying filters
+        filtered = pandas.Series(False, index = data.index)
+
+        for filtr in param.negative_filters:
+
+            filtered |= any_in(
+                data[filtr[0]],
+                filtr[1],
+                split = len(filtr) > 2,
+                sep = filtr[2] if len(filtr) > 2 else None,
+            )
+
+        for filtr in param.positive_filters:
+
+            filtered |= ~any_in(
+                data[filtr[0]],
+                filtr[1],
+                split = len(filtr) > 2,
+                sep = filtr[2] if len(filtr) > 2 else None,
+            )
+
+        lFiltered = int(filtered.sum())
+        data = data[~filtered]
+
+        # references
+        if refCol is not None:
+
+            ref_fields = data[refCol]
+            listlike = ref_fields.map(type).isin({list, set, tuple})
+
+            if not listlike.all():
+
+                ref_fields = ref_fields.where(
+                    listlike,
+                    str_op(ref_fields, lambda c: c.split(refSep)),
+                )
+
+            refs = ref_fields.explode().dropna().astype(object)
+            refs = refs[refs.str.len() > 0].str.strip()
+            translate = refs.str.startswith('PMC') | refs.str.contains(
+                '/',
+                regex = False,
+            )
+            to_translate = set(refs.index[translate])
+            refs = refs[refs.str.isdigit()]
+            refs = (
+                refs.to_frame('ref').reset_index().drop_duplicates().
+                groupby('index')['ref'].agg(list)
+            )
+            refs = refs.reindex(data.index).tolist()
+            refs = [r if isinstance(r, list) else [] for r in refs]
+
+            # DOIs and PMC IDs are translated record by record
+            for i, idx in enumerate(data.index):
+
+                if idx in to_translate:
+
+                    refs[i] = dataio.only_pmids([
+                        r.strip()
+                        for r in common.delEmpty(
+                            list(set(ref_fields[idx]))
+                        )
+                    ])
+
+        else:
+
+            refs = [[] for _ in xrange(len(data))]
+
+        refs = pandas.Series(refs, index = data.index, dtype = object)
+
+        if param.must_have_references:
+
+            no_refs = refs.map(len) == 0
+            rFiltered = int(no_refs.sum())
+            data = data[~no_refs]
+            refs = refs[~no_refs]
+
+        # taxon filters
+        if isinstance(param.ncbi_tax_id, int):
+
+            taxon_a = taxon_b = pandas.Series(
+                param.ncbi_tax_id,
+                index = data.index,
+            )
+
+        elif isinstance(param.ncbi_tax_id, dict):
+
+            tax = param.ncbi_tax_id
+            both = 'A' in tax and 'B' in tax
+            taxon_a = taxon_column(tax['A'] if both else tax)
+            taxon_b = taxon_column(tax['B']) if both else taxon_a
+            excluded = pandas.Series(False, index = data.index)
+
+            for taxd, taxon in (
+                (tax['A'] if 'A' in tax else tax, taxon_a),
+                (tax['B'] if 'B' in tax else tax, taxon_b),
+            ):
+
+                if 'include' in taxd:
+
+                    excluded |= ~taxon.isin(taxd['include'])
+
+                if 'exclude' in taxd:
+
+                    excluded |= taxon.isin(taxd['exclude'])
+
+            excluded |= taxon_a.isnull() | taxon_b.isnull()
+            tFiltered = int(excluded.sum())
+            data = data[~excluded]
+            refs = refs[~excluded]
+            taxon_a = taxon_a[~excluded]
+            taxon_b = taxon_b[~excluded]
+
+        else:
+
+            taxon_a = taxon_b = pandas.Series(
+                self.ncbi_tax_id,
+                index = data.index,
+            )
+
+        # directions
+        if is_directed and not isinstance(is_directed, tuple):
+
+            directed = pandas.Series(True, index = data.index)
+
+        elif dir_col is None:
+
+            directed = pandas.Series(False, index = data.index)
+
+        else:
+
+            directed = any_in(
+                data[dir_col],
+                list(dir_val),
+                split = True,
+                sep = dir_sep,
+            )
+
+        # signs
+        if isinstance(sign, tuple):
+
+            sign_sep = sign[3] if len(sign) > 3 else None
+            stim = any_in(
+                data[sign[0]],
+                sign[1],
+                split = True,
+                sep = sign_sep,
+                to_str = True,
+            )
+            inh = any_in(
+                data[sign[0]],
+                sign[2],
+                split = True,
+                sep = sign_sep,
+                to_str = True,
+            ) & ~stim
+
+        else:
+
+            stim = inh = pandas.Series(False, index = data.index)
+
+        # resources
+        if type(param.resource) is int:
+
+            resources = data[param.resource].map(lambda r: [r]).tolist()
+
+        elif type(param.resource) is tuple:
+
+            resources = (
+                data[param.resource[0]].str.split(param.resource[1]).tolist()
+            )
+
+        else:
+
+            resources = [[param.resource] for _ in xrange(len(data))]
+
+        attrs_edge = attrs_column(param.extra_edge_attrs)
+        attrs_node_a = attrs_column(param.extra_node_attrs_a)
+        attrs_node_b = attrs_column(param.extra_node_attrs_b)
+
+        if not param.extra_edge_attrs:
+
+            attrs_edge = [{} for _ in xrange(len(data))]
+
+        if not param.extra_node_attrs_a:
+
+            attrs_node_a = [{} for _ in xrange(len(data))]
+
+        if not param.extra_node_attrs_b:
+
+            attrs_node_b = [{} for _ in xrange(len(data))]
+
+        edge_list = []
+
+        for (
+            id_a, id_b, resource, this_edge_dir, references, _stim, _inh,
+            _taxon_a, _taxon_b, _attrs_edge, _attrs_node_a, _attrs_node_b,
+        ) in zip(
+            str_op(data[param.id_col_a], lambda c: c.strip()).tolist(),
+            str_op(data[param.id_col_b], lambda c: c.strip()).tolist(),
+            resources,
+            directed.tolist(),
+            refs.tolist(),
+            stim.tolist(),
+            inh.tolist(),
+            taxon_a.tolist(),
+            taxon_b.tolist(),
+            attrs_edge,
+            attrs_node_a,
+            attrs_node_b,
+        ):
+
+            if param.mark_source:
+
+                _attrs_node_a[param.mark_source] = this_edge_dir
+
+            if param.mark_target:
+
+                _attrs_node_b[param.mark_target] = this_edge_dir
+
+            edge_list.append({
+                'id_a': id_a,
+                'id_b': id_b,
+                'id_type_a': param.id_type_a,
+                'id_type_b': param.id_type_b,
+                'entity_type_a': param.entity_type_a,
+                'entity_type_b': param.entity_type_b,
+                'source': resource,
+                'is_directed': this_edge_dir,
+                'references': references,
+                'stim': _stim,
+                'inh': _inh,
+                'taxon_a': _taxon_a,
+                'taxon_b': _taxon_b,
+                'type': param.interaction_type,
+                'attrs_node_a': _attrs_node_a,
+                'attrs_node_b': _attrs_node_b,
+                'attrs_edge': _attrs_edge,
+            })
+
+        return edge_list, lnum, lFiltered, rFiltered, tFiltered
+
+    def read_data_file(
+            self,
+            param,
+            keep_raw = False,
+            cache_files = {},
+            reread = None,
+            redownload = False,
+        ):
+        """
+        Reads interaction data file containing node and edge attributes
+        that can be read from simple text based files and adds it to the
+        networkdata. This function works not only with files, but with
+        lists as well. Any other function can be written to download and
+        preprocess data, and then give it to this function to finally
+        attach to the network.
+
+        :arg pypath.input_formats.ReadSettings param:
+            :py:class:`pypath.input_formats.ReadSettings` instance
             containing the detailed definition of the input format of
             the file. Instead of the file name (on the
             :py:attr:`pypath.input_formats.ReadSettings.input`
@@ -2349,257 +3528,18 @@ class PyPath(session_mod.Logger):
                     )
                     return None
 
-            # finding the largest referred column number,
-            # to avoid references out of range
-            is_directed = param.is_directed
-            sign = param.sign
-            refCol = param.refs[0] if isinstance(param.refs, tuple) \
-                else param.refs if isinstance(param.refs, int) else None
-            refSep = param.refs[1] if isinstance(param.refs,
-                                                    tuple) else ';'
-            sigCol = None if not isinstance(sign, tuple) else sign[0]
-            dir_col = None
-            dir_val = None
-            dir_sep = None
-
-            if isinstance(is_directed, tuple):
-
-                dir_col = is_directed[0]
-                dir_val = is_directed[1]
-                dir_sep = is_directed[2] if len(is_directed) > 2 else None
-
-            elif isinstance(sign, tuple):
-
-                dir_col = sign[0]
-                dir_val = sign[1:3]
-                dir_val = dir_val if type(dir_val[
-                    0]) in common.simpleTypes else common.flatList(dir_val)
-                dir_sep = sign[3] if len(sign) > 3 else None
-
-            dir_val = set(dir_val if isinstance(dir_val, list) else [dir_val])
-            max_col = max(
-                filter(
-                    lambda i: i is not None, [
-                        param.id_col_a,
-                        param.id_col_b,
-                        self.get_max(param.extra_edge_attrs),
-                        self.get_max(param.extra_node_attrs_a),
-                        self.get_max(param.extra_node_attrs_b),
-                        refCol,
-                        dir_col,
-                        sigCol,
-                        max(itertools.chain(
-                            map(lambda x: x[0],
-                                param.positive_filters),
-                            [0])),
-                        max(itertools.chain(
-                            map(lambda x: x[0],
-                                param.negative_filters),
-                            [0]))
-                    ]))
-            # iterating lines from input file
-            lFiltered = 0
-            rFiltered = 0
-            tFiltered = 0
-            readError = 0
-            lnum = 0 # we need to define it here to avoid errors if the
-                     # loop below runs zero cycles
-
-            for lnum, line in enumerate(infile):
-
-                if len(line) <= 1 or (lnum == 1 and param.header):
-                    # empty lines
-                    # or header row
-                    continue
-
-                if not isinstance(line, (list, tuple)):
-
-                    if hasattr(line, 'decode'):
-                        line = line.decode('utf-8')
-
-                    line = line.strip('\n\r').split(param.separator)
-
-                else:
-                    line = [
-                        x.replace('\n', '').replace('\r', '')
-                        if hasattr(x, 'replace') else x for x in line
-                    ]
-
-                # in case line has less fields than needed
-                if len(line) < max_col:
-
-                    self._log(
-                        'Line #%u has less than %u fields,'
-                        ' skipping! :(\n' % (lnum, max_col),
-                        5,
-                    )
-
-                    readError = 1
-                    continue
-
-                else:
-
-                    # applying filters:
-                    if self.filters(line, param.positive_filters,
-                                    param.negative_filters):
-                        lFiltered += 1
-                        continue
-
-                    # reading names and attributes:
-                    if is_directed and not isinstance(is_directed, tuple):
-                        this_edge_dir = True
-
-                    else:
-                        this_edge_dir = self.process_direction(
-                            line,
-                            dir_col,
-                            dir_val,
-                            dir_sep,
-                        )
-
-                    refs = []
-                    if refCol is not None:
-
-                        if not isinstance(line[refCol], (list, set, tuple)):
-
-                            refs = line[refCol].split(refSep)
-
-                        else:
-
-                            refs = line[refCol]
-
-                        refs = common.delEmpty(list(set(refs)))
-
-                    refs = dataio.only_pmids([r.strip() for r in refs])
-
-                    if len(refs) == 0 and param.must_have_references:
-                        rFiltered += 1
-                        continue
-
-                    # to give an easy way:
-                    if isinstance(param.ncbi_tax_id, int):
-                        taxon_a = param.ncbi_tax_id
-                        taxon_b = param.ncbi_tax_id
-
-                    # to enable more sophisticated inputs:
-                    elif isinstance(param.ncbi_tax_id, dict):
-
-                        taxx = self.get_taxon(param.ncbi_tax_id, line)
-
-                        if isinstance(taxx, tuple):
-                            taxon_a = taxx[0]
-                            taxon_b = taxx[1]
-
-                        else:
-                            taxon_a = taxon_b = taxx
-
-                        taxdA = (
-                            param.ncbi_tax_id['A']
-                            if 'A' in param.ncbi_tax_id else
-                            param.ncbi_tax_id)
-                        taxdB = (
-                            param.ncbi_tax_id['B']
-                            if 'B' in param.ncbi_tax_id else
-                            param.ncbi_tax_id)
-
-                        if (('include' in taxdA and
-                            taxon_a not in taxdA['include']) or
-                            ('include' in taxdB and
-                            taxon_b not in taxdB['include']) or
-                            ('exclude' in taxdA and
-                            taxon_a in taxdA['exclude']) or
-                            ('exclude' in taxdB and
-                            taxon_b in taxdB['exclude'])):
-
-                            tFiltered += 1
-                            continue
-
-                    else:
-                        taxon_a = taxon_b = self.ncbi_tax_id
-
-                    if taxon_a is None or taxon_b is None:
-                        tFiltered += 1
-                        continue
-
-                    stim = False
-                    inh = False
-
-                    if isinstance(sign, tuple):
-                        stim, inh = self.process_sign(line[sign[0]], sign)
-
-                    resource = (
-                        [line[param.resource]]
-                        if type(param.resource) is int else
-                        line[param.resource[0]].split(param.resource[1])
-                        if type(param.resource) is tuple else
-                        [param.resource]
-                    )
-
-                    id_a = line[param.id_col_a]
-                    id_b = line[param.id_col_b]
-                    id_a = id_a.strip() if hasattr(id_a, 'strip') else id_a
-                    id_b = id_b.strip() if hasattr(id_b, 'strip') else id_b
-
-                    new_edge = {
-                        'id_a': id_a,
-                        'id_b': id_b,
-                        'id_type_a': param.id_type_a,
-                        'id_type_b': param.id_type_b,
-                        'entity_type_a': param.entity_type_a,
-                        'entity_type_b': param.entity_type_b,
-                        'source': resource,
-                        'is_directed': this_edge_dir,
-                        'references': refs,
-                        'stim': stim,
-                        'inh': inh,
-                        'taxon_a': taxon_a,
-                        'taxon_b': taxon_b,
-                        'type': param.interaction_type,
-                    }
-
-                    # getting additional edge and node attributes
-                    attrs_edge = self.get_attrs(
-                        line,
-                        param.extra_edge_attrs,
-                        lnum,
-                    )
-                    attrs_node_a = self.get_attrs(
-                        line,
-                        param.extra_node_attrs_a,
-                        lnum,
-                    )
-                    attrs_node_b = self.get_attrs(
-                        line,
-                        param.extra_node_attrs_b,
-                        lnum,
-                    )
-
-                    if param.mark_source:
-
-                        attrs_node_a[param.mark_source] = this_edge_dir
-
-                    if param.mark_target:
-
-                        attrs_node_b[param.mark_target] = this_edge_dir
-
-                    # merging dictionaries
-                    node_attrs = {
-                        'attrs_node_a': attrs_node_a,
-                        'attrs_node_b': attrs_node_b,
-                        'attrs_edge': attrs_edge,
-                    }
-                    new_edge.update(node_attrs)
-
-                if readError != 0:
-
-                    self._log(
-                        'Errors occured, certain lines skipped.'
-                        'Trying to read the remaining.\n',
-                        5,
-                    )
-                    readError = 1
-
-                edge_list.append(new_edge)
+            reader = (
+                self._read_data_columns
+                    if (
+                        settings.get('network_column_reader') and
+                        'pandas' in globals()
+                    ) else
+                self._read_data_lines
+            )
+            edge_list, lnum, lFiltered, rFiltered, tFiltered = reader(
+                param,
+                infile,
+            )
 
             if hasattr(infile, 'close'):
 
@@ -2628,7 +3568,10 @@ class PyPath(session_mod.Logger):
             )
 
             if reread or redownload:
-                pickle.dump(edge_list_mapped, open(edges_cache, 'wb'), -1)
+                with cache_mod.atomic_write(edges_cache) as fp:
+
+                    pickle.dump(edge_list_mapped, fp, -1)
+
                 self._log('ID translated edge list saved to %s' % edges_cache)
 
         else:
@@ -2965,24 +3908,108 @@ class PyPath(session_mod.Logger):
 
         if single_list:
 
+            names_mapped = self._map_names_bulk(
+                (
+                    (
+                        item['name'],
+                        item['id_type'],
+                        self.default_name_type[item['type']],
+                        None,
+                    )
+                    for item in lst
+                ),
+                expand_complexes = expand_complexes,
+            )
+
             for item in lst:
                 list_mapped += self.map_item(
                     item,
                     expand_complexes = expand_complexes,
+                    names_mapped = names_mapped,
                 )
 
         else:
 
+            names_mapped = self._map_names_bulk(
+                itertools.chain(*(
+                    (
+                        (
+                            edge['id_a'],
+                            edge['id_type_a'],
+                            self.default_name_type[edge['entity_type_a']],
+                            edge['taxon_a'],
+                        ),
+                        (
+                            edge['id_b'],
+                            edge['id_type_b'],
+                            self.default_name_type[edge['entity_type_b']],
+                            edge['taxon_b'],
+                        ),
+                    )
+                    for edge in lst
+                )),
+                expand_complexes = expand_complexes,
+            )
+
             for edge in lst:
                 list_mapped += self.map_edge(
                     edge,
                     expand_complexes = expand_complexes,
+                    names_mapped = names_mapped,
                 )
 
         return list_mapped
 
 
-    def map_item(self, item, expand_complexes = True):
+    @staticmethod
+    def _map_names_bulk(names, expand_complexes = True):
+        """
+        Translates many names by
+        :py:func:`pypath.mapping.map_names_bulk`, grouped by their ID
+        type, target ID type and organism.
+
+        :arg iterable names:
+            Tuples of name, ID type, target ID type and NCBI Taxonomy
+            ID.
+        :arg bool expand_complexes:
+            Expand complexes, i.e. translate them to the set of their
+            components.
+
+        :return:
+            (*dict*) -- The tuples in *names* as keys and the sets of
+            translated names as values.
+        """
+
+        by_type = collections.defaultdict(set)
+
+        for name, id_type, target_id_type, ncbi_tax_id in names:
+
+            by_type[(id_type, target_id_type, ncbi_tax_id)].add(name)
+
+        names_mapped = {}
+
+        for (id_type, target_id_type, ncbi_tax_id), _names in (
+            iteritems(by_type)
+        ):
+
+            for name, mapped in iteritems(
+                mapping.map_names_bulk(
+                    _names,
+                    id_type,
+                    target_id_type,
+                    ncbi_tax_id = ncbi_tax_id,
+                    expand_complexes = expand_complexes,
+                )
+            ):
+
+                names_mapped[
+                    (name, id_type, target_id_type, ncbi_tax_id)
+                ] = mapped
+
+        return names_mapped
+
+
+    def map_item(self, item, expand_complexes = True, names_mapped = None):
         """
         Translates the name in *item* representing a molecule. Default
         name types are defined in
@@ -2995,16 +4022,30 @@ class PyPath(session_mod.Logger):
         :arg bool expand_complexes:
             Expand complexes, i.e. create links between each member of
             the complex and the interacting partner.
+        :arg dict names_mapped:
+            Optional, names translated in advance by
+            :py:meth:`pypath.main.PyPath._map_names_bulk`.
 
         :return:
             (*list*) -- The default mapped name(s) [str] of *item*.
         """
 
-        # TODO: include
-        default_id = mapping.map_name(
-            item['name'], item['id_type'],
+        key = (
+            item['name'],
+            item['id_type'],
             self.default_name_type[item['type']],
-            expand_complexes = expand_complexes,
+            None,
+        )
+
+        # TODO: include
+        default_id = (
+            names_mapped[key]
+                if names_mapped and key in names_mapped else
+            mapping.map_name(
+                item['name'], item['id_type'],
+                self.default_name_type[item['type']],
+                expand_complexes = expand_complexes,
+            )
         )
 
         if len(default_id) == 0:
@@ -3014,7 +4055,7 @@ class PyPath(session_mod.Logger):
         return default_id
 
 
-    def map_edge(self, edge, expand_complexes = True):
+    def map_edge(self, edge, expand_complexes = True, names_mapped = None):
         """
         Translates the identifiers in *edge* representing an edge. Default
         name types are defined in
@@ -3027,6 +4068,9 @@ class PyPath(session_mod.Logger):
         :arg bool expand_complexes:
             Expand complexes, i.e. create links between each member of
             the complex and the interacting partner.
+        :arg dict names_mapped:
+            Optional, names translated in advance by
+            :py:meth:`pypath.main.PyPath._map_names_bulk`.
 
         :return:
             (*list*) -- Contains the edge(s) [dict] with default mapped
@@ -3034,22 +4078,28 @@ class PyPath(session_mod.Logger):
         """
 
         edge_stack = []
+        default_ids = []
 
-        default_id_a = mapping.map_name(
-            edge['id_a'],
-            edge['id_type_a'],
-            self.default_name_type[edge['entity_type_a']],
-            ncbi_tax_id = edge['taxon_a'],
-            expand_complexes = expand_complexes,
-        )
+        for side in ('a', 'b'):
 
-        default_id_b = mapping.map_name(
-            edge['id_b'],
-            edge['id_type_b'],
-            self.default_name_type[edge['entity_type_b']],
-            ncbi_tax_id = edge['taxon_b'],
-            expand_complexes = expand_complexes,
-        )
+            key = (
+                edge['id_%s' % side],
+                edge['id_type_%s' % side],
+                self.default_name_type[edge['entity_type_%s' % side]],
+                edge['taxon_%s' % side],
+            )
+
+            default_ids.append(
+                names_mapped[key]
+                    if names_mapped and key in names_mapped else
+                mapping.map_name(
+                    *key[:3],
+                    ncbi_tax_id = key[3],
+                    expand_complexes = expand_complexes,
+                )
+            )
+
+        default_id_a, default_id_b = default_ids
 
         # this is needed because the possibility ambigous mapping
         # and expansion of complexes
@@ -3298,6 +4348,7 @@ class PyPath(session_mod.Logger):
 
         graph.delete_vertices(toDel)
         del graph.vs['id_merge']
+        self._graph_changed(graph = graph)
 
 
     def copy_edges(self, sources, target, move=False, graph=None):
@@ -3461,6 +4512,9 @@ class PyPath(session_mod.Logger):
         del graph.es['id_old']
         del graph.vs['id_old']
 
+        # the number of edges might be the same as before
+        self._graph_changed(graph = graph)
+
 
     def delete_by_organism(self, organisms_allowed = None):
         """
@@ -3482,6 +4536,7 @@ class PyPath(session_mod.Logger):
         ]
 
         g.delete_vertices(to_delete)
+        self._graph_changed()
         self.update_vname()
         self.update_db_dict()
 
@@ -3554,6 +4609,7 @@ class PyPath(session_mod.Logger):
         vertices_to_delete = [self.nodDct[n] for n in names_to_delete]
 
         g.delete_vertices(to_delete)
+        self._graph_changed()
 
         self.update_vname()
 
@@ -3577,6 +4633,7 @@ class PyPath(session_mod.Logger):
         if not g.is_simple():
             g.simplify(loops=not self.loops, multiple=True,
                        combine_edges=self.combine_attr)
+            self._graph_changed()
 
         self._log(
             'After duplicate edge removal: '
@@ -3611,6 +4668,7 @@ class PyPath(session_mod.Logger):
         x = g.vs.degree()
         zeroDeg = [i for i, j in enumerate(x) if j == 0]
         g.delete_vertices(zeroDeg)
+        self._graph_changed()
 
         self._log(
             'After removing zero degree nodes: '
@@ -3682,16 +4740,17 @@ class PyPath(session_mod.Logger):
         keep_original_names = settings.get('network_keep_original_names')
 
         g = self.graph
-        g.vs._reindex_names()
+        self.update_vname()
 
-        if not default_attrs['name'] in g.vs['name']:
+        if not default_attrs['name'] in self.nodDct:
 
             if not add:
                 self._log('Failed to add some vertices', -5)
                 return False
 
-            n = g.vcount()
-            g.add_vertices(1)
+            self.new_nodes([default_attrs['name']])
+            self.update_vname()
+            this_node = g.vs[self.nodDct[default_attrs['name']]]
 
             # only keep track of original names if they are strings
             # not, for example, complexes
@@ -3699,15 +4758,13 @@ class PyPath(session_mod.Logger):
                 keep_original_names and
                 isinstance(original_name, common.basestring)
             ):
-                g.vs[n]['original_names'] = {
+                this_node['original_names'] = {
                     original_name: original_name_type,
                 }
 
-            this_node = g.vs[g.vs._name_index[default_attrs['name']]]
-
         else:
 
-            this_node = g.vs[g.vs._name_index[default_attrs['name']]]
+            this_node = g.vs[self.nodDct[default_attrs['name']]]
 
             if this_node['original_names'] is None:
 
@@ -3732,6 +4789,9 @@ class PyPath(session_mod.Logger):
 
             this_node[key] = value
 
+        # the label might have been reset to the name
+        self._labels_pending.add(this_node.index)
+
         for key, value in iteritems(extra_attrs):
 
             if key not in g.vs.attributes():
@@ -3786,8 +4846,7 @@ class PyPath(session_mod.Logger):
 
         g = self.graph
 
-        if not hasattr(self, 'nodDct') or len(self.nodInd) != g.vcount():
-            self.update_vname()
+        self.update_vname()
 
         edge = self.edge_exists(id_a, id_b)
 
@@ -3803,7 +4862,7 @@ class PyPath(session_mod.Logger):
 
                 return False
 
-            g.add_edge(edge[0], edge[1])
+            self.new_edges([tuple(edge)])
             edge = self.edge_exists(id_a, id_b)
 
         # assigning source:
@@ -4032,93 +5091,92 @@ class PyPath(session_mod.Logger):
 
         self._log('Creating directed network object.')
 
-        toDel = []
+        toDel = set()
         g = self.graph if not graph else graph
+        # the directed graph has the same vertices; for each undirected
+        # edge `i` it has an edge `i` in the same direction and an edge
+        # `i + ecount` in the opposite direction
         d = g.as_directed(mutual=True)
         self.update_vname()
-        d.es['directed_sources'] = [[] for _ in xrange(g.ecount())]
-        d.es['undirected_sources'] = [[] for _ in xrange(g.ecount())]
-        d.es['directed'] = [False for _ in xrange(g.ecount())]
+        ecount = g.ecount()
+        names = g.vs['name']
+        directed = [False] * (2 * ecount)
+        directed_sources = [[] for _ in xrange(2 * ecount)]
+        undirected_sources = [[] for _ in xrange(2 * ecount)]
         prg = Progress(
             total=g.ecount(), name="Setting directions", interval=17)
 
-        for e in g.es:
-            """
-            This works because in directed graphs get_eid() defaults to
-            directed = True, so the source -> target edge is returned.
-            """
-            dir_one = (g.vs['name'][e.source], g.vs['name'][e.target])
-            dir_two = (g.vs['name'][e.target], g.vs['name'][e.source])
-            dir_edge_one = d.get_eid(
-                d.vs['name'].index(g.vs['name'][e.source]),
-                d.vs['name'].index(g.vs['name'][e.target]))
-            dir_edge_two = d.get_eid(
-                d.vs['name'].index(g.vs['name'][e.target]),
-                d.vs['name'].index(g.vs['name'][e.source]))
+        for e, (source, target), dirs in zip(
+            g.es,
+            g.get_edgelist(),
+            g.es['dirs'],
+        ):
+
+            dir_one = (names[source], names[target])
+            dir_two = (names[target], names[source])
+            dir_edge_one = e.index
+            dir_edge_two = e.index + ecount
+            has_one = dirs.get_dir(dir_one)
+            has_two = dirs.get_dir(dir_two)
 
-            if not e['dirs'].get_dir(dir_one):
+            if not has_one:
 
-                if not conv_edges or e['dirs'].get_dir(dir_two):
-                    toDel.append(dir_edge_one)
+                if not conv_edges or has_two:
+                    toDel.add(dir_edge_one)
 
             else:
-                d.es[dir_edge_one]['directed'] = True
-                d.es[dir_edge_one]['directed_sources'] += \
-                    e['dirs'].get_dir(dir_one, sources=True)
-                d.es[dir_edge_one]['undirected_sources'] += \
-                    e['dirs'].get_dir('undirected', sources=True)
+                directed[dir_edge_one] = True
+                directed_sources[dir_edge_one] += \
+                    dirs.get_dir(dir_one, sources=True)
+                undirected_sources[dir_edge_one] += \
+                    dirs.get_dir('undirected', sources=True)
 
-            if not e['dirs'].get_dir(dir_two):
+            if not has_two:
 
-                if not conv_edges or e['dirs'].get_dir(dir_one):
-                    toDel.append(dir_edge_two)
+                if not conv_edges or has_one:
+                    toDel.add(dir_edge_two)
 
             else:
-                d.es[dir_edge_two]['directed'] = True
-                d.es[dir_edge_two]['directed_sources'] += \
-                    e['dirs'].get_dir(dir_two, sources=True)
-                d.es[dir_edge_two]['undirected_sources'] += \
-                    e['dirs'].get_dir('undirected', sources=True)
+                directed[dir_edge_two] = True
+                directed_sources[dir_edge_two] += \
+                    dirs.get_dir(dir_two, sources=True)
+                undirected_sources[dir_edge_two] += \
+                    dirs.get_dir('undirected', sources=True)
 
-            if e['dirs'].get_dir('undirected') and \
-                not e['dirs'].get_dir(dir_one) and \
-                    not e['dirs'].get_dir(dir_two):
+            if dirs.get_dir('undirected') and not has_one and not has_two:
 
                 if conv_edges:
-                    d.es[dir_edge_one]['undirected_sources'] += \
-                        e['dirs'].get_dir('undirected', sources=True)
+                    undirected_sources[dir_edge_one] += \
+                        dirs.get_dir('undirected', sources=True)
 
                     if mutual:
-                        d.es[dir_edge_two]['undirected_sources'] += \
-                            e['dirs'].get_dir('undirected', sources=True)
+                        undirected_sources[dir_edge_two] += \
+                            dirs.get_dir('undirected', sources=True)
 
                     else:
-                        toDel.append(dir_edge_two)
+                        toDel.add(dir_edge_two)
 
                 else:
-                    toDel += [dir_edge_one, dir_edge_two]
+                    toDel.update((dir_edge_one, dir_edge_two))
 
             prg.step()
 
-        d.delete_edges(list(set(toDel)))
+        d.es['directed'] = directed
+        d.es['directed_sources'] = directed_sources
+        d.es['undirected_sources'] = undirected_sources
+        d.delete_edges(list(toDel))
         prg.terminate()
         deg = d.vs.degree()
-        toDel = []
-
-        for v in d.vs:
-
-            if deg[v.index] == 0:
-                toDel.append(v.index)
-
-        del self.nodInd
+        toDel = [i for i, _deg in enumerate(deg) if _deg == 0]
 
         if len(toDel) > 0:
-            d.delete_vertices(list(set(toDel)))
+            d.delete_vertices(toDel)
 
         if not graph:
             
             self.dgraph = d
             self._directed = self.dgraph
+            self._directed_key = self._graph_key()
             self._get_directed()
             self._get_undirected()
             self.update_vname()
@@ -4137,7 +5195,11 @@ class PyPath(session_mod.Logger):
             Contains the edges that are to be added to the network.
         """
 
-        self.graph.add_edges(list(edges))
+        edges = list(edges)
+        self.graph.add_edges(edges)
+
+        if edges:
+            self._graph_changed(edges = len(edges))
 
     def new_nodes(self, nodes):
         """
@@ -4148,7 +5210,11 @@ class PyPath(session_mod.Logger):
             Contains the nodes that are to be added to the network.
         """
 
-        self.graph.add_vertices(list(nodes))
+        nodes = list(nodes)
+        self.graph.add_vertices(nodes)
+
+        if nodes:
+            self._graph_changed(vertices = len(nodes))
 
     def edge_exists(self, id_a, id_b):
         """
@@ -4165,8 +5231,7 @@ class PyPath(session_mod.Logger):
             [tuple] of [int] corresponding to the node IDs.
         """
 
-        if not hasattr(self, 'nodDct'):
-            self.update_vname()
+        self.update_vname()
 
         nodes = [self.nodDct[id_a], self.nodDct[id_b]]
         edge = self.graph.get_eid(nodes[0], nodes[1], error=False)
@@ -4207,8 +5272,7 @@ class PyPath(session_mod.Logger):
             (*bool*) -- Whether the node exists in the network or not.
         """
 
-        if not hasattr(self, 'nodInd'):
-            self.update_vname()
+        self.update_vname()
 
         return name in self.nodInd
 
@@ -4226,8 +5290,7 @@ class PyPath(session_mod.Logger):
 
         vids = []
 
-        if not hasattr(self, 'nodInd'):
-            self.update_vname()
+        self.update_vname()
 
         for n in names:
 
@@ -4356,8 +5419,7 @@ class PyPath(session_mod.Logger):
             If not found, returns ``False``.
         """
 
-        if not hasattr(self, 'nodDct'):
-            self.update_vname()
+        self.update_vname()
 
         g = self._directed if directed else self._undirected
         nodDct = self.dnodDct if directed else self.nodDct
@@ -4489,7 +5551,12 @@ class PyPath(session_mod.Logger):
 
                 e[attr] = set(e[attr])
 
-    def attach_network(self, edge_list = False, regulator = False):
+    def attach_network(
+            self,
+            edge_list = False,
+            regulator = False,
+            bulk = None,
+        ):
         """
         Adds edges to the network from *edge_list* obtained from file or
         other input method. If none is passed, checks for such data in
@@ -4505,6 +5572,12 @@ class PyPath(session_mod.Logger):
             Optional, ``False`` by default. If set to ``True``, non
             previously existing nodes, will not be added (and hence, the
             edges involved).
+        :arg bool bulk:
+            Optional, ``None`` by default. Use the bulk ingestion engine
+            (:py:meth:`pypath.main.PyPath._attach_network_bulk`) instead
+            of calling :py:meth:`pypath.main.PyPath.add_update_edge` for
+            each record. If ``None``, the value of the
+            ``network_attach_bulk`` setting is used.
         """
 
         self._log('Adding preprocessed edge list to existing network.')
@@ -4533,6 +5606,18 @@ class PyPath(session_mod.Logger):
 
                 return False
 
+        bulk = (
+            bulk
+                if isinstance(bulk, bool) else
+            settings.get('network_attach_bulk')
+        )
+
+        if bulk:
+
+            self._attach_network_bulk(edge_list, regulator = regulator)
+
+            return None
+
         nodes = []
         edges = []
         # adding nodes and edges first in bunch,
@@ -4571,75 +5656,453 @@ class PyPath(session_mod.Logger):
                     e["default_name_b"],
                 )
 
-                if isinstance(edge, list):
-                    edges.append(tuple(edge))
+                if isinstance(edge, list):
+                    edges.append(tuple(edge))
+
+                prg.step()
+
+        prg.terminate()
+        self.new_edges(set(edges))
+        self._log('New edges have been created')
+        self._log('Introducing new node and edge attributes...')
+        prg = Progress(
+            total = len(edge_list),
+            name = 'Processing attributes',
+            interval = 30,
+        )
+        nodes_updated = []
+        self.update_vname()
+
+        for e in edge_list:
+            # adding new node attributes
+
+            if e['default_name_a'] not in nodes_updated:
+                default_attrs = {
+                    'name': e['default_name_a'],
+                    'label': e['default_name_a'],
+                    'id_type': e['default_name_type_a'],
+                    'type': e['entity_type_a'],
+                    'ncbi_tax_id': e['taxon_a'],
+                }
+                self.add_update_vertex(
+                    default_attrs,
+                    e['id_a'],
+                    e['id_type_a'],
+                    e['attrs_node_a'],
+                )
+                nodes_updated.append(e['default_name_a'])
+
+            if e['default_name_b'] not in nodes_updated:
+                default_attrs = {
+                    'name': e['default_name_b'],
+                    'label': e['default_name_b'],
+                    'id_type': e['default_name_type_b'],
+                    'type': e['entity_type_b'],
+                    'ncbi_tax_id': e['taxon_b']
+                }
+                self.add_update_vertex(
+                    default_attrs,
+                    e['id_b'],
+                    e['id_type_b'],
+                    e['attrs_node_b'],
+                )
+                nodes_updated.append(e['default_name_b'])
+
+            # adding new edge attributes
+            self.add_update_edge(
+                e['default_name_a'],
+                e['default_name_b'],
+                e['source'],
+                e['is_directed'],
+                e['references'],
+                e['stim'],
+                e['inh'],
+                e['taxon_a'],
+                e['taxon_b'],
+                e['type'],
+                e['attrs_edge'],
+            )
+
+            prg.step()
+
+        self._log(
+            'New network resource added, current number '
+            'of nodes: %u, edges: %u.' % (
+                self.graph.vcount(),
+                self.graph.ecount()
+            )
+        )
+
+        prg.terminate()
+        self.raw_data = None
+        self.update_attrs()
+
+
+    def _attach_network_bulk(self, edge_list, regulator = False):
+        """
+        Bulk version of :py:meth:`pypath.main.PyPath.attach_network`.
+        Groups the records of *edge_list* by unordered node pair, creates
+        all new vertices and edges by one call of ``add_vertices`` and
+        ``add_edges``, then assigns the vertex and edge attributes
+        column-wise, in one pass. The result is the same as calling
+        :py:meth:`pypath.main.PyPath.add_update_vertex` and
+        :py:meth:`pypath.main.PyPath.add_update_edge` for each record.
+
+        :arg list edge_list:
+            List of edge records (dicts) as provided by
+            :py:meth:`pypath.main.PyPath.read_data_file`.
+        :arg bool regulator:
+            Optional, ``False`` by default. If set to ``True``, non
+            previously existing nodes, will not be added (and hence, the
+            edges involved).
+        """
+
+        g = self.graph
+        keep_original_names = settings.get('network_keep_original_names')
+
+        self.update_vname()
+
+        # adding nodes
+        name_index = dict(self.nodDct)
+        new_nodes = collections.OrderedDict()
+
+        for e in edge_list:
+
+            aexists = e['default_name_a'] in name_index
+            bexists = e['default_name_b'] in name_index
+
+            if not aexists and (not regulator or bexists):
+                new_nodes[e['default_name_a']] = None
+
+            if not bexists and not regulator:
+                new_nodes[e['default_name_b']] = None
+
+        self.new_nodes(new_nodes.keys())
+        self._log('New nodes have been created (%u)' % len(new_nodes))
+        self.update_vname()
+        name_index = self.nodDct
+
+        # grouping the records by unordered node pairs
+        pair_eid = {}
+
+        for eid, (vid_a, vid_b) in enumerate(g.get_edgelist()):
+
+            pair_eid.setdefault(
+                (vid_a, vid_b) if vid_a <= vid_b else (vid_b, vid_a),
+                eid,
+            )
+
+        ecount = g.ecount()
+        new_edges = []
+        by_edge = collections.OrderedDict()
+        skipped = 0
+
+        for e in edge_list:
+
+            if (
+                e['default_name_a'] not in name_index or
+                e['default_name_b'] not in name_index
+            ):
+
+                skipped += 1
+                continue
+
+            vid_a = name_index[e['default_name_a']]
+            vid_b = name_index[e['default_name_b']]
+            pair = (vid_a, vid_b) if vid_a <= vid_b else (vid_b, vid_a)
+
+            if pair not in pair_eid:
+
+                pair_eid[pair] = ecount + len(new_edges)
+                new_edges.append(pair)
+
+            eid = pair_eid[pair]
+
+            if eid not in by_edge:
+
+                by_edge[eid] = []
+
+            by_edge[eid].append(e)
+
+        self.new_edges(new_edges)
+        self._log('New edges have been created (%u)' % len(new_edges))
+
+        if skipped:
+
+            self._log(
+                '%u records skipped as their nodes '
+                'are not in the network.' % skipped
+            )
+
+        self._log('Introducing new node and edge attributes...')
+
+        def vertex_column(attr, value = None):
+
+            if attr not in vcols:
+
+                vcols[attr] = (
+                    g.vs[attr]
+                        if attr in g.vs.attributes() else
+                    [
+                        [] if isinstance(value, list) else None
+                        for _ in xrange(g.vcount())
+                    ]
+                )
+
+            return vcols[attr]
+
+        def edge_column(attr, default = None):
+
+            if attr not in ecols:
+
+                ecols[attr] = (
+                    g.es[attr]
+                        if attr in g.es.attributes() else
+                    [
+                        default() if default else None
+                        for _ in xrange(g.ecount())
+                    ]
+                )
+
+            return ecols[attr]
+
+        def as_set(value):
+
+            return (
+                value
+                    if isinstance(value, set) else
+                set(value)
+                    if isinstance(value, list) else
+                set([value])
+            )
+
+        # vertex attributes: set from the first record
+        # where the node occurs, just like in `attach_network`
+        vcols = {}
+        nodes_updated = set()
+
+        for e in edge_list:
+
+            for side in ('a', 'b'):
+
+                name = e['default_name_%s' % side]
+
+                if name in nodes_updated or name not in name_index:
+
+                    continue
+
+                nodes_updated.add(name)
+                vid = name_index[name]
+                original_name = e['id_%s' % side]
+
+                original_names = vertex_column('original_names')
+
+                if original_names[vid] is None:
+
+                    original_names[vid] = {}
+
+                if (
+                    keep_original_names and
+                    isinstance(original_name, common.basestring)
+                ):
+
+                    original_names[vid][original_name] = (
+                        e['id_type_%s' % side]
+                    )
+
+                default_attrs = {
+                    'name': name,
+                    'label': name,
+                    'id_type': e['default_name_type_%s' % side],
+                    'type': (
+                        'complex'
+                            if isinstance(name, intera.Complex) else
+                        e['entity_type_%s' % side]
+                    ),
+                    'ncbi_tax_id': e['taxon_%s' % side],
+                }
+
+                for key, value in iteritems(default_attrs):
+
+                    vertex_column(key)[vid] = value
+
+                self._labels_pending.add(vid)
+
+                for key, value in iteritems(e['attrs_node_%s' % side]):
+
+                    column = vertex_column(key, value)
+                    column[vid] = self.combine_attr([column[vid], value])
+
+        # edge attributes: merging all records of one node pair at once
+        ecols = {}
+        ref_objects = {}
+        prg = Progress(
+            total = len(by_edge),
+            name = 'Processing attributes',
+            interval = 30,
+        )
+
+        for eid, records in iteritems(by_edge):
+
+            sources = set()
+            references = []
+            types = []
+            refs_by_source = collections.defaultdict(set)
+            refs_by_type = collections.defaultdict(set)
+            refs_by_dir = collections.defaultdict(set)
+            sources_by_type = collections.defaultdict(set)
+            dir_sources = collections.defaultdict(set)
+            sign_sources = collections.defaultdict(set)
+            extra_attrs = []
+
+            for e in records:
+
+                source = e['source']
+                source_set = as_set(source)
+                id_a = e['default_name_a']
+                id_b = e['default_name_b']
+                typ = e['type']
+
+                refs = []
+
+                for pmid in e['references']:
+
+                    if pmid not in ref_objects:
+
+                        ref_objects[pmid] = _refs.Reference(pmid)
+
+                    refs.append(ref_objects[pmid])
+
+                sources.update(source_set)
+                references.extend(refs)
+
+                for src in (
+                    source
+                        if type(source) in {tuple, set, list} else
+                    (source,)
+                ):
+
+                    refs_by_source[src].update(refs)
+
+                refs_by_type[typ].update(refs)
+                direction = (id_a, id_b) if e['is_directed'] else 'undirected'
+                refs_by_dir[direction].update(refs)
+                dir_sources[direction].update(source_set)
+
+                if e['stim']:
+
+                    sign_sources[((id_a, id_b), 'positive')].update(
+                        source_set
+                    )
+
+                if e['inh']:
+
+                    sign_sources[((id_a, id_b), 'negative')].update(
+                        source_set
+                    )
+
+                sources_by_type[typ].update(source_set)
+                types.extend(typ if isinstance(typ, list) else [typ])
+                extra_attrs.append(e['attrs_edge'])
+
+            # sources
+            column = edge_column('sources', set)
+
+            if column[eid] is None:
+
+                column[eid] = set()
+
+            elif not isinstance(column[eid], set):
+
+                column[eid] = as_set(column[eid])
+
+            column[eid].update(sources)
+
+            # references and types
+            for attr, values in (
+                ('references', references),
+                ('type', types),
+            ):
+
+                column = edge_column(attr, list)
+
+                if column[eid] is None:
+
+                    column[eid] = []
+
+                elif not isinstance(column[eid], list):
+
+                    column[eid] = [column[eid]]
+
+                column[eid] = common.uniqList(column[eid] + values)
+
+            # grouped attributes
+            for attr, groups in (
+                ('refs_by_source', refs_by_source),
+                ('refs_by_type', refs_by_type),
+                ('refs_by_dir', refs_by_dir),
+                ('sources_by_type', sources_by_type),
+            ):
+
+                column = edge_column(attr, dict)
+
+                if not isinstance(column[eid], dict):
+
+                    column[eid] = {}
+
+                for group, values in iteritems(groups):
+
+                    if column[eid].get(group, None) is None:
+
+                        column[eid][group] = set()
+
+                    elif not isinstance(column[eid][group], set):
+
+                        column[eid][group] = as_set(column[eid][group])
+
+                    column[eid][group].update(values)
+
+            # directions and signs
+            column = edge_column('dirs')
+
+            if not column[eid]:
+
+                column[eid] = Direction(
+                    records[0]['default_name_a'],
+                    records[0]['default_name_b'],
+                )
+
+            for direction, _sources in iteritems(dir_sources):
 
-                prg.step()
+                column[eid].set_dir(direction, _sources)
 
-        prg.terminate()
-        self.new_edges(set(edges))
-        self._log('New edges have been created')
-        self._log('Introducing new node and edge attributes...')
-        prg = Progress(
-            total = len(edge_list),
-            name = 'Processing attributes',
-            interval = 30,
-        )
-        nodes_updated = []
-        self.update_vname()
+            for (direction, sign), _sources in iteritems(sign_sources):
 
-        for e in edge_list:
-            # adding new node attributes
+                column[eid].set_sign(direction, sign, _sources)
 
-            if e['default_name_a'] not in nodes_updated:
-                default_attrs = {
-                    'name': e['default_name_a'],
-                    'label': e['default_name_a'],
-                    'id_type': e['default_name_type_a'],
-                    'type': e['entity_type_a'],
-                    'ncbi_tax_id': e['taxon_a'],
-                }
-                self.add_update_vertex(
-                    default_attrs,
-                    e['id_a'],
-                    e['id_type_a'],
-                    e['attrs_node_a'],
-                )
-                nodes_updated.append(e['default_name_a'])
+            # extra attributes
+            for attrs in extra_attrs:
 
-            if e['default_name_b'] not in nodes_updated:
-                default_attrs = {
-                    'name': e['default_name_b'],
-                    'label': e['default_name_b'],
-                    'id_type': e['default_name_type_b'],
-                    'type': e['entity_type_b'],
-                    'ncbi_tax_id': e['taxon_b']
-                }
-                self.add_update_vertex(
-                    default_attrs,
-                    e['id_b'],
-                    e['id_type_b'],
-                    e['attrs_node_b'],
-                )
-                nodes_updated.append(e['default_name_b'])
+                for key, value in iteritems(attrs):
 
-            # adding new edge attributes
-            self.add_update_edge(
-                e['default_name_a'],
-                e['default_name_b'],
-                e['source'],
-                e['is_directed'],
-                e['references'],
-                e['stim'],
-                e['inh'],
-                e['taxon_a'],
-                e['taxon_b'],
-                e['type'],
-                e['attrs_edge'],
-            )
+                    column = edge_column(
+                        key,
+                        list if isinstance(value, list) else None,
+                    )
+                    column[eid] = self.combine_attr([column[eid], value])
 
             prg.step()
 
+        prg.terminate()
+
+        for attr, column in iteritems(vcols):
+
+            g.vs[attr] = column
+
+        for attr, column in iteritems(ecols):
+
+            g.es[attr] = column
+
         self._log(
             'New network resource added, current number '
             'of nodes: %u, edges: %u.' % (
@@ -4648,7 +6111,6 @@ class PyPath(session_mod.Logger):
             )
         )
 
-        prg.terminate()
         self.raw_data = None
         self.update_attrs()
 
@@ -5408,10 +6870,11 @@ class PyPath(session_mod.Logger):
 
         if "unmapped" in g.vs["name"]:
             g.delete_vertices(g.vs.find(name="unmapped").index)
+            self._graph_changed()
             self.update_db_dict()
             self.update_vname()
 
-    def genesymbol_labels(self, graph=None, remap_all=False):
+    def genesymbol_labels(self, graph=None, remap_all=False, vids=None):
         """
         Creats vertex attribute ``'label'`` and fills up with the
         corresponding GeneSymbols of all proteins where the GeneSymbol
@@ -5428,6 +6891,9 @@ class PyPath(session_mod.Logger):
         :arg bool remap_all:
             Optional, ``False`` by default. Whether to map anew the
             GeneSymbol labels if those were already initialized.
+        :arg list vids:
+            Optional, ``None`` by default. Update the labels only for
+            these vertices. By default all vertices are processed.
         """
 
         self._log('Updating vertex labels.')
@@ -5448,6 +6914,9 @@ class PyPath(session_mod.Logger):
 
         if 'label' not in g.vs.attributes():
             remap_all = True
+            vids = None
+
+        vs = g.vs if vids is None else g.vs.select(vids)
 
         labels = [
             (
@@ -5455,10 +6924,10 @@ class PyPath(session_mod.Logger):
                     if remap_all or v['label'] == v['name'] else
                 v['label']
             )
-            for v in g.vs
+            for v in vs
         ]
 
-        for v, l, i in zip(g.vs, labels, xrange(g.vcount())):
+        for v, l, i in zip(vs, labels, xrange(len(vs))):
 
             if l is None:
 
@@ -5480,7 +6949,11 @@ class PyPath(session_mod.Logger):
                 else:
                     labels[i] = v['name']
 
-        g.vs['label'] = labels
+        vs['label'] = labels
+
+        if vids is None:
+            # the label lookups of this graph are outdated
+            self._index_invalidate(g, ('vname', 'dvname'))
 
     def network_stats(self, outfile=None):
         """
@@ -5954,6 +7427,7 @@ class PyPath(session_mod.Logger):
                 e['sources'] = set(e['sources']) - set([source])
 
         g.delete_edges(edgesToDel)
+        self._graph_changed()
 
         if vertexAttrsToDel is not None:
 
@@ -6006,7 +7480,8 @@ class PyPath(session_mod.Logger):
         outf.close()
 
     def load_resources(self, lst=None, exclude=[], cache_files={},
-                       reread=False, redownload=False, keep_raw = False):
+                       reread=False, redownload=False, keep_raw = False,
+                       workers = None):
         """
         Loads multiple resources, and cleans up after. Looks up ID
         types, and loads all ID conversion tables from UniProt if
@@ -6034,31 +7509,115 @@ class PyPath(session_mod.Logger):
         :arg bool redownload:
             Optional, ``False`` by default. Specifies whether to
             re-download the data and ignore the cache.
+        :arg int workers:
+            Optional, ``None`` by default. Number of processes reading
+            and ID translating the resources in parallel. The edge lists
+            are attached to the network in the main process, in the same
+            order as by the serial loading, hence the result is the same.
+            Resources requiring huge memory are always loaded in the main
+            process. If ``None`` the ``network_load_workers`` setting
+            is used.
         """
 
         if lst is None:
             lst = omnipath
 
+        workers = workers or settings.get('network_load_workers') or 1
+
         huge = dict((k, v) for k, v in iteritems(lst) if v.huge
                     and k not in exclude and v.name not in cache_files)
         nothuge = dict((k, v) for k, v in iteritems(lst)
                        if (not v.huge or v.name in cache_files)
                        and k not in exclude)
 
-        # XXX: Not very good practice to name the iterator element
-        #      as one of the kwargs... can lead to confusion
-        for lst in [huge, nothuge]:
+        read_args = {
+            'cache_files': cache_files,
+            'reread': reread,
+            'redownload': redownload,
+        }
+        pool = None
 
-            for k, v in iteritems(lst):
+        if workers > 1:
 
-                self.load_resource(
-                    v,
-                    clean = False,
-                    cache_files = cache_files,
-                    reread = reread,
-                    redownload = redownload,
-                    keep_raw = keep_raw,
-                )
+            # the resources are read in the worker processes while
+            # the huge ones are loaded here, the results come back
+            # in the order of submission
+            parallel = [
+                v for v in nothuge.values() if self._picklable(v)
+            ]
+            mapping.sync_memo()
+            pool = multiprocessing.Pool(
+                processes = workers,
+                initializer = mapping.detach_memo,
+            )
+            results = pool.imap(
+                _read_resource,
+                (
+                    (v, self.ncbi_tax_id, self.cache_dir, read_args)
+                    for v in parallel
+                ),
+            )
+            parallel = set(id(v) for v in parallel)
+
+            self._log(
+                'load_resources(): reading %u resources '
+                'in %u processes.' % (len(parallel), workers)
+            )
+
+        try:
+
+            # XXX: Not very good practice to name the iterator element
+            #      as one of the kwargs... can lead to confusion
+            for lst in [huge, nothuge]:
+
+                for k, v in iteritems(lst):
+
+                    if pool is not None and id(v) in parallel:
+
+                        name, edge_list = next(results)
+
+                        self._log(
+                            'Network data from resource `%s` '
+                            'has been read in a worker process.' % name
+                        )
+
+                        if edge_list is None:
+
+                            continue
+
+                        if keep_raw:
+
+                            self.data[name] = edge_list
+
+                        self.raw_data = edge_list
+                        self._attach_resource(clean = False)
+
+                    else:
+
+                        self.load_resource(
+                            v,
+                            clean = False,
+                            keep_raw = keep_raw,
+                            **read_args
+                        )
+
+            if pool is not None:
+
+                pool.close()
+
+        except:
+
+            if pool is not None:
+
+                pool.terminate()
+
+            raise
+
+        finally:
+
+            if pool is not None:
+
+                pool.join()
 
         sys.stdout.write('\n')
 
@@ -6131,6 +7690,15 @@ class PyPath(session_mod.Logger):
             redownload = redownload,
             keep_raw = keep_raw,
         )
+        self._attach_resource(clean = clean)
+
+
+    def _attach_resource(self, clean = True):
+        """
+        Attaches the edge list in ``raw_data`` to the network and updates
+        the source attributes.
+        """
+
         self.attach_network()
 
         if clean:
@@ -6140,6 +7708,23 @@ class PyPath(session_mod.Logger):
         self.update_vertex_sources()
 
 
+    @staticmethod
+    def _picklable(param):
+        """
+        Tells if a resource definition can be sent to a worker process.
+        """
+
+        try:
+
+            pickle.dumps(param)
+
+            return True
+
+        except Exception:
+
+            return False
+
+
     def load_negatives(self): # FIXME: global name 'negative' is not defined
         """
         """
@@ -8133,12 +9718,133 @@ class PyPath(session_mod.Logger):
             if e is not None)
 
     def _has_directed(self):
+        if (
+            self._directed is not None and
+            self._directed is self.dgraph and
+            getattr(self, '_directed_key', None) != self._graph_key()
+        ):
+            # the graph has been changed since the directed
+            # instance has been created
+            self._directed = None
         if self._directed is None:
             if self.graph.is_directed():
                 self._directed = self.graph
             else:
                 self.get_directed()
 
+    def _graph_key(self, graph = None):
+        """
+        Returns a value which changes when ``graph`` is replaced or
+        vertices or edges are added or removed.
+        """
+
+        graph = self.graph if graph is None else graph
+
+        return (
+            self._graph_version if graph is self.graph else None,
+            id(graph),
+            graph.vcount(),
+            graph.ecount(),
+        )
+
+    def _graph_changed(self, vertices = 0, edges = 0, graph = None):
+        """
+        Registers a change of the network graph. Each method modifying
+        the vertices or edges of the graph should call this, as some
+        changes can not be detected from its size, e.g. renaming
+        vertices or deleting and adding the same number of edges.
+        If *vertices* or *edges* are given, the change is the addition
+        of this number of vertices and edges at the end of the vertex
+        and edge sequences, and the lookups will be extended rather
+        than rebuilt. If *graph* is not the undirected network graph,
+        the lookups built from *graph* are invalidated.
+        """
+
+        if graph is not None and graph is not self.graph:
+
+            self._index_invalidate(graph)
+
+            return
+
+        self._graph_version += 1
+
+        if vertices or edges:
+
+            self._graph_appended[0] += vertices
+            self._graph_appended[1] += edges
+
+        else:
+
+            self._graph_reset_version = self._graph_version
+
+    def _index_update(self, index, graph, force = False):
+        """
+        Tells if the lookup structure *index* built from *graph* needs
+        to be updated.
+
+        :return:
+            ``None`` if the lookup is up to date. Otherwise a tuple of
+            the number of vertices and edges already contained in the
+            lookup; it is ``(0, 0)`` if it should be rebuilt entirely.
+        """
+
+        key = self._graph_key(graph)
+        built = None if force else self._index_keys.get(index)
+
+        if built is None:
+
+            return 0, 0
+
+        built_key, built_appended = built
+
+        if built_key == key:
+
+            return None
+
+        if (
+            graph is self.graph and
+            built_key[1] == key[1] and
+            built_key[0] >= self._graph_reset_version and
+            # the change in size is explained by the recorded additions
+            key[2] - built_key[2] ==
+                self._graph_appended[0] - built_appended[0] and
+            key[3] - built_key[3] ==
+                self._graph_appended[1] - built_appended[1]
+        ):
+
+            return built_key[2], built_key[3]
+
+        return 0, 0
+
+    def _index_built(self, index, graph):
+        """
+        Records that the lookup structure *index* has been updated
+        from the current state of *graph*.
+        """
+
+        self._index_keys[index] = (
+            self._graph_key(graph),
+            tuple(self._graph_appended),
+        )
+
+    def _index_invalidate(self, graph, indices = None):
+        """
+        Marks the lookup structures built from *graph* as outdated.
+
+        :arg tuple indices:
+            Optional, ``None`` by default. Invalidate only these lookups.
+            By default all lookups built from *graph* are invalidated.
+        """
+
+        self._index_keys = dict(
+            (index, built)
+            for index, built in iteritems(self._index_keys)
+            if (
+                built[0][1] != id(graph) or
+                (indices is not None and index not in indices)
+            )
+        )
+
     def _already_has_directed(self):
         """
         """
@@ -11041,6 +12747,7 @@ class PyPath(session_mod.Logger):
             self.graph.delete_vertices(
                 np.where(np.array(self.graph.degree()) == 0)
             )
+            self._graph_changed()
 
             self.update_vname()
 
@@ -11155,36 +12862,36 @@ class PyPath(session_mod.Logger):
                         di.straight[1] in ureceptors
                     ):
 
-                        di.sources[di.straight].add('GO_lig_rec')
+                        di.add_sources(di.straight, 'GO_lig_rec')
 
                     if (
                         di.reverse[0] in uligands and
                         di.reverse[1] in ureceptors
                     ):
 
-                        di.sources[di.reverse].add('GO_lig_rec')
+                        di.add_sources(di.reverse, 'GO_lig_rec')
 
                 # ligand-ligand interaction
                 elif keep_lig_lig and srcs & ligands and tgts & ligands:
                     lig_lig_edges.add(e.index)
                     e['sources'].add('GO_lig_lig')
 
-                    for d in di.sources.values():
+                    for di_key, di_srcs in iteritems(di.sources):
 
-                        if d:
+                        if di_srcs:
 
-                            d.add('GO_lig_lig')
+                            di.add_sources(di_key, 'GO_lig_lig')
 
                 # receptor-receptor interaction
                 elif keep_rec_rec and srcs & receptors and tgts & receptors:
                     rec_rec_edges.add(e.index)
                     e['sources'].add('GO_rec_rec')
 
-                    for d in di.sources.values():
+                    for di_key, di_srcs in iteritems(di.sources):
 
-                        if d:
+                        if di_srcs:
 
-                            d.add('GO_rec_rec')
+                            di.add_sources(di_key, 'GO_rec_rec')
 
             self.set_boolean_vattr('ligand_go',   lig_with_interactions)
             self.set_boolean_vattr('receptor_go', rec_with_interactions)
@@ -11201,6 +12908,7 @@ class PyPath(session_mod.Logger):
             self.graph.delete_vertices(
                 [i for i, d in enumerate(self.graph.degree()) if not d]
             )
+            self._graph_changed()
 
         self.update_vname()
         self.update_sources()
@@ -11266,8 +12974,9 @@ class PyPath(session_mod.Logger):
     def go_enrichment(self, proteins=None, aspect='P', alpha=0.05,
                       correction_method='hommel', all_proteins=None):
         """
-        Does not work at the moment because cfisher module should be
-        replaced with scipy.
+        Gene Ontology enrichment of ``proteins`` against ``all_proteins``,
+        by default all proteins in the network.
+        Returns a ``pypath.goenrich.GOEnrichmentSet`` object.
         """
 
         if not hasattr(self, 'go') or self.ncbi_tax_id not in self.go:
@@ -11292,9 +13001,10 @@ class PyPath(session_mod.Logger):
             if up in all_proteins
         )
 
-        enr = go.GOEnrichmentSet(
+        enr = goenrich.GOEnrichmentSet(
             aspect=aspect,
             organism=self.ncbi_tax_id,
+            annotation=self.go[self.ncbi_tax_id],
             basic_set=annotation,
             alpha=alpha,
             correction_method=correction_method)
@@ -11345,16 +13055,54 @@ class PyPath(session_mod.Logger):
 
         return enr
 
-    def update_adjlist(self, graph=None, mode='ALL'):
+    def update_adjlist(self, graph=None, mode='ALL', force=False):
         """
         Creates an adjacency list in a list of sets format.
+        The list is rebuilt only if the graph or the mode has been
+        changed; new vertices and edges added by :py:meth:`new_nodes`
+        and :py:meth:`new_edges` are inserted into the existing list.
         """
 
         graph = graph or self.graph
-        self.adjlist = [
-            set(graph.neighbors(node, mode = mode))
-            for node in xrange(graph.vcount())
-        ]
+        mode = mode.upper() if isinstance(mode, common.basestring) else mode
+        force = (
+            force or
+            not hasattr(self, 'adjlist') or
+            getattr(self, '_adjlist_mode', None) != mode
+        )
+        update = self._index_update('adjlist', graph, force = force)
+
+        if update is None:
+            return
+
+        vcount, ecount = update
+
+        if vcount == 0 and ecount == 0:
+
+            self.adjlist = [
+                set(graph.neighbors(node, mode = mode))
+                for node in xrange(graph.vcount())
+            ]
+
+        else:
+
+            undirected = not graph.is_directed()
+            out = undirected or mode in {'OUT', 'ALL', igraph.OUT, igraph.ALL}
+            _in = undirected or mode in {'IN', 'ALL', igraph.IN, igraph.ALL}
+            self.adjlist.extend(
+                set() for _ in xrange(vcount, graph.vcount())
+            )
+
+            for e in graph.es[ecount:]:
+
+                if out:
+                    self.adjlist[e.source].add(e.target)
+
+                if _in:
+                    self.adjlist[e.target].add(e.source)
+
+        self._adjlist_mode = mode
+        self._index_built('adjlist', graph)
 
     def find_all_paths(
             self,
@@ -12812,6 +14560,7 @@ class PyPath(session_mod.Logger):
         self.graph.delete_edges(htedgs)
         zerodeg = [v.index for v in self.graph.vs if v.degree() == 0]
         self.graph.delete_vertices(zerodeg)
+        self._graph_changed()
         self.update_vname()
         self._log(
             'Interactions with only high-throughput references '
@@ -12842,6 +14591,7 @@ class PyPath(session_mod.Logger):
         self.graph.delete_edges(udedgs)
         zerodeg = [v.index for v in self.graph.vs if v.degree() == 0]
         self.graph.delete_vertices(zerodeg)
+        self._graph_changed()
         self.update_vname()
         self._log(
             'Undirected interactions %s have been removed. '
@@ -13901,6 +15651,7 @@ class PyPath(session_mod.Logger):
         )
 
         graph.delete_vertices(delete_vids)
+        self._graph_changed(graph = graph)
 
         self._log(
             'Number of nodes reduced from %u to %u after '
@@ -13938,6 +15689,7 @@ class PyPath(session_mod.Logger):
         ]
 
         graph.vs['name'] = new_names
+        self._graph_changed(graph = graph)
 
         self._log(
             '%u nodes renamed to the name of the first ortholog. '
@@ -14295,7 +16047,14 @@ class PyPath(session_mod.Logger):
     homology_translation = orthology_translation
 
 
-    def random_walk_with_return(self, q, graph=None, c=.5, niter=1000):
+    def random_walk_with_return(
+            self,
+            q,
+            graph = None,
+            c = .5,
+            niter = 1000,
+            tol = 1e-10,
+        ):
         """
         Random walk with return (RWR) starting from one or more query nodes.
         Returns affinity (probability) vector of all nodes in the graph.
@@ -14309,7 +16068,10 @@ class PyPath(session_mod.Logger):
             :param float c:
                 Probability of restart.
             :param int niter:
-                Number of iterations.
+                Maximum number of iterations.
+            :param float tol:
+                The iteration stops when the largest change of the
+                probabilities is below this value.
 
         Example:
         --------
@@ -14329,41 +16091,125 @@ class PyPath(session_mod.Logger):
             >>> igraph.plot(pa.graph, vertex_color = colors)
         """
 
-        graph = graph or self._get_directed()
-
-        if not graph.is_directed():
-            sys.stdout.write('\t:: Warning: undirected graph provided\n')
-
         # making q a set of vertex IDs
         q = (q if type(q) is set else set(q) if type(q) is list else {q}
              if type(q) is int else None)
 
         if not q:
             sys.stdout.write('\t:: Warning: no starting node(s)\n')
-            return np.array([0.] * graph.vcount())
 
-        # probability per start node
-        cp = c / len(q)
-        # vector with restarting at starting nodes and 0 at all other nodes
-        _q = np.array([cp if v in q else .0 for v in xrange(graph.vcount())])
+        return self.random_walk_with_return_batch(
+            queries = [q or set()],
+            graph = graph,
+            c = c,
+            niter = niter,
+            tol = tol,
+        )[:,0]
+
+    def random_walk_with_return_batch(
+            self,
+            queries,
+            graph = None,
+            c = .5,
+            niter = 1000,
+            tol = 1e-10,
+        ):
+        """
+        Random walk with return for many queries at once. The probability
+        vectors of all queries are propagated together as columns of one
+        matrix, using a sparse transition matrix.
+
+        Args:
+        -----
+            :param list queries:
+                List of sets or lists of vertex IDs, each is one query.
+            :param igraph.Graph graph:
+                An `igraph.Graph` object.
+            :param float c:
+                Probability of restart.
+            :param int niter:
+                Maximum number of iterations.
+            :param float tol:
+                The iteration stops when the largest change of the
+                probabilities is below this value.
+
+        Returns an array of shape (number of vertices, number of queries),
+        with one affinity column for each query.
+        """
+
+        graph = graph or self._get_directed()
+
+        if not graph.is_directed():
+            sys.stdout.write('\t:: Warning: undirected graph provided\n')
+
+        A = self._rwr_transition_matrix(graph)
+
+        # matrix with restarting at starting nodes and 0 at all other nodes
+        # one column for each query, the probability per start node is
+        # the restart probability divided by the number of start nodes
+        _q = np.zeros((graph.vcount(), len(queries)), dtype = np.float64)
+
+        for i, q in enumerate(queries):
+
+            q = list(q)
 
-        # vector of probabilities;
+            if q:
+
+                _q[q, i] = c / len(q)
+
+        # matrix of probabilities;
         # this will be subject of iteration
         # and its final state will be the result
-        _p = modcopy.copy(_q)
+        _p = _q.copy()
 
-        # transition matrix
-        __A = np.array(list(graph.get_adjacency()), dtype=np.float64).T
-        __A = np.nan_to_num(__A / __A.sum(0), copy=False)
+        # iteration converges to affinity vectors
+        for _ in xrange(niter):
 
-        #return __A, _p, _q
+            _p_prev = _p
+            _p = (1. - c) * A.dot(_p) + _q
 
-        # iteration converges to affinity vector
-        for _ in xrange(niter):
-            _p = (1. - c) * __A.dot(_p) + _q
+            if _p.size and np.abs(_p - _p_prev).max() < tol:
+
+                break
 
         return _p
 
+    def _rwr_transition_matrix(self, graph):
+        """
+        Returns the column normalized sparse transition matrix of a graph.
+        The matrix of the last graph is cached until the graph changes.
+        """
+
+        key = self._graph_key(graph)
+        cached = getattr(self, '_rwr_cache', None)
+
+        if cached and cached[0] is graph and cached[1] == key:
+
+            return cached[2]
+
+        edges = np.array(graph.get_edgelist(), dtype = np.int64)
+        edges.shape = (len(edges), 2)
+
+        if not graph.is_directed():
+
+            edges = np.vstack((edges, edges[:,::-1]))
+
+        # element (i, j) is the number of edges from j to i
+        A = scipy.sparse.coo_matrix(
+            (
+                np.ones(len(edges), dtype = np.float64),
+                (edges[:,1], edges[:,0]),
+            ),
+            shape = (graph.vcount(), graph.vcount()),
+        ).tocsr()
+        out_degree = np.asarray(A.sum(0)).ravel()
+        out_degree[out_degree == 0] = 1.
+        A = A.multiply(1. / out_degree).tocsr()
+
+        self._rwr_cache = (graph, key, A)
+
+        return A
+
     def random_walk_with_return2(self, q, c=.5, niter=1000):
         """
         Literally does random walks.
@@ -14599,3 +16445,18 @@ class PyPath(session_mod.Logger):
         """
 
         pypath.license()
+
+
+def _read_resource(args):
+    """
+    Reads and ID translates the network data of one resource in a worker
+    process of ``PyPath.load_resources``. Returns the name of the resource
+    and the edge list.
+    """
+
+    param, ncbi_tax_id, cache_dir, read_args = args
+
+    pa = PyPath(ncbi_tax_id = ncbi_tax_id, cache_dir = cache_dir)
+    pa.read_data_file(param, **read_args)
+
+    return param.name, pa.raw_data
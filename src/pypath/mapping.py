@@ -31,6 +31,10 @@ import itertools
 import collections
 import datetime
 import time
+import mmap
+import array
+import struct
+import shelve
 
 import urllib
 
@@ -88,6 +92,315 @@ MappingTableKey = collections.namedtuple(
 MappingTableKey.__new__.__defaults__ = ('protein', 9606)
 
 
+class MmapMappingData(object):
+    """
+    Read only, dict like access to ID translation data stored in a compact
+    binary file which is opened by ``mmap``. The file contains the sorted
+    array of the keys, the unique values in a string pool and offset arrays
+    pointing from each key to its values. Lookups are binary searches, only
+    the pages actually used are loaded into the memory. The arrays are
+    in native byte order as the cache is not shared between machines.
+
+    The file is opened at the first access and can be closed (unmapped)
+    any time by ``close``, then it will be opened again at the next access.
+
+    :arg str path:
+        Path to the file written by ``MmapMappingData.write``.
+    """
+
+    _magic = b'PYPMAP01'
+    # magic, number of keys, unique values, key-value pairs
+    # and the size of the key and value pools
+    _header = struct.Struct('<8s5Q')
+
+    def __init__(self, path):
+
+        self.path = path
+        self._mmap = None
+
+
+    @classmethod
+    def write(cls, path, data):
+        """
+        Writes a dict of sets into a file in the compact format.
+
+        :arg str path:
+            Path to the file.
+        :arg dict data:
+            Keys are strings, values are sets of strings.
+        """
+
+        keys = sorted(
+            (key.encode('utf-8'), key)
+            for key in data.keys()
+        )
+        values = sorted(set(itertools.chain(*data.values())))
+        value_ids = dict((value, i) for i, value in enumerate(values))
+        key_pool = b''.join(key for key, _ in keys)
+        value_pool = [value.encode('utf-8') for value in values]
+        key_offsets = cls._offsets(len(key) for key, _ in keys)
+        value_offsets = cls._offsets(len(value) for value in value_pool)
+        value_pool = b''.join(value_pool)
+        ref_offsets = cls._offsets(len(data[key]) for _, key in keys)
+        refs = array.array(
+            'I',
+            (
+                value_ids[value]
+                for _, key in keys
+                for value in sorted(data[key])
+            )
+        )
+
+        if len(refs) % 2:
+
+            # padding to keep the 8 bytes alignment
+            refs.append(0)
+
+        with cache_mod.atomic_write(path) as fp:
+
+            fp.write(
+                cls._header.pack(
+                    cls._magic,
+                    len(keys),
+                    len(values),
+                    len(refs),
+                    len(key_pool),
+                    len(value_pool),
+                )
+            )
+
+            for arr in (key_offsets, ref_offsets, refs, value_offsets):
+
+                fp.write(arr.tobytes())
+
+            fp.write(key_pool)
+            fp.write(value_pool)
+
+
+    @staticmethod
+    def _offsets(sizes):
+
+        offsets = array.array('Q', [0])
+
+        for size in sizes:
+
+            offsets.append(offsets[-1] + size)
+
+        return offsets
+
+
+    @staticmethod
+    def writable(data):
+        """
+        Tells if a dict can be written in this format, i.e. all keys
+        and values are strings.
+        """
+
+        return all(
+            isinstance(key, common.basestring) and
+            all(isinstance(value, common.basestring) for value in values)
+            for key, values in iteritems(data)
+        )
+
+
+    def open(self):
+
+        if self._mmap is not None:
+
+            return
+
+        with open(self.path, 'rb') as fp:
+
+            self._mmap = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+
+        (
+            magic,
+            self._n_keys,
+            self._n_values,
+            n_refs,
+            key_pool_size,
+            value_pool_size,
+        ) = self._header.unpack_from(self._mmap, 0)
+
+        if magic != self._magic:
+
+            self.close()
+
+            raise ValueError(
+                'Not a compact mapping table file: `%s`.' % self.path
+            )
+
+        offset = self._header.size
+        arrays = []
+        buff = memoryview(self._mmap)
+
+        for count, typecode in (
+            (self._n_keys + 1, 'Q'),
+            (self._n_keys + 1, 'Q'),
+            (n_refs + n_refs % 2, 'I'),
+            (self._n_values + 1, 'Q'),
+        ):
+
+            size = count * struct.calcsize(typecode)
+            arrays.append(buff[offset:offset + size].cast(typecode))
+            offset += size
+
+        buff.release()
+
+        (
+            self._key_offsets,
+            self._ref_offsets,
+            self._refs,
+            self._value_offsets,
+        ) = arrays
+        self._key_pool = offset
+        self._value_pool = offset + key_pool_size
+
+
+    def close(self):
+        """
+        Unmaps the file. It will be opened again at the next access.
+        """
+
+        if self._mmap is not None:
+
+            # the views must be released before closing the mmap
+            for attr in (
+                '_key_offsets',
+                '_ref_offsets',
+                '_refs',
+                '_value_offsets',
+            ):
+
+                getattr(self, attr).release()
+                setattr(self, attr, None)
+
+            self._mmap.close()
+            self._mmap = None
+
+
+    def _key(self, i):
+
+        return self._mmap[
+            self._key_pool + self._key_offsets[i]:
+            self._key_pool + self._key_offsets[i + 1]
+        ]
+
+
+    def _value(self, i):
+
+        return self._mmap[
+            self._value_pool + self._value_offsets[i]:
+            self._value_pool + self._value_offsets[i + 1]
+        ].decode('utf-8')
+
+
+    def _index(self, key):
+
+        if not isinstance(key, common.basestring):
+
+            return None
+
+        self.open()
+        key = key.encode('utf-8')
+        lo = 0
+        hi = self._n_keys
+
+        # binary search among the sorted keys
+        while lo < hi:
+
+            mid = (lo + hi) // 2
+
+            if self._key(mid) < key:
+
+                lo = mid + 1
+
+            else:
+
+                hi = mid
+
+        if lo < self._n_keys and self._key(lo) == key:
+
+            return lo
+
+
+    def _values(self, i):
+
+        return set(
+            self._value(j)
+            for j in self._refs[self._ref_offsets[i]:self._ref_offsets[i + 1]]
+        )
+
+
+    def __getitem__(self, key):
+
+        i = self._index(key)
+
+        if i is None:
+
+            raise KeyError(key)
+
+        return self._values(i)
+
+
+    def get(self, key, default = None):
+
+        i = self._index(key)
+
+        return default if i is None else self._values(i)
+
+
+    def __contains__(self, key):
+
+        return self._index(key) is not None
+
+
+    def __len__(self):
+
+        self.open()
+
+        return self._n_keys
+
+
+    def __iter__(self):
+
+        self.open()
+
+        for i in xrange(self._n_keys):
+
+            yield self._key(i).decode('utf-8')
+
+
+    def keys(self):
+
+        return iter(self)
+
+
+    def items(self):
+
+        self.open()
+
+        for i in xrange(self._n_keys):
+
+            yield self._key(i).decode('utf-8'), self._values(i)
+
+
+    def __getstate__(self):
+
+        return {'path': self.path}
+
+
+    def __setstate__(self, state):
+
+        self.path = state['path']
+        self._mmap = None
+
+
+    def __del__(self):
+
+        self.close()
+
+
 class MapReader(session_mod.Logger):
     """
     Reads ID translation data and creates ``MappingTable`` instances.
@@ -237,7 +550,7 @@ class MapReader(session_mod.Logger):
         id_type = getattr(self, 'id_type_%s' % args[0])
         target_id_type = getattr(self, 'id_type_%s' % args[1])
 
-        if isinstance(data, dict):
+        if isinstance(data, (dict, MmapMappingData)):
 
             return MappingTable(
                 data = data,
@@ -278,7 +591,35 @@ class MapReader(session_mod.Logger):
 
             self._remove_cache_file(*args)
 
-            pickle.dump(data, open(cachefile, 'wb'))
+            if (
+                settings.get('mapping_cache_format') == 'mmap' and
+                MmapMappingData.writable(data)
+            ):
+
+                self._write_mmap_cache(data, *args)
+
+            else:
+
+                with cache_mod.atomic_write(cachefile) as fp:
+
+                    pickle.dump(data, fp)
+
+                cache_mod.register_read(cachefile)
+
+
+    def _write_mmap_cache(self, data, *args):
+        """
+        Writes the table into the compact format and replaces the dict
+        in the memory by the memory mapped file.
+        """
+
+        mmapfile = self._attr('cachefile', *args) + '.mmap'
+
+        self._log('Writing mapping table to compact file `%s`.' % mmapfile)
+
+        MmapMappingData.write(mmapfile, data)
+        cache_mod.register_read(mmapfile)
+        setattr(self, '%s_to_%s' % args, MmapMappingData(mmapfile))
 
 
     def read_cache(self):
@@ -295,9 +636,25 @@ class MapReader(session_mod.Logger):
         if self._to_be_loaded(*args):
 
             cachefile = self._attr('cachefile', *args)
+            mmapfile = cachefile + '.mmap'
+            use_mmap = settings.get('mapping_cache_format') == 'mmap'
 
-            if os.path.exists(cachefile):
+            if use_mmap and os.path.exists(mmapfile):
 
+                cache_mod.register_read(mmapfile)
+                setattr(self, '%s_to_%s' % args, MmapMappingData(mmapfile))
+                self._log(
+                    'Loading `%s` to `%s` mapping table '
+                    'from compact file `%s`.' % (
+                        self.param.id_type_a,
+                        self.param.id_type_b,
+                        mmapfile,
+                    )
+                )
+
+            elif os.path.exists(cachefile):
+
+                cache_mod.register_read(cachefile)
                 setattr(
                     self,
                     '%s_to_%s' % args,
@@ -312,6 +669,17 @@ class MapReader(session_mod.Logger):
                     )
                 )
 
+                data = getattr(self, '%s_to_%s' % args)
+
+                if use_mmap and data and MmapMappingData.writable(data):
+
+                    # migrating the pickle to the compact format
+                    self._write_mmap_cache(data, *args)
+                    self._log(
+                        'Removing mapping table cache file `%s`.' % cachefile
+                    )
+                    os.remove(cachefile)
+
 
     def _to_be_loaded(self, *args):
 
@@ -419,10 +787,12 @@ class MapReader(session_mod.Logger):
 
         cachefile = self._attr('cachefile', *args)
 
-        if os.path.exists(cachefile):
+        for path in (cachefile, cachefile + '.mmap'):
+
+            if os.path.exists(path):
 
-            self._log('Removing mapping table cache file `%s`.' % cachefile)
-            os.remove(cachefile)
+                self._log('Removing mapping table cache file `%s`.' % path)
+                os.remove(path)
 
 
     def read_mapping_file(self):
@@ -446,8 +816,9 @@ class MapReader(session_mod.Logger):
 
         else:
 
+            cache_mod.register_read(self.param.input)
             infile = open(self.param.input, encoding = 'utf-8', mode = 'r')
-            total = os.path.getsize(param.input)
+            total = os.path.getsize(self.param.input)
 
         a_to_b = collections.defaultdict(set)
         b_to_a = collections.defaultdict(set)
@@ -797,6 +1168,197 @@ class MappingTable(session_mod.Logger):
         return 'MappingTable from=`%s`, to=`%s`, taxon=`%u`' % self.key
 
 
+class MapNameMemo(session_mod.Logger):
+    """
+    Size bounded, least recently used memo for the results of
+    ``Mapper.map_name``. Optionally all results are written also to an
+    on-disk key-value store (``shelve``) in the cache directory, this way
+    they are available in later sessions.
+
+    The memo is invalidated if any of the mapping table cache files it
+    depends on has changed. The modification times and sizes of these
+    files are registered by ``track`` and stored in the on-disk store too.
+
+    :arg int size:
+        Maximum number of results kept in the memory.
+    :arg str path:
+        Path to the on-disk store. If `None` the memo is kept only in
+        the memory.
+    """
+
+    _files_key = '__files__'
+
+    def __init__(self, size = 100000, path = None):
+
+        session_mod.Logger.__init__(self, name = 'mapping')
+
+        self.size = size
+        self.path = path
+        self.data = collections.OrderedDict()
+        self.files = {}
+        self.hits = 0
+        self.misses = 0
+        self.store = None
+
+        if self.path:
+
+            self.store = shelve.open(self.path)
+            self.files = self.store.get(self._files_key, {})
+
+            changed = [
+                path
+                for path, stamp in iteritems(self.files)
+                if self._stamp(path) != stamp
+            ]
+
+            if changed:
+
+                self._log(
+                    'Mapping table cache files changed, '
+                    'invalidating memo: %s' % ', '.join(changed)
+                )
+                self.clear()
+
+
+    @staticmethod
+    def key(name, id_type, target_id_type, ncbi_tax_id, strict,
+            expand_complexes):
+
+        return json.dumps(
+            (
+                name,
+                id_type,
+                target_id_type,
+                ncbi_tax_id,
+                bool(strict),
+                bool(expand_complexes),
+            )
+        )
+
+
+    @staticmethod
+    def _stamp(path):
+
+        for _path in (path, '%s.mmap' % path):
+
+            if os.path.exists(_path):
+
+                stat = os.stat(_path)
+
+                return [stat.st_mtime, stat.st_size]
+
+
+    def get(self, key):
+        """
+        Returns a copy of the result stored under ``key`` or `None` if
+        it is not in the memo.
+        """
+
+        if key in self.data:
+
+            self.data.move_to_end(key)
+            self.hits += 1
+
+            return set(self.data[key])
+
+        if self.store is not None and key in self.store:
+
+            result = self.store[key]
+            self._add(key, result)
+            self.hits += 1
+
+            return set(result)
+
+        self.misses += 1
+
+
+    def set(self, key, result):
+
+        result = set(result)
+        self._add(key, result)
+
+        # failed translations are kept only for the current session,
+        # these might be only due to temporary errors
+        if self.store is not None and result:
+
+            self.store[key] = result
+
+
+    def _add(self, key, result):
+
+        self.data[key] = result
+
+        if len(self.data) > self.size:
+
+            self.data.popitem(last = False)
+
+
+    def track(self, path):
+        """
+        Registers a mapping table cache file. If the file is already
+        known but has been modified, the memo is invalidated.
+        """
+
+        stamp = self._stamp(path)
+
+        if path in self.files and self.files[path] != stamp:
+
+            self._log(
+                'Mapping table cache file `%s` changed, '
+                'invalidating memo.' % path
+            )
+            self.clear()
+
+        self.files[path] = stamp
+
+        if self.store is not None:
+
+            self.store[self._files_key] = self.files
+
+
+    def clear(self):
+
+        self.data = collections.OrderedDict()
+        self.files = {}
+
+        if self.store is not None:
+
+            self.store.clear()
+
+
+    def close(self):
+
+        if self.store is not None:
+
+            self.store.close()
+            self.store = None
+
+
+    def sync(self):
+        """
+        Writes the pending changes to the on-disk store.
+        """
+
+        if self.store is not None:
+
+            self.store.sync()
+
+
+    def detach(self):
+        """
+        Stops using the on-disk store without writing to it. For forked
+        processes which inherited the store from their parent: only one
+        process should write the store.
+        """
+
+        self.store = None
+
+
+    def __len__(self):
+
+        return len(self.data)
+
+
 class Mapper(session_mod.Logger):
 
 
@@ -805,6 +1367,7 @@ class Mapper(session_mod.Logger):
             ncbi_tax_id = None,
             cleanup_period = 10,
             lifetime = 300,
+            memo = None,
         ):
         """
         cleanup_period : int
@@ -813,6 +1376,9 @@ class Mapper(session_mod.Logger):
         lifetime : int
             If a table has not been used for longer than this preiod it is
             to be removed at next cleanup.
+        memo : bool
+            Keep the results of ``map_name`` in a memo. If `None` the
+            ``mapping_memo`` setting is used.
         """
 
         session_mod.Logger.__init__(self, name = 'mapping')
@@ -872,6 +1438,22 @@ class Mapper(session_mod.Logger):
         self.names_uniprot_static = (
             common.swap_dict_simple(self.uniprot_static_names)
         )
+        self.memo = (
+            MapNameMemo(
+                size = settings.get('mapping_memo_size'),
+                path = (
+                    settings.get('mapping_memo_cache')
+                        if settings.get('mapping_memo_persistent') else
+                    None
+                ),
+            )
+                if (
+                    settings.get('mapping_memo')
+                        if memo is None else
+                    memo
+                ) else
+            None
+        )
 
 
     def reload(self):
@@ -1024,6 +1606,7 @@ class Mapper(session_mod.Logger):
                         uniprots = None,
                         lifetime = 300,
                     )
+                    self._memo_track(reader)
                     
                     self.tables[tbl_key] = getattr(
                         reader,
@@ -1179,6 +1762,62 @@ class Mapper(session_mod.Logger):
 
         ncbi_tax_id = ncbi_tax_id or self.ncbi_tax_id
 
+        memo_key = (
+            self.memo.key(
+                name,
+                id_type,
+                target_id_type,
+                ncbi_tax_id,
+                strict,
+                expand_complexes,
+            )
+                if (
+                    self.memo is not None and
+                    isinstance(name, common.basestring) and
+                    isinstance(id_type, common.basestring)
+                ) else
+            None
+        )
+
+        if memo_key is not None:
+
+            mapped_names = self.memo.get(memo_key)
+
+            if mapped_names is not None:
+
+                return mapped_names
+
+        mapped_names = self._translate_name(
+            name = name,
+            id_type = id_type,
+            target_id_type = target_id_type,
+            ncbi_tax_id = ncbi_tax_id,
+            strict = strict,
+            silent = silent,
+            expand_complexes = expand_complexes,
+        )
+
+        if memo_key is not None:
+
+            self.memo.set(memo_key, mapped_names)
+
+        return mapped_names
+
+
+    def _translate_name(
+            self,
+            name,
+            id_type,
+            target_id_type,
+            ncbi_tax_id,
+            strict = False,
+            silent = True,
+            expand_complexes = True,
+        ):
+        """
+        Does the actual work for ``map_name``, without the memo.
+        """
+
         # we support translating from more name types
         # at the same time
         if isinstance(id_type, (list, set, tuple)):
@@ -1363,6 +2002,35 @@ class Mapper(session_mod.Logger):
         return mapped_names
 
 
+    def _memo_track(self, reader):
+        """
+        Registers the cache files of a ``MapReader`` in the memo.
+        """
+
+        if self.memo is not None:
+
+            for args in (('a', 'b'), ('b', 'a')):
+
+                if reader._to_be_loaded(*args):
+
+                    self.memo.track(reader._attr('cachefile', *args))
+
+
+    def memo_stats(self):
+        """
+        Returns the number of hits and misses and the current size of the
+        ``map_name`` memo. Returns `None` if the memo is disabled.
+        """
+
+        if self.memo is not None:
+
+            return {
+                'hits': self.memo.hits,
+                'misses': self.memo.misses,
+                'size': len(self.memo),
+            }
+
+
     def map_names(
             self,
             names,
@@ -1395,6 +2063,259 @@ class Mapper(session_mod.Logger):
         )
 
 
+    def map_names_bulk(
+            self,
+            names,
+            id_type = None,
+            target_id_type = None,
+            ncbi_tax_id = None,
+            strict = False,
+            silent = True,
+            expand_complexes = True,
+        ):
+        """
+        Translates many IDs at once. Gives the same result as calling
+        ``map_name`` for each of the names but the names are deduplicated
+        first and each fallback step (upper, capitalized and lowercase
+        names, gene symbol synonyms, etc) is done for the subset of names
+        remained unresolved, looking up the mapping table only once for
+        each step.
+
+        names : iterable
+            The names to be translated, e.g. a list or a numpy array.
+
+        Returns a dict with the original names as keys and sets of
+        the target IDs as values.
+        """
+
+        ncbi_tax_id = ncbi_tax_id or self.ncbi_tax_id
+        names = set(names)
+
+        if isinstance(id_type, (list, set, tuple)):
+
+            result = dict((name, set()) for name in names)
+
+            for this_id_type in id_type:
+
+                for name, mapped_names in iteritems(
+                    self.map_names_bulk(
+                        names = names,
+                        id_type = this_id_type,
+                        target_id_type = target_id_type,
+                        ncbi_tax_id = ncbi_tax_id,
+                        strict = strict,
+                        silent = silent,
+                        expand_complexes = expand_complexes,
+                    )
+                ):
+
+                    result[name].update(mapped_names)
+
+            return result
+
+        result = {}
+
+        def lookup(names, _id_type, method = None):
+            # looks up the names not resolved yet in one table
+
+            names = [name for name in names if not result.get(name)]
+
+            if not names:
+
+                return
+
+            tbl = self.which_table(
+                _id_type,
+                target_id_type,
+                ncbi_tax_id = ncbi_tax_id,
+            )
+
+            for name in names:
+
+                result[name] = (
+                    tbl[method(name) if method else name]
+                        if tbl else
+                    set()
+                )
+
+        # complexes
+        complexes = set(name for name in names if hasattr(name, 'components'))
+
+        for name in complexes:
+
+            result[name] = (
+                set(name.components.keys())
+                    if expand_complexes else
+                {name}
+            )
+
+        names = names - complexes
+        memo_keys = {}
+
+        if (
+            self.memo is not None and
+            (id_type != target_id_type or target_id_type == 'uniprot')
+        ):
+
+            for name in names:
+
+                if isinstance(name, common.basestring):
+
+                    key = self.memo.key(
+                        name,
+                        id_type,
+                        target_id_type,
+                        ncbi_tax_id,
+                        strict,
+                        expand_complexes,
+                    )
+                    mapped_names = self.memo.get(key)
+
+                    if mapped_names is None:
+
+                        memo_keys[name] = key
+
+                    else:
+
+                        result[name] = mapped_names
+
+            names = names - set(result.keys())
+
+        if id_type == target_id_type:
+
+            for name in names:
+
+                result[name] = {name}
+
+            if target_id_type != 'uniprot':
+
+                return result
+
+        elif id_type.startswith('refseq'):
+
+            for name in names:
+
+                result[name] = self._map_refseq(
+                    refseq = name,
+                    id_type = id_type,
+                    target_id_type = target_id_type,
+                    ncbi_tax_id = ncbi_tax_id,
+                    strict = strict,
+                )
+
+        else:
+
+            lookup(names, id_type)
+
+        # further attempts for the ones not resolved yet,
+        # just like in `map_name`
+        lookup(names, id_type, lambda name: name.upper())
+
+        if id_type not in {'uniprot', 'trembl', 'uniprot-sec'}:
+
+            lookup(names, id_type, lambda name: name.capitalize())
+            lookup(names, id_type, lambda name: name.lower())
+
+        if id_type == 'genesymbol':
+
+            lookup(names, 'genesymbol-syn')
+
+            if not strict:
+
+                lookup(names, 'genesymbol', lambda name: '%s1' % name)
+                lookup(names, 'genesymbol5')
+
+        if id_type == 'mir-mat-name':
+
+            lookup(names, 'mir-name')
+
+        if target_id_type == 'uniprot':
+
+            mapped = dict((name, result[name]) for name in names)
+            self._uniprot_bulk(mapped, ncbi_tax_id = ncbi_tax_id)
+
+            result.update(
+                (
+                    name,
+                    {u for u in mapped[name] if self.reuniprot.match(u)}
+                )
+                for name in names
+            )
+
+        for name, key in iteritems(memo_keys):
+
+            self.memo.set(key, result[name])
+
+        return result
+
+
+    def _uniprot_bulk(self, mapped, ncbi_tax_id = None):
+        """
+        Does the ``primary_uniprot`` and ``trembl_swissprot`` steps of
+        ``map_name`` for all the translated names at once.
+
+        mapped : dict
+            Original names as keys and sets of UniProt IDs as values.
+            The values will be replaced by the results.
+        """
+
+        ncbi_tax_id = ncbi_tax_id or self.ncbi_tax_id
+        uniprots = set(itertools.chain(*mapped.values()))
+
+        primaries = self.map_names_bulk(
+            names = uniprots,
+            id_type = 'uniprot-sec',
+            target_id_type = 'uniprot-pri',
+            ncbi_tax_id = 0,
+        )
+        primaries = dict(
+            (uniprot, primary or {uniprot})
+            for uniprot, primary in iteritems(primaries)
+        )
+
+        uniprots = set(itertools.chain(*primaries.values()))
+        genesymbols = self.map_names_bulk(
+            names = uniprots,
+            id_type = 'trembl',
+            target_id_type = 'genesymbol',
+            ncbi_tax_id = ncbi_tax_id,
+        )
+        swissprots_by_genesymbol = self.map_names_bulk(
+            names = set(itertools.chain(*genesymbols.values())),
+            id_type = 'genesymbol',
+            target_id_type = 'swissprotissprot',
+            ncbi_tax_id = ncbi_tax_id,
+        )
+        swissprots = {}
+
+        for uniprot in uniprots:
+
+            swissprot = []
+
+            # only the last gene symbol counts, as in `trembl_swissprot`
+            for genesymbol in genesymbols[uniprot]:
+
+                swissprot = swissprots_by_genesymbol[genesymbol]
+
+            swissprots[uniprot] = swissprot or {uniprot}
+
+        for name, orig in iteritems(mapped):
+
+            mapped_names = set(
+                itertools.chain(*(
+                    swissprots[primary]
+                    for uniprot in orig
+                    for primary in primaries[uniprot]
+                ))
+            )
+
+            if orig - mapped_names:
+
+                self.uniprot_mapped.append((orig, mapped_names))
+
+            mapped[name] = mapped_names
+
+
     def _map_refseq(
             self,
             refseq,
@@ -1596,6 +2517,7 @@ class Mapper(session_mod.Logger):
         )
 
         reader = MapReader(param = resource, **kwargs)
+        self._memo_track(reader)
 
         a_to_b = reader.mapping_table_a_to_b
         b_to_a = reader.mapping_table_b_to_a
@@ -1718,6 +2640,7 @@ class Mapper(session_mod.Logger):
 
             if os.path.exists(cachefile):
 
+                cache_mod.register_read(cachefile)
                 data[key] = pickle.load(open(cachefile, 'rb'))
 
             else:
@@ -1737,10 +2660,16 @@ class Mapper(session_mod.Logger):
             )
 
             id_type_b = 'uniprot'
+            pos = 0
 
-            for line in c.result:
+            for i, line in enumerate(c.result):
 
-                prg.step(len(line))
+                # the progress is measured in compressed bytes
+                if not i % 10000:
+
+                    new_pos = c.tell()
+                    prg.step(new_pos - pos)
+                    pos = new_pos
 
                 line = line.decode('ascii').strip().split('\t')
 
@@ -1775,7 +2704,9 @@ class Mapper(session_mod.Logger):
 
             for key, this_data in iteritems(data):
 
-                pickle.dump(this_data, open(cache_files[key], 'wb'))
+                with cache_mod.atomic_write(cache_files[key]) as fp:
+
+                    pickle.dump(this_data, fp)
 
         for key, this_data in iteritems(data):
 
@@ -1839,6 +2770,10 @@ class Mapper(session_mod.Logger):
 
     def __del__(self):
         
+        if getattr(self, 'memo', None) is not None:
+            
+            self.memo.close()
+        
         if hasattr(self._mapper_cleanup_timeloop, 'stop'):
             
             for job in self._mapper_cleanup_timeloop.jobs:
@@ -1867,6 +2802,35 @@ def get_mapper(**kwargs):
     return globals()['mapper']
 
 
+def sync_memo():
+    """
+    Writes the pending changes of the ``map_name`` memo to the disk,
+    should be called before forking worker processes.
+    """
+
+    memo = get_mapper().memo
+
+    if memo is not None:
+
+        memo.sync()
+
+
+def detach_memo():
+    """
+    For worker processes: the persistent memo of ``map_name`` is
+    switched off and the store inherited from the parent is detached,
+    the results are kept only in the memory. Only the main process
+    writes the on-disk memo.
+    """
+
+    settings.setup(mapping_memo_persistent = False)
+    memo = get_mapper().memo
+
+    if memo is not None:
+
+        memo.detach()
+
+
 def map_name(
         name,
         id_type,
@@ -1944,6 +2908,29 @@ def map_names(
     )
 
 
+def map_names_bulk(
+        names,
+        id_type = None,
+        target_id_type = None,
+        ncbi_tax_id = None,
+        strict = False,
+        silent = True,
+        expand_complexes = True,
+    ):
+
+    mapper = get_mapper()
+
+    return mapper.map_names_bulk(
+        names = names,
+        id_type = id_type,
+        target_id_type = target_id_type,
+        ncbi_tax_id = ncbi_tax_id,
+        strict = strict,
+        silent = silent,
+        expand_complexes = expand_complexes,
+    )
+
+
 def label(name):
     """
     For any kind of entity, either protein, miRNA or protein complex,
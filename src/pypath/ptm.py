@@ -23,8 +23,10 @@ from past.builtins import xrange, range
 
 import sys
 import imp
+import time
 import itertools
 import pickle
+import multiprocessing
 
 import pandas as pd
 
@@ -35,6 +37,9 @@ import pypath.homology as homology
 import pypath.uniprot_input as uniprot_input
 import pypath.intera as intera
 import pypath.progress as progress
+import pypath.session_mod as session_mod
+import pypath.settings as settings
+import pypath.cache as cache_mod
 
 
 class PtmProcessor(homology.Proteomes,homology.SequenceContainer):
@@ -560,7 +565,7 @@ class PtmHomologyProcessor(
                     yield tptm
 
 
-class PtmAggregator(object):
+class PtmAggregator(session_mod.Logger):
 
     def __init__(self,
             input_methods = None,
@@ -574,14 +579,21 @@ class PtmAggregator(object):
             nonhuman_direct_lookup = True,
             inputargs = None,
             pickle_file = None,
+            workers = None,
         ):
         """
         Docs not written yet.
+
+        :param int workers:
+            Number of processes processing the inputs. If ``None`` the
+            ``ptm_workers`` setting is used.
         """
         
         for k, v in iteritems(locals()):
             setattr(self, k, v)
         
+        session_mod.Logger.__init__(self, name = 'ptm')
+        
         self.main()
     
     
@@ -607,6 +619,8 @@ class PtmAggregator(object):
     
     def load_from_pickle(self):
         
+        cache_mod.register_read(self.pickle_file)
+        
         with open(self.pickle_file, 'rb') as fp:
             
             self.enz_sub = pickle.load(fp)
@@ -614,7 +628,7 @@ class PtmAggregator(object):
     
     def save_to_pickle(self, pickle_file):
         
-        with open(pickle_file, 'wb') as fp:
+        with cache_mod.atomic_write(pickle_file) as fp:
             
             pickle.dump(
                 obj = self.enz_sub,
@@ -667,6 +681,10 @@ class PtmAggregator(object):
         This 'full list' is organised into a dict by pairs of proteins
         in order to make it more efficient to compile a unique set
         for each pair.
+        The inputs are processed in `workers` processes, then the results
+        are added to the list in the same order as by serial processing.
+        The time and the number of records for each input are stored
+        in `input_stats`.
         """
 
         def extend_lists(ptms):
@@ -682,6 +700,10 @@ class PtmAggregator(object):
                 self.enz_sub[key].append(ptm)
 
         self.enz_sub = {}
+        self.input_stats = []
+        workers = self.workers or settings.get('ptm_workers') or 1
+
+        jobs = []
 
         for input_method in self.input_methods:
 
@@ -690,35 +712,109 @@ class PtmAggregator(object):
                 if input_method in self.inputargs
                 else {}
             )
+            param = dict(
+                input_method = input_method,
+                ncbi_tax_id = self.ncbi_tax_id,
+                trace = self.trace,
+                enzyme_id_type = self.enzyme_id_type,
+                substrate_id_type = self.substrate_id_type,
+            )
 
             if self.ncbi_tax_id == 9606 or self.nonhuman_direct_lookup:
 
-                proc = PtmProcessor(
-                    input_method = input_method,
-                    ncbi_tax_id = self.ncbi_tax_id,
-                    trace = self.trace,
-                    enzyme_id_type = self.enzyme_id_type,
-                    substrate_id_type = self.substrate_id_type,
-                    **inputargs,
+                jobs.append((PtmProcessor, dict(param, **inputargs)))
+
+            if self.map_by_homology_from:
+
+                jobs.append((
+                    PtmHomologyProcessor,
+                    dict(
+                        param,
+                        map_by_homology_from = self.map_by_homology_from,
+                        homology_only_swissprot = (
+                            self.homology_only_swissprot
+                        ),
+                        ptm_homology_strict = self.ptm_homology_strict,
+                        **inputargs
+                    ),
+                ))
+
+        pool = None
+        parallel = [job for job in jobs if self._picklable(job)]
+
+        if workers > 1 and len(parallel) > 1:
+
+            self._log(
+                'Processing %u PTM inputs in %u processes.' % (
+                    len(parallel),
+                    workers,
                 )
+            )
+            mapping.sync_memo()
+            pool = multiprocessing.Pool(
+                processes = workers,
+                initializer = mapping.detach_memo,
+            )
+            results = pool.imap(_process_ptm_input, parallel)
+            parallel = set(id(job) for job in parallel)
 
-                extend_lists(proc.__iter__())
+        try:
 
-            if self.map_by_homology_from:
+            for job in jobs:
 
-                proc = PtmHomologyProcessor(
-                    input_method = input_method,
-                    ncbi_tax_id = self.ncbi_tax_id,
-                    map_by_homology_from = self.map_by_homology_from,
-                    trace = self.trace,
-                    enzyme_id_type = self.enzyme_id_type,
-                    substrate_id_type = self.substrate_id_type,
-                    homology_only_swissprot = self.homology_only_swissprot,
-                    ptm_homology_strict = self.ptm_homology_strict,
-                    **inputargs
+                ptms, elapsed = (
+                    next(results)
+                        if pool is not None and id(job) in parallel else
+                    _process_ptm_input(job)
+                )
+
+                stats = (
+                    job[1]['input_method'],
+                    job[0].__name__,
+                    len(ptms),
+                    elapsed,
+                )
+                self.input_stats.append(stats)
+                self._log(
+                    'PTM input `%s` (%s): %u records in %.02f s.' % stats
                 )
 
-                extend_lists(proc.__iter__())
+                extend_lists(ptms)
+
+            if pool is not None:
+
+                pool.close()
+
+        except:
+
+            if pool is not None:
+
+                pool.terminate()
+
+            raise
+
+        finally:
+
+            if pool is not None:
+
+                pool.join()
+
+
+    @staticmethod
+    def _picklable(job):
+        """
+        Tells if an input can be sent to a worker process.
+        """
+
+        try:
+
+            pickle.dumps(job)
+
+            return True
+
+        except Exception:
+
+            return False
 
 
     def unique(self):
@@ -730,28 +826,93 @@ class PtmAggregator(object):
 
         self.unique_list = set([])
 
+        t0 = time.time()
+        n_ptms = len(self)
+
         for key, ptms in iteritems(self.enz_sub):
 
             self.enz_sub[key] = self.uniq_ptms(ptms)
 
+        self._log(
+            'Merged %u PTM records into %u unique ones '
+            'in %.02f s.' % (n_ptms, len(self), time.time() - t0)
+        )
+
 
     @staticmethod
     def uniq_ptms(ptms):
+        """
+        Merges the equal elements of a list of `intera.DomainMotif`
+        objects. The ones with known residue and modification type and
+        without domain boundaries are merged by looking up their key in
+        a dict. The equality of the rest can not be expressed by a key,
+        these are compared one by one to the unique elements and merged
+        into the first one they are equal with.
+        """
 
         ptms_uniq = []
+        by_key = {}
+        others = []
 
         for ptm in ptms:
-            merged = False
-            for i, ptmu in enumerate(ptms_uniq):
+
+            key = PtmAggregator._ptm_key(ptm)
+
+            if key is None:
+
+                others.append(ptm)
+
+            elif key in by_key:
+
+                by_key[key].merge(ptm)
+
+            else:
+
+                by_key[key] = ptm
+                ptms_uniq.append(ptm)
+
+        for ptm in others:
+
+            for ptmu in ptms_uniq:
+
                 if ptm == ptmu:
-                    ptms_uniq[i].merge(ptm)
-                    merged = True
-            if not merged:
+
+                    ptmu.merge(ptm)
+                    break
+
+            else:
+
                 ptms_uniq.append(ptm)
 
         return ptms_uniq
 
 
+    @staticmethod
+    def _ptm_key(ptm):
+        """
+        Returns a key which is equal for two `intera.DomainMotif` objects
+        if and only if they are equal; or `None` if their equality is
+        not strict: the domain has boundaries or the residue or type of
+        the PTM is unknown.
+        """
+
+        if (
+            (ptm.domain.start and ptm.domain.end) is None and
+            ptm.ptm.residue is not None and
+            ptm.ptm.typ is not None and
+            type(ptm.ptm) is intera.Ptm and
+            type(ptm.ptm.residue) is intera.Residue
+        ):
+
+            return (
+                ptm.ptm.protein,
+                ptm.ptm.residue.protein,
+                ptm.ptm.residue.number,
+                ptm.ptm.residue.name,
+                ptm.ptm.typ,
+            )
+
+
     def make_df(self, tax_id = False):
 
         hdr = ['enzyme', 'substrate', 'isoforms',
@@ -842,6 +1003,21 @@ class PtmAggregator(object):
                 pa.graph.es[e]['ptm'].extend(ptms)
 
 
+def _process_ptm_input(job):
+    """
+    Processes one PTM input, typically in a worker process of
+    `PtmAggregator.build_list`. Returns the list of enzyme-substrate
+    interactions and the time it took.
+    """
+
+    processor, param = job
+    t0 = time.time()
+
+    ptms = list(processor(**param))
+
+    return ptms, time.time() - t0
+
+
 def init_db(**kwargs):
     
     globals()['db'] = PtmAggregator(**kwargs)
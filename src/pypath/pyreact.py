@@ -113,7 +113,6 @@ class BioPaxReader(object):
         self.source = source
         self.file_from_archive = file_from_archive
         self.cleanup_period = cleanup_period
-        self.biopax_tmp_file = None
         self.cachedir = 'cache'
         self.parser_id = common.gen_session_id()
         self.silent = silent
@@ -239,7 +238,6 @@ class BioPaxReader(object):
         self.silent = silent
         self.open_biopax()
         self.biopax_size()
-        self.extract()
         self.set_progress()
         self.init_etree()
         self.iterate()
@@ -254,10 +252,13 @@ class BioPaxReader(object):
         Opens the BioPax file. This method should not be called directly,
         ``BioPaxReader.process()`` calls it.
         """
-        opener_args = {} if self.file_from_archive is None \
-            else {'files_needed': [self.file_from_archive]}
-        if type(self.biopax) is curl.FileOpener:
-            self.opener = biopax
+        # the XML parser reads bytes, the archives are
+        # decompressed on the fly while parsing
+        opener_args = {'default_mode': 'rb'}
+        if self.file_from_archive is not None:
+            opener_args['files_needed'] = [self.file_from_archive]
+        if isinstance(self.biopax, curl.FileOpener):
+            self.opener = self.biopax
         else:
             self.opener = curl.FileOpener(self.biopax, **opener_args)
         if type(self.opener.result) is dict:
@@ -267,45 +268,18 @@ class BioPaxReader(object):
                     sorted(list(self.opener.result.keys()))[0]
             self._biopax = self.opener.result[self.file_from_archive]
         elif self.opener.type == 'gz':
-            self._biopax = self.opener.result
+            self._biopax = self.opener.gzfile
         else:
             self._biopax = self.opener.fileobj
 
     def biopax_size(self):
         """
-        Gets the uncompressed size of the BioPax XML. This is needed in
-        order to have a progress bar. This method should not be called
-        directly, ``BioPaxReader.process()`` calls it.
-        """
-        self.bp_filesize = self.opener.sizes[self.file_from_archive] \
-            if hasattr(self.opener, 'sizes') else self.opener.size
-
-    def extract(self):
-        """
-        Extracts the BioPax file from compressed archive. Creates a
-        temporary file. This is needed to trace the progress of
-        processing, which is useful in case of large files.
-        This method should not be called directly,
+        Gets the size of the BioPax file on the disk (compressed size
+        in case of archives). This is needed in order to have a progress
+        bar. This method should not be called directly,
         ``BioPaxReader.process()`` calls it.
         """
-        if self.opener.type != 'plain':
-            self.biopax_tmp_file = os.path.join(self.cachedir,
-                                                'biopax.processing.tmp.owl')
-            if not self.silent:
-                prg = progress.Progress(
-                    self.bp_filesize, 'Extracting %s from %s compressed file' %
-                    (self.file_from_archive, self.opener.type), 1000000)
-            with open(self.biopax_tmp_file, 'wb') as tmpf:
-                while True:
-                    chunk = self._biopax.read(100000)
-                    if not self.silent:
-                        prg.step(len(chunk))
-                    if not len(chunk):
-                        break
-                    tmpf.write(chunk)
-            self._biopax = open(self.biopax_tmp_file, 'rb')
-            if not self.silent:
-                prg.terminate()
+        self.bp_filesize = os.path.getsize(self.opener.fileobj.name)
 
     def init_etree(self):
         """
@@ -335,11 +309,11 @@ class BioPaxReader(object):
         This method should not be called directly,
         ``BioPaxReader.process()`` calls it.
         """
-        self.fpos = self._biopax.tell()
+        self.fpos = self.opener.tell()
         try:
             for ev, elem in self.bp:
                 # step the progressbar:
-                new_fpos = self._biopax.tell()
+                new_fpos = self.opener.tell()
                 if not self.silent:
                     self.prg.step(new_fpos - self.fpos)
                 self.fpos = new_fpos
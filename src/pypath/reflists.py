@@ -106,6 +106,7 @@ class ReferenceListManager(session_mod.Logger):
         
         if os.path.exists(cachefile):
             
+            cache_mod.register_read(cachefile)
             self.lists[key] = pickle.load(open(cachefile, 'rb'))
             
             self._log(
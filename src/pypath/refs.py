@@ -33,6 +33,7 @@ import pypath.common as common
 import pypath.urls as urls
 import pypath.dataio as dataio
 import pypath.settings as settings
+import pypath.cache as cache_mod
 
 
 class Reference(object):
@@ -180,6 +181,7 @@ def get_pubmed_data(
     if os.path.exists(cachefile):
         sys.stdout.write('\t:: Loading data previously downloaded '
                          'from PubMed, from file `%s`\n' % cachefile)
+        cache_mod.register_read(cachefile)
         pmdata = pickle.load(open(cachefile, 'rb'))
 
     missing = list(set(pubmeds) - set(pmdata.keys()))
@@ -29,6 +29,7 @@ except:
 import pypath.dataio as dataio
 import pypath.common as common
 import pypath.session_mod as session_mod
+import pypath.cache as cache_mod
 
 
 class AbstractResource(session_mod.Logger):
@@ -137,6 +138,8 @@ class AbstractResource(session_mod.Logger):
                 os.path.exists(self.dump)
             ):
                 
+                cache_mod.register_read(self.dump)
+                
                 with open(self.dump, 'rb') as fp:
                     
                     self._from_dump = pickle.load(fp)
@@ -19,6 +19,7 @@
 #
 
 from future.utils import iteritems
+from past.builtins import xrange
 
 import sys
 import os
@@ -42,6 +43,7 @@ import pypath.descriptions as descriptions
 import pypath._html as _html
 import pypath.urls as urls
 import pypath.session_mod as session_mod
+import pypath.settings as settings
 from pypath.common import flatList
 from pypath._version import __version__
 
@@ -54,6 +56,82 @@ def stop_server():
     reactor.removeAll()
 
 
+class ResponseProducer(object):
+    """
+    Writes a response into a Twisted request chunk by chunk, as a pull
+    producer: the next chunk is created only when the transport is ready
+    to send more data. This way large responses never exist in the memory
+    as a whole and the reactor is not blocked while they are created.
+    
+    :param twisted.web.server.Request request:
+        The request to respond to.
+    :param iterator chunks:
+        Yields the parts of the response as bytes.
+    :param callable on_finish:
+        Called with the complete response (bytes) after the last chunk
+        has been written. If `None` the chunks are not kept.
+    :param int max_size:
+        Keep the chunks only until their total size exceeds this many
+        bytes, larger responses are not passed to ``on_finish``.
+    """
+    
+    def __init__(self, request, chunks, on_finish = None, max_size = None):
+        
+        self.request = request
+        self.chunks = chunks
+        self.on_finish = on_finish
+        self.max_size = max_size
+        self.written = [] if on_finish else None
+        self.written_size = 0
+    
+    
+    def start(self):
+        
+        self.request.registerProducer(self, False)
+    
+    
+    def resumeProducing(self):
+        
+        if self.chunks is None:
+            
+            return
+        
+        try:
+            
+            chunk = next(self.chunks)
+            
+        except StopIteration:
+            
+            self.chunks = None
+            self.request.unregisterProducer()
+            self.request.finish()
+            
+            if self.written is not None:
+                
+                self.on_finish(b''.join(self.written))
+            
+            return
+        
+        if self.written is not None:
+            
+            self.written.append(chunk)
+            self.written_size += len(chunk)
+            
+            if self.max_size is not None and self.written_size > self.max_size:
+                
+                # too large to be kept
+                self.written = None
+        
+        self.request.write(chunk)
+    
+    
+    def stopProducing(self):
+        
+        # the connection has been lost
+        self.chunks = None
+        self.written = None
+
+
 class BaseServer(twisted.web.resource.Resource, session_mod.Logger):
     
     
@@ -100,7 +178,17 @@ class BaseServer(twisted.web.resource.Resource, session_mod.Logger):
             
             if hasattr(toCall, '__call__'):
                 
-                response = toCall(request)
+                response = (
+                    self._cached_response(request) or
+                    toCall(request)
+                )
+                
+                if isinstance(response, ResponseProducer):
+                    
+                    response.start()
+                    
+                    return twisted.web.server.NOT_DONE_YET
+                
                 response = (
                     response.encode('utf-8')
                     if type(response) is unicode else
@@ -239,6 +327,15 @@ class BaseServer(twisted.web.resource.Resource, session_mod.Logger):
                 req.args[b'source_target'] = left_right
     
     
+    def _cached_response(self, req):
+        """
+        Returns a ``ResponseProducer`` if the response to the request
+        is available in a cache. By default there is no cache.
+        """
+        
+        return None
+    
+    
     def about(self, req):
         
         return self.welcome_message
@@ -283,6 +380,24 @@ class TableServer(BaseServer):
         'isoforms',
     }
     
+    # number of rows serialized at once
+    chunk_size = 10000
+    # number of complete responses kept in the memory, their total size
+    # and the size of one response in bytes are limited by the
+    # `server_response_cache_max_bytes` and
+    # `server_response_cache_max_entry_bytes` settings
+    response_cache_size = 16
+    # requests with these arguments are not cached,
+    # these select small parts of the tables
+    uncached_args = {
+        b'partners',
+        b'sources',
+        b'targets',
+        b'enzymes',
+        b'substrates',
+        b'proteins',
+    }
+    
     args_reference = {
         'interactions': {
             'header': None,
@@ -545,12 +660,31 @@ class TableServer(BaseServer):
         self.input_files = copy.deepcopy(self.default_input_files)
         self.input_files.update(input_files or {})
         self.data = {}
+        self._indices = {}
+        self._bitmaps = {}
+        self._list_values = {}
+        self._response_cache = collections.OrderedDict()
+        self._response_cache_bytes = 0
+        self.response_cache_max_bytes = settings.get(
+            'server_response_cache_max_bytes'
+        )
+        self.response_cache_max_entry_bytes = settings.get(
+            'server_response_cache_max_entry_bytes'
+        )
         self._read_tables()
-        self._preprocess_interactions()
-        self._preprocess_ptms()
-        self._preprocess_annotations()
-        self._preprocess_complexes()
-        self._preprocess_intercell()
+        
+        for name in (
+            'interactions',
+            'ptms',
+            'annotations',
+            'complexes',
+            'intercell',
+        ):
+            
+            # the tables not loaded can not be queried anyways
+            if name in self.data:
+                
+                getattr(self, '_preprocess_%s' % name)()
         
         BaseServer.__init__(self)
         self._log('TableServer startup ready.')
@@ -611,6 +745,43 @@ class TableServer(BaseServer):
                 for s in tbl.tfregulons_level
             ]
         )
+        
+        not_tfregulons = np.logical_not(tbl.tfregulons)
+        bitmaps = {
+            'not_tfregulons': not_tfregulons,
+            'directed': tbl.is_directed == 1,
+            'signed': np.logical_or(
+                tbl.is_stimulation == 1,
+                tbl.is_inhibition == 1,
+            ),
+        }
+        bitmaps.update(
+            (('dataset', dataset), tbl[dataset].astype(bool))
+            for dataset in self.datasets_
+            if dataset in tbl.columns
+        )
+        bitmaps.update(
+            (
+                ('tfregulons_method', method),
+                tbl[['tfregulons_%s' % method]].any(axis = 1),
+            )
+            for method in self.tfregulons_methods
+        )
+        
+        self._build_index(
+            'interactions',
+            columns = (
+                'source',
+                'target',
+                'source_genesymbol',
+                'target_genesymbol',
+                'type',
+                'ncbi_tax_id_source',
+                'ncbi_tax_id_target',
+            ),
+            set_columns = ('set_sources', 'set_tfregulons_level'),
+            bitmaps = bitmaps,
+        )
     
     
     def _preprocess_ptms(self):
@@ -620,6 +791,19 @@ class TableServer(BaseServer):
         tbl['set_sources'] = pd.Series(
             [set(s.split(';')) for s in tbl.sources]
         )
+        
+        self._build_index(
+            'ptms',
+            columns = (
+                'enzyme',
+                'substrate',
+                'enzyme_genesymbol',
+                'substrate_genesymbol',
+                'modification',
+                'ncbi_tax_id',
+            ),
+            set_columns = ('set_sources',),
+        )
     
     
     def _preprocess_complexes(self):
@@ -632,12 +816,21 @@ class TableServer(BaseServer):
         tbl['set_proteins'] = pd.Series(
             [set(c.split('-')) for c in tbl.components]
         )
+        
+        self._build_index(
+            'complexes',
+            set_columns = ('set_sources', 'set_proteins'),
+        )
     
     
     def _preprocess_annotations(self):
         
         self._log('Preprocessing annotations.')
-        pass
+        
+        self._build_index(
+            'annotations',
+            columns = ('uniprot', 'genesymbol', 'source'),
+        )
     
     
     def _preprocess_intercell(self):
@@ -645,6 +838,110 @@ class TableServer(BaseServer):
         self._log('Preprocessing intercell data.')
         tbl = self.data['intercell']
         tbl.drop('full_name', axis = 1, inplace = True, errors = 'ignore')
+        
+        self._build_index(
+            'intercell',
+            columns = ('uniprot', 'genesymbol', 'category', 'class_type'),
+        )
+    
+    
+    def _build_index(
+            self,
+            name,
+            columns = (),
+            set_columns = (),
+            bitmaps = None,
+        ):
+        """
+        Creates indices for a table: for each value in the ``columns``
+        and for each element of the sets in the ``set_columns`` an array
+        of the row numbers where it occurs. ``bitmaps`` are boolean arrays
+        of precomputed conditions, from these also the row numbers are
+        stored. The queries select the rows by combining these arrays
+        and access only the selected rows of the table.
+        """
+        
+        tbl = self.data[name]
+        index = {}
+        
+        for col in columns:
+            
+            index[col] = dict(
+                (value, np.asarray(rows, dtype = np.int64))
+                for value, rows in iteritems(
+                    tbl.groupby(col, sort = False, observed = True).indices
+                )
+            )
+        
+        for col in set_columns:
+            
+            rows = collections.defaultdict(list)
+            
+            for i, values in enumerate(tbl[col]):
+                
+                for value in values:
+                    
+                    rows[value].append(i)
+            
+            index[col] = dict(
+                (value, np.array(_rows, dtype = np.int64))
+                for value, _rows in iteritems(rows)
+            )
+        
+        self._indices[name] = index
+        self._bitmaps[name] = dict(
+            (key, np.flatnonzero(np.asarray(bitmap, dtype = bool)))
+            for key, bitmap in iteritems(bitmaps or {})
+        )
+        self._split_list_fields(name)
+        
+        self._log('Indices for table `%s` have been built.' % name)
+    
+    
+    def _rows(self, name, column, values):
+        """
+        Returns the sorted row numbers of a table where ``column`` has
+        any of the ``values``.
+        """
+        
+        index = self._indices[name][column]
+        
+        return self._union(*(index[v] for v in values if v in index))
+    
+    
+    def _bitmap(self, name, key):
+        
+        return self._bitmaps[name].get(key, np.array([], dtype = np.int64))
+    
+    
+    @staticmethod
+    def _union(*rows):
+        
+        return (
+            np.unique(np.concatenate(rows))
+                if rows else
+            np.array([], dtype = np.int64)
+        )
+    
+    
+    @staticmethod
+    def _intersect(rows, other):
+        """
+        Intersection of two sorted arrays of row numbers. ``None``
+        means all rows.
+        """
+        
+        return (
+            other
+                if rows is None else
+            np.intersect1d(rows, other, assume_unique = True)
+        )
+    
+    
+    @staticmethod
+    def _select_rows(tbl, rows):
+        
+        return tbl if rows is None else tbl.iloc[rows]
     
     
     def _check_args(self, req):
@@ -935,9 +1232,15 @@ class TableServer(BaseServer):
         
         # starting from the entire dataset
         tbl = self.data['interactions']
+        # the rows are selected by combining the row numbers
+        # from the indices built at startup
+        _rows = lambda column, values: (
+            self._rows('interactions', column, values)
+        )
+        _bitmap = lambda key: self._bitmap('interactions', key)
         
         # filter by type
-        tbl = tbl[tbl.type.isin(args['types'])]
+        rows = _rows('type', args['types'])
         
         # if partners provided those will overwrite
         # sources and targets
@@ -949,66 +1252,87 @@ class TableServer(BaseServer):
         # and gene symbols
         if args['sources'] and args['targets'] and source_target == 'OR':
             
-            tbl = tbl[
-                tbl.target.isin(args['targets']) |
-                tbl.target_genesymbol.isin(args['targets']) |
-                tbl.source.isin(args['sources']) |
-                tbl.source_genesymbol.isin(args['sources'])
-            ]
+            rows = self._intersect(
+                rows,
+                self._union(
+                    _rows('target', args['targets']),
+                    _rows('target_genesymbol', args['targets']),
+                    _rows('source', args['sources']),
+                    _rows('source_genesymbol', args['sources']),
+                )
+            )
         
         else:
             
             if args['sources']:
-                tbl = tbl[
-                    tbl.source.isin(args['sources']) |
-                    tbl.source_genesymbol.isin(args['sources'])
-                ]
+                rows = self._intersect(
+                    rows,
+                    self._union(
+                        _rows('source', args['sources']),
+                        _rows('source_genesymbol', args['sources']),
+                    )
+                )
             
             if args['targets']:
-                tbl = tbl[
-                    tbl.target.isin(args['targets']) |
-                    tbl.target_genesymbol.isin(args['targets'])
-                ]
+                rows = self._intersect(
+                    rows,
+                    self._union(
+                        _rows('target', args['targets']),
+                        _rows('target_genesymbol', args['targets']),
+                    )
+                )
         
         # filter by datasets
         if args['datasets']:
-            tbl = tbl.query(' or '.join(args['datasets']))
+            rows = self._intersect(
+                rows,
+                self._union(*(
+                    _bitmap(('dataset', dataset))
+                    for dataset in args['datasets']
+                ))
+            )
         
         # filter by organism
-        tbl = tbl[
-            tbl.ncbi_tax_id_source.isin(args['organisms']) |
-            tbl.ncbi_tax_id_target.isin(args['organisms'])
-        ]
+        rows = self._intersect(
+            rows,
+            self._union(
+                _rows('ncbi_tax_id_source', args['organisms']),
+                _rows('ncbi_tax_id_target', args['organisms']),
+            )
+        )
         
         # filter by TG Regulons confidence levels
         if 'TF' in args['types'] and args['tfregulons_levels']:
             
-            tbl = tbl[
-                np.logical_not(tbl.tfregulons) |
-                [
-                    bool(levels & args['tfregulons_levels'])
-                    for levels in tbl.set_tfregulons_level
-                ]
-            ]
+            rows = self._intersect(
+                rows,
+                self._union(
+                    _bitmap('not_tfregulons'),
+                    _rows('set_tfregulons_level', args['tfregulons_levels']),
+                )
+            )
         
         # filter by databases
         if args['databases']:
             
-            tbl = tbl[
-                [
-                    bool(sources & args['databases'])
-                    for sources in tbl.set_sources
-                ]
-            ]
+            rows = self._intersect(
+                rows,
+                _rows('set_sources', args['databases']),
+            )
         
         # filtering by TF Regulons methods
         if 'TF' in args['types'] and args['tfregulons_methods']:
             
-            q = ['tfregulons_%s' % m for m in args['tfregulons_methods']]
-            
-            tbl = tbl[
-                tbl[q].any(1) | np.logical_not(tbl.tfregulons)
-            ]
+            rows = self._intersect(
+                rows,
+                self._union(
+                    _bitmap('not_tfregulons'),
+                    *(
+                        _bitmap(('tfregulons_method', method))
+                        for method in args['tfregulons_methods']
+                    )
+                )
+            )
         
         # filter directed & signed
         if (
@@ -1016,17 +1340,16 @@ class TableServer(BaseServer):
             self._parse_arg(req.args[b'directed'])
         ):
             
-            tbl = tbl[tbl.is_directed == 1]
+            rows = self._intersect(rows, _bitmap('directed'))
         
         if (
             b'signed' in req.args and
             self._parse_arg(req.args[b'signed'])
         ):
             
-            tbl = tbl[np.logical_or(
-                tbl.is_stimulation == 1,
-                tbl.is_inhibition == 1
-            )]
+            rows = self._intersect(rows, _bitmap('signed'))
+        
+        tbl = self._select_rows(tbl, rows)
         
         if req.args[b'fields']:
             
@@ -1108,10 +1431,12 @@ class TableServer(BaseServer):
         
         # starting from the entire dataset
         tbl = self.data['ptms']
+        _rows = lambda column, values: self._rows('ptms', column, values)
+        rows = None
         
         # filter by type
         if args['types']:
-            tbl = tbl[tbl.modification.isin(args['types'])]
+            rows = _rows('modification', args['types'])
         
         # if partners provided those will overwrite
         # enzymes and substrates
@@ -1127,39 +1452,48 @@ class TableServer(BaseServer):
             enzyme_substrate == 'OR'
         ):
             
-            tbl = tbl[
-                tbl.substrate.isin(args['substrates']) |
-                tbl.substrate_genesymbol.isin(args['substrates']) |
-                tbl.enzyme.isin(args['enzymes']) |
-                tbl.enzyme_genesymbol.isin(args['enzymes'])
-            ]
+            rows = self._intersect(
+                rows,
+                self._union(
+                    _rows('substrate', args['substrates']),
+                    _rows('substrate_genesymbol', args['substrates']),
+                    _rows('enzyme', args['enzymes']),
+                    _rows('enzyme_genesymbol', args['enzymes']),
+                )
+            )
         
         else:
             
             if args['enzymes']:
-                tbl = tbl[
-                    tbl.enzyme.isin(args['enzymes']) |
-                    tbl.enzyme_genesymbol.isin(args['enzymes'])
-                ]
+                rows = self._intersect(
+                    rows,
+                    self._union(
+                        _rows('enzyme', args['enzymes']),
+                        _rows('enzyme_genesymbol', args['enzymes']),
+                    )
+                )
             
             if args['substrates']:
-                tbl = tbl[
-                    tbl.substrate.isin(args['substrates']) |
-                    tbl.substrate_genesymbol.isin(args['substrates'])
-                ]
+                rows = self._intersect(
+                    rows,
+                    self._union(
+                        _rows('substrate', args['substrates']),
+                        _rows('substrate_genesymbol', args['substrates']),
+                    )
+                )
         
         # filter by organism
-        tbl = tbl[tbl.ncbi_tax_id.isin(args['organisms'])]
+        rows = self._intersect(rows, _rows('ncbi_tax_id', args['organisms']))
         
         # filter by databases
         if args['databases']:
             
-            tbl = tbl[
-                [
-                    bool(args['databases'] & sources)
-                    for sources in tbl.set_sources
-                ]
-            ]
+            rows = self._intersect(
+                rows,
+                _rows('set_sources', args['databases']),
+            )
+        
+        tbl = self._select_rows(tbl, rows)
         
         if req.args[b'fields']:
             
@@ -1198,6 +1532,10 @@ class TableServer(BaseServer):
         
         # starting from the entire dataset
         tbl = self.data['annotations']
+        _rows = lambda column, values: (
+            self._rows('annotations', column, values)
+        )
+        rows = None
         
         hdr = tbl.columns
         
@@ -1206,17 +1544,22 @@ class TableServer(BaseServer):
             
             databases = self._args_set(req, 'databases')
             
-            tbl = tbl[tbl.source.isin(databases)]
+            rows = _rows('source', databases)
         
         # filtering for proteins
         if b'proteins' in req.args:
             
             proteins = self._args_set(req, 'proteins')
             
-            tbl = tbl[
-                tbl.uniprot.isin(proteins) |
-                tbl.genesymbol.isin(proteins)
-            ]
+            rows = self._intersect(
+                rows,
+                self._union(
+                    _rows('uniprot', proteins),
+                    _rows('genesymbol', proteins),
+                )
+            )
+        
+        tbl = self._select_rows(tbl, rows)
         
         # provide genesymbols: yes or no
         if (
@@ -1243,6 +1586,10 @@ class TableServer(BaseServer):
         
         # starting from the entire dataset
         tbl = self.data['intercell']
+        _rows = lambda column, values: (
+            self._rows('intercell', column, values)
+        )
+        rows = None
         
         hdr = tbl.columns
         
@@ -1251,26 +1598,29 @@ class TableServer(BaseServer):
             
             levels = self._args_set(req, 'levels')
             
-            tbl = tbl[tbl.class_type.isin(levels)]
+            rows = _rows('class_type', levels)
         
         # filtering for categories
         if b'categories' in req.args:
             
             categories = self._args_set(req, 'categories')
             
-            tbl = tbl[tbl.category.isin(categories)]
+            rows = self._intersect(rows, _rows('category', categories))
         
         # filtering for proteins
         if b'proteins' in req.args:
             
             proteins = self._args_set(req, 'proteins')
             
-            tbl = tbl[
-                np.logical_or(
-                    tbl.uniprot.isin(proteins),
-                    tbl.genesymbol.isin(proteins),
+            rows = self._intersect(
+                rows,
+                self._union(
+                    _rows('uniprot', proteins),
+                    _rows('genesymbol', proteins),
                 )
-            ]
+            )
+        
+        tbl = self._select_rows(tbl, rows)
         
         tbl = tbl.loc[:,hdr]
         
@@ -1292,65 +1642,227 @@ class TableServer(BaseServer):
         hdr.remove('set_sources')
         hdr.remove('set_proteins')
         
+        _rows = lambda column, values: (
+            self._rows('complexes', column, values)
+        )
+        rows = None
+        
         # filtering for databases
         if b'databases' in req.args:
             
             databases = self._args_set(req, 'databases')
             
-            tbl = tbl[
-                [
-                    bool(sources & databases)
-                    for sources in tbl.set_sources
-                ]
-            ]
+            rows = _rows('set_sources', databases)
         
         # filtering for proteins
         if b'proteins' in req.args:
             
             proteins = self._args_set(req, 'proteins')
             
-            tbl = tbl[
-                [
-                    bool(this_proteins & proteins)
-                    for this_proteins in tbl.set_proteins
-                ]
-            ]
+            rows = self._intersect(rows, _rows('set_proteins', proteins))
+        
+        tbl = self._select_rows(tbl, rows)
         
         tbl = tbl.loc[:,hdr]
         
         return self._serve_dataframe(tbl, req)
     
     
-    @classmethod
-    def _serve_dataframe(cls, tbl, req):
+    def _split_list_fields(self, name):
+        """
+        In the data frames the lists are `;` separated strings, in json
+        we serve them as lists. Here we split the distinct values of these
+        fields in advance.
+        """
         
-        if b'format' in req.args and req.args[b'format'][0] == b'json':
+        tbl = self.data[name]
+        
+        self._list_values[name] = dict(
+            (
+                field,
+                dict(
+                    (value, self._split_list_field(field, value))
+                    for value in tbl[field].dropna().unique()
+                )
+            )
+            for field in self.list_fields
+            if field in tbl.columns
+        )
+    
+    
+    def _split_list_field(self, field, value):
+        
+        return (
+            None
+                if pd.isnull(value) else
+            [
+                int(f) if field in self.int_list_fields else f
+                for f in value.split(';')
+            ]
+        )
+    
+    
+    def _serve_dataframe(self, tbl, req):
+        """
+        Returns a ``ResponseProducer`` which serializes the data frame
+        in chunks while sending the response.
+        """
+        
+        name = req.postpath[0]
+        
+        return ResponseProducer(
+            req,
+            (
+                self._json_chunks(tbl, name)
+                    if (
+                        b'format' in req.args and
+                        req.args[b'format'][0] == b'json'
+                    ) else
+                self._tsv_chunks(tbl, header = bool(req.args[b'header']))
+            ),
+            on_finish = (
+                self._cache_setter(req)
+                    if (
+                        self._cacheable(req) and
+                        self._cache_key(req) not in self._response_cache
+                    ) else
+                None
+            ),
+            max_size = self.response_cache_max_entry_bytes,
+        )
+    
+    
+    def _chunks(self, tbl):
+        
+        for i in xrange(0, len(tbl), self.chunk_size):
+            
+            yield tbl.iloc[i:i + self.chunk_size]
+    
+    
+    def _tsv_chunks(self, tbl, header = True):
+        
+        if not len(tbl):
+            
+            yield tbl.to_csv(
+                sep = '\t',
+                index = False,
+                header = header,
+            ).encode('utf-8')
+        
+        for chunk in self._chunks(tbl):
+            
+            yield chunk.to_csv(
+                sep = '\t',
+                index = False,
+                header = header,
+            ).encode('utf-8')
+            
+            header = False
+    
+    
+    def _json_chunks(self, tbl, name):
+        
+        list_values = self._list_values.get(name, {})
+        list_fields = [f for f in tbl.columns if f in list_values]
+        sep = b'['
+        
+        for chunk in self._chunks(tbl):
             
-            data_json = tbl.to_json(orient = 'records')
-            # this is necessary because in the data frame we keep lists
-            # as `;` separated strings but in json we is nicer to serve
-            # them as lists
-            data_json = json.loads(data_json)
+            records = json.loads(chunk.to_json(orient = 'records'))
             
-            for i in data_json:
+            for field in list_fields:
+                
+                values = list_values[field]
                 
-                for k, v in iteritems(i):
+                # the records and the values are in the same order
+                for record, value in zip(records, chunk[field]):
                     
-                    if k in cls.list_fields:
-                        
-                        i[k] = [
-                            int(f) if k in cls.int_list_fields else f
-                            for f in v.split(';')
-                        ]
+                    record[field] = (
+                        values[value]
+                            if value in values else
+                        self._split_list_field(field, value)
+                    )
             
-            return json.dumps(data_json)
+            yield sep + ', '.join(
+                json.dumps(record)
+                for record in records
+            ).encode('utf-8')
             
-        else:
+            sep = b', '
+        
+        yield b'[]' if sep == b'[' else b']'
+    
+    
+    def _cache_key(self, req):
+        
+        return (
+            req.postpath[0],
+            tuple(sorted(
+                (arg, tuple(val) if isinstance(val, list) else val)
+                for arg, val in iteritems(req.args)
+            )),
+        )
+    
+    
+    def _cacheable(self, req):
+        
+        return (
+            req.postpath[0] in self.args_reference and
+            not self.uncached_args & set(req.args.keys())
+        )
+    
+    
+    def _cache_setter(self, req):
+        
+        key = self._cache_key(req)
+        
+        def set_cache(response):
             
-            return tbl.to_csv(
-                sep = '\t',
-                index = False,
-                header = bool(req.args[b'header'])
+            if key in self._response_cache:
+                
+                # cached meanwhile by a concurrent request
+                return
+            
+            self._response_cache[key] = response
+            self._response_cache_bytes += len(response)
+            
+            while (
+                len(self._response_cache) > self.response_cache_size or (
+                    self.response_cache_max_bytes is not None and
+                    self._response_cache_bytes > self.response_cache_max_bytes
+                )
+            ):
+                
+                _key, _response = self._response_cache.popitem(last = False)
+                self._response_cache_bytes -= len(_response)
+        
+        return set_cache
+    
+    
+    def _cached_response(self, req):
+        
+        if not self._cacheable(req):
+            
+            return None
+        
+        # the header argument is processed later, by ``_check_args``
+        # here we only make it look the same way
+        args = copy.copy(req.args)
+        req.args[b'header'] = self._parse_arg(req.args[b'header'])
+        key = self._cache_key(req)
+        req.args = args
+        
+        if key in self._response_cache:
+            
+            self._response_cache.move_to_end(key)
+            response = self._response_cache[key]
+            
+            return ResponseProducer(
+                req,
+                (
+                    response[i:i + 1048576]
+                    for i in xrange(0, max(len(response), 1), 1048576)
+                ),
             )
     
     
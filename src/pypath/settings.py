@@ -65,9 +65,30 @@ _defaults = {
     'slk3_edges': 'signalink3_edges.tsv',
     'slk01human': 'slk01human.csv',
     'cachedir': None,
+    # keep track of the download cache files in an SQLite database
+    'cache_index': True,
+    'cache_index_file': 'cache_index.sqlite',
+    # maximum total size of the download cache in bytes, the least
+    # recently used files are removed above this size
+    'cache_max_size': None,
+    # maximum age of the download cache files in days, by default for
+    # all files, and for URLs matching certain regular expressions
+    'cache_max_age': None,
+    'cache_max_age_urls': {},
     'pubmed_cache': 'pubmed.pickle',
     'mapping_use_cache': True,
+    # format of the mapping table cache files: `pickle` or `mmap`, the
+    # latter is a compact binary file accessed by memory mapping
+    'mapping_cache_format': 'pickle',
+    # keep the results of `Mapper.map_name` in a LRU memo of this size
+    'mapping_memo': False,
+    'mapping_memo_size': 100000,
+    # write the memo also to a `shelve` store in the cache directory
+    'mapping_memo_persistent': False,
+    'mapping_memo_cache': 'mapping_memo',
     'use_intermediate_cache': True,
+    # maximum number of simultaneous transfers in `curl.MultiCurl`
+    'curl_multi_concurrency': 8,
     'default_organism': 9606,
     'default_name_types': {
         'protein': 'uniprot',
@@ -81,6 +102,35 @@ _defaults = {
     'network_expand_complexes': True,
     'network_keep_original_names': True,
     'network_pickle_cache': True,
+    # format of the saved networks: `pickle` or `snapshot`, the latter
+    # is a directory of NumPy arrays (see `pypath.snapshot`)
+    'network_save_format': 'pickle',
+    # attach the edges of a resource in bulk: one `add_vertices` and
+    # `add_edges` call and column-wise attribute assignment
+    'network_attach_bulk': False,
+    # read the input files of network resources into a column store
+    # (`pandas.DataFrame`) instead of processing them line by line
+    'network_column_reader': False,
+    # number of processes reading the resources in `load_resources`
+    'network_load_workers': 1,
+    # number of rows in one chunk when exporting tables chunk by chunk
+    'export_chunk_size': 50000,
+    # number of processes processing the inputs of `ptm.PtmAggregator`
+    'ptm_workers': 1,
+    # number of processes building the tables in `websrvtab`
+    'websrvtab_workers': 1,
+    # maximum total size of the responses kept in the memory by
+    # `server.TableServer`, and the maximum size of one response in bytes
+    'server_response_cache_max_bytes': 512 * 1024 ** 2,
+    'server_response_cache_max_entry_bytes': 128 * 1024 ** 2,
+    # store the boolean array of `annot.AnnotationTable` as a sparse
+    # (CSC) matrix instead of a dense array
+    'annot_sparse_array': False,
+    # load the annotation resources of `annot.AnnotationTable` only when
+    # they are first accessed
+    'annot_lazy': False,
+    # number of processes loading the resources of `annot.AnnotationTable`
+    'annot_workers': 1,
     'network_extra_directions': {
         'Wang',
         'KEGG',
@@ -120,6 +170,7 @@ in_datadir = {
 
 in_cachedir = {
     'pubmed_cache',
+    'mapping_memo_cache',
     'trip_preprocessed',
     'hpmr_preprocessed',
 }
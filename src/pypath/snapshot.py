@@ -0,0 +1,834 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+"""
+Columnar snapshots of network graphs.
+
+A snapshot is a directory of NumPy `.npy` files: the edge list, one or
+more arrays for each vertex and edge attribute, a table of all strings
+occuring in the attributes and a `manifest.json` describing the
+columns. Strings, references and resources are stored as integer ids
+pointing into the string table, collections as offset and value
+arrays, `Direction` objects as flags and resource bitmasks. Attributes
+of other types are pickled column by column.
+
+The arrays are memory mapped when read, but igraph keeps the attributes
+in Python lists, hence each loaded attribute is decoded entirely into
+Python objects. By default all attributes are loaded: in this case the
+memory use is the same as with a pickle. To open a snapshot quickly and
+with less memory, load only a subset of the attributes
+(``vertex_attrs`` and ``edge_attrs`` of ``NetworkSnapshot.load``), the
+rest can be added later.
+"""
+
+from future.utils import iteritems
+from past.builtins import xrange
+
+import os
+import json
+import shutil
+
+try:
+    import cPickle as pickle
+
+except ImportError:
+    import pickle
+
+import numpy as np
+import igraph
+
+import pypath.session_mod as session_mod
+import pypath.refs as refs_mod
+import pypath.main as main
+
+
+SNAPSHOT_VERSION = 1
+
+_containers = {'set': set, 'list': list, 'tuple': tuple}
+
+
+class NetworkSnapshot(session_mod.Logger):
+
+
+    def __init__(self, path):
+        """
+        :arg str path:
+            Path to the snapshot directory.
+        """
+
+        session_mod.Logger.__init__(self, name = 'snapshot')
+
+        self.path = path
+        self.manifest = None
+        self._strings = None
+        self._references = {}
+
+
+    #
+    # writing
+    #
+
+    def save(self, graph):
+        """
+        Writes *graph* into the snapshot directory. An existing snapshot
+        at the same path is replaced.
+
+        :arg igraph.Graph graph:
+            The network graph object.
+        """
+
+        tmp_path = '%s.tmp' % self.path
+
+        if os.path.exists(tmp_path):
+
+            shutil.rmtree(tmp_path)
+
+        os.makedirs(tmp_path)
+
+        self._string_ids = {}
+        self._string_list = []
+        self._write_path = tmp_path
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'vcount': graph.vcount(),
+            'ecount': graph.ecount(),
+            'directed': graph.is_directed(),
+            'vertex': {},
+            'edge': {},
+        }
+
+        self._save_array(
+            'edges',
+            np.array(graph.get_edgelist(), dtype = np.int32).reshape(-1, 2),
+        )
+
+        with open(os.path.join(tmp_path, 'graph.pickle'), 'wb') as fp:
+
+            pickle.dump(
+                dict(
+                    (attr, graph[attr])
+                    for attr in graph.attributes()
+                ),
+                fp,
+                protocol = pickle.HIGHEST_PROTOCOL,
+            )
+
+        for key, seq in (('vertex', graph.vs), ('edge', graph.es)):
+
+            for i, attr in enumerate(seq.attributes()):
+
+                prefix = '%s%03u' % (key[0], i)
+                manifest[key][attr] = self._save_column(prefix, seq[attr])
+
+        manifest['resources'] = self._save_resources()
+        self._save_strings()
+
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w') as fp:
+
+            json.dump(manifest, fp)
+
+        if os.path.exists(self.path):
+
+            shutil.rmtree(self.path)
+
+        os.rename(tmp_path, self.path)
+
+        del self._string_ids
+        del self._string_list
+        self.manifest = None
+        self._strings = None
+
+        self._log(
+            'Network saved to snapshot `%s`: %u nodes, %u edges.' % (
+                self.path,
+                graph.vcount(),
+                graph.ecount(),
+            )
+        )
+
+
+    def _save_array(self, name, array):
+
+        np.save(os.path.join(self._write_path, '%s.npy' % name), array)
+
+
+    def _string_id(self, s):
+
+        if s not in self._string_ids:
+
+            self._string_ids[s] = len(self._string_list)
+            self._string_list.append(s)
+
+        return self._string_ids[s]
+
+
+    def _save_strings(self):
+
+        data = [s.encode('utf-8') for s in self._string_list]
+        offsets = np.zeros(len(data) + 1, dtype = np.int64)
+        offsets[1:] = np.cumsum([len(d) for d in data])
+
+        self._save_array('strings_offsets', offsets)
+        self._save_array(
+            'strings_data',
+            np.frombuffer(b''.join(data), dtype = np.uint8),
+        )
+
+
+    def _save_resources(self):
+        """
+        Saves the names of the resources in the order of the bits in the
+        `Direction` bitmasks.
+        """
+
+        return [
+            self._string_id(name)
+            for name in main.Direction.registry.names
+        ]
+
+
+    @staticmethod
+    def _column_kind(values):
+        """
+        Finds out the way a column can be stored.
+
+        :return:
+            Tuple of the kind of the column (``'int'``, ``'float'``,
+            ``'bool'``, ``'str'``, ``'items'``, ``'dict'``, ``'dirs'``
+            or ``'pickle'``) and the details of the contents.
+        """
+
+        values = [v for v in values if v is not None]
+
+        if not values:
+
+            return 'none', None
+
+        first = values[0]
+        typ = type(first)
+
+        if not all(type(v) is typ for v in values):
+
+            return 'pickle', None
+
+        if typ is bool:
+
+            return 'bool', None
+
+        if typ is int:
+
+            return (
+                ('int', None)
+                    if all(-2 ** 63 <= v < 2 ** 63 for v in values) else
+                ('pickle', None)
+            )
+
+        if typ is float:
+
+            return 'float', None
+
+        if typ is str:
+
+            return 'str', None
+
+        if typ is main.Direction:
+
+            return (
+                ('dirs', None)
+                    if all(
+                        type(v.straight[0]) is str and
+                        type(v.straight[1]) is str
+                        for v in values
+                    ) else
+                ('pickle', None)
+            )
+
+        if typ in (set, list, tuple):
+
+            element = NetworkSnapshot._element_kind(
+                e for v in values for e in v
+            )
+
+            if element:
+
+                return 'items', {
+                    'container': typ.__name__,
+                    'element': element,
+                }
+
+        if typ is dict:
+
+            keys = [k for v in values for k in v.keys()]
+
+            if all(
+                type(k) is str or (
+                    type(k) is tuple and
+                    len(k) == 2 and
+                    type(k[0]) is str and
+                    type(k[1]) is str
+                )
+                for k in keys
+            ):
+
+                dict_values = [dv for v in values for dv in v.values()]
+
+                if all(type(dv) is str for dv in dict_values):
+
+                    return 'dict', {'container': None, 'element': 'str'}
+
+                containers = set(type(dv) for dv in dict_values)
+
+                if len(containers) <= 1 and containers <= {set, list, tuple}:
+
+                    element = NetworkSnapshot._element_kind(
+                        e for dv in dict_values for e in dv
+                    )
+
+                    if element:
+
+                        return 'dict', {
+                            'container': (
+                                containers.pop().__name__
+                                    if containers else
+                                'set'
+                            ),
+                            'element': element,
+                        }
+
+        return 'pickle', None
+
+
+    @staticmethod
+    def _element_kind(elements):
+
+        kind = 'str'
+
+        for i, e in enumerate(elements):
+
+            typ = type(e)
+
+            if i == 0 and typ is refs_mod.Reference:
+
+                kind = 'ref'
+
+            if typ is not (str if kind == 'str' else refs_mod.Reference):
+
+                return None
+
+        return kind
+
+
+    def _element_id(self, e):
+
+        return self._string_id(e if type(e) is str else e.pmid)
+
+
+    def _save_column(self, prefix, values):
+
+        kind, details = self._column_kind(values)
+        column = {'kind': kind, 'prefix': prefix}
+
+        if details:
+
+            column.update(details)
+
+        if kind != 'none' and any(v is None for v in values):
+
+            self._save_array(
+                '%s.null' % prefix,
+                np.array([v is None for v in values], dtype = np.bool_),
+            )
+            column['null'] = True
+
+        if kind == 'none':
+
+            pass
+
+        elif kind == 'pickle':
+
+            with open(
+                os.path.join(self._write_path, '%s.pickle' % prefix),
+                'wb',
+            ) as fp:
+
+                pickle.dump(values, fp, protocol = pickle.HIGHEST_PROTOCOL)
+
+        elif kind in ('int', 'float', 'bool'):
+
+            dtype = {'int': np.int64, 'float': np.float64, 'bool': np.bool_}
+            default = {'int': 0, 'float': np.nan, 'bool': False}
+
+            self._save_array(
+                prefix,
+                np.array(
+                    [default[kind] if v is None else v for v in values],
+                    dtype = dtype[kind],
+                ),
+            )
+
+        elif kind == 'str':
+
+            self._save_array(
+                prefix,
+                np.array(
+                    [-1 if v is None else self._string_id(v) for v in values],
+                    dtype = np.int32,
+                ),
+            )
+
+        elif kind == 'items':
+
+            self._save_offsets(
+                '%s.offsets' % prefix,
+                (len(v) if v is not None else 0 for v in values),
+                len(values),
+            )
+            self._save_array(
+                '%s.values' % prefix,
+                np.array(
+                    [
+                        self._element_id(e)
+                        for v in values if v is not None
+                        for e in v
+                    ],
+                    dtype = np.int32,
+                ),
+            )
+
+        elif kind == 'dict':
+
+            items = [
+                (k, dv)
+                for v in values if v is not None
+                for k, dv in iteritems(v)
+            ]
+
+            self._save_offsets(
+                '%s.offsets' % prefix,
+                (len(v) if v is not None else 0 for v in values),
+                len(values),
+            )
+            self._save_array(
+                '%s.keys' % prefix,
+                np.array(
+                    [
+                        (self._string_id(k), -1)
+                            if type(k) is str else
+                        (self._string_id(k[0]), self._string_id(k[1]))
+                        for k, dv in items
+                    ],
+                    dtype = np.int32,
+                ).reshape(-1, 2),
+            )
+
+            if column['container'] is None:
+
+                self._save_array(
+                    '%s.values' % prefix,
+                    np.array(
+                        [self._string_id(dv) for k, dv in items],
+                        dtype = np.int32,
+                    ),
+                )
+
+            else:
+
+                self._save_offsets(
+                    '%s.value_offsets' % prefix,
+                    (len(dv) for k, dv in items),
+                    len(items),
+                )
+                self._save_array(
+                    '%s.values' % prefix,
+                    np.array(
+                        [self._element_id(e) for k, dv in items for e in dv],
+                        dtype = np.int32,
+                    ),
+                )
+
+        elif kind == 'dirs':
+
+            self._save_directions(prefix, values, column)
+
+        return column
+
+
+    def _save_offsets(self, name, lengths, n):
+
+        offsets = np.zeros(n + 1, dtype = np.int64)
+        offsets[1:] = np.cumsum(
+            np.fromiter(lengths, dtype = np.int64, count = n)
+        )
+        self._save_array(name, offsets)
+
+
+    def _save_directions(self, prefix, values, column):
+
+        n_words = max(1, (len(main.Direction.registry.names) + 63) // 64)
+        column['words'] = n_words
+        word_mask = (1 << 64) - 1
+
+        straight = np.full((len(values), 2), -1, dtype = np.int32)
+        flags = np.zeros(len(values), dtype = np.uint8)
+        masks = np.zeros((len(values), 7, n_words), dtype = np.uint64)
+
+        for i, d in enumerate(values):
+
+            if d is None:
+
+                continue
+
+            straight[i] = (
+                self._string_id(d.straight[0]),
+                self._string_id(d.straight[1]),
+            )
+            flags[i] = d._flags
+
+            for j, mask in enumerate(d._masks()):
+
+                w = 0
+
+                while mask:
+
+                    masks[i, j, w] = mask & word_mask
+                    mask >>= 64
+                    w += 1
+
+        self._save_array('%s.straight' % prefix, straight)
+        self._save_array('%s.flags' % prefix, flags)
+        self._save_array('%s.masks' % prefix, masks)
+
+
+    #
+    # reading
+    #
+
+    def open(self):
+        """
+        Reads the manifest and the string table of the snapshot.
+        """
+
+        if self.manifest is not None:
+
+            return
+
+        with open(os.path.join(self.path, 'manifest.json'), 'r') as fp:
+
+            self.manifest = json.load(fp)
+
+        data = self._load_array('strings_data').tobytes()
+        offsets = self._load_array('strings_offsets').tolist()
+
+        self._strings = [
+            data[offsets[i]:offsets[i + 1]].decode('utf-8')
+            for i in xrange(len(offsets) - 1)
+        ]
+        self._references = {}
+
+
+    def attributes(self):
+        """
+        Returns the names of the vertex and edge attributes stored in
+        the snapshot.
+
+        :return:
+            (*dict*) -- With keys ``'vertex'`` and ``'edge'`` and lists
+            of attribute names as values.
+        """
+
+        self.open()
+
+        return dict(
+            (key, sorted(self.manifest[key].keys()))
+            for key in ('vertex', 'edge')
+        )
+
+
+    def load(self, graph = None, vertex_attrs = None, edge_attrs = None):
+        """
+        Creates an igraph object from the snapshot or adds attributes
+        from the snapshot to a graph loaded earlier.
+
+        :arg igraph.Graph graph:
+            Optional, ``None`` by default. A graph created by an earlier
+            call of this method; the attributes will be added to it.
+            If ``None``, a new graph is created.
+        :arg list vertex_attrs:
+            Optional, ``None`` by default. The vertex attributes to
+            load. If ``None``, all attributes are loaded.
+        :arg list edge_attrs:
+            Optional, ``None`` by default. The edge attributes to load.
+            If ``None``, all attributes are loaded.
+
+        :return:
+            (*igraph.Graph*) -- The network graph object.
+        """
+
+        self.open()
+        manifest = self.manifest
+
+        if graph is None:
+
+            edges = self._load_array('edges')
+            graph = igraph.Graph(
+                n = manifest['vcount'],
+                edges = edges.tolist(),
+                directed = manifest['directed'],
+            )
+
+            with open(os.path.join(self.path, 'graph.pickle'), 'rb') as fp:
+
+                for attr, value in iteritems(pickle.load(fp)):
+
+                    graph[attr] = value
+
+        for key, seq, attrs in (
+            ('vertex', graph.vs, vertex_attrs),
+            ('edge', graph.es, edge_attrs),
+        ):
+
+            attrs = manifest[key].keys() if attrs is None else attrs
+
+            for attr in attrs:
+
+                if attr not in manifest[key]:
+
+                    self._log(
+                        'No %s attribute `%s` in snapshot `%s`.' % (
+                            key, attr, self.path,
+                        )
+                    )
+                    continue
+
+                seq[attr] = self._load_column(
+                    manifest[key][attr],
+                    len(seq),
+                )
+
+        return graph
+
+
+    def _load_array(self, name, mmap = True):
+
+        return np.load(
+            os.path.join(self.path, '%s.npy' % name),
+            mmap_mode = 'r' if mmap else None,
+        )
+
+
+    def _elements(self, element, ids):
+        """
+        Returns a lookup from string ids to the elements of
+        collections: the strings themselves or `Reference` objects.
+        The `Reference` objects are shared by all attributes.
+        """
+
+        if element == 'str':
+
+            return self._strings.__getitem__
+
+        for i in np.unique(ids).tolist():
+
+            if i not in self._references:
+
+                self._references[i] = refs_mod.Reference(self._strings[i])
+
+        return self._references.__getitem__
+
+
+    def _load_column(self, column, n):
+
+        kind = column['kind']
+        prefix = column['prefix']
+
+        if kind == 'none':
+
+            return [None] * n
+
+        if kind == 'pickle':
+
+            with open(
+                os.path.join(self.path, '%s.pickle' % prefix),
+                'rb',
+            ) as fp:
+
+                return pickle.load(fp)
+
+        if kind in ('int', 'float', 'bool'):
+
+            values = self._load_array(prefix).tolist()
+
+        elif kind == 'str':
+
+            strings = self._strings
+            values = [
+                None if i == -1 else strings[i]
+                for i in self._load_array(prefix).tolist()
+            ]
+
+        elif kind == 'items':
+
+            container = _containers[column['container']]
+            offsets = self._load_array('%s.offsets' % prefix).tolist()
+            ids = self._load_array('%s.values' % prefix)
+            element = self._elements(column['element'], ids)
+            ids = ids.tolist()
+            values = [
+                container(map(element, ids[offsets[i]:offsets[i + 1]]))
+                for i in xrange(n)
+            ]
+
+        elif kind == 'dict':
+
+            values = self._load_dicts(column, n)
+
+        elif kind == 'dirs':
+
+            values = self._load_directions(column, n)
+
+        if column.get('null'):
+
+            null = self._load_array('%s.null' % prefix)
+            values = [
+                None if _null else value
+                for value, _null in zip(values, null.tolist())
+            ]
+
+        return values
+
+
+    def _load_dicts(self, column, n):
+
+        prefix = column['prefix']
+        strings = self._strings
+        offsets = self._load_array('%s.offsets' % prefix).tolist()
+        keys = [
+            strings[a] if b == -1 else (strings[a], strings[b])
+            for a, b in self._load_array('%s.keys' % prefix).tolist()
+        ]
+        ids = self._load_array('%s.values' % prefix)
+
+        if column['container'] is None:
+
+            dict_values = [strings[i] for i in ids.tolist()]
+
+        else:
+
+            container = _containers[column['container']]
+            element = self._elements(column['element'], ids)
+            ids = ids.tolist()
+            value_offsets = (
+                self._load_array('%s.value_offsets' % prefix).tolist()
+            )
+            dict_values = [
+                container(
+                    map(element, ids[value_offsets[i]:value_offsets[i + 1]])
+                )
+                for i in xrange(len(keys))
+            ]
+
+        return [
+            dict(zip(
+                keys[offsets[i]:offsets[i + 1]],
+                dict_values[offsets[i]:offsets[i + 1]],
+            ))
+            for i in xrange(n)
+        ]
+
+
+    def _load_directions(self, column, n):
+
+        prefix = column['prefix']
+        strings = self._strings
+        straight = self._load_array('%s.straight' % prefix).tolist()
+        flags = self._load_array('%s.flags' % prefix).tolist()
+        masks = self._load_array('%s.masks' % prefix)
+        n_words = column['words']
+
+        if n_words == 1:
+
+            masks = masks[:,:,0].tolist()
+
+        else:
+
+            masks = [
+                [
+                    sum(int(w) << (64 * k) for k, w in enumerate(words))
+                    for words in edge_masks
+                ]
+                for edge_masks in masks.tolist()
+            ]
+
+        remap = self._resource_remap()
+        from_masks = main.Direction._from_masks
+
+        return [
+            None
+                if a == -1 else
+            from_masks(
+                (strings[a], strings[b]),
+                _flags,
+                _masks if remap is None else [remap(m) for m in _masks],
+            )
+            for (a, b), _flags, _masks in zip(straight, flags, masks)
+        ]
+
+
+    def _resource_remap(self):
+        """
+        Makes sure the resources of the snapshot are registered in
+        `Direction.registry`.
+
+        :return:
+            ``None`` if the bitmasks of the snapshot are valid in this
+            process, otherwise a function translating them.
+        """
+
+        registry = main.Direction.registry
+        names = [self._strings[i] for i in self.manifest['resources']]
+
+        if registry.names == names[:len(registry.names)]:
+
+            for name in names[len(registry.names):]:
+
+                registry.encode(name)
+
+            return None
+
+        bits = [registry.encode(name) for name in names]
+
+        def remap(mask):
+
+            result = 0
+            i = 0
+
+            while mask:
+
+                if mask & 1:
+
+                    result |= bits[i]
+
+                mask >>= 1
+                i += 1
+
+            return result
+
+        return remap
@@ -23,8 +23,12 @@ building the tables for the webservice.
 
 from future.utils import iteritems
 
+import os
 import imp
 import copy
+import json
+import time
+import multiprocessing
 
 import pandas as pd
 
@@ -36,6 +40,8 @@ import pypath.export as export
 import pypath.main as main
 import pypath.data_formats as data_formats
 import pypath.session_mod as session_mod
+import pypath.settings as settings
+import pypath.cache as cache_mod
 
 
 class WebserviceTables(session_mod.Logger):
@@ -43,6 +49,14 @@ class WebserviceTables(session_mod.Logger):
     Creates the data frames which the web service uses to serve the data from.
     """
     
+    stages = (
+        'interactions',
+        'ptms',
+        'complexes',
+        'annotations',
+        'intercell',
+    )
+    
     
     def __init__(
             self,
@@ -74,19 +88,211 @@ class WebserviceTables(session_mod.Logger):
         setattr(self, '__class__', new)
     
     
-    def main(self):
+    def main(self, workers = None, force = False, stages = None):
+        """
+        Builds all tables. The stages (one stage for each table) run
+        independently, each in a new process, optionally in parallel.
+        After a stage finished, a checkpoint is written next to its
+        output file: this contains the hashes of the files the stage has
+        read, i.e. the download cache files, the pickle caches (e.g. of
+        mapping tables or annotations) and the local input files.
+        As each stage starts in a new process, it can not use data
+        loaded by another stage without reading it from these files.
+        Stages are skipped if their output file exists and none of their
+        input files changed since the checkpoint has been written.
+        The time spent on each stage is logged and stored in `timing`.
+
+        :arg int workers:
+            Number of processes. If ``None`` the ``websrvtab_workers``
+            setting is used.
+        :arg bool force:
+            Build all stages, even if they are up to date.
+        :arg list stages:
+            Names of the stages to build, by default all of them.
+        """
+        
+        workers = workers or settings.get('websrvtab_workers') or 1
+        stages = stages or self.stages
+        self.timing = {}
+        
+        todo = []
+        
+        for stage in stages:
+            
+            if not force and self.is_up_to_date(stage):
+                
+                self._log('Stage `%s` is up to date, skipping.' % stage)
+                
+            else:
+                
+                self._remove_checkpoint(stage)
+                todo.append(stage)
+        
+        if not todo:
+            
+            return
+        
+        args = [(self.__class__, self._param(), stage) for stage in todo]
+        workers = min(workers, len(todo))
+        
+        self._log(
+            'Building %u stages in %u processes.' % (len(todo), workers)
+        )
+        
+        # one new process for each stage, so the memory is released
+        # after each of them and no data is shared between them
+        pool = multiprocessing.Pool(
+            processes = workers,
+            maxtasksperchild = 1,
+        )
         
-        self.interactions()
-        self.ptms()
-        self.complexes()
-        self.annotations()
-        self.intercell()
+        try:
+            
+            for stage, elapsed, cache_files in pool.imap_unordered(
+                _run_stage,
+                args,
+            ):
+                
+                self.timing[stage] = elapsed
+                self._write_checkpoint(stage, cache_files, elapsed)
+                self._log(
+                    'Stage `%s` finished in %.02f s.' % (stage, elapsed)
+                )
+            
+            pool.close()
+            
+        except:
+            
+            pool.terminate()
+            raise
+            
+        finally:
+            
+            pool.join()
+    
+    
+    def _param(self):
+        
+        param = dict(
+            ('outfile_%s' % stage, self._outfile(stage))
+            for stage in self.stages
+        )
+        param['only_human'] = self.only_human
+        
+        return param
+    
+    
+    def _outfile(self, stage):
+        
+        return getattr(self, 'outfile_%s' % stage)
+    
+    
+    def _checkpoint_file(self, stage):
+        
+        return '%s.checkpoint.json' % self._outfile(stage)
+    
+    
+    def is_up_to_date(self, stage):
+        """
+        Tells if the output of a stage exists and none of the files it
+        depends on changed since it has been built. Files with a new size
+        or modification time but the same contents are not considered
+        changed, only their new signature is recorded.
+        """
+        
+        checkpoint = self._read_checkpoint(stage)
+        
+        if checkpoint is None or not os.path.exists(self._outfile(stage)):
+            
+            return False
+        
+        touched = False
+        
+        for path, signature in iteritems(checkpoint['cache_files']):
+            
+            current = _file_signature(path, signature)
+            
+            if current == signature:
+                
+                continue
+            
+            if (
+                current is None or
+                signature is None or
+                current[2] != signature[2]
+            ):
+                
+                self._log(
+                    'Stage `%s`: file `%s` has changed.' % (stage, path)
+                )
+                
+                return False
+            
+            checkpoint['cache_files'][path] = current
+            touched = True
+        
+        if touched:
+            
+            # next time the hash is not calculated again
+            self._save_checkpoint(stage, checkpoint)
+        
+        return True
+    
+    
+    def _read_checkpoint(self, stage):
+        
+        path = self._checkpoint_file(stage)
+        
+        if os.path.exists(path):
+            
+            with open(path, 'r') as fp:
+                
+                return json.load(fp)
+    
+    
+    def _write_checkpoint(self, stage, cache_files, elapsed):
+        
+        checkpoint = {
+            'stage': stage,
+            'outfile': self._outfile(stage),
+            'elapsed': elapsed,
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'cache_files': dict(
+                (path, _file_signature(path))
+                for path in sorted(cache_files)
+            ),
+        }
+        
+        self._save_checkpoint(stage, checkpoint)
+    
+    
+    def _save_checkpoint(self, stage, checkpoint):
+        
+        with open(self._checkpoint_file(stage), 'w') as fp:
+            
+            json.dump(checkpoint, fp, indent = 2)
+    
+    
+    def _remove_checkpoint(self, stage):
+        
+        path = self._checkpoint_file(stage)
+        
+        if os.path.exists(path):
+            
+            os.remove(path)
     
     
     def interactions(self):
+        """
+        Builds the interactions table and writes it into
+        `outfile_interactions` chunk by chunk, hence the full table never
+        needs to be in the memory. The file is compressed if its name
+        ends with `.gz` and it is Parquet if its name ends with
+        `.parquet`.
+        """
         
         self._log('Building `interactions` data frame.')
-        dataframes = []
+        writer = export.TableWriter(self.outfile_interactions)
         
         tfregulons = copy.deepcopy(data_formats.transcription)
         tfregulons['tfregulons'].input_args['levels'] = {
@@ -110,8 +316,7 @@ class WebserviceTables(session_mod.Logger):
             getattr(pa, to_call)(**kwargs)
             
             e = export.Export(pa)
-            e.webservice_interactions_df()
-            dataframes.append(e.df)
+            self._write_interactions(e, writer)
             
             if not self.only_human:
                 
@@ -143,23 +348,24 @@ class WebserviceTables(session_mod.Logger):
                     
                     pa.orthology_translation(rodent)
                     e = export.Export(pa)
-                    e.webservice_interactions_df()
-                    dataframes.append(e.df)
+                    self._write_interactions(e, writer)
         
         del e
         del pa
         
-        self.df_interactions = pd.concat(dataframes)
-        self.df_interactions.to_csv(
-            self.outfile_interactions,
-            sep = '\t',
-            index = False
-        )
+        writer.close()
         self._log('Data frame `interactions` has been exported to `%s`.' % (
             self.outfile_interactions,
         ))
     
     
+    def _write_interactions(self, e, writer):
+        
+        for df in e.webservice_interactions_batches():
+            
+            writer.write(df)
+    
+    
     def ptms(self):
         
         self._log('Building `ptms` data frame.')
@@ -252,3 +458,42 @@ class WebserviceTables(session_mod.Logger):
         self._log('Data frame `intercell` has been exported to `%s`.' % (
             self.outfile_intercell,
         ))
+
+
+def _file_signature(path, previous = None):
+    """
+    Returns the size, modification time and MD5 hash of a file, or
+    ``None`` if the file does not exist. If the size and time are the
+    same as in ``previous`` the hash is not calculated again.
+    """
+    
+    if not os.path.exists(path):
+        
+        return None
+    
+    stat = os.stat(path)
+    size_mtime = [stat.st_size, stat.st_mtime]
+    
+    if previous and previous[:2] == size_mtime:
+        
+        return previous
+    
+    return size_mtime + [cache_mod.file_md5(path)]
+
+
+def _run_stage(args):
+    """
+    Builds one stage of `WebserviceTables` in a worker process.
+    Returns the name of the stage, the time it took and the paths of the
+    files it has read.
+    """
+    
+    cls, param, stage = args
+    tables = cls(**param)
+    t0 = time.time()
+    
+    with cache_mod.track_reads() as files_read:
+        
+        getattr(tables, stage)()
+    
+    return stage, time.time() - t0, files_read
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+"""
+Compares the per-edge and the bulk engine of `PyPath.attach_network`
+on a synthetic edge list. Run it as a script:
+
+    python bench_attach_network.py [n_edges] [n_nodes]
+"""
+
+import sys
+import time
+
+import pypath.main as main
+import pypath.settings as settings
+
+from test_network_igraph import _synthetic_edge_list, _edge_summary
+
+
+def bench_attach_network(n_edges = 500000, n_nodes = 20000):
+
+    settings.setup(progressbars = False)
+
+    edge_list = _synthetic_edge_list(n_edges = n_edges, n_nodes = n_nodes)
+
+    result = {}
+
+    for bulk in (True, False):
+
+        pa = main.PyPath()
+
+        t0 = time.time()
+        pa.attach_network(edge_list = list(edge_list), bulk = bulk)
+        elapsed = time.time() - t0
+
+        result[bulk] = (pa, elapsed)
+
+        sys.stdout.write(
+            '%s engine: %.02f s, %u nodes, %u edges\n' % (
+                'bulk' if bulk else 'per edge',
+                elapsed,
+                pa.graph.vcount(),
+                pa.graph.ecount(),
+            )
+        )
+
+    sys.stdout.write('Speedup: %.01fx, results are %s.\n' % (
+        result[False][1] / result[True][1],
+        'identical'
+            if (
+                _edge_summary(result[False][0]) ==
+                _edge_summary(result[True][0])
+            ) else
+        'DIFFERENT',
+    ))
+
+
+if __name__ == '__main__':
+
+    bench_attach_network(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+"""
+Measures the memory used by the `Direction` objects of a synthetic
+network. Run it as a script:
+
+    python bench_direction_memory.py [n_edges] [n_nodes] [n_resources]
+"""
+
+import sys
+import gc
+import random
+import tracemalloc
+
+import pypath.main as main
+import pypath.settings as settings
+
+from test_network_igraph import _synthetic_edge_list
+
+
+def bench_direction_memory(n_edges = 100000, n_nodes = 10000, n_resources = 50):
+
+    settings.setup(progressbars = False)
+
+    rnd = random.Random(1)
+    resources = ['Resource%u' % i for i in range(n_resources)]
+    edge_list = _synthetic_edge_list(n_edges = n_edges, n_nodes = n_nodes)
+
+    for e in edge_list:
+
+        e['source'] = rnd.sample(resources, rnd.randrange(1, 4))
+
+    # the objects created before the start are not traced
+    tracemalloc.start()
+    pa = main.PyPath()
+    pa.attach_network(edge_list = edge_list, bulk = True)
+    del edge_list
+
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    pa.graph.es['dirs'] = [None] * pa.graph.ecount()
+    gc.collect()
+    freed = before - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    sys.stdout.write(
+        '%u edges, Direction objects: %.01f MB, %.0f bytes per edge\n' % (
+            pa.graph.ecount(),
+            freed / 1024. ** 2,
+            freed / float(pa.graph.ecount()),
+        )
+    )
+
+
+if __name__ == '__main__':
+
+    bench_direction_memory(*(int(a) for a in sys.argv[1:4]))
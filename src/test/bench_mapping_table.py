@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+"""
+Compares the load time and the memory footprint of the pickle and the
+compact (memory mapped) mapping table cache formats on a synthetic table.
+Each format is loaded in a separate process. Run it as a script:
+
+    python bench_mapping_table.py [n_keys] [n_lookups]
+"""
+
+import os
+import sys
+import time
+import random
+import pickle
+import resource
+import tempfile
+import subprocess
+
+import pypath.mapping as mapping
+
+
+def _synthetic_table(n_keys = 500000, seed = 1):
+
+    rnd = random.Random(seed)
+    values = ['P%05u' % i for i in range(n_keys // 2)]
+
+    return dict(
+        (
+            'GENE%07u' % i,
+            set(rnd.choice(values) for _ in range(rnd.randint(1, 3))),
+        )
+        for i in range(n_keys)
+    )
+
+
+def _rss():
+    """
+    Current resident set size in MB (Linux only).
+    """
+
+    with open('/proc/self/statm', 'r') as fp:
+
+        return (
+            int(fp.read().split()[1]) *
+            resource.getpagesize() / 1048576.
+        )
+
+
+def _load(fmt, path, n_lookups):
+
+    rss0 = _rss()
+    t0 = time.time()
+
+    if fmt == 'pickle':
+
+        data = pickle.load(open(path, 'rb'))
+
+    else:
+
+        data = mapping.MmapMappingData(path)
+        len(data)
+
+    loaded = time.time() - t0
+
+    t0 = time.time()
+    n_keys = len(data)
+
+    for i in range(n_lookups):
+
+        data.get('GENE%07u' % ((i * 7919) % n_keys))
+
+    looked_up = time.time() - t0
+
+    sys.stdout.write(
+        '%s: load %.03f s, %u lookups %.03f s, RSS increase %.01f MB\n' % (
+            fmt,
+            loaded,
+            n_lookups,
+            looked_up,
+            _rss() - rss0,
+        )
+    )
+
+
+def bench_mapping_table(n_keys = 500000, n_lookups = 100000):
+
+    data = _synthetic_table(n_keys = n_keys)
+    tmpdir = tempfile.mkdtemp()
+    paths = {
+        'pickle': os.path.join(tmpdir, 'table.pickle'),
+        'mmap': os.path.join(tmpdir, 'table.pickle.mmap'),
+    }
+
+    pickle.dump(data, open(paths['pickle'], 'wb'))
+    mapping.MmapMappingData.write(paths['mmap'], data)
+
+    mmap_data = mapping.MmapMappingData(paths['mmap'])
+
+    sys.stdout.write(
+        'Formats are %s, file sizes: pickle %.01f MB, mmap %.01f MB\n' % (
+            'identical' if dict(mmap_data.items()) == data else 'DIFFERENT',
+            os.path.getsize(paths['pickle']) / 1048576.,
+            os.path.getsize(paths['mmap']) / 1048576.,
+        )
+    )
+    mmap_data.close()
+
+    for fmt, path in paths.items():
+
+        subprocess.call([
+            sys.executable,
+            __file__,
+            '--load',
+            fmt,
+            path,
+            str(n_lookups),
+        ])
+
+    for path in paths.values():
+
+        os.remove(path)
+
+    os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+
+    if sys.argv[1:2] == ['--load']:
+
+        _load(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+
+    else:
+
+        bench_mapping_table(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+"""
+Compares saving and loading a synthetic network by pickle and by
+columnar snapshot. Run it as a script:
+
+    python bench_network_snapshot.py [n_edges] [n_nodes] [workdir]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+import pypath.main as main
+import pypath.settings as settings
+
+from test_network_igraph import _synthetic_edge_list
+
+
+def bench_network_snapshot(n_edges = 100000, n_nodes = 10000, workdir = None):
+
+    settings.setup(progressbars = False)
+
+    workdir = workdir or tempfile.mkdtemp()
+    os.makedirs(workdir, exist_ok = True)
+    rnd = random.Random(1)
+    resources = ['Resource%u' % i for i in range(50)]
+    edge_list = _synthetic_edge_list(n_edges = n_edges, n_nodes = n_nodes)
+
+    for e in edge_list:
+
+        e['source'] = rnd.sample(resources, rnd.randrange(1, 4))
+
+    pa = main.PyPath()
+    pa.attach_network(edge_list = edge_list, bulk = True)
+
+    for snapshot in (False, True):
+
+        path = os.path.join(
+            workdir,
+            'network.%s' % ('snapshot' if snapshot else 'pickle'),
+        )
+
+        t0 = time.time()
+        pa.save_network(pfile = path, snapshot = snapshot)
+        t_save = time.time() - t0
+
+        pa_loaded = main.PyPath()
+        t0 = time.time()
+        pa_loaded.init_network(pfile = path)
+        t_load = time.time() - t0
+
+        sys.stdout.write(
+            '%s: save %.02f s, load %.02f s, %u edges loaded\n' % (
+                'snapshot' if snapshot else 'pickle',
+                t_save,
+                t_load,
+                pa_loaded.graph.ecount(),
+            )
+        )
+
+
+if __name__ == '__main__':
+
+    args = sys.argv[1:]
+    bench_network_snapshot(
+        *([int(a) for a in args[:2]] + args[2:3])
+    )
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import os
+import collections
+import multiprocessing
+import multiprocessing.pool
+
+from future.utils import iteritems
+
+import pytest
+import igraph
+import numpy as np
+import scipy.sparse
+
+import pypath.annot as annot
+
+
+Record = collections.namedtuple(
+    'Record',
+    ['tissue', 'level', 'tags'],
+)
+
+
+_proteins = ['P00000', 'P00001', 'P00002', 'P00003', 'P00004']
+
+
+def _annotation(name = 'Test'):
+
+    return annot.AnnotationBase(
+        name = name,
+        dump = {
+            'P00001': {
+                Record('liver', 'high', ('a', 'b')),
+                Record('lung', 'low', ()),
+            },
+            'P00002': {
+                Record('liver', 'low', ('b',)),
+            },
+            'P00003': {
+                Record('lung', 'high', ('c',)),
+            },
+            'P00004': set(),
+        },
+        reference_set = _proteins,
+        infer_complexes = False,
+    )
+
+
+def _resource_input():
+
+    return {
+        'P00001': [('liver', 'high'), ('lung', 'low')],
+        'P00002': [('liver', 'low')],
+    }
+
+
+def _failing_input():
+
+    raise RuntimeError('Resource not available.')
+
+
+class _Resource(annot.AnnotationBase):
+
+
+    def __init__(self, **kwargs):
+
+        annot.AnnotationBase.__init__(
+            self,
+            name = 'Resource',
+            input_method = _resource_input,
+            infer_complexes = False,
+            **kwargs
+        )
+
+
+    def _process_method(self):
+
+        record = collections.namedtuple(
+            'ResourceAnnotation',
+            ['tissue', 'level'],
+        )
+
+        self.annot = dict(
+            (uniprot, set(record(*a) for a in annots))
+            for uniprot, annots in iteritems(self.data)
+        )
+
+
+class _Failing(_Resource):
+
+
+    def __init__(self, **kwargs):
+
+        annot.AnnotationBase.__init__(
+            self,
+            name = 'Failing',
+            input_method = _failing_input,
+            infer_complexes = False,
+            **kwargs
+        )
+
+
+def _table(sparse):
+
+    table = annot.AnnotationTable(
+        proteins = _proteins,
+        use_complexes = False,
+        use_fields = {'Test': ('tissue', 'level'), 'Other': ('level',)},
+        sparse = sparse,
+        load = False,
+    )
+    table.annots = {'Test': _annotation(), 'Other': _annotation('Other')}
+
+    return table
+
+
+class TestAnnotationBase(object):
+
+
+    def test_get_subset(self):
+
+        a = _annotation()
+
+        assert a.get_subset() == {'P00001', 'P00002', 'P00003'}
+        assert a.get_subset(tissue = 'liver') == {'P00001', 'P00002'}
+        # all conditions must hold for the same record
+        assert a.get_subset(tissue = 'lung', level = 'high') == {'P00003'}
+        assert a.get_subset(tissue = {'lung', 'brain'}) == {
+            'P00001',
+            'P00003',
+        }
+        # elements of multiple values
+        assert a.get_subset(tags = 'b') == {'P00001', 'P00002'}
+        assert a.get_subset(tags = {'c', 'x'}) == {'P00003'}
+        assert a.get_subset(tags = ('a', 'b')) == {'P00001'}
+        # callables evaluated on the remaining records
+        assert a.get_subset(
+            tissue = 'liver',
+            tags = lambda tags: len(tags) > 1,
+        ) == {'P00001'}
+        assert a.get_subset(
+            method = lambda r: r.level == 'low',
+            tissue = 'lung',
+        ) == {'P00001'}
+        assert a.get_subset(tissue = 'brain') == set()
+
+
+    def test_to_array(self):
+
+        a = _annotation()
+
+        names, data = a.to_array(use_fields = ('tissue', 'level'))
+
+        assert names[0] == ('Test',)
+        assert data.shape == (5, 7)
+
+        for name, column in zip(names[1:], data.T[1:]):
+
+            subset = a.get_subset(**dict(zip(('tissue', 'level'), name[1:])))
+
+            assert set(
+                entity
+                for entity, value in zip(a.reference_set, column)
+                if value
+            ) == subset
+
+        # the index is rebuilt after the annotations change
+        a.annot['P00004'] = {Record('liver', 'high', ())}
+        a.drop_index()
+
+        assert 'P00004' in a.get_subset(tissue = 'liver')
+
+        names, data = a.to_array(use_fields = ('tissue', 'level'))
+
+        assert data[4, names.index(('Test', 'liver', 'high'))]
+
+
+class TestAnnotationTable(object):
+
+
+    def test_sparse_array(self):
+
+        dense = _table(sparse = False)
+        dense.make_array()
+        table = _table(sparse = True)
+        table.make_array()
+
+        assert scipy.sparse.issparse(table.data)
+        assert list(table.names) == list(dense.names)
+        assert (table.data.toarray() == dense.data).all()
+        assert table.cols[('Other', 'low')] == 9
+
+        table.make_sets()
+        dense.make_sets()
+
+        assert table.sets == dense.sets
+        assert table.sets[('Test', 'liver', 'high')] == {'P00001'}
+        assert (
+            table.to_dataframe().sparse.to_dense().values ==
+            dense.to_dataframe().values
+        ).all()
+
+        graph = igraph.Graph([(0, 1), (1, 2)])
+        graph.vs['name'] = ['P00003', 'P00002', 'P09999']
+        pa = type('PyPath', (object,), {'graph': graph})()
+        nodeannot, edgeannot = table.annotate_network(pa)
+
+        assert nodeannot == dense.annotate_network(pa)[0]
+        assert (('Test', 'lung', 'high'), 0) in nodeannot
+        assert (
+            ('Test', 'lung'),
+            ('Other', 'low'),
+            0,
+        ) in edgeannot
+        assert not any(e[2] == 1 for e in edgeannot)
+
+        table.keep({('Test',), ('Other', 'low')})
+
+        assert list(table.names) == [('Test',), ('Other', 'low')]
+        assert table.data.shape == (5, 2)
+        assert table.cols[('Other', 'low')] == 1
+
+
+    def test_save_array(self, tmpdir):
+
+        fname = str(tmpdir.join('annot.npz'))
+        table = _table(sparse = True)
+        table.make_array()
+        table.save_array(fname)
+
+        # the array is loaded, not built again
+        loaded = _table(sparse = False)
+        loaded.load_array(fname)
+
+        assert isinstance(loaded.data, np.ndarray)
+        assert list(loaded.names) == list(table.names)
+        assert (loaded.data == table.data.toarray()).all()
+        assert loaded.cols == table.cols
+
+        # not loaded if the rows are different
+        other = _table(sparse = False)
+        other.reference_set = list(reversed(other.reference_set))
+        other.load_array(fname)
+
+        assert not hasattr(other, 'data')
+
+        # the array is removed if the annotations are saved without it
+        pickle_file = fname[:-4]
+        table.save_to_pickle(pickle_file)
+
+        assert os.path.exists(fname)
+
+        del table.data
+        table.save_to_pickle(pickle_file)
+
+        assert not os.path.exists(fname)
+
+
+    def test_lazy(self):
+
+        table = annot.AnnotationTable(
+            proteins = _proteins,
+            protein_sources = (_Resource, _Failing),
+            complex_sources = (),
+            use_complexes = False,
+            lazy = True,
+        )
+
+        assert set(table.annots.keys()) == {'Resource', 'Failing'}
+        assert table.annots.loaded == set()
+
+        assert table.annots['Resource'].get_subset(level = 'low') == {
+            'P00001',
+            'P00002',
+        }
+        assert table.annots.loaded == {'Resource'}
+        assert table.load_stats['Resource'].time >= 0
+
+        # failed ones are removed upon access
+        assert set(table.search('P00002').keys()) == {'Resource'}
+        assert set(table.annots.keys()) == {'Resource'}
+
+
+    def test_parallel(self):
+
+        table = annot.AnnotationTable(
+            proteins = _proteins,
+            protein_sources = (_Resource, _Failing),
+            complex_sources = (),
+            use_complexes = False,
+            lazy = False,
+            workers = 2,
+        )
+
+        assert set(table.annots.keys()) == {'Resource'}
+        assert table.annots.loaded == {'Resource'}
+
+        resource = table.annots['Resource']
+
+        assert resource.get_subset(tissue = 'liver', level = 'high') == {
+            'P00001',
+        }
+        assert (
+            resource.annot['P00002'].pop().__class__.__name__ ==
+            'ResourceAnnotation'
+        )
+        assert set(table.load_stats.keys()) == {'Resource'}
+
+
+    def test_parallel_failure(self, monkeypatch):
+
+        pools = []
+
+        class Pool(multiprocessing.pool.Pool):
+
+            def __init__(self, *args, **kwargs):
+
+                multiprocessing.pool.Pool.__init__(self, *args, **kwargs)
+                self.calls = []
+                pools.append(self)
+
+            def terminate(self):
+
+                self.calls.append('terminate')
+                multiprocessing.pool.Pool.terminate(self)
+
+            def join(self):
+
+                self.calls.append('join')
+                multiprocessing.pool.Pool.join(self)
+
+        def record_stats(self, name, elapsed, memory):
+
+            raise RuntimeError('Failed to record the stats.')
+
+        monkeypatch.setattr(multiprocessing, 'Pool', Pool)
+        monkeypatch.setattr(
+            annot.AnnotationTable,
+            '_record_stats',
+            record_stats,
+        )
+
+        # the workers are terminated if processing a result fails
+        with pytest.raises(RuntimeError):
+
+            annot.AnnotationTable(
+                proteins = _proteins,
+                protein_sources = (_Resource, _Failing),
+                complex_sources = (),
+                use_complexes = False,
+                lazy = False,
+                workers = 2,
+            )
+
+        assert len(pools) == 1
+        assert pools[0].calls == ['terminate', 'join']
+        assert not multiprocessing.active_children()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import os
+import time
+import gzip
+import zipfile
+import threading
+
+import pytest
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+import pypath.curl as curl
+import pypath.cache as cache_mod
+import pypath.settings as settings
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Answers GET requests by the path and POST requests by the body.
+    The path `/flaky` fails at the first attempt, `/size/<n>` returns
+    `n` bytes.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+
+        if self.path == '/flaky' and '/flaky' not in self.server.requests:
+
+            self._respond(b'', status = 500)
+
+        elif self.path == '/latin1':
+
+            self._respond('T\u00fcrei'.encode('latin-1'))
+
+        elif self.path.startswith('/size/'):
+
+            self._respond(b'x' * int(self.path.split('/')[2]))
+
+        else:
+
+            self._respond(('GET %s' % self.path).encode('ascii'))
+
+    def do_POST(self):
+
+        length = int(self.headers['Content-Length'])
+        self._respond(b'POST ' + self.rfile.read(length))
+
+    def _respond(self, body, status = 200):
+
+        self.server.requests.append(self.path)
+        self.server.times.append(time.time())
+        self.server.clients.add(self.client_address)
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+
+    srv = _Server(('127.0.0.1', 0), _Handler)
+    srv.requests = []
+    srv.times = []
+    srv.clients = set()
+    thread = threading.Thread(target = srv.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield srv
+
+    srv.shutdown()
+    srv.server_close()
+
+
+class TestMultiCurl(object):
+
+
+    def test_multi_curl(self, server, tmpdir):
+
+        cache_dir = str(tmpdir)
+        base = 'http://127.0.0.1:%u' % server.server_address[1]
+        requests = (
+            ['%s/item%u' % (base, i) for i in range(30)] +
+            [{'url': '%s/post' % base, 'post': {'q': 'x%u' % i}}
+             for i in range(5)] +
+            ['%s/item0' % base, '%s/flaky' % base]
+        )
+
+        mc = curl.MultiCurl(
+            requests,
+            concurrency = 4,
+            cache_dir = cache_dir,
+        )
+
+        assert mc.results == (
+            ['GET /item%u' % i for i in range(30)] +
+            ['POST q=x%u' % i for i in range(5)] +
+            ['GET /item0', 'GET /flaky']
+        )
+        # the duplicated URL downloaded once, the flaky one twice
+        assert len(server.requests) == 37
+        # connections are reused
+        assert len(server.clients) <= 4
+
+        # the results are in the usual cache files
+        c = curl.Curl(
+            '%s/post' % base,
+            post = {'q': 'x3'},
+            cache_dir = cache_dir,
+        )
+
+        assert c.use_cache
+        assert c.result == 'POST q=x3'
+        assert len(server.requests) == 37
+
+        # nothing is downloaded again
+        mc = curl.MultiCurl(requests, cache_dir = cache_dir)
+
+        assert mc.results[5] == 'GET /item5'
+        assert len(server.requests) == 37
+
+
+    def test_min_interval(self, server, tmpdir):
+
+        base = 'http://127.0.0.1:%u' % server.server_address[1]
+        requests = ['%s/item%u' % (base, i) for i in range(5)]
+        requests.append('%s/flaky' % base)
+
+        mc = curl.MultiCurl(
+            requests,
+            concurrency = 3,
+            min_interval = .2,
+            cache_dir = str(tmpdir),
+        )
+
+        assert mc.results == ['GET /item%u' % i for i in range(5)] + [
+            'GET /flaky',
+        ]
+        # the retry of the flaky one is rate limited too
+        assert len(server.times) == 7
+        assert all(
+            t1 - t0 > .15
+            for t0, t1 in zip(server.times[:-1], server.times[1:])
+        )
+
+
+class TestCacheIndex(object):
+
+
+    def test_cache_index(self, server, tmpdir, monkeypatch):
+
+        cache_dir = str(tmpdir)
+        base = 'http://127.0.0.1:%u' % server.server_address[1]
+        monkeypatch.setattr(settings.settings, 'cache_max_size', 3500)
+        monkeypatch.setattr(
+            settings.settings,
+            'cache_max_age_urls',
+            {r'/size/999$': 0},
+        )
+
+        def download(path):
+
+            return curl.Curl(base + path, cache_dir = cache_dir)
+
+        c0 = download('/size/1000')
+        c1 = download('/size/1001')
+        download('/size/1000')
+        download('/size/1002')
+
+        index = cache_mod.get_index(cache_dir)
+        entries = dict((e.url, e) for e in index.entries())
+
+        assert entries[base + '/size/1000'].hits == 1
+        assert entries[base + '/size/1000'].size == 1000
+        assert entries[base + '/size/1000'].md5 == cache_mod.file_md5(
+            c0.cache_file_name
+        )
+        assert index.total_size() == 3003
+
+        # the least recently used file is evicted
+        c3 = download('/size/1003')
+
+        assert base + '/size/1001' not in set(
+            e.url for e in index.entries()
+        )
+        assert not os.path.exists(c1.cache_file_name)
+        assert index.total_size() == 3005
+
+        # expired files are downloaded again
+        n_requests = len(server.requests)
+        download('/size/999')
+        download('/size/999')
+
+        assert len(server.requests) == n_requests + 2
+
+        # changed files are detected
+        with open(c3.cache_file_name, 'a') as fp:
+
+            fp.write('x')
+
+        assert index.verify() == [c3.cache_file_name]
+
+        # files not in the index are found
+        untracked = os.path.join(cache_dir, '%s-untracked' % ('0' * 32))
+
+        with open(untracked, 'w') as fp:
+
+            fp.write('x')
+
+        assert index.scan() == 1
+        assert untracked in set(e.path for e in index.entries())
+
+        index.prune(max_size = 1)
+
+        assert [e.path for e in index.entries()] == [untracked]
+        assert not os.path.exists(c3.cache_file_name)
+
+
+class TestCacheWrite(object):
+
+
+    def test_atomic_write(self, server, tmpdir):
+
+        cache_dir = str(tmpdir)
+        base = 'http://127.0.0.1:%u' % server.server_address[1]
+
+        c = curl.Curl(base + '/item1', cache_dir = cache_dir)
+
+        assert c.result == 'GET /item1'
+        # the temporary file has been moved to its final place
+        assert os.path.exists(c.cache_file_name)
+        assert not os.path.exists(cache_mod.tmp_path(c.cache_file_name))
+
+        # a failed download does not leave any file behind
+        c = curl.Curl(base + '/flaky', cache_dir = cache_dir, retries = 1)
+
+        assert c.download_failed
+        assert not os.path.exists(c.cache_file_name)
+        assert not os.path.exists(cache_mod.tmp_path(c.cache_file_name))
+
+        # the original file is kept if writing fails
+        path = str(tmpdir.join('data.pickle'))
+
+        with cache_mod.atomic_write(path) as fp:
+
+            fp.write(b'old')
+
+        with pytest.raises(ValueError):
+
+            with cache_mod.atomic_write(path) as fp:
+
+                fp.write(b'partial')
+                raise ValueError
+
+        with open(path, 'rb') as fp:
+
+            assert fp.read() == b'old'
+
+        assert not os.path.exists(cache_mod.tmp_path(path))
+
+
+class TestFileOpener(object):
+
+
+    def test_cache_encoding(self, server, tmpdir):
+
+        cache_dir = str(tmpdir)
+        url = 'http://127.0.0.1:%u/latin1' % server.server_address[1]
+
+        def get(encoding, **kwargs):
+
+            return curl.Curl(
+                url,
+                encoding = encoding,
+                cache_dir = cache_dir,
+                **kwargs
+            )
+
+        # a file transcoded to utf-8 by an earlier version
+        legacy = get(None, setup = False, call = False, process = False)
+
+        with open(legacy.cache_file_name, 'wb') as fp:
+
+            fp.write('T\u00fcrei'.encode('utf-8'))
+
+        c = get('iso-8859-1')
+
+        assert c.cache_file_name != legacy.cache_file_name
+        assert not c.use_cache
+        assert c.result == 'T\u00fcrei'
+        assert get('latin1').use_cache
+        assert get('latin1').result == 'T\u00fcrei'
+        assert get('utf-8').cache_file_name == legacy.cache_file_name
+        assert get('utf-8').result == 'T\u00fcrei'
+
+
+
+    def test_streaming(self, tmpdir):
+
+        lines = ['T\u00fcrei\t%u\n' % i for i in range(1000)]
+        content = ''.join(lines)
+
+        # decoded while reading, the file is not rewritten
+        path = str(tmpdir.join('data.txt'))
+
+        with open(path, 'wb') as fp:
+
+            fp.write(content.encode('latin-1'))
+
+        c = curl.Curl(path, encoding = 'latin-1', large = True)
+
+        assert list(c.result) == lines
+
+        with open(path, 'rb') as fp:
+
+            assert fp.read() == content.encode('latin-1')
+
+        # gzip decompressed on the fly, progress in compressed bytes
+        path = str(tmpdir.join('data.txt.gz'))
+
+        with gzip.open(path, 'wb') as fp:
+
+            fp.write(content.encode('utf-8'))
+
+        opener = curl.FileOpener(path)
+
+        assert opener.size == os.path.getsize(path)
+        assert list(opener.result) == lines
+        assert opener.tell() == opener.size
+
+        # zip members decoded on the fly
+        path = str(tmpdir.join('data.zip'))
+
+        with zipfile.ZipFile(path, 'w') as zf:
+
+            zf.writestr('data.txt', content.encode('latin-1'))
+
+        c = curl.Curl(path, encoding = 'latin-1', large = True)
+
+        assert list(c.result['data.txt']) == lines
+        assert sorted(os.listdir(str(tmpdir))) == [
+            'data.txt',
+            'data.txt.gz',
+            'data.zip',
+        ]
+
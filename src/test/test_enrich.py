@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import random
+
+import numpy as np
+import scipy.stats
+
+import pypath.enrich as enrich
+import pypath.goenrich as goenrich
+
+
+def _random_sets(n_proteins = 300, n_terms = 40, n_sets = 6, seed = 1):
+
+    rnd = random.Random(seed)
+    proteins = ['P%05u' % i for i in range(n_proteins)]
+    terms = ['GO:%07u' % i for i in range(n_terms)]
+    annotation = dict(
+        (uniprot, set(rnd.sample(terms, rnd.randrange(1, 6))))
+        for uniprot in proteins
+    )
+    sets = [
+        set(rnd.sample(proteins, rnd.randrange(5, 60)))
+        for _ in range(n_sets)
+    ]
+
+    return proteins, terms, annotation, sets
+
+
+class _Names(object):
+
+
+    def get_name(self, term):
+
+        return 'name of %s' % term
+
+
+class TestEnrich(object):
+
+
+    def test_hypergeom_pvalues(self):
+
+        pvalues = enrich.hypergeom_pvalues(
+            set_count = np.array([0, 3, 10, 7]),
+            pop_count = np.array([20, 20, 30, 12]),
+            set_size = 25,
+            pop_size = 200,
+        )
+
+        for pvalue, (k, n) in zip(pvalues, ((0, 20), (3, 20), (10, 30), (7, 12))):
+
+            fisher = scipy.stats.fisher_exact(
+                ((k, 25 - k), (n - k, 200 - 25 - n + k)),
+                alternative = 'greater',
+            )[1]
+
+            assert np.isclose(pvalue, fisher)
+
+
+    def test_enrichment_matrix(self):
+
+        proteins, terms, annotation, sets = _random_sets()
+        annot_matrix = np.array([
+            [term in annotation[uniprot] for term in terms]
+            for uniprot in proteins
+        ])
+        set_matrix = np.array([
+            [uniprot in this_set for this_set in sets]
+            for uniprot in proteins
+        ])
+
+        result = enrich.enrichment_matrix(
+            annot_matrix,
+            set_matrix,
+            names = terms,
+            method = 'fdr_bh',
+        )
+
+        for i in range(len(sets)):
+
+            counts = annot_matrix[set_matrix[:,i]].sum(axis = 0)
+            tested = counts >= 1
+            table = enrich.enrichment_table(
+                set_count = counts[tested],
+                pop_count = annot_matrix.sum(axis = 0)[tested],
+                set_size = set_matrix[:,i].sum(),
+                pop_size = len(proteins),
+                names = np.array(terms)[tested],
+                method = 'fdr_bh',
+            )
+            this_result = result[result.set == i].set_index('term')
+
+            assert list(this_result.pvalue) == sorted(this_result.pvalue)
+            assert np.allclose(
+                this_result.loc[table.index, ['pvalue', 'pval_adj']].values,
+                table[['pvalue', 'pval_adj']].values,
+            )
+
+
+    def test_enrichment_set(self, capsys):
+
+        data = {
+            'term1': (10, 20, 25, 'First term'),
+            'term2': (2, 40, 25, 'Second term'),
+            'term3': (5, 5, 25, 'Third term'),
+        }
+
+        enr = enrich.EnrichmentSet(data, pop_size = 200)
+
+        assert capsys.readouterr().out == ''
+        assert list(enr.table.index) == ['term1', 'term2', 'term3']
+        assert enr.enrichments['term3'].pval_adj == enr.table.pval_adj['term3']
+        assert enr.top_names(length = 2) == [
+            data[term][3]
+            for term in enr.table.sort_values('pval_adj').index[:2]
+        ]
+        assert enr.top_names()[0] == 'First term'
+
+        enr.correction(method = 'bonferroni')
+
+        assert np.isclose(
+            enr.enrichments['term2'].pval_adj,
+            min(1., enr.enrichments['term2'].pvalue * 3),
+        )
+
+
+class TestGOEnrichmentSet(object):
+
+
+    def test_new_sets(self):
+
+        proteins, terms, annotation, sets = _random_sets()
+        enr = goenrich.GOEnrichmentSet(
+            aspect = 'P',
+            annotation = _Names(),
+            basic_set = annotation,
+        )
+
+        result = enr.new_sets(sets)
+
+        for i, this_set in enumerate(sets):
+
+            enr.new_set(set_names = this_set)
+            this_result = result[result.set == i].set_index('term')
+
+            assert set(this_result.index) == set(enr.enrichments.keys())
+
+            for term, e in enr.enrichments.items():
+
+                assert np.isclose(this_result.pvalue[term], e.pvalue)
+                assert np.isclose(this_result.pval_adj[term], e.pval_adj)
+
+        assert result.name[0] == 'name of %s' % result.term[0]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import random
+import pytest
+
+import pypath.go as go
+
+
+def _synthetic_ontology(n_terms = 500, seed = 1):
+    """
+    Creates a ``GeneOntology`` object with a random directed acyclic
+    graph of terms, without downloading anything.
+    """
+    
+    rnd = random.Random(seed)
+    relations = sorted(go.GeneOntology.all_relations)
+    terms = ['GO:%07u' % i for i in range(n_terms)]
+    
+    ontology = go.GeneOntology.__new__(go.GeneOntology)
+    ontology.ancestors = dict((term, set()) for term in terms)
+    ontology.descendants = dict((term, set()) for term in terms)
+    ontology.aspect = dict((term, 'P') for term in terms)
+    
+    for i, term in enumerate(terms[1:], start = 1):
+        
+        for parent in rnd.sample(terms[:i], min(i, rnd.randint(1, 3))):
+            
+            relation = rnd.choice(relations)
+            ontology.ancestors[term].add((parent, relation))
+            ontology.descendants[parent].add((term, relation))
+    
+    return ontology
+
+
+def _subgraph_nodes(ontology, direction, terms, relations, include_seed):
+    """
+    The recursive traversal used before memoization, as reference.
+    """
+    
+    graph = getattr(ontology, direction)
+    subgraph = set(terms) if include_seed else set()
+    
+    for term in terms:
+        
+        for related, relation in graph[term]:
+            
+            if relation not in relations:
+                
+                continue
+            
+            if related not in subgraph:
+                
+                subgraph.update(
+                    _subgraph_nodes(
+                        ontology,
+                        direction,
+                        {related},
+                        relations,
+                        True,
+                    )
+                )
+                subgraph.add(related)
+    
+    return subgraph
+
+
+class TestGeneOntology(object):
+    
+    def test_closures(self):
+        
+        ontology = _synthetic_ontology()
+        rnd = random.Random(2)
+        terms = sorted(ontology.aspect.keys())
+        
+        queries = [
+            (
+                direction,
+                set(rnd.sample(terms, rnd.randint(1, 3))),
+                relations,
+                include_seed,
+            )
+            for direction in ('ancestors', 'descendants')
+            for relations in (
+                go.GeneOntology.all_relations,
+                {'is_a', 'part_of'},
+            )
+            for include_seed in (True, False)
+            for _ in range(20)
+        ]
+        
+        expected = [_subgraph_nodes(ontology, *q) for q in queries]
+        
+        assert [
+            ontology.subgraph_nodes(*q) for q in queries
+        ] == expected
+        
+        ontology.build_index()
+        ontology._closures = {}
+        
+        assert [
+            ontology.subgraph_nodes(*q) for q in queries
+        ] == expected
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import os
+import random
+import collections
+
+import pypath.linkcomm as linkcomm
+
+
+def _synthetic_network(n_nodes = 120, n_edges = 400, seed = 1):
+    """
+    Creates a random network with string node names and edge weights.
+    """
+
+    rnd = random.Random(seed)
+
+    adj = collections.defaultdict(set)
+    edges = set()
+    weights = {}
+
+    while len(edges) < n_edges:
+
+        a, b = rnd.sample(range(n_nodes), 2)
+        edge = linkcomm.swap('N%03u' % a, 'N%03u' % b)
+        edges.add(edge)
+        adj[edge[0]].add(edge[1])
+        adj[edge[1]].add(edge[0])
+        weights[edge] = rnd.choice((0.5, 1.0, 2.0))
+
+    return dict(adj), edges, weights
+
+
+class TestSparseHLC(object):
+
+
+    def test_single_linkage(self, tmpdir):
+
+        for seed in range(3):
+
+            adj, edges, weights = _synthetic_network(seed = seed)
+
+            for dendro_flag in (False, True):
+
+                result = linkcomm.HLC(adj, edges).single_linkage(
+                    dendro_flag = dendro_flag,
+                )
+                result_sparse = linkcomm.SparseHLC(adj, edges).single_linkage(
+                    dendro_flag = dendro_flag,
+                )
+
+                assert result_sparse == result
+
+            assert (
+                linkcomm.SparseHLC(adj, edges).single_linkage(0.3) ==
+                linkcomm.HLC(adj, edges).single_linkage(0.3)
+            )
+
+        # the output files are the same
+        def write(hlc, name):
+
+            path = str(tmpdir.join(name))
+            edge2cid, S, D, list_D, orig_cid2edge, linkage = (
+                hlc.single_linkage(dendro_flag = True)
+            )
+            linkcomm.write_edge2cid(edge2cid, path)
+            linkcomm.write_dendro(path, orig_cid2edge, linkage)
+
+            return path
+
+        path = write(linkcomm.HLC(adj, edges), 'hlc')
+        path_sparse = write(linkcomm.SparseHLC(adj, edges), 'sparse')
+
+        for ext in (
+            '.edge2comm.txt',
+            '.comm2edges.txt',
+            '.comm2nodes.txt',
+            '.cid2edge.txt',
+            '.linkage.txt',
+        ):
+
+            with open(path + ext) as fp, open(path_sparse + ext) as fp_sparse:
+
+                assert fp.read() == fp_sparse.read()
+
+
+    def test_weighted(self):
+
+        adj, edges, weights = _synthetic_network(seed = 4)
+
+        P, S, D, list_D = linkcomm.HLC(adj, edges).single_linkage(w = weights)
+        P_sparse, S_sparse, D_sparse, list_D_sparse = (
+            linkcomm.SparseHLC(adj, edges).single_linkage(w = weights)
+        )
+
+        # the similarities might differ by rounding errors
+        assert P_sparse == P
+        assert abs(S_sparse - S) < 1e-9
+        assert abs(D_sparse - D) < 1e-9
+
+        assert (
+            linkcomm.SparseHLC(adj, edges).single_linkage(0.3, w = weights)[0]
+            ==
+            linkcomm.HLC(adj, edges).single_linkage(0.3, w = weights)[0]
+        )
+
+
+    def test_no_adjacent_edges(self):
+
+        edges = {('a', 'b'), ('c', 'd')}
+        adj = {'a': {'b'}, 'b': {'a'}, 'c': {'d'}, 'd': {'c'}}
+
+        for w in (None, {('a', 'b'): 1.0, ('c', 'd'): 2.0}):
+
+            assert (
+                linkcomm.SparseHLC(adj, edges).single_linkage(w = w) ==
+                linkcomm.HLC(adj, edges).single_linkage(w = w)
+            )
+            assert (
+                linkcomm.SparseHLC(adj, edges).single_linkage(0.3, w = w) ==
+                linkcomm.HLC(adj, edges).single_linkage(0.3, w = w)
+            )
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2018
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import os
+import pytest
+
+import pypath.intera as intera
+import pypath.mapping as mapping
+import pypath.input_formats as input_formats
+import pypath.settings as settings
+
+
+def _file_mapping(tmpdir, lines = None, id_type_b = 'uniprot'):
+    
+    infile = tmpdir.join('mapping.tsv')
+    infile.write(
+        ''.join(
+            lines or (
+                'genesymbol\tuniprot\n',
+                'EGFR\tP00533\n',
+                'ERBB2\tP04626\n',
+                'ERBB2\tQ9UK79\n',
+                'ÄBC\tX00001\n',
+            )
+        )
+    )
+    
+    return input_formats.FileMapping(
+        id_type_a = 'genesymbol',
+        id_type_b = id_type_b,
+        input_ = str(infile),
+        col_a = 0,
+        col_b = 1,
+        separator = '\t',
+        header = 1,
+        ncbi_tax_id = 9606,
+    )
+
+
+class TestMapping(object):
+    
+    def test_mmap_cache(self, tmpdir):
+        
+        param = _file_mapping(tmpdir)
+        settings.setup(
+            cachedir = str(tmpdir.mkdir('cache')),
+            mapping_cache_format = 'mmap',
+        )
+        
+        try:
+            
+            # first load writes the cache, second reads it back
+            for _ in range(2):
+                
+                reader = mapping.MapReader(param, load_b_to_a = True)
+                a_to_b = reader.mapping_table_a_to_b
+                b_to_a = reader.mapping_table_b_to_a
+                
+                assert isinstance(reader.a_to_b, mapping.MmapMappingData)
+                assert os.path.exists(reader.cachefile_a_to_b + '.mmap')
+                assert not os.path.exists(reader.cachefile_a_to_b)
+                assert a_to_b['ERBB2'] == {'P04626', 'Q9UK79'}
+                assert a_to_b['ÄBC'] == {'X00001'}
+                assert a_to_b['TP53'] == set()
+                assert b_to_a['P00533'] == {'EGFR'}
+                assert len(reader.a_to_b) == 3
+            
+            reader.a_to_b.close()
+            
+            assert dict(reader.a_to_b.items())['EGFR'] == {'P00533'}
+        
+        finally:
+            
+            settings.setup(mapping_cache_format = 'pickle')
+    
+    
+    def test_mmap_rewrite(self, tmpdir):
+        
+        path = str(tmpdir.join('table.mmap'))
+        mapping.MmapMappingData.write(path, {'EGFR': {'P00533'}})
+        data = mapping.MmapMappingData(path)
+        
+        assert data['EGFR'] == {'P00533'}
+        
+        # another process writing the same cache file does not
+        # change the file already mapped into the memory
+        mapping.MmapMappingData.write(
+            path,
+            {'ERBB2': {'P04626', 'Q9UK79'}, 'TP53': {'P04637'}},
+        )
+        
+        assert data['EGFR'] == {'P00533'}
+        assert len(data) == 1
+        
+        data.close()
+        
+        assert data['ERBB2'] == {'P04626', 'Q9UK79'}
+        assert len(data) == 2
+        assert os.listdir(str(tmpdir)) == ['table.mmap']
+    
+    
+    def test_mmap_cache_migration(self, tmpdir):
+        
+        param = _file_mapping(tmpdir)
+        settings.setup(
+            cachedir = str(tmpdir.mkdir('cache')),
+            mapping_cache_format = 'pickle',
+        )
+        
+        try:
+            
+            reader = mapping.MapReader(param)
+            reader.mapping_table_a_to_b
+            
+            assert os.path.exists(reader.cachefile_a_to_b)
+            
+            # the pickle is replaced by the compact file at the next load
+            settings.setup(mapping_cache_format = 'mmap')
+            reader = mapping.MapReader(param)
+            a_to_b = reader.mapping_table_a_to_b
+            
+            assert isinstance(reader.a_to_b, mapping.MmapMappingData)
+            assert a_to_b['ERBB2'] == {'P04626', 'Q9UK79'}
+            assert os.path.exists(reader.cachefile_a_to_b + '.mmap')
+            assert not os.path.exists(reader.cachefile_a_to_b)
+            
+            reader.a_to_b.close()
+            
+            # and read from there next time
+            reader = mapping.MapReader(param)
+            
+            assert reader.mapping_table_a_to_b['EGFR'] == {'P00533'}
+            
+            reader.a_to_b.close()
+        
+        finally:
+            
+            settings.setup(mapping_cache_format = 'pickle')
+    
+    
+    def test_map_name_memo(self, tmpdir):
+        
+        param = _file_mapping(tmpdir, id_type_b = 'entrez')
+        settings.setup(
+            cachedir = str(tmpdir.mkdir('cache')),
+            mapping_memo_persistent = True,
+            mapping_memo_cache = str(tmpdir.join('memo')),
+        )
+        
+        def new_mapper():
+            
+            m = mapping.Mapper(memo = True)
+            m.load_mapping(param)
+            
+            return m
+        
+        def translate(m):
+            
+            return m.map_name('Erbb2', 'genesymbol', 'entrez')
+        
+        try:
+            
+            m = new_mapper()
+            
+            for _ in range(2):
+                
+                assert translate(m) == {'P04626', 'Q9UK79'}
+            
+            assert m.memo_stats()['hits'] == 1
+            assert m.memo_stats()['misses'] == 1
+            
+            m.memo.close()
+            
+            # the results are available in a new session
+            m = new_mapper()
+            
+            assert translate(m) == {'P04626', 'Q9UK79'}
+            assert m.memo_stats()['hits'] == 1
+            
+            m.memo.close()
+            
+            # and invalidated if the mapping table has changed
+            os.remove(mapping.MapReader(param).cachefile_a_to_b)
+            param = _file_mapping(
+                tmpdir,
+                ('genesymbol\tentrez\n', 'ERBB2\tP04626\n'),
+                id_type_b = 'entrez',
+            )
+            m = new_mapper()
+            
+            assert translate(m) == {'P04626'}
+            assert m.memo_stats()['hits'] == 0
+            
+            m.memo.close()
+        
+        finally:
+            
+            settings.setup(mapping_memo_persistent = False)
+    
+    
+    def test_map_names_bulk(self, tmpdir):
+        
+        settings.setup(cachedir = str(tmpdir.mkdir('cache')))
+        
+        tables = {
+            ('genesymbol', 'uniprot'): (
+                ('EGFR', 'P00533'),
+                ('ERBB2', 'P04626'),
+                ('ERBB2', 'Q9UK79'),
+                ('TP53', 'P99999'),
+                ('Mapk1', 'P28482'),
+                ('CDK1', 'P06493'),
+                ('FOO', 'A0A024R161'),
+                ('MIR1', 'MI0000001'),
+            ),
+            ('genesymbol-syn', 'uniprot'): (('HER1', 'P00533'),),
+            ('genesymbol5', 'uniprot'): (('KRASA', 'P01116'),),
+            ('uniprot-sec', 'uniprot-pri'): (('P99999', 'P04637'),),
+            ('trembl', 'genesymbol'): (
+                ('Q9UK79', 'ERBB2'),
+                ('A0A024R161', 'FOO'),
+            ),
+            # the same ID type as used by `Mapper.trembl_swissprot`
+            ('genesymbol', 'swissprotissprot'): (('ERBB2', 'P04626'),),
+        }
+        
+        def new_mapper():
+            
+            m = mapping.Mapper(memo = False)
+            
+            for (id_type_a, id_type_b), lines in tables.items():
+                
+                infile = tmpdir.join('%s__%s.tsv' % (id_type_a, id_type_b))
+                infile.write(
+                    ''.join(
+                        '%s\t%s\n' % line
+                        for line in (('a', 'b'),) + lines
+                    )
+                )
+                m.load_mapping(
+                    input_formats.FileMapping(
+                        id_type_a = id_type_a,
+                        id_type_b = id_type_b,
+                        input_ = str(infile),
+                        col_a = 0,
+                        col_b = 1,
+                        separator = '\t',
+                        header = 1,
+                        ncbi_tax_id = 9606,
+                    ),
+                    load_a_to_b = True,
+                    load_b_to_a = False,
+                )
+            
+            return m
+        
+        cplex = intera.Complex(components = ['P00533', 'P04626'])
+        
+        queries = (
+            (
+                # uppercase, capitalized and synonym fallbacks, trembl
+                # and secondary IDs translated to primary swissprot,
+                # no hit, duplicates and a complex
+                [
+                    'EGFR', 'egfr', 'ERBB2', 'TP53', 'mapk1', 'HER1',
+                    'CDK', 'KRASA', 'FOO', 'NOTHING', 'EGFR', cplex,
+                ],
+                'genesymbol',
+                'uniprot',
+            ),
+            (
+                ['P99999', 'Q9UK79', 'A0A024R161', 'P00533'],
+                'uniprot',
+                'uniprot',
+            ),
+            (['Q9UK79', 'A0A024R161', 'P00000'], 'trembl', 'genesymbol'),
+        )
+        
+        m_single = new_mapper()
+        m_bulk = new_mapper()
+        
+        for names, id_type, target_id_type in queries:
+            
+            for strict in (False, True):
+                
+                result = m_bulk.map_names_bulk(
+                    names,
+                    id_type = id_type,
+                    target_id_type = target_id_type,
+                    strict = strict,
+                )
+                
+                assert set(result.keys()) == set(names)
+                
+                for name in names:
+                    
+                    assert result[name] == m_single.map_name(
+                        name,
+                        id_type = id_type,
+                        target_id_type = target_id_type,
+                        strict = strict,
+                    )
+        
+        result = m_bulk.map_names_bulk(
+            ['ERBB2', 'TP53', 'CDK', 'NOTHING'],
+            'genesymbol',
+            'uniprot',
+        )
+        
+        assert result['ERBB2'] == {'P04626'}
+        assert result['TP53'] == {'P04637'}
+        assert result['CDK'] == {'P06493'}
+        assert result['NOTHING'] == set()
+        assert m_bulk.map_names_bulk(
+            [cplex],
+            'genesymbol',
+            'uniprot',
+            expand_complexes = False,
+        ) == {cplex: {cplex}}
@@ -23,16 +23,617 @@ Tests for the `igraph` based implementation of pypath's network building
 tools. Currently in `pypath.main.PyPath`.
 """
 
+import gzip
+import random
+import pickle
+import multiprocessing
+
 import pytest
+import numpy as np
+import pandas as pd
 
 import pypath.main as main
+import pypath.mapping as mapping
+import pypath.export as export
 import pypath.settings as settings
 import pypath.data_formats as data_formats
+import pypath.input_formats as input_formats
+
+
+def _synthetic_edge_list(n_edges = 2000, n_nodes = 300, seed = 1):
+    """
+    Creates mapped edge records like those produced by
+    `PyPath.read_data_file`. The entity type is `lncrna` to avoid
+    label translation via the UniProt mapping tables.
+    """
+    
+    rnd = random.Random(seed)
+    
+    edge_list = []
+    
+    for _ in range(n_edges):
+        
+        id_a = 'N%05u' % rnd.randrange(n_nodes)
+        id_b = 'N%05u' % rnd.randrange(n_nodes)
+        
+        edge_list.append({
+            'id_a': id_a.lower(),
+            'id_b': id_b.lower(),
+            'id_type_a': 'synthetic',
+            'id_type_b': 'synthetic',
+            'entity_type_a': 'lncrna',
+            'entity_type_b': 'lncrna',
+            'default_name_a': id_a,
+            'default_name_b': id_b,
+            'default_name_type_a': 'lncrna-genesymbol',
+            'default_name_type_b': 'lncrna-genesymbol',
+            'source': [rnd.choice(('ResA', 'ResB', 'ResC'))],
+            'is_directed': rnd.random() < .5,
+            'references': [
+                str(rnd.randrange(1000))
+                for _ in range(rnd.randrange(3))
+            ],
+            'stim': rnd.random() < .3,
+            'inh': rnd.random() < .2,
+            'taxon_a': 9606,
+            'taxon_b': 9606,
+            'type': rnd.choice(('PPI', 'TF')),
+            'attrs_node_a': {},
+            'attrs_node_b': {},
+            'attrs_edge': {'score': rnd.random()},
+        })
+    
+    return edge_list
+
+
+def _synthetic_lines(n_lines = 1000, seed = 1):
+    """
+    Creates the lines of a tab separated interaction table with
+    references, signs, directions, taxa, filter and resource columns.
+    """
+    
+    rnd = random.Random(seed)
+    
+    lines = ['a\tb\trefs\tsign\tdir\ttaxon\tmethod\tflags\tresources']
+    
+    for i in range(n_lines):
+        
+        if i % 97 == 0:
+            
+            lines.append('')
+            continue
+        
+        if i % 89 == 0:
+            
+            lines.append('N%05u\tN%05u' % (i, i + 1))
+            continue
+        
+        lines.append('\t'.join((
+            ' N%05u ' % rnd.randrange(100),
+            'N%05u' % rnd.randrange(100),
+            ';'.join(
+                rnd.choice(('%u' % rnd.randrange(50), ' %u ' % i, '', 'x'))
+                for _ in range(rnd.randrange(4))
+            ),
+            ','.join(
+                rnd.sample(('stimulation', 'inhibition', 'unknown'), 2)
+            ),
+            rnd.choice(('yes', 'no', 'yes no')),
+            rnd.choice(('human', 'mouse', 'yeast')),
+            rnd.choice(('physical', 'genetic')),
+            ','.join(rnd.sample(('HTP', 'LTP', 'curated'), 2)),
+            ','.join(rnd.sample(('ResA', 'ResB', 'ResC'), 2)),
+        )) + '\n')
+    
+    return lines
+
+
+def _edge_summary(pa):
+    
+    result = {}
+    
+    for e in pa.graph.es:
+        
+        d = e['dirs']
+        key = tuple(sorted(pa.edge_names(e)))
+        
+        result[key] = (
+            e['sources'],
+            set(r.pmid for r in e['references']),
+            set(e['type']),
+            e['score'],
+            dict(
+                (src, set(r.pmid for r in refs))
+                for src, refs in e['refs_by_source'].items()
+            ),
+            dict(
+                (_dir, set(r.pmid for r in refs))
+                for _dir, refs in e['refs_by_dir'].items()
+            ),
+            e['sources_by_type'],
+            d.dirs,
+            d.sources,
+            d.positive_sources,
+            d.negative_sources,
+        )
+    
+    return result
 
 
 class TestPyPath(object):
     
     
+    def test_attach_network_bulk(self):
+        
+        edge_list = _synthetic_edge_list()
+        
+        pa_seq = main.PyPath()
+        pa_seq.attach_network(edge_list = list(edge_list), bulk = False)
+        
+        pa_bulk = main.PyPath()
+        pa_bulk.attach_network(edge_list = list(edge_list), bulk = True)
+        
+        assert pa_seq.graph.vcount() == pa_bulk.graph.vcount()
+        assert pa_seq.graph.ecount() == pa_bulk.graph.ecount()
+        assert _edge_summary(pa_seq) == _edge_summary(pa_bulk)
+    
+    
+    def test_read_data_columns(self):
+        
+        param = input_formats.ReadSettings(
+            name = 'Synthetic',
+            separator = '\t',
+            header = True,
+            id_col_a = 0,
+            id_col_b = 1,
+            references = (2, ';'),
+            sign = (3, 'stimulation', 'inhibition', ','),
+            is_directed = (4, 'yes'),
+            ncbi_tax_id = {
+                'col': 5,
+                'dict': {'human': 9606, 'mouse': 10090},
+                'exclude': {10090},
+            },
+            positive_filters = [(6, 'physical')],
+            negative_filters = [(7, 'HTP', ',')],
+            extra_edge_attrs = {'flags': (7, ',')},
+            resource = (8, ','),
+            mark_source = 'source_mark',
+        )
+        lines = _synthetic_lines()
+        
+        pa = main.PyPath()
+        by_lines = pa._read_data_lines(param, iter(lines))
+        by_columns = pa._read_data_columns(param, iter(lines))
+        
+        for edge in by_lines[0] + by_columns[0]:
+            
+            edge['references'] = sorted(edge['references'])
+        
+        assert by_lines[0]
+        assert by_lines == by_columns
+    
+    
+    def test_load_resources_workers(self, tmpdir, monkeypatch):
+        
+        settings.setup(cachedir = str(tmpdir.mkdir('cache')))
+        # removing the nodes missing from the reference lists
+        # would need to download UniProt
+        monkeypatch.setattr(main.PyPath, 'clean_graph', lambda self: None)
+        resources = {}
+        
+        for i in range(3):
+            
+            infile = tmpdir.join('resource%u.tsv' % i)
+            infile.write(''.join(
+                'L%03u\tL%03u\t%u\n' % (
+                    (j * 7 + i) % 60,
+                    (j * 11 + i * 3) % 60,
+                    j,
+                )
+                for j in range(200)
+            ))
+            resources['Resource%u' % i] = input_formats.ReadSettings(
+                name = 'Resource%u' % i,
+                separator = '\t',
+                id_col_a = 0,
+                id_col_b = 1,
+                id_type_a = 'lncrna-genesymbol',
+                id_type_b = 'lncrna-genesymbol',
+                entity_type_a = 'lncrna',
+                entity_type_b = 'lncrna',
+                references = (2, ';'),
+                is_directed = True,
+                extra_edge_attrs = {'score': 2},
+                input = str(infile),
+            )
+        
+        summaries = []
+        
+        for workers in (1, 2):
+            
+            pa = main.PyPath()
+            pa.load_resources(resources, reread = True, workers = workers)
+            summaries.append(_edge_summary(pa))
+        
+        assert summaries[0]
+        assert summaries[0] == summaries[1]
+    
+    
+    def test_load_resources_workers_memo(self, tmpdir, monkeypatch):
+        
+        settings.setup(
+            cachedir = str(tmpdir.mkdir('cache')),
+            mapping_memo = True,
+            mapping_memo_persistent = True,
+            mapping_memo_cache = str(tmpdir.join('memo')),
+        )
+        monkeypatch.setattr(main.PyPath, 'clean_graph', lambda self: None)
+        resources = dict(
+            (
+                'Resource%u' % i,
+                input_formats.ReadSettings(
+                    name = 'Resource%u' % i,
+                    input = str(tmpdir.join('resource%u.tsv' % i)),
+                ),
+            )
+            for i in range(3)
+        )
+        
+        def read_data_file(self, param, **kwargs):
+            
+            # tells if the worker uses the on-disk memo
+            self.raw_data = [
+                mapping.get_mapper().memo.store is None,
+                settings.get('mapping_memo_persistent'),
+            ]
+        
+        attached = []
+        monkeypatch.setattr(main.PyPath, 'read_data_file', read_data_file)
+        monkeypatch.setattr(
+            main.PyPath,
+            '_attach_resource',
+            lambda self, clean = True: attached.append(self.raw_data),
+        )
+        
+        try:
+            
+            mapping.init()
+            main.PyPath().load_resources(resources, workers = 2)
+            
+            assert attached == [[True, False]] * 3
+            assert mapping.get_mapper().memo.store is not None
+            
+            # the workers are terminated if attaching the data fails
+            def attach_fails(self, clean = True):
+                
+                raise RuntimeError
+            
+            monkeypatch.setattr(main.PyPath, '_attach_resource', attach_fails)
+            
+            with pytest.raises(RuntimeError):
+                
+                main.PyPath().load_resources(resources, workers = 2)
+            
+            assert not multiprocessing.active_children()
+        
+        finally:
+            
+            settings.setup(
+                mapping_memo = False,
+                mapping_memo_persistent = False,
+            )
+            mapping.init()
+    
+    
+    def test_random_walk_with_return(self):
+        
+        pa = main.PyPath()
+        pa.attach_network(edge_list = _synthetic_edge_list(), bulk = True)
+        graph = pa.graph
+        graph.to_directed()
+        queries = [{0, 5}, {7}, set()]
+        
+        def check():
+            
+            # the dense reference implementation
+            A = np.array(list(graph.get_adjacency()), dtype = np.float64).T
+            A = np.nan_to_num(A / A.sum(0))
+            
+            result = pa.random_walk_with_return_batch(queries, graph = graph)
+            
+            for i, q in enumerate(queries):
+                
+                _q = np.array([
+                    .5 / len(q) if v in q else 0.
+                    for v in range(graph.vcount())
+                ])
+                _p = _q.copy()
+                
+                for _ in range(1000):
+                    
+                    _p = .5 * A.dot(_p) + _q
+                
+                assert np.allclose(result[:,i], _p)
+            
+            assert np.allclose(
+                pa.random_walk_with_return(q = [0, 5], graph = graph),
+                result[:,0],
+            )
+        
+        check()
+        
+        # rewiring keeps the number of edges, the cached transition
+        # matrix must not be used
+        target = next(
+            v for v in range(1, graph.vcount())
+            if not graph.are_connected(0, v)
+        )
+        graph.delete_edges([2])
+        graph.add_edges([(0, target)])
+        pa._graph_changed()
+        
+        check()
+    
+    
+    def test_get_directed(self):
+        
+        pa = main.PyPath()
+        pa.attach_network(edge_list = _synthetic_edge_list(), bulk = True)
+        
+        expected = {}
+        
+        for e in pa.graph.es:
+            
+            for _dir in e['dirs'].which_dirs():
+                
+                expected[_dir] = (
+                    sorted(e['dirs'].get_dir(_dir, sources = True)),
+                    sorted(e['dirs'].get_dir('undirected', sources = True)),
+                )
+        
+        pa._has_directed()
+        dgraph = pa.dgraph
+        
+        assert dgraph.is_directed()
+        assert expected == dict(
+            (
+                (dgraph.vs[e.source]['name'], dgraph.vs[e.target]['name']),
+                (
+                    sorted(e['directed_sources']),
+                    sorted(e['undirected_sources']),
+                ),
+            )
+            for e in dgraph.es
+        )
+        assert all(dgraph.es['directed'])
+        
+        # the directed graph is cached until the graph changes
+        pa._has_directed()
+        assert pa.dgraph is dgraph
+        
+        pa.graph.delete_edges([0])
+        pa._has_directed()
+        assert pa.dgraph is not dgraph
+        assert pa.dgraph.ecount() < dgraph.ecount()
+    
+    
+    def test_ligand_receptor_go_inference(self, monkeypatch):
+        
+        pa = main.PyPath()
+        pa.attach_network(edge_list = _synthetic_edge_list(), bulk = True)
+        pa.graph.vs['go'] = [{} for _ in range(pa.graph.vcount())]
+        original = dict(
+            (tuple(sorted(pa.edge_names(e))), e['dirs'].sources)
+            for e in pa.graph.es
+        )
+        
+        # ligands: every third node, receptors: the next ones
+        ligands = set(i for i in range(pa.graph.vcount()) if i % 3 == 0)
+        receptors = set(i for i in range(pa.graph.vcount()) if i % 3 == 1)
+        selected = {
+            'GO:0005576': ligands,
+            'GO:0005102': ligands,
+            'GO:0005887': receptors,
+            'GO:0038023': receptors,
+        }
+        
+        monkeypatch.setattr(
+            main.dataio,
+            'go_descendants_quickgo',
+            lambda aspects: {},
+        )
+        monkeypatch.setattr(
+            main.PyPath,
+            'init_network',
+            lambda self, sources: None,
+        )
+        monkeypatch.setattr(
+            main.PyPath,
+            'select_by_go',
+            lambda self, term, go_desc: set(selected.get(term, ())),
+        )
+        
+        pa.load_ligand_receptor_network(
+            lig_rec_resources = False,
+            keep_lig_lig = True,
+            keep_rec_rec = True,
+        )
+        
+        labels = {'GO_lig_rec', 'GO_lig_lig', 'GO_rec_rec'}
+        found = set()
+        
+        for e in pa.graph.es:
+            
+            key = tuple(sorted(pa.edge_names(e)))
+            label = e['sources'] & labels
+            
+            assert len(label) == 1
+            
+            label = label.pop()
+            found.add(label)
+            
+            if label == 'GO_lig_rec':
+                
+                continue
+            
+            # the label is added to each direction having any source
+            assert e['dirs'].sources == dict(
+                (di_key, srcs | {label} if srcs else srcs)
+                for di_key, srcs in original[key].items()
+            )
+        
+        assert found == labels
+    
+    
+    def test_lookup_updates(self):
+        
+        edge_list = _synthetic_edge_list(n_edges = 3000)
+        pa = main.PyPath()
+        pa.attach_network(edge_list = edge_list[:2000], bulk = True)
+        pa.update_vname()
+        pa.update_adjlist()
+        nodDct = pa.nodDct
+        
+        # nothing changed, the lookups are not rebuilt
+        pa.update_vname()
+        assert pa.nodDct is nodDct
+        
+        pa.attach_network(edge_list = edge_list[2000:], bulk = False)
+        pa.update_vname()
+        pa.update_adjlist()
+        
+        # new nodes and edges have been added to the existing lookups
+        assert pa.nodDct is nodDct
+        
+        lookups = (
+            pa.nodInd,
+            dict(pa.nodDct),
+            pa.labDct,
+            pa.nodNam,
+            pa.nodLab,
+            pa.adjlist,
+        )
+        
+        pa.update_vname(force = True)
+        pa.update_adjlist(force = True)
+        
+        assert lookups == (
+            pa.nodInd,
+            pa.nodDct,
+            pa.labDct,
+            pa.nodNam,
+            pa.nodLab,
+            pa.adjlist,
+        )
+        assert pa.nodDct is not nodDct
+        
+        pa.graph.delete_vertices([0])
+        pa.update_vname()
+        
+        assert len(pa.nodDct) == pa.graph.vcount()
+        
+        # moving the edges of a node keeps the number of edges
+        pa = main.PyPath()
+        pa.attach_network(
+            edge_list = _synthetic_edge_list(n_edges = 20, n_nodes = 200),
+        )
+        pa.update_adjlist()
+        g = pa.graph
+        ecount = g.ecount()
+        source = next(v.index for v in g.vs if v.degree() == 1)
+        peer = g.neighbors(source)[0]
+        target = next(
+            v.index
+            for v in g.vs
+            if (
+                v.index not in {source, peer} and
+                not set(g.neighbors(v.index)) & {source, peer}
+            )
+        )
+        pa.copy_edges([source], target, move = True)
+        pa.update_adjlist()
+        
+        assert g.ecount() == ecount
+        assert pa.adjlist[target] >= {peer}
+        assert pa.adjlist[source] == set()
+    
+    
+    def test_network_snapshot(self, tmpdir):
+        
+        pa = main.PyPath()
+        pa.attach_network(edge_list = _synthetic_edge_list(), bulk = True)
+        # columns of types without special encoding are pickled
+        pa.graph.vs['misc'] = [
+            i if i % 2 else str(i) for i in range(pa.graph.vcount())
+        ]
+        path = str(tmpdir.join('network.snapshot'))
+        pa.save_network(pfile = path, snapshot = True)
+        
+        pa_loaded = main.PyPath()
+        pa_loaded.init_network(pfile = path)
+        
+        assert pa_loaded.graph.get_edgelist() == pa.graph.get_edgelist()
+        assert _edge_summary(pa_loaded) == _edge_summary(pa)
+        
+        for attr in pa.graph.vs.attributes():
+            
+            assert pa_loaded.graph.vs[attr] == pa.graph.vs[attr]
+        
+        for attr in pa.graph.es.attributes():
+            
+            if attr != 'dirs':
+                
+                assert pa_loaded.graph.es[attr] == pa.graph.es[attr]
+        
+        # loading attributes on demand
+        pa_lazy = main.PyPath()
+        pa_lazy.load_network_snapshot(path, edge_attrs = ['score'])
+        
+        assert 'refs_by_dir' not in pa_lazy.graph.es.attributes()
+        assert pa_lazy.graph.es['score'] == pa.graph.es['score']
+        
+        pa_lazy.load_snapshot_attrs(edge_attrs = ['refs_by_dir'])
+        
+        assert pa_lazy.graph.es['refs_by_dir'] == pa.graph.es['refs_by_dir']
+    
+    
+    def test_export_batches(self, tmpdir):
+        
+        pa = main.PyPath()
+        pa.attach_network(edge_list = _synthetic_edge_list(), bulk = True)
+        
+        for unique_pairs in (True, False):
+            
+            e = export.Export(pa)
+            e.make_df(unique_pairs = unique_pairs)
+            
+            batches = list(
+                e.iter_batches(unique_pairs = unique_pairs, chunk_size = 77)
+            )
+            
+            assert all(len(df) <= 77 for df in batches)
+            assert (
+                pd.concat(batches).astype(str).values.tolist() ==
+                e.df.astype(str).values.tolist()
+            )
+            
+            path = str(tmpdir.join('network-%u.tsv.gz' % unique_pairs))
+            e.write_batches(
+                outfile = path,
+                unique_pairs = unique_pairs,
+                chunk_size = 77,
+            )
+            expected = str(tmpdir.join('network-%u.tsv' % unique_pairs))
+            e.df.to_csv(expected, sep = '\t', index = False)
+            
+            with gzip.open(path, 'rt') as fp_written:
+                
+                with open(expected, 'r') as fp_expected:
+                    
+                    assert fp_written.read() == fp_expected.read()
+    
+    
     def test_complex_expansion(self):
         
         input_param = {'Signor': data_formats.pathway['signor']}
@@ -133,3 +734,48 @@ class TestPyPath(object):
                     *edge['dirs'].which_dirs()
                 ) == [True, False]
             )
+
+
+class TestDirection(object):
+    
+    
+    def test_direction(self):
+        
+        d = main.Direction('b', 'a')
+        d.set_dir(('a', 'b'), ['ResA', 'ResB'])
+        d.set_dir('undirected', 'ResC')
+        d.set_sign(('b', 'a'), 'negative', {'ResD'})
+        
+        assert d.nodes == ['a', 'b']
+        assert d.dirs == {
+            ('a', 'b'): True,
+            ('b', 'a'): True,
+            'undirected': True,
+        }
+        assert d.sources_straight() == {'ResA', 'ResB'}
+        assert d.get_dir(('b', 'a'), sources = True) == {'ResD'}
+        assert d.get_sign(('b', 'a')) == [False, True]
+        assert d.get_sign(('a', 'b'), 'positive') is False
+        assert d.which_dirs() == [('a', 'b'), ('b', 'a')]
+        
+        other = main.Direction('a', 'b')
+        other.set_sign(('a', 'b'), 'positive', 'ResE')
+        d.merge(other)
+        
+        assert d.positive_sources_straight() == {'ResE'}
+        assert d.sources_straight() == {'ResA', 'ResB', 'ResE'}
+        
+        d.unset_dir(('a', 'b'))
+        
+        assert not d.get_dir(('a', 'b'))
+        assert d.consensus_edges() == [['b', 'a', 'directed', 'negative']]
+        
+        copy = pickle.loads(pickle.dumps(d))
+        
+        assert copy.sources == d.sources
+        assert copy.positive_sources == d.positive_sources
+        assert copy.negative == d.negative
+        
+        translated = d.translate({'a': 'c', 'b': 'd'})
+        
+        assert translated.negative_sources_reverse() == {'ResD'}
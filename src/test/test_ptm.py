@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import random
+import multiprocessing
+
+import pytest
+
+import pypath.intera as intera
+import pypath.ptm as ptm
+
+
+def _synthetic_ptms(n_ptms = 2000, seed = 1):
+    """
+    Creates enzyme-substrate interactions between one pair of proteins,
+    with many redundant records from different resources.
+    """
+
+    rnd = random.Random(seed)
+
+    result = []
+
+    for _ in range(n_ptms):
+
+        residue = intera.Residue(
+            rnd.randrange(1, 50),
+            rnd.choice('STY'),
+            'P00533',
+        )
+
+        result.append(
+            intera.DomainMotif(
+                domain = intera.Domain(protein = 'P06241'),
+                ptm = intera.Ptm(
+                    'P00533',
+                    residue = residue,
+                    typ = rnd.choice(('phosphorylation', 'acetylation')),
+                    isoform = rnd.choice((1, 2)),
+                ),
+                sources = rnd.choice(('ResA', 'ResB', 'ResC')),
+                refs = [str(rnd.randrange(100))],
+            )
+        )
+
+    return result
+
+
+def _uniq_ptms_pairwise(ptms):
+    """
+    The earlier, pairwise implementation of `PtmAggregator.uniq_ptms`.
+    """
+
+    ptms_uniq = []
+
+    for ptm in ptms:
+        merged = False
+        for i, ptmu in enumerate(ptms_uniq):
+            if ptm == ptmu:
+                ptms_uniq[i].merge(ptm)
+                merged = True
+        if not merged:
+            ptms_uniq.append(ptm)
+
+    return ptms_uniq
+
+
+class _Processor(object):
+    """
+    Replaces `PtmProcessor`: the inputs are named by the seed of the
+    synthetic records, `fail` raises an error.
+    """
+
+    def __init__(self, input_method, **kwargs):
+
+        self.input_method = input_method
+
+    def __iter__(self):
+
+        if self.input_method == 'fail':
+
+            raise ValueError('Failed to process input.')
+
+        return iter(_synthetic_ptms(50, seed = int(self.input_method)))
+
+
+def _aggregator(input_methods, workers):
+
+    aggregator = ptm.PtmAggregator.__new__(ptm.PtmAggregator)
+    aggregator.input_methods = input_methods
+    aggregator.inputargs = {}
+    aggregator.workers = workers
+    aggregator.ncbi_tax_id = 9606
+    aggregator.nonhuman_direct_lookup = False
+    aggregator.map_by_homology_from = set()
+    aggregator.trace = False
+    aggregator.enzyme_id_type = 'uniprot'
+    aggregator.substrate_id_type = 'uniprot'
+    aggregator._log = lambda msg: None
+
+    return aggregator
+
+
+class TestPtmAggregator(object):
+
+
+    def test_uniq_ptms(self):
+
+        uniq = ptm.PtmAggregator.uniq_ptms(_synthetic_ptms())
+        uniq_pairwise = _uniq_ptms_pairwise(_synthetic_ptms())
+
+        assert (
+            [dm.get_line() for dm in uniq] ==
+            [dm.get_line() for dm in uniq_pairwise]
+        )
+
+        # records without residue are merged into an equal one
+        ptms = _synthetic_ptms(n_ptms = 100)
+        first = ptms[0]
+        ptms.append(
+            intera.DomainMotif(
+                domain = intera.Domain(protein = 'P06241'),
+                ptm = intera.Ptm('P00533', typ = first.ptm.typ),
+                sources = 'ResD',
+            )
+        )
+
+        uniq = ptm.PtmAggregator.uniq_ptms(ptms)
+
+        assert len(uniq) == len(_uniq_ptms_pairwise(_synthetic_ptms(100)))
+        assert 'ResD' in uniq[0].sources
+
+
+    def test_build_list_workers(self, monkeypatch):
+
+        monkeypatch.setattr(ptm, 'PtmProcessor', _Processor)
+        results = []
+
+        for workers in (1, 3):
+
+            aggregator = _aggregator(['1', '2', '3'], workers)
+            aggregator.build_list()
+            results.append(
+                [
+                    (key, [dm.get_line() for dm in dms])
+                    for key, dms in aggregator.enz_sub.items()
+                ]
+            )
+
+            assert (
+                [stats[2] for stats in aggregator.input_stats] ==
+                [50, 50, 50]
+            )
+
+        assert results[0] == results[1]
+
+        # the workers are terminated if an input fails
+        aggregator = _aggregator(['1', 'fail', '3'], 3)
+
+        with pytest.raises(ValueError):
+
+            aggregator.build_list()
+
+        assert not multiprocessing.active_children()
@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2019
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import json
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+twisted_requesthelper = pytest.importorskip('twisted.web.test.requesthelper')
+
+import pypath.server as server
+
+
+def _synthetic_tables(tmpdir, n_rows = 300, seed = 1):
+    """
+    Writes small random tables in the format of the webservice
+    tables, returns the paths.
+    """
+
+    rnd = random.Random(seed)
+    proteins = ['P%05u' % i for i in range(30)]
+    genesymbols = dict((p, 'GENE%u' % i) for i, p in enumerate(proteins))
+    resources = ['ResA', 'ResB', 'ResC', 'ResD']
+    datasets = sorted(server.TableServer.datasets_)
+    methods = sorted(server.TableServer.tfregulons_methods)
+
+    def some(values, k = 2):
+
+        return ';'.join(sorted(rnd.sample(values, rnd.randint(1, k))))
+
+    def pair():
+
+        return rnd.sample(proteins, 2)
+
+    tables = {}
+
+    rows = []
+
+    for _ in range(n_rows):
+
+        source, target = pair()
+        typ = rnd.choice(('PPI', 'PPI', 'TF', 'MTI'))
+        rows.append(
+            dict(
+                [
+                    ('source', source),
+                    ('target', target),
+                    ('source_genesymbol', genesymbols[source]),
+                    ('target_genesymbol', genesymbols[target]),
+                ] +
+                [
+                    (field, rnd.randint(0, 1))
+                    for field in (
+                        'is_directed',
+                        'is_stimulation',
+                        'is_inhibition',
+                        'consensus_direction',
+                        'consensus_stimulation',
+                        'consensus_inhibition',
+                    )
+                ] +
+                [
+                    ('dip_url', ''),
+                    ('sources', some(resources, 3)),
+                    ('references', some(['1', '2', '3', '11'])),
+                ] +
+                [
+                    (dataset, rnd.random() < .5)
+                    for dataset in datasets
+                ] +
+                [
+                    ('tfregulons_%s' % method, rnd.random() < .3)
+                    for method in methods
+                ] +
+                [
+                    (
+                        'tfregulons_level',
+                        some(['A', 'B', 'C', 'D', 'E'])
+                            if typ == 'TF' else
+                        np.nan
+                    ),
+                    ('type', typ),
+                    ('ncbi_tax_id_source', rnd.choice((9606, 9606, 10090))),
+                    ('ncbi_tax_id_target', rnd.choice((9606, 9606, 10090))),
+                ]
+            )
+        )
+
+    tables['interactions'] = rows
+
+    rows = []
+
+    for _ in range(n_rows):
+
+        enzyme, substrate = pair()
+        rows.append(
+            dict((
+                ('enzyme', enzyme),
+                ('substrate', substrate),
+                ('enzyme_genesymbol', genesymbols[enzyme]),
+                ('substrate_genesymbol', genesymbols[substrate]),
+                ('isoforms', some(['1', '2'])),
+                ('residue_type', rnd.choice('STY')),
+                ('residue_offset', rnd.randint(1, 500)),
+                ('modification', rnd.choice(
+                    ('phosphorylation', 'acetylation')
+                )),
+                ('sources', some(resources, 3)),
+                ('references', some(['1', '2', '3', '11'])),
+                ('ncbi_tax_id', rnd.choice((9606, 9606, 10090))),
+            ))
+        )
+
+    tables['ptms'] = rows
+
+    tables['annotations'] = [
+        dict((
+            ('uniprot', protein),
+            ('genesymbol', genesymbols[protein]),
+            ('source', rnd.choice(resources)),
+            ('label', rnd.choice(('location', 'function'))),
+            ('value', rnd.choice(('a', 'b', 'c'))),
+            ('record_id', i),
+        ))
+        for i, protein in enumerate(
+            rnd.choice(proteins) for _ in range(n_rows)
+        )
+    ]
+
+    rows = []
+
+    for i in range(n_rows // 3):
+
+        components = sorted(rnd.sample(proteins, rnd.randint(2, 4)))
+        rows.append(
+            dict((
+                ('name', 'Complex%u' % i),
+                ('components', '-'.join(components)),
+                (
+                    'components_genesymbols',
+                    '-'.join(genesymbols[c] for c in components),
+                ),
+                ('stoichiometry', ':'.join('1' for c in components)),
+                ('sources', some(resources, 3)),
+                ('references', some(['1', '2', '3', '11'])),
+                ('identifiers', 'id%u' % i),
+            ))
+        )
+
+    tables['complexes'] = rows
+
+    tables['intercell'] = [
+        dict((
+            ('category', rnd.choice(('ligand', 'receptor', 'ecm'))),
+            ('uniprot', protein),
+            ('genesymbol', genesymbols[protein]),
+            ('mainclass', rnd.choice(('ligand', 'receptor'))),
+            ('class_type', rnd.choice(('main', 'sub'))),
+        ))
+        for protein in (rnd.choice(proteins) for _ in range(n_rows))
+    ]
+
+    input_files = {}
+
+    for name, rows in tables.items():
+
+        path = str(tmpdir.join('%s.tsv' % name))
+        pd.DataFrame(rows).to_csv(path, sep = '\t', index = False)
+        input_files[name] = path
+
+    return input_files
+
+
+def _get(srv, path, **args):
+    """
+    Sends a GET request to the server, returns the response.
+    """
+
+    req = twisted_requesthelper.DummyRequest(
+        [p.encode('utf-8') for p in path.split('/')]
+    )
+    req.args = dict(
+        (k.encode('utf-8'), [v.encode('utf-8')])
+        for k, v in args.items()
+    )
+
+    srv.render_GET(req)
+
+    assert req.finished
+
+    return b''.join(req.written)
+
+
+@pytest.fixture(scope = 'module')
+def input_files(tmpdir_factory):
+
+    return _synthetic_tables(tmpdir_factory.mktemp('tables'))
+
+
+class TestTableServer(object):
+
+
+    # queries and the number of rows in their results
+    queries = (
+        ('interactions', {}, 69),
+        ('interactions', {'genesymbols': 'yes', 'fields': 'sources'}, 69),
+        ('interactions/P00001', {}, 3),
+        ('interactions/P00001,P00002,GENE3/P00004,GENE5,GENE6/and', {}, 1),
+        (
+            'interactions',
+            {'sources': 'P00003,GENE4', 'targets': 'P00005'},
+            5,
+        ),
+        (
+            'interactions',
+            {
+                'datasets': 'tfregulons,kinaseextra',
+                'tfregulons_levels': 'A,C',
+                'tfregulons_methods': 'curated,tfbs',
+                'fields': 'organism,tfregulons_level,databases',
+            },
+            78,
+        ),
+        ('interactions', {'types': 'TF,MTI', 'organisms': '10090'}, 33),
+        ('interactions', {'databases': 'ResA,ResC', 'directed': 'yes'}, 21),
+        ('interactions', {'datasets': 'pathwayextra', 'signed': '1'}, 52),
+        ('ptms', {}, 208),
+        ('ptms', {'genesymbols': '1', 'fields': 'databases,isoforms'}, 208),
+        ('ptms/P00001/P00002', {}, 15),
+        (
+            'ptms/P00001,P00002,GENE3/P00004,GENE5,GENE6/and',
+            {'types': 'acetylation'},
+            3,
+        ),
+        ('ptms', {'databases': 'ResB', 'organisms': '9606,10090'}, 156),
+        ('annotations', {}, 300),
+        ('annotations', {'databases': 'ResA,ResB'}, 136),
+        (
+            'annotations',
+            {'proteins': 'P00001,GENE3', 'databases': 'ResC'},
+            3,
+        ),
+        ('complexes', {}, 100),
+        ('complexes', {'databases': 'ResD'}, 44),
+        (
+            'complexes',
+            {'proteins': 'P00001,P00003', 'databases': 'ResA'},
+            10,
+        ),
+        ('intercell', {}, 300),
+        ('intercell', {'levels': 'main', 'categories': 'ligand,ecm'}, 104),
+        ('intercell', {'proteins': 'GENE1,P00002,P00003'}, 28),
+    )
+
+
+    def test_queries(self, input_files):
+
+        srv = server.TableServer(input_files = input_files)
+
+        for path, args, n_rows in self.queries:
+
+            tsv = _get(srv, path, format = 'tsv', **args).decode('utf-8')
+            records = json.loads(_get(srv, path, format = 'json', **args))
+
+            assert len(tsv.splitlines()) - 1 == n_rows, (path, args)
+            assert len(records) == n_rows, (path, args)
+
+
+    def test_query_rows(self, input_files):
+
+        srv = server.TableServer(input_files = input_files)
+
+        def rows(path, columns, **args):
+
+            return sorted(
+                tuple(record[c] for c in columns)
+                for record in json.loads(
+                    _get(srv, path, format = 'json', **args)
+                )
+            )
+
+        # PPI of the `omnipath` dataset, at least one partner is human
+        assert rows('interactions/P00001', ('source', 'target')) == [
+            ('P00001', 'P00007'),
+            ('P00019', 'P00001'),
+            ('P00019', 'P00001'),
+        ]
+        assert rows(
+            'interactions/P00001,P00002,GENE3/P00004,GENE5,GENE6/and',
+            ('source', 'target'),
+        ) == [('P00002', 'P00005')]
+        # human by default, the 4th one (P00003-P00006) is mouse
+        assert rows(
+            'ptms/P00001,P00002,GENE3/P00004,GENE5,GENE6/and',
+            ('enzyme', 'substrate', 'residue_offset'),
+            types = 'acetylation',
+        ) == [
+            ('P00001', 'P00005', 22),
+            ('P00002', 'P00004', 335),
+            ('P00003', 'P00004', 85),
+        ]
+        assert rows(
+            'annotations',
+            ('uniprot', 'label', 'record_id'),
+            proteins = 'P00001,GENE3',
+            databases = 'ResC',
+        ) == [
+            ('P00001', 'function', 145),
+            ('P00001', 'location', 159),
+            ('P00003', 'location', 252),
+        ]
+
+
+    def test_missing_tables(self, input_files):
+
+        srv = server.TableServer(
+            input_files = dict(
+                (name, path)
+                for name, path in input_files.items()
+                if name != 'annotations'
+            )
+        )
+
+        assert 'annotations' not in srv.data
+        assert _get(srv, 'complexes', databases = 'ResA').startswith(
+            b'name\tcomponents'
+        )
+
+
+    def test_streaming(self, input_files, monkeypatch):
+
+        srv = server.TableServer(input_files = input_files)
+        srv.response_cache_size = 2
+
+        def request(path, **args):
+
+            req = twisted_requesthelper.DummyRequest(
+                [p.encode('utf-8') for p in path.split('/')]
+            )
+            req.args = dict(
+                (k.encode('utf-8'), [v.encode('utf-8')])
+                for k, v in args.items()
+            )
+            srv.render_GET(req)
+
+            assert req.finished
+
+            return req
+
+        # the response is sent in many chunks
+        args = {'fields': 'isoforms', 'organisms': '9606,10090'}
+        srv.chunk_size = 7
+        req = request('ptms', format = 'json', **args)
+        response = b''.join(req.written)
+
+        assert len(req.written) > 10
+        assert len(json.loads(response)) == len(srv.data['ptms'])
+
+        srv.chunk_size = 10000
+        srv._response_cache.clear()
+        srv._response_cache_bytes = 0
+
+        assert b''.join(
+            request('ptms', format = 'json', **args).written
+        ) == response
+
+        req = request('ptms', format = 'tsv', **args)
+
+        assert b''.join(req.written) == (
+            srv.data['ptms'].loc[
+                :,
+                [
+                    'enzyme', 'substrate', 'residue_type',
+                    'residue_offset', 'modification', 'isoforms',
+                ]
+            ].to_csv(sep = '\t', index = False).encode('utf-8')
+        )
+
+        # the complete responses are cached, queries
+        # selecting by identifiers are not
+        request('complexes', databases = 'ResA')
+        request('complexes', proteins = 'P00001')
+
+        assert len(srv._response_cache) == 2
+
+        def handler(req):
+
+            raise RuntimeError('Response not served from the cache.')
+
+        monkeypatch.setattr(srv, 'complexes', handler)
+        monkeypatch.setattr(srv, 'ptms', handler)
+
+        assert b''.join(
+            request('complexes', databases = 'ResA').written
+        ).startswith(b'name\tcomponents')
+
+        # least recently used responses are evicted
+        with pytest.raises(RuntimeError):
+
+            request('ptms', format = 'json', **args)
+
+
+    def test_response_cache_size(self, input_files):
+
+        srv = server.TableServer(input_files = input_files)
+        queries = [
+            ('complexes', {'databases': 'ResA'}),
+            ('complexes', {'databases': 'ResD'}),
+            ('annotations', {'databases': 'ResA'}),
+            ('ptms', {'format': 'json'}),
+        ]
+        sizes = [len(_get(srv, path, **args)) for path, args in queries]
+
+        def cached():
+
+            assert srv._response_cache_bytes == sum(
+                len(response) for response in srv._response_cache.values()
+            )
+
+            return [
+                (key[0], dict(key[1]).get(b'databases', (None,))[0])
+                for key in srv._response_cache.keys()
+            ]
+
+        srv._response_cache.clear()
+        srv._response_cache_bytes = 0
+        srv.response_cache_max_bytes = sizes[0] + sizes[1]
+        srv.response_cache_max_entry_bytes = sizes[3] - 1
+
+        for path, args in queries[:2]:
+
+            _get(srv, path, **args)
+
+        assert cached() == [('complexes', b'ResA'), ('complexes', b'ResD')]
+
+        # the least recently used ones are evicted above the total size
+        path, args = queries[2]
+        _get(srv, path, **args)
+
+        assert cached() == [('complexes', b'ResD'), ('annotations', b'ResA')]
+
+        # responses larger than the limit are not kept
+        path, args = queries[3]
+        srv.response_cache_max_bytes = None
+
+        assert len(_get(srv, path, **args)) == sizes[3]
+        assert len(cached()) == 2
+
+        srv.response_cache_max_entry_bytes = sizes[3]
+        _get(srv, path, **args)
+
+        assert len(cached()) == 3
+
+
+    def test_json_chunks(self, input_files):
+
+        srv = server.TableServer(input_files = input_files)
+
+        # any row labels, any order of rows
+        tbl = srv.data['ptms'].iloc[::-3].loc[:, ['enzyme', 'isoforms']]
+        tbl.index = ['row%u' % i for i in range(len(tbl))]
+
+        assert json.loads(b''.join(srv._json_chunks(tbl, 'ptms'))) == [
+            {
+                'enzyme': enzyme,
+                'isoforms': [int(i) for i in isoforms.split(';')],
+            }
+            for enzyme, isoforms in zip(tbl.enzyme, tbl.isoforms)
+        ]
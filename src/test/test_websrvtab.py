@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  This file is part of the `pypath` python module
+#
+#  Copyright
+#  2014-2018
+#  EMBL, EMBL-EBI, Uniklinik RWTH Aachen, Heidelberg University
+#
+#  File author(s): Dénes Türei (turei.denes@gmail.com)
+#                  Nicolàs Palacio
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  Website: http://pypath.omnipathdb.org/
+#
+
+
+import os
+import time
+import pickle
+
+import pypath.curl as curl
+import pypath.mapping as mapping
+import pypath.input_formats as input_formats
+import pypath.settings as settings
+import pypath.websrvtab as websrvtab
+
+
+def _mapping_param(workdir):
+
+    return input_formats.FileMapping(
+        id_type_a = 'genesymbol',
+        id_type_b = 'uniprot',
+        input_ = os.path.join(workdir, 'mapping.tsv'),
+        col_a = 0,
+        col_b = 1,
+        separator = '\t',
+        header = 1,
+        ncbi_tax_id = 9606,
+    )
+
+
+class _Tables(websrvtab.WebserviceTables):
+    """
+    Two cheap stages: the first reads a local file by `Curl`, the second
+    a mapping table which is cached as a pickle after the first load.
+    """
+    
+    stages = ('plain', 'mapped')
+    
+    
+    def __init__(self, only_human = False, outfile_plain = None,
+                 outfile_mapped = None):
+        
+        websrvtab.WebserviceTables.__init__(self, only_human = only_human)
+        
+        self.outfile_plain = outfile_plain
+        self.outfile_mapped = outfile_mapped
+        self.workdir = os.path.dirname(outfile_plain)
+    
+    
+    def plain(self):
+        
+        c = curl.Curl(os.path.join(self.workdir, 'input.tsv'))
+        
+        with open(self.outfile_plain, 'w') as fp:
+            
+            fp.write(c.result.upper())
+    
+    
+    def mapped(self):
+        
+        reader = mapping.MapReader(_mapping_param(self.workdir))
+        
+        with open(self.outfile_mapped, 'w') as fp:
+            
+            for genesymbol, uniprots in sorted(
+                reader.mapping_table_a_to_b.data.items()
+            ):
+                
+                fp.write('%s\t%s\n' % (genesymbol, ','.join(sorted(uniprots))))
+
+
+class TestWebserviceTables(object):
+    
+    def test_checkpoints(self, tmpdir):
+        
+        workdir = str(tmpdir)
+        tmpdir.join('input.tsv').write('a\tb\n')
+        tmpdir.join('mapping.tsv').write(
+            'genesymbol\tuniprot\nEGFR\tP00533\nERBB2\tP04626\n'
+        )
+        settings.setup(
+            cachedir = str(tmpdir.mkdir('cache')),
+            mapping_cache_format = 'pickle',
+        )
+        
+        tables = _Tables(
+            outfile_plain = os.path.join(workdir, 'plain.tsv'),
+            outfile_mapped = os.path.join(workdir, 'mapped.tsv'),
+        )
+        
+        for workers in (1, 2):
+            
+            tables.main(workers = workers, force = True)
+            
+            assert set(tables.timing) == {'plain', 'mapped'}
+            assert tmpdir.join('plain.tsv').read() == 'A\tB\n'
+            assert tmpdir.join('mapped.tsv').read() == (
+                'EGFR\tP00533\nERBB2\tP04626\n'
+            )
+            
+            # nothing changed
+            tables.main(workers = workers)
+            
+            assert tables.timing == {}
+        
+        # the same contents with a new modification time
+        tmpdir.join('input.tsv').write('a\tb\n')
+        tmpdir.join('input.tsv').setmtime(time.time() + 100)
+        tables.main()
+        
+        assert tables.timing == {}
+        
+        # the local input of the first stage
+        tmpdir.join('input.tsv').write('a\tb\tc\n')
+        tables.main()
+        
+        assert set(tables.timing) == {'plain'}
+        assert tmpdir.join('plain.tsv').read() == 'A\tB\tC\n'
+        
+        # the mapping table is loaded from the pickle cache now,
+        # a new cache must trigger the second stage
+        reader = mapping.MapReader(_mapping_param(workdir))
+        cachefile = reader.cachefile_a_to_b
+        
+        assert os.path.exists(cachefile)
+        
+        pickle.dump(
+            {'EGFR': {'P00533'}, 'TP53': {'P04637'}},
+            open(cachefile, 'wb'),
+        )
+        tables.main(workers = 2)
+        
+        assert set(tables.timing) == {'mapped'}
+        assert tmpdir.join('mapped.tsv').read() == (
+            'EGFR\tP00533\nTP53\tP04637\n'
+        )
+        
+        tables.main()
+        
+        assert tables.timing == {}